@@ -8,9 +8,12 @@
 """
 from abc import ABC, abstractmethod
 from typing import Dict, List, Optional, Any
+from asgiref.sync import sync_to_async
 from django.core.cache import cache
 import logging
 
+from apps.common.async_views import async_http_client
+
 logger = logging.getLogger(__name__)
 
 
@@ -78,6 +81,31 @@ class BasePlatformAdapter(ABC):
         logger.info(f"[{self.PLATFORM_NAME}] AccessToken 已刷新, 有效期: {cache_timeout}s")
         return token
     
+    async def aget_access_token(self, client=None) -> str:
+        """
+        获取 AccessToken（带缓存，异步）
+        
+        Args:
+            client: 复用的 httpx.AsyncClient，为空时新建
+        """
+        cached_token = await cache.aget(self.token_cache_key)
+        if cached_token:
+            return cached_token
+        
+        if client is None:
+            async with async_http_client() as client:
+                token_data = await self._afetch_access_token(client)
+        else:
+            token_data = await self._afetch_access_token(client)
+        token = token_data.get('access_token', '')
+        expires_in = token_data.get('expires_in', 7200)
+        
+        cache_timeout = max(expires_in - self.TOKEN_EXPIRE_BUFFER, 60)
+        await cache.aset(self.token_cache_key, token, timeout=cache_timeout)
+        
+        logger.info(f"[{self.PLATFORM_NAME}] AccessToken 已刷新, 有效期: {cache_timeout}s")
+        return token
+    
     def clear_token_cache(self) -> None:
         """清除 Token 缓存"""
         cache.delete(self.token_cache_key)
@@ -126,6 +154,28 @@ class BasePlatformAdapter(ABC):
         """
         pass
     
+    async def _afetch_access_token(self, client) -> Dict[str, Any]:
+        """
+        从平台 API 获取 AccessToken（异步）
+        
+        默认在线程中执行同步实现，子类可使用 client 重写为原生异步调用
+        """
+        return await sync_to_async(self._fetch_access_token)()
+    
+    async def asend_notification(self, user_ids: List[str], message: Dict, client=None) -> Dict[str, Any]:
+        """
+        发送通知消息（异步）
+        
+        默认在线程中执行同步实现，子类可重写为原生异步调用；
+        推送多个平台时可通过 asyncio.gather 并发等待
+        
+        Args:
+            user_ids: 用户ID列表
+            message: 消息内容
+            client: 复用的 httpx.AsyncClient，为空时新建
+        """
+        return await sync_to_async(self.send_notification)(user_ids, message)
+    
     def get_department_list(self) -> List[Dict]:
         """
         获取部门列表（可选实现）
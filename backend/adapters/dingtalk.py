@@ -6,7 +6,9 @@
 import requests
 import logging
 from typing import Dict, List, Any
+from django.conf import settings
 
+from apps.common.async_views import async_http_client
 from .base import BasePlatformAdapter
 
 logger = logging.getLogger(__name__)
@@ -23,7 +25,7 @@ class DingTalkAdapter(BasePlatformAdapter):
     """
     
     PLATFORM_NAME = 'dingtalk'
-    BASE_URL = 'https://oapi.dingtalk.com'
+    BASE_URL = settings.SSO_API_BASE_URLS['dingtalk_oapi']
     
     def __init__(self, app_key: str, app_secret: str, agent_id: str = None):
         """
@@ -47,20 +49,34 @@ class DingTalkAdapter(BasePlatformAdapter):
         
         try:
             response = requests.get(url, params=params, timeout=10)
-            data = response.json()
-            
-            if data.get('errcode', 0) != 0:
-                logger.error(f"[DingTalk] 获取Token失败: {data}")
-                raise Exception(f"获取Token失败: {data.get('errmsg')}")
-            
-            return {
-                'access_token': data.get('access_token', ''),
-                'expires_in': data.get('expires_in', 7200)
-            }
+            return self._parse_token_response(response.json())
+        except Exception as e:
+            logger.error(f"[DingTalk] 获取Token异常: {str(e)}")
+            raise
+    
+    async def _afetch_access_token(self, client) -> Dict[str, Any]:
+        """获取钉钉 AccessToken（异步）"""
+        try:
+            response = await client.get(
+                f"{self.BASE_URL}/gettoken",
+                params={'appkey': self.app_key, 'appsecret': self.app_secret}
+            )
+            return self._parse_token_response(response.json())
         except Exception as e:
             logger.error(f"[DingTalk] 获取Token异常: {str(e)}")
             raise
     
+    @staticmethod
+    def _parse_token_response(data: Dict) -> Dict[str, Any]:
+        if data.get('errcode', 0) != 0:
+            logger.error(f"[DingTalk] 获取Token失败: {data}")
+            raise Exception(f"获取Token失败: {data.get('errmsg')}")
+        
+        return {
+            'access_token': data.get('access_token', ''),
+            'expires_in': data.get('expires_in', 7200)
+        }
+    
     def get_user_info(self, user_id: str) -> Dict[str, Any]:
         """
         获取钉钉用户信息
@@ -115,6 +131,36 @@ class DingTalkAdapter(BasePlatformAdapter):
         token = self.get_access_token()
         url = f"{self.BASE_URL}/topapi/message/corpconversation/asyncsend_v2"
         
+        try:
+            response = requests.post(
+                f"{url}?access_token={token}",
+                json=self._build_message_payload(user_ids, message),
+                timeout=10
+            )
+            return self._parse_send_response(response.json())
+        except Exception as e:
+            logger.error(f"[DingTalk] 发送消息异常: {str(e)}")
+            return {'success': False, 'error': str(e)}
+    
+    async def asend_notification(self, user_ids: List[str], message: Dict, client=None) -> Dict[str, Any]:
+        """发送钉钉工作通知（异步）"""
+        if client is None:
+            async with async_http_client() as client:
+                return await self.asend_notification(user_ids, message, client)
+        
+        try:
+            token = await self.aget_access_token(client)
+            response = await client.post(
+                f"{self.BASE_URL}/topapi/message/corpconversation/asyncsend_v2",
+                params={'access_token': token},
+                json=self._build_message_payload(user_ids, message)
+            )
+            return self._parse_send_response(response.json())
+        except Exception as e:
+            logger.error(f"[DingTalk] 发送消息异常: {str(e)}")
+            return {'success': False, 'error': str(e)}
+    
+    def _build_message_payload(self, user_ids: List[str], message: Dict) -> Dict:
         msg_type = message.get('type', 'text')
         content = message.get('content', '')
         
@@ -130,28 +176,19 @@ class DingTalkAdapter(BasePlatformAdapter):
                 }
             }
         
-        payload = {
+        return {
             'agent_id': self.agent_id,
             'userid_list': ','.join(user_ids),
             'msg': msg
         }
+    
+    @staticmethod
+    def _parse_send_response(data: Dict) -> Dict[str, Any]:
+        if data.get('errcode', 0) != 0:
+            logger.error(f"[DingTalk] 发送消息失败: {data}")
+            return {'success': False, 'error': data.get('errmsg')}
         
-        try:
-            response = requests.post(
-                f"{url}?access_token={token}",
-                json=payload,
-                timeout=10
-            )
-            data = response.json()
-            
-            if data.get('errcode', 0) != 0:
-                logger.error(f"[DingTalk] 发送消息失败: {data}")
-                return {'success': False, 'error': data.get('errmsg')}
-            
-            return {'success': True, 'task_id': data.get('task_id')}
-        except Exception as e:
-            logger.error(f"[DingTalk] 发送消息异常: {str(e)}")
-            return {'success': False, 'error': str(e)}
+        return {'success': True, 'task_id': data.get('task_id')}
     
     def get_department_list(self, parent_id: int = 1) -> List[Dict]:
         """
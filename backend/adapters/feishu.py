@@ -3,10 +3,13 @@
 
 飞书平台集成实现
 """
+import asyncio
 import requests
 import logging
 from typing import Dict, List, Any
+from django.conf import settings
 
+from apps.common.async_views import async_http_client
 from .base import BasePlatformAdapter
 
 logger = logging.getLogger(__name__)
@@ -23,7 +26,7 @@ class FeishuAdapter(BasePlatformAdapter):
     """
     
     PLATFORM_NAME = 'feishu'
-    BASE_URL = 'https://open.feishu.cn/open-apis'
+    BASE_URL = settings.SSO_API_BASE_URLS['feishu']
     
     def __init__(self, app_id: str, app_secret: str):
         """
@@ -46,20 +49,34 @@ class FeishuAdapter(BasePlatformAdapter):
         
         try:
             response = requests.post(url, json=payload, timeout=10)
-            data = response.json()
-            
-            if data.get('code', 0) != 0:
-                logger.error(f"[Feishu] 获取Token失败: {data}")
-                raise Exception(f"获取Token失败: {data.get('msg')}")
-            
-            return {
-                'access_token': data.get('tenant_access_token', ''),
-                'expires_in': data.get('expire', 7200)
-            }
+            return self._parse_token_response(response.json())
+        except Exception as e:
+            logger.error(f"[Feishu] 获取Token异常: {str(e)}")
+            raise
+    
+    async def _afetch_access_token(self, client) -> Dict[str, Any]:
+        """获取飞书 tenant_access_token（异步）"""
+        try:
+            response = await client.post(
+                f"{self.BASE_URL}/auth/v3/tenant_access_token/internal",
+                json={'app_id': self.app_id, 'app_secret': self.app_secret}
+            )
+            return self._parse_token_response(response.json())
         except Exception as e:
             logger.error(f"[Feishu] 获取Token异常: {str(e)}")
             raise
     
+    @staticmethod
+    def _parse_token_response(data: Dict) -> Dict[str, Any]:
+        if data.get('code', 0) != 0:
+            logger.error(f"[Feishu] 获取Token失败: {data}")
+            raise Exception(f"获取Token失败: {data.get('msg')}")
+        
+        return {
+            'access_token': data.get('tenant_access_token', ''),
+            'expires_in': data.get('expire', 7200)
+        }
+    
     def _get_auth_header(self) -> Dict:
         """获取认证头"""
         token = self.get_access_token()
@@ -119,38 +136,75 @@ class FeishuAdapter(BasePlatformAdapter):
         """
         url = f"{self.BASE_URL}/im/v1/messages"
         
-        msg_type = message.get('type', 'text')
-        content = message.get('content', '')
-        
         results = []
         for user_id in user_ids:
-            payload = {
-                'receive_id': user_id,
-                'msg_type': msg_type,
-            }
-            
-            if msg_type == 'text':
-                payload['content'] = f'{{"text": "{content}"}}'
-            elif msg_type == 'post':
-                payload['content'] = content  # 应该是富文本JSON
-            
             try:
                 response = requests.post(
                     url,
                     headers=self._get_auth_header(),
-                    params={'receive_id_type': 'open_id'},
-                    json=payload,
+                    params={'receive_id_type': message.get('receive_id_type', 'open_id')},
+                    json=self._build_message_payload(user_id, message),
                     timeout=10
                 )
-                data = response.json()
-                
-                if data.get('code', 0) != 0:
-                    results.append({'user_id': user_id, 'success': False, 'error': data.get('msg')})
-                else:
-                    results.append({'user_id': user_id, 'success': True})
+                results.append(self._parse_send_response(user_id, response.json()))
             except Exception as e:
                 results.append({'user_id': user_id, 'success': False, 'error': str(e)})
         
+        return self._summarize_results(user_ids, results)
+    
+    async def asend_notification(self, user_ids: List[str], message: Dict, client=None) -> Dict[str, Any]:
+        """
+        发送飞书消息（异步）
+        
+        飞书按接收人逐条发送，异步版本并发发送，总耗时约等于单条耗时
+        """
+        if client is None:
+            async with async_http_client() as client:
+                return await self.asend_notification(user_ids, message, client)
+        
+        url = f"{self.BASE_URL}/im/v1/messages"
+        headers = {'Authorization': f'Bearer {await self.aget_access_token(client)}'}
+        params = {'receive_id_type': message.get('receive_id_type', 'open_id')}
+        
+        async def send_one(user_id):
+            try:
+                response = await client.post(
+                    url,
+                    headers=headers,
+                    params=params,
+                    json=self._build_message_payload(user_id, message)
+                )
+                return self._parse_send_response(user_id, response.json())
+            except Exception as e:
+                return {'user_id': user_id, 'success': False, 'error': str(e)}
+        
+        results = await asyncio.gather(*(send_one(user_id) for user_id in user_ids))
+        return self._summarize_results(user_ids, list(results))
+    
+    @staticmethod
+    def _build_message_payload(user_id: str, message: Dict) -> Dict:
+        msg_type = message.get('type', 'text')
+        content = message.get('content', '')
+        
+        payload = {
+            'receive_id': user_id,
+            'msg_type': msg_type,
+        }
+        
+        if msg_type == 'text':
+            payload['content'] = f'{{"text": "{content}"}}'
+        elif msg_type == 'post':
+            payload['content'] = content  # 应该是富文本JSON
+        return payload
+    
+    @staticmethod
+    def _parse_send_response(user_id: str, data: Dict) -> Dict[str, Any]:
+        if data.get('code', 0) != 0:
+            return {'user_id': user_id, 'success': False, 'error': data.get('msg')}
+        return {'user_id': user_id, 'success': True}
+    
+    @staticmethod
+    def _summarize_results(user_ids: List[str], results: List[Dict]) -> Dict[str, Any]:
         success_count = sum(1 for r in results if r['success'])
         return {
             'success': success_count == len(user_ids),
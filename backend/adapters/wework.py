@@ -6,7 +6,9 @@
 import requests
 import logging
 from typing import Dict, List, Any
+from django.conf import settings
 
+from apps.common.async_views import async_http_client
 from .base import BasePlatformAdapter
 
 logger = logging.getLogger(__name__)
@@ -24,7 +26,7 @@ class WeWorkAdapter(BasePlatformAdapter):
     """
     
     PLATFORM_NAME = 'wework'
-    BASE_URL = 'https://qyapi.weixin.qq.com/cgi-bin'
+    BASE_URL = settings.SSO_API_BASE_URLS['wework']
     
     def __init__(self, corp_id: str, agent_id: str, secret: str):
         """
@@ -48,20 +50,34 @@ class WeWorkAdapter(BasePlatformAdapter):
         
         try:
             response = requests.get(url, params=params, timeout=10)
-            data = response.json()
-            
-            if data.get('errcode', 0) != 0:
-                logger.error(f"[WeWork] 获取Token失败: {data}")
-                raise Exception(f"获取Token失败: {data.get('errmsg')}")
-            
-            return {
-                'access_token': data.get('access_token', ''),
-                'expires_in': data.get('expires_in', 7200)
-            }
+            return self._parse_token_response(response.json())
+        except Exception as e:
+            logger.error(f"[WeWork] 获取Token异常: {str(e)}")
+            raise
+    
+    async def _afetch_access_token(self, client) -> Dict[str, Any]:
+        """获取企业微信 AccessToken（异步）"""
+        try:
+            response = await client.get(
+                f"{self.BASE_URL}/gettoken",
+                params={'corpid': self.corp_id, 'corpsecret': self.app_secret}
+            )
+            return self._parse_token_response(response.json())
         except Exception as e:
             logger.error(f"[WeWork] 获取Token异常: {str(e)}")
             raise
     
+    @staticmethod
+    def _parse_token_response(data: Dict) -> Dict[str, Any]:
+        if data.get('errcode', 0) != 0:
+            logger.error(f"[WeWork] 获取Token失败: {data}")
+            raise Exception(f"获取Token失败: {data.get('errmsg')}")
+        
+        return {
+            'access_token': data.get('access_token', ''),
+            'expires_in': data.get('expires_in', 7200)
+        }
+    
     def get_user_info(self, user_id: str) -> Dict[str, Any]:
         """
         获取企业微信用户信息
@@ -115,6 +131,36 @@ class WeWorkAdapter(BasePlatformAdapter):
         token = self.get_access_token()
         url = f"{self.BASE_URL}/message/send"
         
+        try:
+            response = requests.post(
+                f"{url}?access_token={token}",
+                json=self._build_message_payload(user_ids, message),
+                timeout=10
+            )
+            return self._parse_send_response(response.json())
+        except Exception as e:
+            logger.error(f"[WeWork] 发送消息异常: {str(e)}")
+            return {'success': False, 'error': str(e)}
+    
+    async def asend_notification(self, user_ids: List[str], message: Dict, client=None) -> Dict[str, Any]:
+        """发送企业微信应用消息（异步）"""
+        if client is None:
+            async with async_http_client() as client:
+                return await self.asend_notification(user_ids, message, client)
+        
+        try:
+            token = await self.aget_access_token(client)
+            response = await client.post(
+                f"{self.BASE_URL}/message/send",
+                params={'access_token': token},
+                json=self._build_message_payload(user_ids, message)
+            )
+            return self._parse_send_response(response.json())
+        except Exception as e:
+            logger.error(f"[WeWork] 发送消息异常: {str(e)}")
+            return {'success': False, 'error': str(e)}
+    
+    def _build_message_payload(self, user_ids: List[str], message: Dict) -> Dict:
         msg_type = message.get('type', 'text')
         content = message.get('content', '')
         
@@ -130,23 +176,15 @@ class WeWorkAdapter(BasePlatformAdapter):
             payload['markdown'] = {'content': content}
         elif msg_type == 'textcard':
             payload['textcard'] = message.get('textcard', {})
+        return payload
+    
+    @staticmethod
+    def _parse_send_response(data: Dict) -> Dict[str, Any]:
+        if data.get('errcode', 0) != 0:
+            logger.error(f"[WeWork] 发送消息失败: {data}")
+            return {'success': False, 'error': data.get('errmsg')}
         
-        try:
-            response = requests.post(
-                f"{url}?access_token={token}",
-                json=payload,
-                timeout=10
-            )
-            data = response.json()
-            
-            if data.get('errcode', 0) != 0:
-                logger.error(f"[WeWork] 发送消息失败: {data}")
-                return {'success': False, 'error': data.get('errmsg')}
-            
-            return {'success': True, 'invaliduser': data.get('invaliduser', '')}
-        except Exception as e:
-            logger.error(f"[WeWork] 发送消息异常: {str(e)}")
-            return {'success': False, 'error': str(e)}
+        return {'success': True, 'invaliduser': data.get('invaliduser', '')}
     
     def get_department_list(self, parent_id: int = None) -> List[Dict]:
         """
@@ -0,0 +1,248 @@
+"""
+数据权限解析 - 精臣云资产管理系统
+
+集中计算用户的有效功能权限、可见公司及各公司下的数据范围：
+- 数据范围取 UserCompanyMembership.data_scope 与角色 permissions.data_scope 中最宽者
+- 部门范围按 MPTT (tree_id, lft, rght) 区间展开为部门ID集合
+- 结果缓存在 Redis，键包含用户版本号与全局版本号，成员/角色/部门变更时递增版本即失效
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from .models import Role, UserCompanyMembership, UserDepartment
+
+
+class DataScopeResolver:
+    """用户数据权限解析器"""
+
+    SCOPE_ALL = 'all'
+    SCOPE_DEPARTMENT = 'department'
+    SCOPE_SELF = 'self'
+
+    # 角色 permissions.data_scope 取值到成员数据范围的映射
+    ROLE_SCOPE_MAP = {
+        'all': SCOPE_ALL,
+        'dept_below': SCOPE_DEPARTMENT,
+        'department': SCOPE_DEPARTMENT,
+        'self': SCOPE_SELF,
+    }
+    SCOPE_RANK = {SCOPE_SELF: 0, SCOPE_DEPARTMENT: 1, SCOPE_ALL: 2}
+
+    CACHE_KEY = 'data_scope:{user_id}:{global_version}:{user_version}'
+    USER_VERSION_KEY = 'data_scope_version:{user_id}'
+    GLOBAL_VERSION_KEY = 'data_scope_version:global'
+    # 与访问令牌有效期一致，一个令牌周期内最多解析一次
+    CACHE_TIMEOUT = int(settings.SIMPLE_JWT['ACCESS_TOKEN_LIFETIME'].total_seconds())
+
+    @classmethod
+    def get_scope(cls, user, request=None):
+        """
+        获取用户数据权限
+
+        Returns:
+            None: 不受限（超级用户）
+            dict: {
+                'permissions': 'all' | [功能权限ID],
+                'company_ids': [可见公司ID],
+                'companies': {公司ID: {'scope': ..., 'department_ids': [...]}}
+            }
+        """
+        if request is not None and hasattr(request, '_data_scope'):
+            return request._data_scope
+
+        if user.is_superuser:
+            scope = None
+        else:
+            key = cls.CACHE_KEY.format(
+                user_id=user.id,
+                global_version=cls._get_version(cls.GLOBAL_VERSION_KEY),
+                user_version=cls._get_version(cls.USER_VERSION_KEY.format(user_id=user.id)),
+            )
+            scope = cache.get(key)
+            if scope is None:
+                scope = cls._resolve(user)
+                cache.set(key, scope, cls.CACHE_TIMEOUT)
+
+        if request is not None:
+            request._data_scope = scope
+        return scope
+
+    @classmethod
+    def invalidate_user(cls, user_id):
+        """用户成员关系/角色变更后使其缓存失效"""
+        cls._bump_version(cls.USER_VERSION_KEY.format(user_id=user_id))
+
+    @classmethod
+    def invalidate_all(cls):
+        """部门树或角色定义变更后使所有用户缓存失效"""
+        cls._bump_version(cls.GLOBAL_VERSION_KEY)
+
+    @staticmethod
+    def _get_version(key):
+        return cache.get_or_set(key, 1, None)
+
+    @staticmethod
+    def _bump_version(key):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 2, None)
+
+    @classmethod
+    def _resolve(cls, user):
+        """从数据库计算用户数据权限"""
+        from apps.organizations.models import Department
+
+        # 1. 公司成员关系 -> 每个公司的基础数据范围与部门
+        companies = {}
+        memberships = UserCompanyMembership.objects.filter(
+            user=user, end_date__isnull=True, company__is_active=True
+        ).values_list('company_id', 'data_scope', 'department_id', 'is_admin')
+        for company_id, data_scope, department_id, is_admin in memberships:
+            entry = companies.setdefault(company_id, {'scope': cls.SCOPE_SELF, 'departments': set()})
+            scope = cls.SCOPE_ALL if is_admin else data_scope
+            entry['scope'] = cls._wider(entry['scope'], scope)
+            if department_id:
+                entry['departments'].add(department_id)
+
+        if not companies and user.primary_company_id:
+            companies[user.primary_company_id] = {'scope': cls.SCOPE_SELF, 'departments': set()}
+
+        # 2. 角色 -> 功能权限与数据范围
+        function_permissions = set()
+        all_permissions = False
+        roles = Role.objects.filter(
+            user_roles__user=user, is_active=True
+        ).values_list('company_id', 'permissions').distinct()
+        for role_company_id, permissions in roles:
+            permissions = permissions or {}
+            perms = permissions.get('function_permissions')
+            if perms == 'all':
+                all_permissions = True
+            elif isinstance(perms, list):
+                function_permissions.update(perms)
+
+            role_scope = cls.ROLE_SCOPE_MAP.get(permissions.get('data_scope'))
+            if not role_scope:
+                continue
+            for company_id, entry in companies.items():
+                if role_company_id is None or role_company_id == company_id:
+                    entry['scope'] = cls._wider(entry['scope'], role_scope)
+
+        # 3. 部门范围 -> 用户所属部门（按公司）及其 MPTT 子树
+        dept_companies = [cid for cid, e in companies.items() if e['scope'] == cls.SCOPE_DEPARTMENT]
+        if dept_companies:
+            user_dept_ids = set(
+                UserDepartment.objects.filter(user=user).values_list('department_id', flat=True)
+            )
+            if user.department_id:
+                user_dept_ids.add(user.department_id)
+
+            roots = Department.objects.filter(
+                company_id__in=dept_companies
+            ).filter(
+                Q(id__in=user_dept_ids) |
+                Q(id__in=[d for cid in dept_companies for d in companies[cid]['departments']])
+            ).values_list('company_id', 'tree_id', 'lft', 'rght')
+
+            ranges = Q()
+            has_range = False
+            for company_id, tree_id, lft, rght in roots:
+                ranges |= Q(company_id=company_id, tree_id=tree_id, lft__gte=lft, rght__lte=rght)
+                has_range = True
+
+            if has_range:
+                for company_id, dept_id in Department.objects.filter(ranges).values_list('company_id', 'id'):
+                    companies[company_id]['departments'].add(dept_id)
+
+        return {
+            'permissions': 'all' if all_permissions else sorted(function_permissions),
+            'company_ids': sorted(companies),
+            'companies': {
+                company_id: {
+                    'scope': entry['scope'],
+                    'department_ids': sorted(entry['departments']) if entry['scope'] == cls.SCOPE_DEPARTMENT else [],
+                }
+                for company_id, entry in companies.items()
+            },
+        }
+
+    @classmethod
+    def _wider(cls, a, b):
+        return a if cls.SCOPE_RANK.get(a, 0) >= cls.SCOPE_RANK.get(b, 0) else b
+
+    @classmethod
+    def has_permission(cls, user, permission_id, request=None):
+        """检查用户是否拥有指定功能权限"""
+        scope = cls.get_scope(user, request)
+        if scope is None or scope['permissions'] == 'all':
+            return True
+        return permission_id in scope['permissions']
+
+    @classmethod
+    def get_company_scope(cls, user, company_id, request=None):
+        """
+        用户在指定公司下的数据范围
+
+        Returns:
+            'all' | 'department' | 'self'，超级用户为 'all'，不可见的公司为 None
+        """
+        scope = cls.get_scope(user, request)
+        if scope is None:
+            return cls.SCOPE_ALL
+        try:
+            entry = scope['companies'].get(int(company_id))
+        except (TypeError, ValueError):
+            return None
+        return entry['scope'] if entry else None
+
+    @classmethod
+    def build_q(cls, user, company_field, department_fields=None, user_fields=None, shared=False, request=None):
+        """
+        构建数据权限过滤条件
+
+        Args:
+            company_field: 公司字段，如 'company_id' / 'consumable__company_id'
+            department_fields: 部门字段列表，满足任一即可见
+            user_fields: 人员字段列表，满足任一即可见（本人相关的数据在任何范围下均可见）
+            shared: 公司级共享数据（如用品目录），可见公司内全部可见，不区分部门/本人范围
+
+        未声明所需字段时按不可见处理：本部门范围需要部门或人员字段，本人范围需要人员字段，
+        否则该公司的数据对其不可见，不会退化为整公司可见。
+
+        Returns:
+            None 表示不限制，否则返回 Q 对象
+        """
+        scope = cls.get_scope(user, request)
+        if scope is None:
+            return None
+
+        department_fields = department_fields or []
+        user_fields = user_fields or []
+
+        # 整公司可见的合并为一个 IN 条件
+        full_company_ids = []
+        q = Q()
+        for company_id, entry in scope['companies'].items():
+            company_scope = entry['scope']
+            if company_scope == cls.SCOPE_ALL or shared:
+                full_company_ids.append(company_id)
+                continue
+
+            visible = Q()
+            if company_scope == cls.SCOPE_DEPARTMENT:
+                for field in department_fields:
+                    visible |= Q(**{f'{field}__in': entry['department_ids']})
+            for field in user_fields:
+                visible |= Q(**{field: user.id})
+            if visible:
+                q |= Q(**{company_field: company_id}) & visible
+
+        if full_company_ids:
+            q |= Q(**{f'{company_field}__in': full_company_ids})
+
+        if not q:
+            # 无任何可见数据
+            return Q(pk__in=[])
+        return q
@@ -0,0 +1,15 @@
+"""
+密码哈希器 - 精臣云资产管理系统
+
+PBKDF2 迭代次数可由 PASSWORD_PBKDF2_ITERATIONS 配置。算法名保持 pbkdf2_sha256，
+已有密码无需迁移：用户下次登录时 Django 检测到迭代次数不同会自动按新配置重新哈希。
+迭代次数的取值参考 scripts/benchmark_login.py hashers 的测量结果。
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """迭代次数可配置的 PBKDF2-SHA256 哈希器"""
+
+    iterations = getattr(settings, 'PASSWORD_PBKDF2_ITERATIONS', None) or PBKDF2PasswordHasher.iterations
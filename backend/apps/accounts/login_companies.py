@@ -0,0 +1,88 @@
+"""
+登录可选公司解析 - 精臣云资产管理系统
+
+两步登录第一步需要返回用户可进入的公司列表：
+- 结果缓存在 Redis，键包含用户版本号（与数据权限共用，成员关系/主公司变更时递增）
+  和公司版本号（公司新增、改名、停用时递增），任一变更即失效
+- 第一步将公司ID与用户版本号写入 login_temp_token，第二步版本未变时直接复用，
+  两步之间成员关系被调整时重新解析
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .data_scope import DataScopeResolver
+from .models import UserCompanyMembership
+
+
+class LoginCompanyResolver:
+    """登录可选公司解析器"""
+
+    CACHE_KEY = 'login_companies:{user_id}:{company_version}:{user_version}'
+    COMPANY_VERSION_KEY = 'login_companies_version:company'
+    CACHE_TIMEOUT = int(settings.SIMPLE_JWT['ACCESS_TOKEN_LIFETIME'].total_seconds())
+
+    @classmethod
+    def get_user_version(cls, user_id):
+        return DataScopeResolver._get_version(DataScopeResolver.USER_VERSION_KEY.format(user_id=user_id))
+
+    @classmethod
+    def get_companies(cls, user, user_version=None):
+        """
+        获取用户可登录的公司
+
+        Returns:
+            [{'id', 'name', 'short_name', 'membership_type'}]，按主公司优先、名称排序
+        """
+        key = cls.CACHE_KEY.format(
+            user_id=user.id,
+            company_version=DataScopeResolver._get_version(cls.COMPANY_VERSION_KEY),
+            user_version=user_version if user_version is not None else cls.get_user_version(user.id),
+        )
+        companies = cache.get(key)
+        if companies is None:
+            companies = cls._resolve(user)
+            cache.set(key, companies, cls.CACHE_TIMEOUT)
+        return companies
+
+    @classmethod
+    def invalidate_all(cls):
+        """公司信息变更后使所有用户的缓存失效（成员关系变更由数据权限用户版本号覆盖）"""
+        DataScopeResolver._bump_version(cls.COMPANY_VERSION_KEY)
+
+    @staticmethod
+    def _resolve(user):
+        """从数据库计算用户可登录的公司"""
+        from apps.organizations.models import Company
+
+        # 1. 有效的公司成员关系
+        companies = {}
+        memberships = UserCompanyMembership.objects.filter(
+            user_id=user.id, end_date__isnull=True, company__is_active=True
+        ).order_by('-membership_type', 'company__name').values_list(
+            'company_id', 'company__name', 'company__short_name', 'membership_type'
+        )
+        for company_id, name, short_name, membership_type in memberships:
+            companies.setdefault(company_id, {
+                'id': company_id,
+                'name': name,
+                'short_name': short_name,
+                'membership_type': membership_type,
+            })
+        if companies:
+            return list(companies.values())
+
+        # 2. 无成员关系时取用户主公司
+        if user.primary_company_id:
+            primary = Company.objects.filter(id=user.primary_company_id, is_active=True).values(
+                'id', 'name', 'short_name'
+            ).first()
+            if primary:
+                return [{**primary, 'membership_type': 'primary'}]
+
+        # 3. 未关联公司的超级用户可进入所有启用的公司
+        if user.is_superuser:
+            return [
+                {**company, 'membership_type': 'admin'}
+                for company in Company.objects.filter(is_active=True).values('id', 'name', 'short_name')
+            ]
+        return []
@@ -5,6 +5,7 @@ Multi-company architecture support
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth import get_user_model
+from django.db.models import Prefetch, prefetch_related_objects
 from .models import Role, UserRole, OperationLog, UserCompanyMembership, UserDepartment
 
 User = get_user_model()
@@ -49,6 +50,32 @@ class UserDepartmentSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
+def get_user_prefetches():
+    """
+    UserSerializer 所需的预加载配置
+    
+    列表查询需带上这些 Prefetch，序列化方法只读取预加载缓存，
+    查询数量不随用户数量增长。
+    """
+    return [
+        Prefetch(
+            'department_memberships',
+            queryset=UserDepartment.objects.select_related('department')
+        ),
+        Prefetch(
+            'user_roles',
+            queryset=UserRole.objects.select_related('role')
+        ),
+        Prefetch(
+            'company_memberships',
+            queryset=UserCompanyMembership.objects.select_related('company', 'department').filter(
+                end_date__isnull=True
+            ),
+            to_attr='active_company_memberships'
+        ),
+    ]
+
+
 class UserSerializer(serializers.ModelSerializer):
     """用户序列化器 - Enhanced for multi-company and multi-department support"""
     
@@ -76,9 +103,14 @@ class UserSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'last_login', 'display_name']
     
+    def to_representation(self, instance):
+        # 单个对象（如 me、登录返回）未经视图预加载时，在此补齐
+        if not hasattr(instance, 'active_company_memberships'):
+            prefetch_related_objects([instance], *get_user_prefetches())
+        return super().to_representation(instance)
+    
     def get_department_memberships(self, obj):
         """获取用户所属的所有部门（多部门支持）"""
-        memberships = obj.department_memberships.select_related('department').all()
         return [
             {
                 'id': m.id,
@@ -90,30 +122,26 @@ class UserSerializer(serializers.ModelSerializer):
                 'position': m.position,
                 'sso_order': m.sso_order
             }
-            for m in memberships
+            for m in obj.department_memberships.all()
         ]
     
     def get_all_departments(self, obj):
         """获取用户所属的所有部门ID列表（简化版）"""
-        return list(obj.department_memberships.values_list('department_id', flat=True))
+        return [m.department_id for m in obj.department_memberships.all()]
     
     def get_roles(self, obj):
         """获取用户角色列表"""
-        user_roles = obj.user_roles.select_related('role').all()
         return [
             {
                 'id': ur.role.id,
                 'name': ur.role.name,
                 'code': ur.role.code
             }
-            for ur in user_roles
+            for ur in obj.user_roles.all()
         ]
     
     def get_company_memberships(self, obj):
         """获取用户公司关联列表"""
-        memberships = obj.company_memberships.select_related('company', 'department').filter(
-            end_date__isnull=True
-        )
         return [
             {
                 'id': m.id,
@@ -125,7 +153,7 @@ class UserSerializer(serializers.ModelSerializer):
                 'is_admin': m.is_admin,
                 'data_scope': m.data_scope
             }
-            for m in memberships
+            for m in obj.active_company_memberships
         ]
 
 
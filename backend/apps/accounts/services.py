@@ -3,6 +3,7 @@
 """
 from django.db import transaction
 from .models import Role, UserRole, User
+from .data_scope import DataScopeResolver
 
 
 class RoleService:
@@ -161,6 +162,9 @@ class RoleService:
         - 所有活跃用户分配普通员工角色
         - 部门负责人分配部门管理员角色
         - 超级用户分配超级管理员角色
+        
+        基于集合计算：先算出期望的 (用户, 角色) 对，与已有 UserRole 求差集后批量插入。
+        有新增角色时在事务提交后使数据权限缓存失效。
         """
         from apps.organizations.models import Department
         
@@ -174,54 +178,61 @@ class RoleService:
         if not employee_role:
             return {'error': '普通员工角色不存在'}
         
-        stats = {
-            'total_users': 0,
-            'employee_assigned': 0,
-            'dept_admin_assigned': 0,
-            'super_admin_assigned': 0
+        # 活跃用户: {user_id: (department_id, is_superuser)}
+        active_users = {
+            user_id: (department_id, is_superuser)
+            for user_id, department_id, is_superuser in User.objects.filter(
+                is_active=True
+            ).values_list('id', 'department_id', 'is_superuser')
         }
         
-        # 获取所有活跃用户
-        active_users = User.objects.filter(is_active=True)
-        stats['total_users'] = active_users.count()
-        
-        # 获取所有部门负责人
-        dept_managers = set()
-        for dept in Department.objects.filter(manager__isnull=False):
-            if dept.manager:
-                dept_managers.add(dept.manager.id)
-        
-        for user in active_users:
-            # 所有用户分配普通员工角色
-            _, created = UserRole.objects.get_or_create(
-                user=user,
-                role=employee_role,
-                defaults={'department': user.department}
-            )
-            if created:
-                stats['employee_assigned'] += 1
-            
-            # 部门负责人分配部门管理员角色
-            if user.id in dept_managers and dept_admin_role:
-                _, created = UserRole.objects.get_or_create(
-                    user=user,
-                    role=dept_admin_role,
-                    defaults={'department': user.department}
-                )
-                if created:
-                    stats['dept_admin_assigned'] += 1
-            
-            # 超级用户分配超级管理员角色
-            if user.is_superuser and super_admin_role:
-                _, created = UserRole.objects.get_or_create(
-                    user=user,
-                    role=super_admin_role,
-                    defaults={'department': user.department}
-                )
-                if created:
-                    stats['super_admin_assigned'] += 1
-        
-        return stats
+        # 部门负责人
+        dept_managers = set(
+            Department.objects.filter(manager__isnull=False).values_list('manager_id', flat=True)
+        )
+        
+        # 期望的 (user_id, role) 集合
+        desired = []
+        for user_id, (department_id, is_superuser) in active_users.items():
+            desired.append((user_id, employee_role))
+            if dept_admin_role and user_id in dept_managers:
+                desired.append((user_id, dept_admin_role))
+            if super_admin_role and is_superuser:
+                desired.append((user_id, super_admin_role))
+        
+        # 已存在的 (user_id, role_id)，不区分部门，与 get_or_create(user, role) 语义一致
+        role_ids = [r.id for r in (employee_role, dept_admin_role, super_admin_role) if r]
+        existing = set(
+            UserRole.objects.filter(role_id__in=role_ids).values_list('user_id', 'role_id')
+        )
+        
+        missing = [
+            (user_id, role) for user_id, role in desired
+            if (user_id, role.id) not in existing
+        ]
+        
+        UserRole.objects.bulk_create(
+            [
+                UserRole(user_id=user_id, role=role, department_id=active_users[user_id][0])
+                for user_id, role in missing
+            ],
+            batch_size=1000,
+            ignore_conflicts=True
+        )
+        if missing:
+            # bulk_create 不触发 post_save，提交后统一使数据权限缓存失效
+            transaction.on_commit(DataScopeResolver.invalidate_all)
+        
+        return {
+            'total_users': len(active_users),
+            'employee_assigned': sum(1 for _, role in missing if role.id == employee_role.id),
+            'dept_admin_assigned': sum(
+                1 for _, role in missing if dept_admin_role and role.id == dept_admin_role.id
+            ),
+            'super_admin_assigned': sum(
+                1 for _, role in missing if super_admin_role and role.id == super_admin_role.id
+            ),
+        }
     
     @classmethod
     def get_users_by_role(cls, role_code):
@@ -0,0 +1,41 @@
+"""
+账户信号处理 - 精臣云资产管理系统
+
+成员关系、角色、部门变更时使数据权限缓存失效；公司变更时使登录可选公司缓存失效
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.organizations.models import Company, Department
+from .models import User, Role, UserRole, UserCompanyMembership, UserDepartment
+from .data_scope import DataScopeResolver
+from .login_companies import LoginCompanyResolver
+
+# 影响数据权限的用户字段
+SCOPE_USER_FIELDS = {'department', 'department_id', 'primary_company', 'primary_company_id', 'is_superuser', 'is_active'}
+
+
+@receiver([post_save, post_delete], sender=UserCompanyMembership)
+@receiver([post_save, post_delete], sender=UserRole)
+@receiver([post_save, post_delete], sender=UserDepartment)
+def invalidate_user_data_scope(sender, instance, **kwargs):
+    DataScopeResolver.invalidate_user(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_data_scope_on_user_change(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields is None or SCOPE_USER_FIELDS & set(update_fields):
+        DataScopeResolver.invalidate_user(instance.id)
+
+
+@receiver([post_save, post_delete], sender=Role)
+@receiver([post_save, post_delete], sender=Department)
+def invalidate_all_data_scopes(sender, instance, **kwargs):
+    DataScopeResolver.invalidate_all()
+
+
+@receiver([post_save, post_delete], sender=Company)
+def invalidate_login_companies(sender, instance, **kwargs):
+    LoginCompanyResolver.invalidate_all()
@@ -0,0 +1,12 @@
+"""
+账户与权限异步任务 - 精臣云资产管理系统
+"""
+from celery import shared_task
+
+from .services import RoleService
+
+
+@shared_task(ignore_result=False)
+def sync_all_user_roles():
+    """后台同步所有用户角色，返回与 RoleService.sync_all_user_roles 相同的统计"""
+    return RoleService.sync_all_user_roles()
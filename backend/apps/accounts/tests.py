@@ -0,0 +1,69 @@
+"""
+用户管理接口测试
+"""
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.organizations.models import Company, Department
+from .models import User, Role, UserRole, UserDepartment, UserCompanyMembership
+
+
+class UserListQueryCountTest(TestCase):
+    """用户列表的查询数量不随用户数量增长（部门、角色、公司关系均走预加载）"""
+
+    # 分页 COUNT + 用户列表（关联公司、部门）+ 部门关系 / 角色 / 公司关系三个预加载
+    EXPECTED_QUERIES = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='测试公司', code='TEST')
+        cls.departments = [
+            Department.objects.create(company=cls.company, name=f'部门{i}', code=f'D{i}')
+            for i in range(3)
+        ]
+        cls.roles = [
+            Role.objects.create(company=cls.company, name=f'角色{i}', code=f'R{i}')
+            for i in range(2)
+        ]
+        cls.admin = User.objects.create_superuser('admin_test', 'admin@example.com', 'x')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def create_users(self, count):
+        start = User.objects.count()
+        for i in range(start, start + count):
+            user = User.objects.create_user(
+                f'user{i}', f'user{i}@example.com', None,
+                primary_company=self.company,
+                department=self.departments[i % 3],
+            )
+            UserDepartment.objects.create(user=user, department=self.departments[i % 3], is_primary=True)
+            UserDepartment.objects.create(user=user, department=self.departments[(i + 1) % 3])
+            UserCompanyMembership.objects.create(user=user, company=self.company, department=self.departments[i % 3])
+            for role in self.roles:
+                UserRole.objects.create(user=user, role=role, department=self.departments[i % 3])
+
+    def assert_list_queries(self):
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            response = self.client.get('/api/auth/users/', {'page_size': 100})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_query_count_constant(self):
+        self.create_users(5)
+        self.assertEqual(len(self.assert_list_queries().json()['results']), 6)
+
+        self.create_users(20)
+        self.assertEqual(len(self.assert_list_queries().json()['results']), 26)
+
+    def test_serialized_relations(self):
+        self.create_users(3)
+        response = self.assert_list_queries()
+
+        results = response.json()['results']
+        user = next(row for row in results if row['username'].startswith('user'))
+        self.assertEqual(len(user['roles']), 2)
+        self.assertEqual(len(user['department_memberships']), 2)
+        self.assertEqual(len(user['company_memberships']), 1)
@@ -18,6 +18,7 @@ from .models import Role, UserRole, OperationLog, UserCompanyMembership
 from .serializers import (
     CustomTokenObtainPairSerializer,
     UserSerializer,
+    get_user_prefetches,
     UserCreateSerializer,
     UserUpdateSerializer,
     PasswordChangeSerializer,
@@ -27,6 +28,7 @@ from .serializers import (
     UserCompanyMembershipSerializer,
     UserCompanyMembershipCreateSerializer
 )
+from .login_companies import LoginCompanyResolver
 from .pagination import FlexiblePageNumberPagination
 from .services import RoleService
 
@@ -85,47 +87,11 @@ class VerifyCredentialsView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Get user's available companies
-        from apps.organizations.models import Company
-        
-        companies = []
-        
-        # 1. Check UserCompanyMembership (multi-company support)
-        memberships = UserCompanyMembership.objects.filter(
-            user=user,
-            end_date__isnull=True
-        ).select_related('company').order_by('-membership_type', 'company__name')
-        
-        company_ids = set()
-        for membership in memberships:
-            if membership.company.is_active and membership.company_id not in company_ids:
-                companies.append({
-                    'id': membership.company.id,
-                    'name': membership.company.name,
-                    'short_name': membership.company.short_name,
-                    'membership_type': membership.membership_type
-                })
-                company_ids.add(membership.company_id)
-        
-        # 2. If no memberships, check user's direct company assignment
-        if not companies and hasattr(user, 'company') and user.company:
-            companies.append({
-                'id': user.company.id,
-                'name': user.company.name,
-                'short_name': user.company.short_name,
-                'membership_type': 'primary'
-            })
-        
-        # 3. For superusers with no company, return all active companies
-        if not companies and user.is_superuser:
-            all_companies = Company.objects.filter(is_active=True).values(
-                'id', 'name', 'short_name'
-            )
-            companies = [
-                {**c, 'membership_type': 'admin'} for c in all_companies
-            ]
+        # Get user's available companies (cached, invalidated on membership / company changes)
+        user_version = LoginCompanyResolver.get_user_version(user.id)
+        companies = LoginCompanyResolver.get_companies(user, user_version=user_version)
         
-        # 4. If still no companies, return error
+        # If no companies, return error
         if not companies:
             return Response(
                 {'error': '您没有关联任何公司，请联系管理员'},
@@ -138,7 +104,9 @@ class VerifyCredentialsView(APIView):
         cache.set(cache_key, {
             'user_id': user.id,
             'username': user.username,
-            'company_ids': [c['id'] for c in companies]
+            'company_ids': [c['id'] for c in companies],
+            # Step 2 reuses company_ids while the user's membership version is unchanged
+            'user_version': user_version
         }, timeout=1800)  # 30 minutes
         
         return Response({
@@ -176,21 +144,40 @@ class CompleteLoginView(APIView):
                 status=status.HTTP_401_UNAUTHORIZED
             )
         
-        # Verify company access
-        if company_id not in token_data['company_ids']:
+        try:
+            company_id = int(company_id)
+        except (TypeError, ValueError):
             return Response(
-                {'error': '您没有该公司的访问权限'},
-                status=status.HTTP_403_FORBIDDEN
+                {'error': '无效的 company_id'},
+                status=status.HTTP_400_BAD_REQUEST
             )
         
         # Get user
-        try:
-            user = User.objects.get(id=token_data['user_id'])
-        except User.DoesNotExist:
+        user = User.objects.filter(id=token_data['user_id']).only(
+            'id', 'username', 'password', 'nickname', 'first_name', 'last_name',
+            'is_active', 'is_superuser', 'primary_company'
+        ).first()
+        if user is None:
             return Response(
                 {'error': '用户不存在'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        if not user.is_active:
+            return Response(
+                {'error': '账号已被禁用'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        # Verify company access; re-resolve only if memberships changed since step 1
+        company_ids = token_data['company_ids']
+        user_version = LoginCompanyResolver.get_user_version(user.id)
+        if token_data.get('user_version') != user_version:
+            company_ids = [c['id'] for c in LoginCompanyResolver.get_companies(user, user_version=user_version)]
+        if company_id not in company_ids:
+            return Response(
+                {'error': '您没有该公司的访问权限'},
+                status=status.HTTP_403_FORBIDDEN
+            )
         
         # Delete temp token (one-time use)
         cache.delete(cache_key)
@@ -243,7 +230,9 @@ class CustomTokenObtainPairView(TokenObtainPairView):
 class UserViewSet(viewsets.ModelViewSet):
     """用户管理视图集"""
     
-    queryset = User.objects.select_related('department').all()
+    queryset = User.objects.select_related(
+        'department', 'primary_company', 'asset_department'
+    ).prefetch_related(*get_user_prefetches())
     serializer_class = UserSerializer
     pagination_class = FlexiblePageNumberPagination
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
@@ -393,7 +382,17 @@ class RoleViewSet(viewsets.ModelViewSet):
         - 所有活跃用户分配普通员工角色
         - 部门负责人分配部门管理员角色
         - 超级用户分配超级管理员角色
+        
+        请求参数 async=true 时提交后台任务，返回任务ID
         """
+        if str(request.data.get('async', '')).lower() in ('true', '1'):
+            from .tasks import sync_all_user_roles
+            task = sync_all_user_roles.delay()
+            return Response({
+                'message': '角色同步任务已提交',
+                'task_id': task.id
+            }, status=status.HTTP_202_ACCEPTED)
+        
         stats = RoleService.sync_all_user_roles()
         
         if 'error' in stats:
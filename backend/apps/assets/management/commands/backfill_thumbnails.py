@@ -0,0 +1,90 @@
+"""
+补齐资产图片缩略图
+
+为已有的 Asset.image / AssetImage.image 生成缩略图，可多进程并行。
+缩略图按内容哈希存放，重复执行只会处理缺失或过期的记录。
+
+Usage:
+    python manage.py backfill_thumbnails                      # 处理全部资产图片
+    python manage.py backfill_thumbnails --model asset        # 仅资产主图
+    python manage.py backfill_thumbnails --workers 4          # 4 个进程并行
+    python manage.py backfill_thumbnails --force              # 忽略已有结果重新生成
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from services import ThumbnailService
+
+
+def generate_batch(target, pks, force):
+    """子进程内处理一批记录，返回 (生成数, 跳过数)"""
+    generated = skipped = 0
+    for pk in pks:
+        if ThumbnailService.generate(target, pk, force=force):
+            generated += 1
+        else:
+            skipped += 1
+    connections.close_all()
+    return generated, skipped
+
+
+class Command(BaseCommand):
+    help = 'Generate missing thumbnails for asset images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            choices=['all', *ThumbnailService.TARGETS],
+            default='all',
+            help='Which images to process (default: all)'
+        )
+        parser.add_argument('--workers', type=int, default=1, help='Number of worker processes')
+        parser.add_argument('--batch-size', type=int, default=200, help='Records per worker batch')
+        parser.add_argument('--force', action='store_true', help='Regenerate even if thumbnails are current')
+
+    def handle(self, *args, **options):
+        targets = list(ThumbnailService.TARGETS) if options['model'] == 'all' else [options['model']]
+        batch_size = max(options['batch_size'], 1)
+
+        for target in targets:
+            model, image_field, thumb_field = ThumbnailService.get_model(target)
+            queryset = model.objects.exclude(**{image_field: ''}).exclude(**{f'{image_field}__isnull': True})
+
+            # 仅保留缩略图缺失或与原图不一致的记录
+            pks = [
+                pk for pk, image_name, thumbnails in
+                queryset.values_list('pk', image_field, thumb_field).iterator(chunk_size=2000)
+                if options['force'] or not ThumbnailService.is_current(thumbnails, image_name)
+            ]
+            if not pks:
+                self.stdout.write(f'{target}: nothing to do')
+                continue
+
+            batches = [pks[i:i + batch_size] for i in range(0, len(pks), batch_size)]
+            started = time.perf_counter()
+            generated = skipped = 0
+
+            if options['workers'] > 1:
+                # 子进程 fork 前关闭连接，避免共用父进程的数据库连接
+                connections.close_all()
+                with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+                    futures = [executor.submit(generate_batch, target, batch, options['force']) for batch in batches]
+                    for future in as_completed(futures):
+                        batch_generated, batch_skipped = future.result()
+                        generated += batch_generated
+                        skipped += batch_skipped
+                        self.stdout.write(f'  {target}: {generated + skipped}/{len(pks)}')
+            else:
+                for batch in batches:
+                    batch_generated, batch_skipped = generate_batch(target, batch, options['force'])
+                    generated += batch_generated
+                    skipped += batch_skipped
+                    self.stdout.write(f'  {target}: {generated + skipped}/{len(pks)}')
+
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(
+                f'{target}: generated {generated}, skipped {skipped} in {elapsed:.1f}s'
+            ))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0005_assettransferitem_from_department_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asset',
+            name='image_thumbnails',
+            field=models.JSONField(blank=True, default=dict, verbose_name='缩略图'),
+        ),
+        migrations.AddField(
+            model_name='assetimage',
+            name='thumbnails',
+            field=models.JSONField(blank=True, default=dict, verbose_name='缩略图'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0006_image_thumbnails'),
+        ('organizations', '0004_company_company_type_company_currency_and_more'),
+        ('procurement', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='asset',
+            index=models.Index(fields=['company', 'barcode'], name='asset_company_barcode_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='asset',
+            index=models.Index(fields=['company', 'rfid_code'], name='asset_company_rfid_idx'),
+        ),
+    ]
@@ -5,6 +5,8 @@ from django.db import models
 from mptt.models import MPTTModel, TreeForeignKey
 from decimal import Decimal
 
+from apps.common.models import OptimisticLockMixin
+
 
 class AssetCategory(MPTTModel):
     """资产分类（树形结构）"""
@@ -52,7 +54,7 @@ class AssetCategory(MPTTModel):
         return self.name
 
 
-class Asset(models.Model):
+class Asset(OptimisticLockMixin, models.Model):
     """资产主模型"""
     
     class Status(models.TextChoices):
@@ -100,6 +102,8 @@ class Asset(models.Model):
     
     # 图片和附件
     image = models.ImageField('资产图片', upload_to='assets/images/', blank=True, null=True)
+    # 缩略图（由 ThumbnailService 异步生成）: {'source': 原图路径, 'digest': 内容哈希, 尺寸: {格式: 路径}}
+    image_thumbnails = models.JSONField('缩略图', default=dict, blank=True)
     attachments = models.JSONField('附件列表', default=list)
     
     # 财务信息
@@ -207,6 +211,8 @@ class Asset(models.Model):
     )
     is_deleted = models.BooleanField('是否删除', default=False)
     deleted_at = models.DateTimeField('删除时间', null=True, blank=True)
+    # 乐观锁版本号，每次更新递增（OptimisticLockMixin）
+    version = models.PositiveIntegerField('版本', default=1)
     created_at = models.DateTimeField('创建时间', auto_now_add=True)
     updated_at = models.DateTimeField('更新时间', auto_now=True)
     
@@ -215,6 +221,11 @@ class Asset(models.Model):
         verbose_name_plural = '资产'
         ordering = ['-created_at']
         unique_together = ['company', 'asset_code']
+        indexes = [
+            # 盘点扫码按条形码 / RFID 解析资产
+            models.Index(fields=['company', 'barcode'], name='asset_company_barcode_idx'),
+            models.Index(fields=['company', 'rfid_code'], name='asset_company_rfid_idx'),
+        ]
     
     def __str__(self):
         return f"{self.asset_code} - {self.name}"
@@ -237,6 +248,8 @@ class AssetImage(models.Model):
         verbose_name='资产'
     )
     image = models.ImageField('图片', upload_to='assets/images/')
+    # 缩略图（由 ThumbnailService 异步生成），结构同 Asset.image_thumbnails
+    thumbnails = models.JSONField('缩略图', default=dict, blank=True)
     is_primary = models.BooleanField('主图', default=False)
     sort_order = models.IntegerField('排序', default=0)
     created_at = models.DateTimeField('创建时间', auto_now_add=True)
@@ -10,6 +10,7 @@ from .models import (
     AssetDisposal, AssetDisposalItem,
     AssetMaintenance, AssetLabel
 )
+from services import ThumbnailService
 
 
 class AssetCategorySerializer(serializers.ModelSerializer):
@@ -54,10 +55,15 @@ class AssetCategoryTreeSerializer(serializers.ModelSerializer):
 class AssetImageSerializer(serializers.ModelSerializer):
     """资产图片序列化器"""
     
+    thumbnail = serializers.SerializerMethodField()
+    
     class Meta:
         model = AssetImage
-        fields = ['id', 'asset', 'image', 'is_primary', 'sort_order', 'created_at']
+        fields = ['id', 'asset', 'image', 'thumbnail', 'is_primary', 'sort_order', 'created_at']
         read_only_fields = ['id', 'created_at']
+    
+    def get_thumbnail(self, obj):
+        return ThumbnailService.to_urls(obj.thumbnails, obj.image.name, self.context.get('request'))
 
 
 class AssetSerializer(serializers.ModelSerializer):
@@ -91,11 +97,12 @@ class AssetSerializer(serializers.ModelSerializer):
             'manager', 'manager_name',
             'rfid_code', 'barcode', 'qrcode',
             'supplier', 'warranty_expiry',
-            'custom_data', 'remark',
+            'custom_data', 'remark', 'version',
             'created_by', 'created_at', 'updated_at'
         ]
         # 移除 asset_code 从 read_only_fields，允许编辑
-        read_only_fields = ['id', 'company', 'created_by', 'created_at', 'updated_at']
+        # version 由乐观锁维护，编辑时的期望版本通过 If-Match 或 expected_version 传入
+        read_only_fields = ['id', 'company', 'version', 'created_by', 'created_at', 'updated_at']
 
 
 class AssetListSerializer(serializers.ModelSerializer):
@@ -109,6 +116,8 @@ class AssetListSerializer(serializers.ModelSerializer):
     manager_name = serializers.SerializerMethodField()
     manage_department_name = serializers.SerializerMethodField()
     supplier_name = serializers.SerializerMethodField()
+    # 缩略图 URL: {'small': {'webp': url, 'jpeg': url}, 'medium': {...}}，未生成时为 null
+    thumbnail = serializers.SerializerMethodField()
     
     class Meta:
         model = Asset
@@ -123,9 +132,12 @@ class AssetListSerializer(serializers.ModelSerializer):
             'manage_department', 'manage_department_name',
             'manager', 'manager_name',
             'supplier', 'supplier_name',
-            'image', 'remark', 'created_at'
+            'image', 'thumbnail', 'remark', 'version', 'created_at'
         ]
     
+    def get_thumbnail(self, obj):
+        return ThumbnailService.to_urls(obj.image_thumbnails, obj.image.name, self.context.get('request'))
+    
     def get_using_user_name(self, obj):
         return obj.using_user.display_name if obj.using_user else None
     
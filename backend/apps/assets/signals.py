@@ -0,0 +1,41 @@
+"""
+资产模块信号处理
+
+资产图片上传或替换后，事务提交时提交缩略图生成任务
+"""
+import logging
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Asset, AssetImage
+
+logger = logging.getLogger(__name__)
+
+
+def _enqueue_thumbnails(target, pk):
+    from .tasks import generate_image_thumbnails
+
+    try:
+        generate_image_thumbnails.delay(target, pk)
+    except Exception as e:
+        # 任务队列不可用时不影响保存，可通过 backfill_thumbnails 命令补齐
+        logger.warning(f"[Thumbnail] 提交缩略图任务失败 {target}#{pk}: {e}")
+
+
+@receiver(post_save, sender=Asset)
+def schedule_asset_thumbnails(sender, instance, **kwargs):
+    from services import ThumbnailService
+
+    if instance.image and not ThumbnailService.is_current(instance.image_thumbnails, instance.image.name):
+        transaction.on_commit(partial(_enqueue_thumbnails, 'asset', instance.pk))
+
+
+@receiver(post_save, sender=AssetImage)
+def schedule_asset_image_thumbnails(sender, instance, **kwargs):
+    from services import ThumbnailService
+
+    if instance.image and not ThumbnailService.is_current(instance.thumbnails, instance.image.name):
+        transaction.on_commit(partial(_enqueue_thumbnails, 'asset_image', instance.pk))
@@ -0,0 +1,21 @@
+"""
+资产异步任务 - 精臣云资产管理系统
+"""
+from celery import shared_task
+
+
+@shared_task(ignore_result=False)
+def render_asset_labels(label_id, asset_ids, fmt='pdf'):
+    """后台批量渲染资产标签，结果写入存储并返回下载地址"""
+    from services import LabelRenderService
+    
+    return LabelRenderService.render_to_storage(label_id, asset_ids, fmt)
+
+
+@shared_task(ignore_result=False)
+def generate_image_thumbnails(target, pk, force=False):
+    """后台生成资产图片缩略图（target: asset / asset_image）"""
+    from services import ThumbnailService
+    
+    thumbnails = ThumbnailService.generate(target, pk, force=force)
+    return thumbnails.get('digest') if thumbnails else None
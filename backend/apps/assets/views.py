@@ -14,6 +14,10 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django.utils import timezone
 
+from apps.common.filters import DataScopeFilterBackend
+from apps.common.exceptions import ConflictError
+from apps.system.custom_field_query import CustomFieldFilterBackend, CustomFieldOrderingFilter
+
 from .models import (
     AssetCategory, Asset, AssetImage, AssetOperation,
     AssetReceive, AssetReceiveItem,
@@ -37,7 +41,8 @@ from .serializers import (
 from services import (
     AssetService, ReceiveService, BorrowService,
     TransferService, DisposalService, MaintenanceService,
-    BatchImportExportService, BatchOperationService
+    BatchImportExportService, BatchOperationService,
+    LabelRenderService
 )
 
 
@@ -86,7 +91,13 @@ class AssetViewSet(viewsets.ModelViewSet):
         'manage_department', 'manager', 'supplier', 'created_by'
     ).filter(is_deleted=False)
     serializer_class = AssetSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [
+        DataScopeFilterBackend, DjangoFilterBackend, CustomFieldFilterBackend, SearchFilter, CustomFieldOrderingFilter
+    ]
+    data_scope_department_fields = ['using_department_id', 'manage_department_id']
+    data_scope_user_fields = ['using_user_id', 'manager_id', 'created_by_id']
+    # ?cf.<field_key>= 按自定义字段过滤，ordering=cf.<field_key> 排序
+    custom_fields_module = 'asset'
     filterset_fields = [
         'company', 'category', 'status', 'using_department',
         'using_user', 'location', 'manage_department', 'manager'
@@ -115,13 +126,28 @@ class AssetViewSet(viewsets.ModelViewSet):
         serializer.instance = asset
     
     def perform_update(self, serializer):
-        """更新资产 - 委托给 AssetService"""
-        asset = self.get_object()
-        updated_asset = AssetService.update_asset(
-            asset=asset,
-            validated_data=serializer.validated_data,
-            user=self.request.user
+        """
+        更新资产 - 委托给 AssetService
+        
+        If-Match 请求头（或请求体 expected_version）为编辑时看到的版本号；
+        版本已变化时返回 409，data.current 为资产当前数据。
+        """
+        asset = serializer.instance
+        expected_version = (
+            self.request.headers.get('If-Match', '').strip('"') or self.request.data.get('expected_version')
         )
+        try:
+            updated_asset = AssetService.update_asset(
+                asset=asset,
+                validated_data=serializer.validated_data,
+                user=self.request.user,
+                expected_version=expected_version
+            )
+        except ConflictError as e:
+            current = self.get_queryset().get(pk=asset.pk)
+            raise ConflictError(
+                e.msg, data={'current': AssetSerializer(current, context=self.get_serializer_context()).data}
+            ) from e
         serializer.instance = updated_asset
     
     @action(detail=False, methods=['get'])
@@ -211,6 +237,42 @@ class AssetViewSet(viewsets.ModelViewSet):
         
         return BatchImportExportService.export_assets(queryset, export_fields)
     
+    @action(detail=False, methods=['post'])
+    def print_labels(self, request):
+        """
+        批量渲染资产标签 - 委托给 LabelRenderService
+        
+        资产范围：请求体 asset_ids，未指定时按与列表相同的查询参数过滤。
+        请求体：label（模板ID，默认取启用的默认模板）、format（pdf / zpl）、async。
+        超过 LabelRenderService.SYNC_LIMIT 的批次自动提交后台任务。
+        """
+        label = LabelRenderService.get_label(
+            request.data.get('label'),
+            company_id=request.data.get('company') or request.query_params.get('company')
+        )
+        
+        queryset = self.filter_queryset(self.get_queryset())
+        asset_ids = request.data.get('asset_ids')
+        if asset_ids:
+            queryset = queryset.filter(id__in=asset_ids)
+        
+        result = LabelRenderService.print_labels(
+            request.user, label, queryset,
+            fmt=request.data.get('format', 'pdf'),
+            run_async=str(request.data.get('async', '')).lower() in ('true', '1')
+        )
+        if isinstance(result, dict):
+            return Response(result, status=status.HTTP_202_ACCEPTED)
+        return result
+    
+    @action(detail=False, methods=['get'])
+    def label_job(self, request):
+        """查询本人提交的后台标签渲染任务状态"""
+        task_id = request.query_params.get('task_id')
+        if not task_id:
+            return Response({'msg': '缺少 task_id'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(LabelRenderService.get_job(request.user, task_id))
+    
     # ========== Batch Operations ==========
     
     @action(detail=False, methods=['post'])
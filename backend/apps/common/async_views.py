@@ -0,0 +1,55 @@
+"""
+异步视图 - 精臣云资产管理系统
+
+AsyncAPIView 让 DRF 视图的处理方法可以声明为 async def：
+- 认证、权限、限流（可能访问数据库）在线程中执行
+- 处理方法在事件循环中 await，等待第三方平台期间不占用 worker
+ASGI 部署（GUNICORN_PROFILE=asgi）下收益最大；WSGI 部署下同样可用，行为与同步视图一致。
+"""
+import asyncio
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework.views import APIView
+
+
+def async_http_client(**kwargs):
+    """
+    访问第三方平台的异步 HTTP 客户端
+
+    调用方使用 ``async with async_http_client() as client`` 管理连接，
+    同一请求内的多次调用复用连接。
+    """
+    kwargs.setdefault('timeout', httpx.Timeout(settings.SSO_HTTP_TIMEOUT, connect=settings.SSO_HTTP_CONNECT_TIMEOUT))
+    return httpx.AsyncClient(**kwargs)
+
+
+class AsyncAPIView(APIView):
+    """处理方法为 async def 的 APIView"""
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            if asyncio.iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(request, *args, **kwargs)
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
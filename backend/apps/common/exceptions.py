@@ -49,6 +49,13 @@ class PermissionError(BusinessException):
         super().__init__(msg=msg, code=403, data=data)
 
 
+class ConflictError(BusinessException):
+    """并发冲突异常（乐观锁版本不一致）"""
+    
+    def __init__(self, msg: str = '数据已被他人修改，请刷新后重试', data=None):
+        super().__init__(msg=msg, code=409, data=data)
+
+
 def unified_exception_handler(exc, context):
     """
     统一异常处理器
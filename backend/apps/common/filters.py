@@ -0,0 +1,50 @@
+"""
+通用过滤器 - 精臣云资产管理系统
+"""
+from rest_framework.filters import BaseFilterBackend
+
+from apps.accounts.data_scope import DataScopeResolver
+
+
+def apply_data_scope(request, queryset, company_field='company_id', department_fields=None, user_fields=None,
+                     shared=False):
+    """
+    按当前用户数据权限过滤查询集（供非 GenericAPIView 的视图直接调用）
+    """
+    q = DataScopeResolver.build_q(
+        request.user,
+        company_field=company_field,
+        department_fields=department_fields,
+        user_fields=user_fields,
+        shared=shared,
+        request=request,
+    )
+    if q is None:
+        return queryset
+    return queryset.filter(q)
+
+
+class DataScopeFilterBackend(BaseFilterBackend):
+    """
+    数据权限过滤后端
+
+    视图通过以下属性声明字段：
+        data_scope_company_field: 公司字段（默认 'company_id'）
+        data_scope_department_fields: 部门字段列表（本部门范围）
+        data_scope_user_fields: 人员字段列表（本人范围）
+        data_scope_shared: 公司级共享数据（默认 False）
+
+    本部门/本人范围的用户只能看到声明字段命中的数据，未声明字段的视图对其不可见。
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if not request.user or not request.user.is_authenticated:
+            return queryset.none()
+        return apply_data_scope(
+            request,
+            queryset,
+            company_field=getattr(view, 'data_scope_company_field', 'company_id'),
+            department_fields=getattr(view, 'data_scope_department_fields', None),
+            user_fields=getattr(view, 'data_scope_user_fields', None),
+            shared=getattr(view, 'data_scope_shared', False),
+        )
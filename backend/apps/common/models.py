@@ -5,7 +5,7 @@
 - 所有 Model 必须继承 BaseModel (包含 created_at, updated_at, is_deleted, created_by)
 - 禁止物理删除，必须实现 soft_delete 逻辑
 """
-from django.db import models
+from django.db import DatabaseError, models
 from django.conf import settings
 from django.utils import timezone
 
@@ -199,6 +199,51 @@ class TimeStampedModel(models.Model):
         abstract = True
 
 
+class OptimisticLockMixin:
+    """
+    乐观锁混入
+    
+    模型需定义 version = models.PositiveIntegerField(default=1):
+    - 每次 save() 更新时 version 自增（update_fields 自动带上 version）
+    - save_if_version() 以 UPDATE ... WHERE version = 期望版本 写入，版本已变化时不写入
+    """
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            self.version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'version' not in update_fields:
+                kwargs['update_fields'] = [*update_fields, 'version']
+        super().save(*args, **kwargs)
+    
+    def save_if_version(self, expected_version: int, update_fields) -> bool:
+        """
+        乐观锁保存：UPDATE ... WHERE version = expected_version，仅写入 update_fields
+        
+        Returns:
+            数据库中的版本已变化（被他人修改）时返回 False，不写入任何数据
+        """
+        self.version = expected_version
+        self._expected_version = expected_version
+        try:
+            self.save(update_fields=update_fields)
+        except DatabaseError:
+            if self._version_matched:
+                raise
+            self.version = expected_version
+            return False
+        finally:
+            del self._expected_version
+        return True
+    
+    def _do_update(self, base_qs, *args, **kwargs):
+        expected_version = getattr(self, '_expected_version', None)
+        if expected_version is None:
+            return super()._do_update(base_qs, *args, **kwargs)
+        self._version_matched = super()._do_update(base_qs.filter(version=expected_version), *args, **kwargs)
+        return self._version_matched
+
+
 # =====================================================
 # 金额字段规范
 # 遵循 .cursorrules: 金额字段必须使用 DecimalField(max_digits=19, decimal_places=4)
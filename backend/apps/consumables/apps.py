@@ -5,3 +5,6 @@ class ConsumablesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.consumables'
     verbose_name = '耗材管理'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
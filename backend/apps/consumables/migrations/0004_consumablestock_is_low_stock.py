@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:36
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_low_stock(apps, schema_editor):
+    Consumable = apps.get_model('consumables', 'Consumable')
+    ConsumableStock = apps.get_model('consumables', 'ConsumableStock')
+    min_stock = Consumable.objects.filter(pk=OuterRef('consumable_id')).values('min_stock')[:1]
+    ConsumableStock.objects.annotate(min_stock=Subquery(min_stock)).filter(
+        quantity__lte=models.F('min_stock')
+    ).update(is_low_stock=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consumables', '0003_alter_consumable_options_and_more'),
+        ('organizations', '0004_company_company_type_company_currency_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='consumablestock',
+            name='is_low_stock',
+            field=models.BooleanField(default=False, verbose_name='低于安全库存'),
+        ),
+        migrations.AddIndex(
+            model_name='consumablestock',
+            index=models.Index(condition=models.Q(('is_low_stock', True)), fields=['warehouse', 'consumable'], name='consumable_stock_low_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consumableoutbound',
+            index=models.Index(fields=['company', 'outbound_date'], name='consumable_outbound_date_idx'),
+        ),
+        migrations.RunPython(backfill_low_stock, migrations.RunPython.noop),
+    ]
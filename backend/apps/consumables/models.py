@@ -100,15 +100,32 @@ class ConsumableStock(models.Model):
         verbose_name='仓库'
     )
     quantity = models.IntegerField('库存数量', default=0)
+    # 库存数量 <= 用品安全库存，出入库记账与安全库存调整时维护
+    is_low_stock = models.BooleanField('低于安全库存', default=False)
     updated_at = models.DateTimeField('更新时间', auto_now=True)
     
     class Meta:
         verbose_name = '用品库存'
         verbose_name_plural = '用品库存'
         unique_together = ['consumable', 'warehouse']
+        indexes = [
+            # 只索引预警行，预警列表与统计不再关联用品表比较安全库存
+            models.Index(
+                fields=['warehouse', 'consumable'],
+                condition=models.Q(is_low_stock=True),
+                name='consumable_stock_low_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.consumable.name} - {self.warehouse.name}: {self.quantity}"
+    
+    def save(self, *args, **kwargs):
+        self.is_low_stock = self.quantity <= self.consumable.min_stock
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'is_low_stock' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'is_low_stock']
+        super().save(*args, **kwargs)
 
 
 class ConsumableInbound(models.Model):
@@ -244,6 +261,10 @@ class ConsumableOutbound(models.Model):
         verbose_name = '用品出库单'
         verbose_name_plural = '用品出库单'
         ordering = ['-created_at']
+        indexes = [
+            # 按出库日期滚动统计领用消耗
+            models.Index(fields=['company', 'outbound_date'], name='consumable_outbound_date_idx'),
+        ]
     
     def __str__(self):
         return self.outbound_no
@@ -77,7 +77,8 @@ class ConsumableInboundSerializer(serializers.ModelSerializer):
                   'supplier', 'supplier_name', 'status', 'inbound_date', 
                   'total_amount', 'remark', 'created_by', 'created_by_name', 
                   'created_at', 'items', 'item_count']
-        read_only_fields = ['created_by', 'created_at']
+        # 单号由编码规则生成
+        read_only_fields = ['inbound_no', 'created_by', 'created_at']
     
     def get_supplier_name(self, obj):
         return obj.supplier.name if obj.supplier else None
@@ -110,7 +111,8 @@ class ConsumableOutboundSerializer(serializers.ModelSerializer):
                   'receive_department', 'receive_department_name',
                   'reason', 'remark', 'created_by', 'created_by_name',
                   'created_at', 'items', 'item_count']
-        read_only_fields = ['created_by', 'created_at']
+        # 单号由编码规则生成
+        read_only_fields = ['outbound_no', 'created_by', 'created_at']
     
     def get_receive_user_name(self, obj):
         return obj.receive_user.display_name if obj.receive_user else None
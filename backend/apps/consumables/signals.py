@@ -0,0 +1,18 @@
+"""
+耗材模块信号处理
+
+用品安全库存调整后，重算该用品各仓库库存的预警标记
+"""
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Consumable
+
+
+@receiver(post_save, sender=Consumable)
+def refresh_low_stock_flags(sender, instance, created, update_fields=None, **kwargs):
+    from services import ReplenishmentService
+
+    if created or (update_fields is not None and 'min_stock' not in update_fields):
+        return
+    ReplenishmentService.refresh_low_stock(instance.pk, instance.min_stock)
@@ -5,9 +5,15 @@ from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django.db import transaction
-from django.utils import timezone
 
-from .models import ConsumableCategory, Consumable, ConsumableStock, ConsumableInbound, ConsumableInboundItem, ConsumableOutbound, ConsumableOutboundItem
+from apps.accounts.data_scope import DataScopeResolver
+from apps.common.exceptions import BusinessException, ValidationError
+from apps.common.filters import DataScopeFilterBackend
+from apps.system.form_bundle import get_request_company_id
+from services.consumable_document_service import ConsumableDocumentService
+from services.replenishment_service import ReplenishmentService
+
+from .models import ConsumableCategory, Consumable, ConsumableStock, ConsumableInbound, ConsumableOutbound
 from .serializers import (
     ConsumableCategorySerializer, ConsumableSerializer,
     ConsumableStockSerializer, ConsumableInboundSerializer, ConsumableOutboundSerializer
@@ -18,7 +24,9 @@ class ConsumableCategoryViewSet(viewsets.ModelViewSet):
     queryset = ConsumableCategory.objects.all()
     serializer_class = ConsumableCategorySerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, SearchFilter]
+    filter_backends = [DataScopeFilterBackend, DjangoFilterBackend, SearchFilter]
+    # 分类与用品档案为公司共享目录，领用时需可选
+    data_scope_shared = True
     filterset_fields = ['company', 'parent']
     search_fields = ['name', 'code']
     
@@ -37,251 +45,228 @@ class ConsumableViewSet(viewsets.ModelViewSet):
     queryset = Consumable.objects.all()
     serializer_class = ConsumableSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DataScopeFilterBackend, DjangoFilterBackend, SearchFilter, OrderingFilter]
+    data_scope_shared = True
     filterset_fields = ['company', 'category', 'is_active']
     search_fields = ['name', 'code', 'brand', 'model', 'category__name']
     ordering_fields = ['created_at', 'name']
     ordering = ['-created_at']
+    
+    def _replenishment_options(self, params):
+        return {
+            name: params.get(name)
+            for name in ('velocity_days', 'lead_time_days', 'review_days')
+            if params.get(name) not in (None, '')
+        }
+    
+    def _check_replenishment_scope(self, company_id):
+        """补货建议汇总全公司库存与在途，仅整公司数据范围可用"""
+        scope = DataScopeResolver.get_company_scope(self.request.user, company_id, self.request)
+        if scope != DataScopeResolver.SCOPE_ALL:
+            return Response({'detail': '无权查看该公司的补货数据'}, status=status.HTTP_403_FORBIDDEN)
+        return None
+    
+    @action(detail=False, methods=['get'])
+    def replenishment(self, request):
+        """补货建议（支持 category 等列表过滤参数，include_all=true 返回全部用品）"""
+        company_id = get_request_company_id(request)
+        if not company_id:
+            return Response({'detail': '公司ID不能为空'}, status=status.HTTP_400_BAD_REQUEST)
+        denied = self._check_replenishment_scope(company_id)
+        if denied:
+            return denied
+        try:
+            result = ReplenishmentService.suggestions(
+                company_id,
+                consumables=self.filter_queryset(self.get_queryset()),
+                include_all=request.query_params.get('include_all') in ('1', 'true'),
+                **self._replenishment_options(request.query_params)
+            )
+        except BusinessException as e:
+            return Response({'detail': e.msg}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result)
+    
+    @action(detail=False, methods=['post'], url_path='replenishment/generate')
+    def generate_replenishment(self, request):
+        """按补货建议生成采购申请草稿；items 为空时采用全部建议采购量"""
+        from apps.procurement.serializers import PurchaseRequestSerializer
+        
+        company_id = request.data.get('company') or get_request_company_id(request)
+        if not company_id:
+            return Response({'detail': '公司ID不能为空'}, status=status.HTTP_400_BAD_REQUEST)
+        denied = self._check_replenishment_scope(company_id)
+        if denied:
+            return denied
+        try:
+            requests = ReplenishmentService.create_purchase_requests(
+                company_id,
+                request.user,
+                lines=request.data.get('items') or None,
+                consumables=self.filter_queryset(self.get_queryset()),
+                department_id=request.data.get('department') or None,
+                expected_date=request.data.get('expected_date') or None,
+                **self._replenishment_options(request.data)
+            )
+        except BusinessException as e:
+            return Response({'detail': e.msg}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(PurchaseRequestSerializer(requests, many=True).data, status=status.HTTP_201_CREATED)
 
 
 class ConsumableStockViewSet(viewsets.ModelViewSet):
     queryset = ConsumableStock.objects.select_related('consumable', 'consumable__category', 'warehouse').all()
     serializer_class = ConsumableStockSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, SearchFilter]
+    filter_backends = [DataScopeFilterBackend, DjangoFilterBackend, SearchFilter]
+    data_scope_company_field = 'consumable__company_id'
+    # 库存只按仓库区分，无部门/人员字段：仅整公司范围可见，本部门/本人范围不可见
+    data_scope_department_fields = []
+    data_scope_user_fields = []
     filterset_fields = ['consumable', 'warehouse']
     search_fields = ['consumable__name', 'consumable__code', 'consumable__category__name', 'warehouse__name']
     
     @action(detail=False, methods=['get'])
     def warning(self, request):
         """获取库存预警列表"""
-        from django.db.models import F
-        queryset = self.get_queryset().filter(quantity__lte=F('consumable__min_stock'))
+        queryset = self.filter_queryset(self.get_queryset()).filter(is_low_stock=True)
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
 
-def generate_document_code(code_type, company_id=None):
-    """Generate document code using the code rule system"""
-    from apps.system.models import CodeRule
-    import os, json, traceback
-    
-    now = timezone.now()
-    
-    # #region agent log
-    try:
-        log_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), '.cursor', 'debug.log')
-        open(log_path, 'a').write(json.dumps({'location': 'views.py:generate_document_code', 'message': 'Code generation started', 'data': {'code_type': code_type, 'company_id': company_id}, 'timestamp': __import__('time').time(), 'sessionId': 'debug-session', 'hypothesisId': 'H1'}) + '\n')
-    except:
-        pass
-    # #endregion
-    
-    # Get or create default rule
-    try:
-        if company_id:
-            rule = CodeRule.objects.get(company_id=company_id, code=code_type)
-        else:
-            rule = CodeRule.objects.get(company__isnull=True, code=code_type)
-        # #region agent log
-        try:
-            log_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), '.cursor', 'debug.log')
-            open(log_path, 'a').write(json.dumps({'location': 'views.py:generate_document_code', 'message': 'Rule found', 'data': {'rule_id': rule.id, 'prefix': rule.prefix, 'current_serial': rule.current_serial}, 'timestamp': __import__('time').time(), 'sessionId': 'debug-session', 'hypothesisId': 'H1'}) + '\n')
-        except:
-            pass
-        # #endregion
-    except CodeRule.DoesNotExist:
-        # Default rules for different types
-        defaults = {
-            'inbound_code': {'prefix': 'RK', 'name': '入库单编号规则'},
-            'outbound_code': {'prefix': 'LY', 'name': '领用单编号规则'},
-        }
-        default = defaults.get(code_type, {'prefix': 'DOC', 'name': '单据编号规则'})
-        rule = CodeRule.objects.create(
-            company_id=company_id,
-            code=code_type,
-            name=default['name'],
-            prefix=default['prefix'],
-            date_format='YYYYMMDD',
-            serial_length=4,
-            reset_cycle='daily',
-            is_active=True
-        )
-        # #region agent log
-        try:
-            log_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), '.cursor', 'debug.log')
-            open(log_path, 'a').write(json.dumps({'location': 'views.py:generate_document_code', 'message': 'Rule created', 'data': {'rule_id': rule.id, 'prefix': rule.prefix}, 'timestamp': __import__('time').time(), 'sessionId': 'debug-session', 'hypothesisId': 'H1'}) + '\n')
-        except:
-            pass
-        # #endregion
-    
-    # Generate date string
-    date_str = ''
-    if rule.date_format == 'YYYY':
-        date_str = now.strftime('%Y')
-    elif rule.date_format == 'YYYYMM':
-        date_str = now.strftime('%Y%m')
-    elif rule.date_format == 'YYYYMMDD':
-        date_str = now.strftime('%Y%m%d')
-    
-    # Check if reset is needed
-    should_reset = False
-    if rule.reset_cycle == 'daily' and rule.last_reset_date != now.date():
-        should_reset = True
-    elif rule.reset_cycle == 'monthly' and (rule.last_reset_date is None or rule.last_reset_date.month != now.month):
-        should_reset = True
-    elif rule.reset_cycle == 'yearly' and (rule.last_reset_date is None or rule.last_reset_date.year != now.year):
-        should_reset = True
-    
-    if should_reset:
-        rule.current_serial = 0
-        rule.last_reset_date = now.date()
+class ConsumableDocumentMixin:
+    """
+    入库单 / 领用单共用的创建与编辑
     
-    # Increment serial
-    rule.current_serial += 1
-    rule.save()
+    表头由视图序列化器校验，明细校验、单号预留与批量写入由 ConsumableDocumentService 完成；
+    任一表头或明细不合法时不写入任何数据。
+    """
     
-    # Format serial number
-    serial = str(rule.current_serial).zfill(rule.serial_length)
-    sep = rule.separator or ''
-    generated_code = f"{rule.prefix or ''}{sep}{date_str}{sep}{serial}"
+    document_kind = None
+    document_label = '单据'
+    # 创建时未提供的表头字段默认值
+    document_defaults = {}
     
-    # #region agent log
-    try:
-        log_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), '.cursor', 'debug.log')
-        open(log_path, 'a').write(json.dumps({'location': 'views.py:generate_document_code', 'message': 'Code generated', 'data': {'generated_code': generated_code, 'prefix': rule.prefix, 'date_str': date_str, 'serial': serial}, 'timestamp': __import__('time').time(), 'sessionId': 'debug-session', 'hypothesisId': 'H1'}) + '\n')
-    except:
-        pass
-    # #endregion
+    def _request_company_id(self, data):
+        return data.get('company') or getattr(self.request.user, 'current_company_id', None)
     
-    return generated_code
-
-
-class ConsumableInboundViewSet(viewsets.ModelViewSet):
-    queryset = ConsumableInbound.objects.select_related('warehouse', 'supplier', 'created_by').prefetch_related('items').all()
-    serializer_class = ConsumableInboundSerializer
-    permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, OrderingFilter, SearchFilter]
-    filterset_fields = ['company', 'status', 'warehouse']
-    search_fields = ['inbound_no', 'warehouse__name', 'supplier__name', 'created_by__username', 'created_by__nickname']
-    ordering = ['-created_at']
+    def _create_documents(self, company_id, payloads):
+        """
+        校验并创建单据
+        
+        Raises:
+            ValidationError: data.errors 为 [{index, errors: {字段: [信息], items: [{index, errors}]}}]
+        """
+        headers = [
+            {**self.document_defaults, **{key: value for key, value in payload.items() if key != 'items'}, 'company': company_id}
+            for payload in payloads
+        ]
+        serializer = self.get_serializer(data=headers, many=True)
+        header_errors = [{}] * len(payloads)
+        if not serializer.is_valid():
+            # 按序号的字典或与数据等长的列表，视 DRF 版本而定
+            errors = serializer.errors
+            header_errors = [errors.get(index, {}) for index in range(len(payloads))] if isinstance(errors, dict) else errors
+        lines_list, item_errors = ConsumableDocumentService.clean_items(
+            self.document_kind, company_id, [payload.get('items') or [] for payload in payloads]
+        )
+        
+        errors = []
+        for index, (document_errors, line_errors) in enumerate(zip(header_errors, item_errors)):
+            document_errors = dict(document_errors)
+            if line_errors:
+                document_errors['items'] = line_errors
+            if document_errors:
+                errors.append({'index': index, 'errors': document_errors})
+        if errors:
+            raise ValidationError(f'{self.document_label}校验失败', data={'errors': errors})
+        
+        documents = ConsumableDocumentService.create_documents(
+            self.document_kind, company_id, serializer.validated_data, lines_list, self.request.user
+        )
+        return list(
+            self.get_queryset().prefetch_related('items__consumable')
+            .filter(pk__in=[document.pk for document in documents]).order_by('pk')
+        )
     
-    @transaction.atomic
     def create(self, request, *args, **kwargs):
-        """Create inbound with items"""
+        """创建单据（含明细）"""
+        data = {key: value for key, value in request.data.items()}
+        company_id = self._request_company_id(data)
+        if not company_id:
+            return Response({'detail': '公司ID不能为空'}, status=status.HTTP_400_BAD_REQUEST)
+        
         try:
-            # #region agent log
-            try:
-                import json, os; log_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), '.cursor', 'debug.log'); open(log_path, 'a').write(json.dumps({'location': 'views.py:inbound_create', 'message': 'Inbound create called', 'data': {'request_data': str(dict(request.data))[:500], 'user_id': request.user.id if request.user else None}, 'timestamp': __import__('time').time(), 'sessionId': 'debug-session', 'hypothesisId': 'H1'}) + '\n')
-            except Exception as e:
-                pass
-            # #endregion
-            
-            # Convert request.data to dict and extract items
-            if hasattr(request.data, 'get'):
-                data = {k: v for k, v in request.data.items()}
-            else:
-                data = dict(request.data)
-            items_data = data.pop('items', []) if 'items' in data else []
-            
-            # Auto-generate inbound_no
-            company_id = data.get('company') or getattr(request.user, 'current_company_id', None)
-            if not company_id:
-                return Response({'detail': '公司ID不能为空'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            try:
-                data['inbound_no'] = generate_document_code('inbound_code', company_id)
-            except Exception as e:
-                # #region agent log
-                try:
-                    import json, os; log_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), '.cursor', 'debug.log'); open(log_path, 'a').write(json.dumps({'location': 'views.py:inbound_code_gen_error', 'message': 'Code generation failed', 'data': {'error': str(e)}, 'timestamp': __import__('time').time(), 'sessionId': 'debug-session', 'hypothesisId': 'H1'}) + '\n')
-                except:
-                    pass
-                # #endregion
-                return Response({'detail': f'生成编号失败: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            
-            data['company'] = company_id
-            data['created_by'] = request.user.id
-            
-            # #region agent log
-            try:
-                import json, os; log_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), '.cursor', 'debug.log'); open(log_path, 'a').write(json.dumps({'location': 'views.py:inbound_before_save', 'message': 'Before save inbound', 'data': {'inbound_no': data.get('inbound_no'), 'company': str(company_id), 'items_count': len(items_data)}, 'timestamp': __import__('time').time(), 'sessionId': 'debug-session', 'hypothesisId': 'H1'}) + '\n')
-            except:
-                pass
-            # #endregion
-            
-            # Create inbound record
-            serializer = self.get_serializer(data=data)
-            if not serializer.is_valid():
-                # #region agent log
-                try:
-                    import json, os; log_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), '.cursor', 'debug.log'); open(log_path, 'a').write(json.dumps({'location': 'views.py:inbound_serializer_invalid', 'message': 'Serializer validation failed', 'data': {'errors': str(serializer.errors)}, 'timestamp': __import__('time').time(), 'sessionId': 'debug-session', 'hypothesisId': 'H1'}) + '\n')
-                except:
-                    pass
-                # #endregion
-                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-            inbound = serializer.save()
-            
-            # #region agent log
-            try:
-                import json, os; log_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), '.cursor', 'debug.log'); open(log_path, 'a').write(json.dumps({'location': 'views.py:inbound_after_save', 'message': 'Inbound created', 'data': {'id': inbound.id, 'inbound_no': inbound.inbound_no}, 'timestamp': __import__('time').time(), 'sessionId': 'debug-session', 'hypothesisId': 'H1'}) + '\n')
-            except:
-                pass
-            # #endregion
-            
-            # Create items
-            for item_data in items_data:
-                quantity = item_data.get('quantity', 0)
-                price = item_data.get('price', 0)
-                amount = item_data.get('amount', quantity * price)
-                ConsumableInboundItem.objects.create(
-                    inbound=inbound,
-                    consumable_id=item_data['consumable'],
-                    quantity=quantity,
-                    price=price,
-                    amount=amount
-                )
-            
-            return Response(self.get_serializer(inbound).data, status=status.HTTP_201_CREATED)
-        except Exception as e:
-            # #region agent log
-            try:
-                import json, os, traceback; log_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), '.cursor', 'debug.log'); open(log_path, 'a').write(json.dumps({'location': 'views.py:inbound_create_exception', 'message': 'Unexpected error in create', 'data': {'error': str(e), 'traceback': traceback.format_exc()[:1000]}, 'timestamp': __import__('time').time(), 'sessionId': 'debug-session', 'hypothesisId': 'H1'}) + '\n')
-            except:
-                pass
-            # #endregion
-            return Response({'detail': f'创建失败: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            document = self._create_documents(company_id, [data])[0]
+        except ValidationError as e:
+            return Response(e.data['errors'][0]['errors'], status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(document).data, status=status.HTTP_201_CREATED)
+    
+    @action(detail=False, methods=['post'], url_path='batch')
+    def batch_create(self, request):
+        """
+        批量创建单据（如部门集中领用）
+        
+        documents: [{表头字段, items: [...]}]；documents 以外的顶层字段作为每张单据的公共表头
+        """
+        documents = request.data.get('documents')
+        if not isinstance(documents, list) or not documents:
+            return Response({'detail': '请提供 documents 列表'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(documents) > ConsumableDocumentService.MAX_BATCH_DOCUMENTS:
+            return Response(
+                {'detail': f'单次最多创建 {ConsumableDocumentService.MAX_BATCH_DOCUMENTS} 张{self.document_label}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not all(isinstance(document, dict) for document in documents):
+            return Response({'detail': 'documents 的每一项必须是对象'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        common = {key: value for key, value in request.data.items() if key != 'documents'}
+        company_id = self._request_company_id(common)
+        if not company_id:
+            return Response({'detail': '公司ID不能为空'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        created = self._create_documents(company_id, [{**common, **document} for document in documents])
+        return Response(self.get_serializer(created, many=True).data, status=status.HTTP_201_CREATED)
     
-    @transaction.atomic
     def update(self, request, *args, **kwargs):
-        """Update inbound with items"""
+        """编辑草稿单据；提交 items 时整体替换明细"""
         instance = self.get_object()
         
         if instance.status != 'draft':
-            return Response({'detail': '只能编辑草稿状态的入库单'}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({'detail': f'只能编辑草稿状态的{self.document_label}'}, status=status.HTTP_400_BAD_REQUEST)
         
-        data = request.data.copy()
-        items_data = data.pop('items', [])
-        
-        # Update inbound record
+        data = {key: value for key, value in request.data.items() if key not in ('items', 'company')}
         serializer = self.get_serializer(instance, data=data, partial=True)
         serializer.is_valid(raise_exception=True)
-        inbound = serializer.save()
         
-        # Replace items
-        instance.items.all().delete()
-        for item_data in items_data:
-            quantity = item_data.get('quantity', 0)
-            price = item_data.get('price', 0)
-            amount = item_data.get('amount', quantity * price)
-            ConsumableInboundItem.objects.create(
-                inbound=inbound,
-                consumable_id=item_data['consumable'],
-                quantity=quantity,
-                price=price,
-                amount=amount
+        lines = None
+        if 'items' in request.data:
+            lines_list, item_errors = ConsumableDocumentService.clean_items(
+                self.document_kind, instance.company_id, [request.data.get('items') or []]
             )
+            if item_errors[0]:
+                return Response({'items': item_errors[0]}, status=status.HTTP_400_BAD_REQUEST)
+            lines = lines_list[0]
+        
+        with transaction.atomic():
+            document = serializer.save()
+            if lines is not None:
+                ConsumableDocumentService.replace_items(self.document_kind, document, lines)
         
-        return Response(self.get_serializer(inbound).data)
+        return Response(self.get_serializer(
+            self.get_queryset().prefetch_related('items__consumable').get(pk=document.pk)
+        ).data)
+
+
+class ConsumableInboundViewSet(ConsumableDocumentMixin, viewsets.ModelViewSet):
+    queryset = ConsumableInbound.objects.select_related('warehouse', 'supplier', 'created_by').prefetch_related('items').all()
+    serializer_class = ConsumableInboundSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DataScopeFilterBackend, DjangoFilterBackend, OrderingFilter, SearchFilter]
+    data_scope_user_fields = ['created_by_id']
+    filterset_fields = ['company', 'status', 'warehouse']
+    search_fields = ['inbound_no', 'warehouse__name', 'supplier__name', 'created_by__username', 'created_by__nickname']
+    ordering = ['-created_at']
+    document_kind = ConsumableDocumentService.INBOUND
+    document_label = '入库单'
     
     @action(detail=True, methods=['post'])
     def approve(self, request, pk=None):
@@ -291,16 +276,12 @@ class ConsumableInboundViewSet(viewsets.ModelViewSet):
         if inbound.status != 'draft':
             return Response({'detail': '只能确认草稿状态的入库单'}, status=status.HTTP_400_BAD_REQUEST)
         
+        movements = {}
+        for consumable_id, quantity in inbound.items.values_list('consumable_id', 'quantity'):
+            movements[consumable_id] = movements.get(consumable_id, 0) + quantity
+        
         with transaction.atomic():
-            # Update stock for each item
-            for item in inbound.items.all():
-                stock, created = ConsumableStock.objects.get_or_create(
-                    consumable=item.consumable,
-                    warehouse=inbound.warehouse,
-                    defaults={'quantity': 0}
-                )
-                stock.quantity += item.quantity
-                stock.save()
+            ReplenishmentService.apply_movements(inbound.warehouse_id, movements)
             
             # Update status
             inbound.status = 'approved'
@@ -309,109 +290,19 @@ class ConsumableInboundViewSet(viewsets.ModelViewSet):
         return Response({'detail': '入库确认成功'})
 
 
-class ConsumableOutboundViewSet(viewsets.ModelViewSet):
+class ConsumableOutboundViewSet(ConsumableDocumentMixin, viewsets.ModelViewSet):
     queryset = ConsumableOutbound.objects.select_related('warehouse', 'receive_user', 'receive_department', 'created_by').prefetch_related('items').all()
     serializer_class = ConsumableOutboundSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, OrderingFilter, SearchFilter]
+    filter_backends = [DataScopeFilterBackend, DjangoFilterBackend, OrderingFilter, SearchFilter]
+    data_scope_department_fields = ['receive_department_id']
+    data_scope_user_fields = ['receive_user_id', 'created_by_id']
     filterset_fields = ['company', 'status', 'outbound_type']
     search_fields = ['outbound_no', 'warehouse__name', 'receive_user__username', 'receive_user__nickname', 'receive_department__name', 'created_by__username', 'created_by__nickname']
     ordering = ['-created_at']
-    
-    @transaction.atomic
-    def create(self, request, *args, **kwargs):
-        """Create outbound with items"""
-        try:
-            # #region agent log
-            try:
-                import json, os; log_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), '.cursor', 'debug.log'); open(log_path, 'a').write(json.dumps({'location': 'views.py:outbound_create', 'message': 'Outbound create called', 'data': {'request_data': str(dict(request.data))[:500], 'user_id': request.user.id if request.user else None}, 'timestamp': __import__('time').time(), 'sessionId': 'debug-session', 'hypothesisId': 'H1'}) + '\n')
-            except:
-                pass
-            # #endregion
-            
-            # Convert request.data to dict and extract items
-            if hasattr(request.data, 'get'):
-                data = {k: v for k, v in request.data.items()}
-            else:
-                data = dict(request.data)
-            items_data = data.pop('items', []) if 'items' in data else []
-            
-            # Auto-generate outbound_no
-            company_id = data.get('company') or getattr(request.user, 'current_company_id', None)
-            if not company_id:
-                return Response({'detail': '公司ID不能为空'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            try:
-                data['outbound_no'] = generate_document_code('outbound_code', company_id)
-            except Exception as e:
-                # #region agent log
-                try:
-                    import json, os; log_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), '.cursor', 'debug.log'); open(log_path, 'a').write(json.dumps({'location': 'views.py:outbound_code_gen_error', 'message': 'Code generation failed', 'data': {'error': str(e)}, 'timestamp': __import__('time').time(), 'sessionId': 'debug-session', 'hypothesisId': 'H1'}) + '\n')
-                except:
-                    pass
-                # #endregion
-                return Response({'detail': f'生成编号失败: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            
-            data['company'] = company_id
-            data['created_by'] = request.user.id
-            data['outbound_type'] = data.get('outbound_type', 'receive')
-            
-            # Create outbound record
-            serializer = self.get_serializer(data=data)
-            if not serializer.is_valid():
-                # #region agent log
-                try:
-                    import json, os; log_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), '.cursor', 'debug.log'); open(log_path, 'a').write(json.dumps({'location': 'views.py:outbound_serializer_invalid', 'message': 'Serializer validation failed', 'data': {'errors': str(serializer.errors)}, 'timestamp': __import__('time').time(), 'sessionId': 'debug-session', 'hypothesisId': 'H1'}) + '\n')
-                except:
-                    pass
-                # #endregion
-                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-            outbound = serializer.save()
-            
-            # Create items
-            for item_data in items_data:
-                ConsumableOutboundItem.objects.create(
-                    outbound=outbound,
-                    consumable_id=item_data['consumable'],
-                    quantity=item_data['quantity']
-                )
-            
-            return Response(self.get_serializer(outbound).data, status=status.HTTP_201_CREATED)
-        except Exception as e:
-            # #region agent log
-            try:
-                import json, os, traceback; log_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), '.cursor', 'debug.log'); open(log_path, 'a').write(json.dumps({'location': 'views.py:outbound_create_exception', 'message': 'Unexpected error in create', 'data': {'error': str(e), 'traceback': traceback.format_exc()[:1000]}, 'timestamp': __import__('time').time(), 'sessionId': 'debug-session', 'hypothesisId': 'H1'}) + '\n')
-            except:
-                pass
-            # #endregion
-            return Response({'detail': f'创建失败: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    
-    @transaction.atomic
-    def update(self, request, *args, **kwargs):
-        """Update outbound with items"""
-        instance = self.get_object()
-        
-        if instance.status != 'draft':
-            return Response({'detail': '只能编辑草稿状态的领用单'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        data = request.data.copy()
-        items_data = data.pop('items', [])
-        
-        # Update outbound record
-        serializer = self.get_serializer(instance, data=data, partial=True)
-        serializer.is_valid(raise_exception=True)
-        outbound = serializer.save()
-        
-        # Replace items
-        instance.items.all().delete()
-        for item_data in items_data:
-            ConsumableOutboundItem.objects.create(
-                outbound=outbound,
-                consumable_id=item_data['consumable'],
-                quantity=item_data['quantity']
-            )
-        
-        return Response(self.get_serializer(outbound).data)
+    document_kind = ConsumableDocumentService.OUTBOUND
+    document_label = '领用单'
+    document_defaults = {'outbound_type': 'receive'}
     
     @action(detail=True, methods=['post'])
     def approve(self, request, pk=None):
@@ -421,27 +312,19 @@ class ConsumableOutboundViewSet(viewsets.ModelViewSet):
         if outbound.status != 'draft':
             return Response({'detail': '只能确认草稿状态的领用单'}, status=status.HTTP_400_BAD_REQUEST)
         
-        with transaction.atomic():
-            # Check and deduct stock for each item
-            for item in outbound.items.all():
-                try:
-                    stock = ConsumableStock.objects.get(
-                        consumable=item.consumable,
-                        warehouse=outbound.warehouse
-                    )
-                    if stock.quantity < item.quantity:
-                        return Response({
-                            'detail': f'{item.consumable.name} 库存不足，当前库存: {stock.quantity}'
-                        }, status=status.HTTP_400_BAD_REQUEST)
-                    stock.quantity -= item.quantity
-                    stock.save()
-                except ConsumableStock.DoesNotExist:
-                    return Response({
-                        'detail': f'{item.consumable.name} 在该仓库无库存'
-                    }, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Update status
-            outbound.status = 'approved'
-            outbound.save()
+        movements = {}
+        for consumable_id, quantity in outbound.items.values_list('consumable_id', 'quantity'):
+            movements[consumable_id] = movements.get(consumable_id, 0) - quantity
+        
+        try:
+            with transaction.atomic():
+                # 库存不足时整单回滚
+                ReplenishmentService.apply_movements(outbound.warehouse_id, movements)
+                
+                # Update status
+                outbound.status = 'approved'
+                outbound.save()
+        except BusinessException as e:
+            return Response({'detail': e.msg}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response({'detail': '领用确认成功'})
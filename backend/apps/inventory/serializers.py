@@ -3,7 +3,6 @@ from .models import InventoryTask, InventoryRecord
 
 
 class InventoryTaskSerializer(serializers.ModelSerializer):
-    executor_name = serializers.CharField(source='executor.display_name', read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     progress = serializers.SerializerMethodField()
     
@@ -12,11 +11,10 @@ class InventoryTaskSerializer(serializers.ModelSerializer):
         fields = '__all__'
     
     def get_progress(self, obj):
-        total = obj.records.count()
-        if total == 0:
+        # 计数字段由扫码提交时回写，避免列表逐行 COUNT
+        if not obj.total_assets:
             return 0
-        completed = obj.records.filter(status='completed').count()
-        return int(completed / total * 100)
+        return int(obj.checked_assets / obj.total_assets * 100)
 
 
 class InventoryRecordSerializer(serializers.ModelSerializer):
@@ -26,3 +24,20 @@ class InventoryRecordSerializer(serializers.ModelSerializer):
     class Meta:
         model = InventoryRecord
         fields = '__all__'
+
+
+class InventoryScanItemSerializer(serializers.Serializer):
+    """扫码条目：code 可为资产编码、条形码或 RFID 编码；未提交的实际信息保持不变"""
+    code = serializers.CharField(max_length=200)
+    result = serializers.ChoiceField(
+        choices=InventoryRecord.Result.choices, default=InventoryRecord.Result.NORMAL
+    )
+    actual_location = serializers.IntegerField(required=False, allow_null=True)
+    actual_department = serializers.IntegerField(required=False, allow_null=True)
+    actual_user = serializers.IntegerField(required=False, allow_null=True)
+    remark = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+
+class InventoryScanSerializer(serializers.Serializer):
+    """批量扫码提交"""
+    items = InventoryScanItemSerializer(many=True, allow_empty=False, max_length=5000)
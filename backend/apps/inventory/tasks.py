@@ -0,0 +1,12 @@
+"""
+盘点异步任务 - 精臣云资产管理系统
+"""
+from celery import shared_task
+
+
+@shared_task(ignore_result=False)
+def generate_inventory_records(task_id):
+    """后台生成盘点记录"""
+    from services import InventoryService
+    
+    return InventoryService.generate_records(task_id)
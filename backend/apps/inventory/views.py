@@ -5,8 +5,11 @@ from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import OrderingFilter
 
+from django.utils import timezone
+
+from services import InventoryService
 from .models import InventoryTask, InventoryRecord
-from .serializers import InventoryTaskSerializer, InventoryRecordSerializer
+from .serializers import InventoryTaskSerializer, InventoryRecordSerializer, InventoryScanSerializer
 
 
 class InventoryTaskViewSet(viewsets.ModelViewSet):
@@ -14,41 +17,68 @@ class InventoryTaskViewSet(viewsets.ModelViewSet):
     serializer_class = InventoryTaskSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, OrderingFilter]
-    filterset_fields = ['company', 'status', 'executor']
+    filterset_fields = ['company', 'status', 'inventory_type']
     ordering = ['-created_at']
     
+    @action(detail=True, methods=['post'])
+    def generate(self, request, pk=None):
+        """
+        生成盘点记录 - 委托给 InventoryService
+        
+        可重复执行，仅补齐新进入盘点范围的资产；async=true 时提交后台任务。
+        """
+        task = self.get_object()
+        if str(request.data.get('async', '')).lower() in ('true', '1'):
+            from .tasks import generate_inventory_records
+            celery_task = generate_inventory_records.delay(task.pk)
+            return Response({
+                'message': '盘点记录生成任务已提交',
+                'task_id': celery_task.id
+            }, status=status.HTTP_202_ACCEPTED)
+        return Response(InventoryService.generate_records(task.pk))
+    
     @action(detail=True, methods=['post'])
     def start(self, request, pk=None):
-        """开始盘点"""
+        """开始盘点：生成盘点记录并进入进行中"""
         task = self.get_object()
-        if task.status != 'pending':
+        if task.status != InventoryTask.Status.DRAFT:
             return Response({'error': '任务状态不正确'}, status=status.HTTP_400_BAD_REQUEST)
-        task.status = 'in_progress'
-        task.save()
-        return Response({'message': '盘点已开始'})
+        result = InventoryService.generate_records(task.pk)
+        InventoryTask.objects.filter(pk=task.pk).update(
+            status=InventoryTask.Status.IN_PROGRESS, actual_start_date=timezone.localdate()
+        )
+        return Response({'message': '盘点已开始', **result})
     
     @action(detail=True, methods=['post'])
     def complete(self, request, pk=None):
-        """完成盘点"""
+        """
+        完成盘点 - 未盘资产记为盘亏并统计账实差异
+        
+        请求体 apply_corrections=true 时将盘到资产的实际位置/部门/使用人回写到资产台账。
+        """
         task = self.get_object()
-        task.status = 'completed'
-        task.save()
-        return Response({'message': '盘点已完成'})
+        apply_corrections = str(request.data.get('apply_corrections', '')).lower() in ('true', '1')
+        result = InventoryService.complete_task(task.pk, request.user, apply_corrections=apply_corrections)
+        return Response({'message': '盘点已完成', **result})
     
     @action(detail=True, methods=['get'])
     def statistics(self, request, pk=None):
         """获取盘点统计"""
         task = self.get_object()
-        records = task.records.all()
-        total = records.count()
-        normal = records.filter(result='normal').count()
-        abnormal = total - normal
-        return Response({
-            'total': total,
-            'completed': records.filter(status='completed').count(),
-            'normal': normal,
-            'abnormal': abnormal
-        })
+        return Response(InventoryService.get_statistics(task.pk))
+    
+    @action(detail=True, methods=['post'])
+    def scan(self, request, pk=None):
+        """
+        批量提交扫码结果 - 委托给 InventoryService
+        
+        请求体：{"items": [{"code", "result", "actual_location", "actual_department", "actual_user", "remark"}]}
+        重复提交相同内容不会产生改动，返回最新盘点统计。
+        """
+        task = self.get_object()
+        serializer = InventoryScanSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(InventoryService.submit_scans(task.pk, serializer.validated_data['items'], request.user))
 
 
 class InventoryRecordViewSet(viewsets.ModelViewSet):
@@ -56,19 +86,21 @@ class InventoryRecordViewSet(viewsets.ModelViewSet):
     serializer_class = InventoryRecordSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ['task', 'asset', 'status', 'result']
+    filterset_fields = ['task', 'asset', 'result', 'checker']
     
     @action(detail=True, methods=['post'])
     def check(self, request, pk=None):
         """提交盘点结果"""
         record = self.get_object()
         result = request.data.get('result')
-        remark = request.data.get('remark', '')
+        if result not in InventoryRecord.Result.values:
+            return Response({'error': '盘点结果不正确'}, status=status.HTTP_400_BAD_REQUEST)
         
         record.result = result
-        record.remark = remark
-        record.status = 'completed'
-        record.checked_by = request.user
-        record.save()
+        record.remark = request.data.get('remark', '')
+        record.checker = request.user
+        record.check_time = timezone.now()
+        record.save(update_fields=['result', 'remark', 'checker', 'check_time'])
+        InventoryService.refresh_statistics(record.task_id)
         
         return Response({'message': '提交成功'})
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Notification, NotificationRecipient, Announcement, AlertRule
+from .models import Notification, NotificationRecipient, Announcement, AlertRule, AlertRecord
 
 
 class NotificationRecipientInline(admin.TabularInline):
@@ -24,6 +24,12 @@ class AnnouncementAdmin(admin.ModelAdmin):
 
 @admin.register(AlertRule)
 class AlertRuleAdmin(admin.ModelAdmin):
-    list_display = ['name', 'alert_type', 'advance_days', 'is_active', 'company']
+    list_display = ['name', 'alert_type', 'advance_days', 'is_active', 'company', 'last_run_at', 'last_run_duration', 'last_matched_count']
     list_filter = ['alert_type', 'is_active']
     search_fields = ['name']
+
+
+@admin.register(AlertRecord)
+class AlertRecordAdmin(admin.ModelAdmin):
+    list_display = ['rule', 'business_type', 'business_id', 'last_notified_at', 'notify_count', 'resolved_at']
+    list_filter = ['business_type']
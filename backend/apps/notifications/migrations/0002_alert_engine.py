@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alertrule',
+            name='last_matched_count',
+            field=models.IntegerField(default=0, verbose_name='最近命中数量'),
+        ),
+        migrations.AddField(
+            model_name='alertrule',
+            name='last_run_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='最近执行时间'),
+        ),
+        migrations.AddField(
+            model_name='alertrule',
+            name='last_run_duration',
+            field=models.IntegerField(blank=True, null=True, verbose_name='最近执行耗时(毫秒)'),
+        ),
+        migrations.CreateModel(
+            name='AlertRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('business_type', models.CharField(max_length=50, verbose_name='业务类型')),
+                ('business_id', models.IntegerField(verbose_name='业务ID')),
+                ('last_notified_at', models.DateTimeField(verbose_name='最近提醒时间')),
+                ('notify_count', models.IntegerField(default=1, verbose_name='提醒次数')),
+                ('rule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='records', to='notifications.alertrule', verbose_name='预警规则')),
+            ],
+            options={
+                'verbose_name': '预警触发记录',
+                'verbose_name_plural': '预警触发记录',
+                'unique_together': {('rule', 'business_type', 'business_id')},
+            },
+        ),
+    ]
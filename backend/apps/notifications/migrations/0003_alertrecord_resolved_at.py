@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_alert_engine'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alertrecord',
+            name='resolved_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='恢复时间'),
+        ),
+    ]
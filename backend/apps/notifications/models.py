@@ -150,6 +150,12 @@ class AlertRule(models.Model):
     )
     
     is_active = models.BooleanField('是否启用', default=True)
+    
+    # 最近一次执行情况（由定时任务回写）
+    last_run_at = models.DateTimeField('最近执行时间', null=True, blank=True)
+    last_run_duration = models.IntegerField('最近执行耗时(毫秒)', null=True, blank=True)
+    last_matched_count = models.IntegerField('最近命中数量', default=0)
+    
     created_at = models.DateTimeField('创建时间', auto_now_add=True)
     
     class Meta:
@@ -158,3 +164,32 @@ class AlertRule(models.Model):
     
     def __str__(self):
         return self.name
+
+
+class AlertRecord(models.Model):
+    """
+    预警触发记录
+    
+    每条规则对每个业务对象只保留一条记录，用于按 repeat_interval 去重；
+    对象不再命中规则（如库存已补足、借用已归还）时标记为已恢复，再次命中时重新提醒
+    """
+    
+    rule = models.ForeignKey(
+        AlertRule,
+        on_delete=models.CASCADE,
+        related_name='records',
+        verbose_name='预警规则'
+    )
+    business_type = models.CharField('业务类型', max_length=50)
+    business_id = models.IntegerField('业务ID')
+    last_notified_at = models.DateTimeField('最近提醒时间')
+    notify_count = models.IntegerField('提醒次数', default=1)
+    resolved_at = models.DateTimeField('恢复时间', null=True, blank=True)
+    
+    class Meta:
+        verbose_name = '预警触发记录'
+        verbose_name_plural = '预警触发记录'
+        unique_together = ['rule', 'business_type', 'business_id']
+    
+    def __str__(self):
+        return f"{self.rule_id} - {self.business_type}:{self.business_id}"
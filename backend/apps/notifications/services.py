@@ -0,0 +1,403 @@
+"""
+消息通知服务 - 精臣云资产管理系统
+
+- UnreadCounter: 基于 Redis 的用户未读数计数器
+- AlertEngine: 预警规则执行引擎，由 Celery Beat 定时调用，对所有启用的 AlertRule 进行评估：
+    - 每条规则只执行一次集合查询获取命中对象
+    - 按 repeat_interval 通过 AlertRecord 去重，不再命中的对象标记为已恢复
+    - 批量创建 Notification / NotificationRecipient
+    - 回写每条规则的执行耗时与命中数量
+"""
+import logging
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import Notification, NotificationRecipient, AlertRule, AlertRecord
+
+logger = logging.getLogger(__name__)
+
+
+class UnreadCounter:
+    """
+    用户未读通知计数器
+
+    计数保存在缓存 (Redis) 中，角标轮询只读缓存；
+    缓存缺失时回源 COUNT 一次，计数漂移由 reconcile() 定时校正。
+    """
+
+    CACHE_KEY = 'notification_unread:{user_id}'
+    CACHE_TIMEOUT = 60 * 60 * 24
+
+    @classmethod
+    def _key(cls, user_id):
+        return cls.CACHE_KEY.format(user_id=user_id)
+
+    @classmethod
+    def get(cls, user_id):
+        """获取用户未读数"""
+        count = cache.get(cls._key(user_id))
+        if count is None:
+            count = NotificationRecipient.objects.filter(user_id=user_id, is_read=False).count()
+            cache.set(cls._key(user_id), count, cls.CACHE_TIMEOUT)
+        return count
+
+    @classmethod
+    def incr(cls, user_counts):
+        """
+        批量增加未读数
+
+        Args:
+            user_counts: {user_id: delta}
+        """
+        for user_id, delta in user_counts.items():
+            try:
+                cache.incr(cls._key(user_id), delta)
+            except ValueError:
+                # 缓存中无计数，下次读取时回源
+                pass
+
+    @classmethod
+    def decr(cls, user_id, delta=1):
+        """减少未读数，计数缺失或将为负时直接删除缓存等待回源"""
+        key = cls._key(user_id)
+        try:
+            if cache.decr(key, delta) < 0:
+                cache.delete(key)
+        except ValueError:
+            pass
+
+    @classmethod
+    def reset(cls, user_id):
+        """清零（全部已读）"""
+        cache.set(cls._key(user_id), 0, cls.CACHE_TIMEOUT)
+
+    @classmethod
+    def reconcile(cls):
+        """
+        按数据库重新校正所有有通知记录用户的未读数
+
+        Returns:
+            int: 校正的用户数量
+        """
+        rows = NotificationRecipient.objects.values('user_id').annotate(
+            unread=Count('id', filter=Q(is_read=False))
+        ).values_list('user_id', 'unread')
+
+        total = 0
+        batch = {}
+        for user_id, unread in rows.iterator(chunk_size=2000):
+            batch[cls._key(user_id)] = unread
+            if len(batch) >= 1000:
+                cache.set_many(batch, cls.CACHE_TIMEOUT)
+                total += len(batch)
+                batch = {}
+        if batch:
+            cache.set_many(batch, cls.CACHE_TIMEOUT)
+            total += len(batch)
+        return total
+
+
+class AlertEngine:
+    """预警规则执行引擎"""
+
+    BATCH_SIZE = 500
+
+    # alert_type -> (业务类型, 收集方法名)
+    COLLECTORS = {
+        AlertRule.AlertType.WARRANTY_EXPIRY: ('asset', '_collect_warranty_expiry'),
+        AlertRule.AlertType.RETURN_DUE: ('asset_borrow', '_collect_return_due'),
+        AlertRule.AlertType.STOCK_LOW: ('consumable_stock', '_collect_stock_low'),
+        AlertRule.AlertType.MAINTENANCE_DUE: ('asset_maintenance', '_collect_maintenance_due'),
+    }
+
+    @classmethod
+    def evaluate_all(cls, rule_ids=None):
+        """
+        评估所有启用的预警规则
+
+        Args:
+            rule_ids: 仅评估指定规则（可选）
+
+        Returns:
+            list: 每条规则的执行结果
+        """
+        rules = AlertRule.objects.filter(is_active=True).order_by('id')
+        if rule_ids:
+            rules = rules.filter(id__in=rule_ids)
+
+        results = []
+        for rule in rules:
+            try:
+                results.append(cls.evaluate_rule(rule))
+            except Exception as e:
+                logger.exception(f"Alert rule {rule.id} evaluation failed")
+                results.append({
+                    'rule_id': rule.id,
+                    'alert_type': rule.alert_type,
+                    'error': str(e),
+                })
+        return results
+
+    @classmethod
+    def evaluate_rule(cls, rule, now=None):
+        """
+        评估单条预警规则并发送通知
+
+        Returns:
+            dict: {rule_id, alert_type, matched, notified, resolved, duration_ms}
+        """
+        started = time.monotonic()
+        now = now or timezone.now()
+        result = {
+            'rule_id': rule.id,
+            'alert_type': rule.alert_type,
+            'matched': 0,
+            'notified': 0,
+            'resolved': 0,
+        }
+
+        collector = cls.COLLECTORS.get(rule.alert_type)
+        if collector is None:
+            # 合同到期等类型暂无业务数据来源
+            result['skipped'] = 'unsupported alert type'
+        else:
+            business_type, method_name = collector
+            items = getattr(cls, method_name)(rule, timezone.localdate(now))
+            result['matched'] = len(items)
+            result['resolved'] = cls._resolve_recovered(rule, business_type, items, now)
+            due_items = cls._filter_due_items(rule, business_type, items, now)
+            if due_items:
+                result['notified'] = cls._send(rule, business_type, due_items, now)
+
+        duration_ms = int((time.monotonic() - started) * 1000)
+        result['duration_ms'] = duration_ms
+        AlertRule.objects.filter(pk=rule.pk).update(
+            last_run_at=now,
+            last_run_duration=duration_ms,
+            last_matched_count=result['matched'],
+        )
+        logger.info(
+            f"Alert rule {rule.id} ({rule.alert_type}): matched={result['matched']} "
+            f"notified={result['notified']} resolved={result['resolved']} duration={duration_ms}ms"
+        )
+        return result
+
+    # ==================== 命中对象收集 ====================
+    # 每个收集方法返回 [{'business_id', 'title', 'content', 'user_ids'}]
+
+    @staticmethod
+    def _collect_warranty_expiry(rule, today):
+        """保修将在 advance_days 天内到期的资产"""
+        from apps.assets.models import Asset
+
+        rows = Asset.objects.filter(
+            company_id=rule.company_id,
+            is_deleted=False,
+            warranty_expiry__isnull=False,
+            warranty_expiry__gte=today,
+            warranty_expiry__lte=today + timedelta(days=rule.advance_days),
+        ).exclude(
+            status=Asset.Status.DISPOSED
+        ).values_list('id', 'asset_code', 'name', 'warranty_expiry')
+
+        return [
+            {
+                'business_id': asset_id,
+                'title': f'资产保修即将到期：{name}',
+                'content': f'资产 {asset_code}（{name}）的保修将于 {expiry} 到期，'
+                           f'剩余 {(expiry - today).days} 天。',
+                'user_ids': [],
+            }
+            for asset_id, asset_code, name, expiry in rows
+        ]
+
+    @staticmethod
+    def _collect_return_due(rule, today):
+        """即将到期或已逾期未归还的借用单（同时提醒借用人）"""
+        from apps.assets.models import AssetBorrow
+
+        rows = AssetBorrow.objects.filter(
+            company_id=rule.company_id,
+            status=AssetBorrow.Status.BORROWED,
+            expected_return_date__lte=today + timedelta(days=rule.advance_days),
+        ).values_list('id', 'borrow_no', 'borrower_id', 'expected_return_date')
+
+        items = []
+        for borrow_id, borrow_no, borrower_id, expected in rows:
+            days = (expected - today).days
+            if days < 0:
+                title = f'借用单已逾期：{borrow_no}'
+                content = f'借用单 {borrow_no} 应于 {expected} 归还，已逾期 {-days} 天。'
+            else:
+                title = f'借用单即将到期：{borrow_no}'
+                content = f'借用单 {borrow_no} 应于 {expected} 归还，剩余 {days} 天。'
+            items.append({
+                'business_id': borrow_id,
+                'title': title,
+                'content': content,
+                'user_ids': [borrower_id] if borrower_id else [],
+            })
+        return items
+
+    @staticmethod
+    def _collect_stock_low(rule, today):
+        """库存数量低于安全库存的耗材库存"""
+        from apps.consumables.models import ConsumableStock
+
+        rows = ConsumableStock.objects.filter(
+            consumable__company_id=rule.company_id,
+            consumable__is_active=True,
+            is_low_stock=True,
+        ).values_list(
+            'id', 'consumable__code', 'consumable__name', 'warehouse__name',
+            'quantity', 'consumable__min_stock'
+        )
+
+        return [
+            {
+                'business_id': stock_id,
+                'title': f'耗材库存不足：{name}',
+                'content': f'{code}（{name}）在 {warehouse} 的库存为 {quantity}，'
+                           f'低于安全库存 {min_stock}。',
+                'user_ids': [],
+            }
+            for stock_id, code, name, warehouse, quantity, min_stock in rows
+        ]
+
+    @staticmethod
+    def _collect_maintenance_due(rule, today):
+        """计划开始日期临近的待处理维保单"""
+        from apps.assets.models import AssetMaintenance
+
+        rows = AssetMaintenance.objects.filter(
+            asset__company_id=rule.company_id,
+            status=AssetMaintenance.Status.PENDING,
+            start_date__isnull=False,
+            start_date__lte=today + timedelta(days=rule.advance_days),
+        ).values_list('id', 'maintenance_no', 'asset__asset_code', 'asset__name', 'start_date')
+
+        return [
+            {
+                'business_id': maintenance_id,
+                'title': f'维保即将到期：{asset_name}',
+                'content': f'维保单 {maintenance_no}（资产 {asset_code}）计划于 {start_date} 开始。',
+                'user_ids': [],
+            }
+            for maintenance_id, maintenance_no, asset_code, asset_name, start_date in rows
+        ]
+
+    # ==================== 去重与发送 ====================
+
+    @staticmethod
+    def _resolve_recovered(rule, business_type, items, now):
+        """未恢复的记录中本次不再命中的对象标记为已恢复，返回恢复数量"""
+        matched_ids = {item['business_id'] for item in items}
+        open_records = AlertRecord.objects.filter(
+            rule=rule, business_type=business_type, resolved_at__isnull=True
+        ).values_list('id', 'business_id')
+        recovered = [record_id for record_id, business_id in open_records if business_id not in matched_ids]
+        if not recovered:
+            return 0
+        return AlertRecord.objects.filter(pk__in=recovered).update(resolved_at=now)
+
+    @staticmethod
+    def _filter_due_items(rule, business_type, items, now):
+        """
+        按 repeat_interval 过滤需要提醒的对象
+
+        repeat_interval <= 0 表示同一对象只提醒一次；已恢复后再次命中的对象视为新预警
+        """
+        if not items:
+            return []
+
+        last_notified = dict(
+            AlertRecord.objects.filter(
+                rule=rule, business_type=business_type, resolved_at__isnull=True
+            ).values_list('business_id', 'last_notified_at')
+        )
+        if rule.repeat_interval > 0:
+            threshold = now - timedelta(days=rule.repeat_interval)
+        else:
+            threshold = None
+
+        due_items = []
+        for item in items:
+            last_at = last_notified.get(item['business_id'])
+            if last_at is None or (threshold is not None and last_at <= threshold):
+                item['is_new'] = last_at is None
+                due_items.append(item)
+        return due_items
+
+    @classmethod
+    @transaction.atomic
+    def _send(cls, rule, business_type, items, now):
+        """批量创建通知、接收记录并更新去重记录，返回发送的通知数量"""
+        rule_user_ids = list(rule.recipients.values_list('id', flat=True))
+
+        notifications = []
+        recipient_ids = []
+        for item in items:
+            user_ids = set(rule_user_ids) | set(item['user_ids'])
+            if not user_ids:
+                continue
+            notifications.append(Notification(
+                company_id=rule.company_id,
+                notification_type=Notification.NotificationType.ALERT,
+                title=item['title'],
+                content=item['content'],
+                business_type=business_type,
+                business_id=item['business_id'],
+            ))
+            recipient_ids.append(user_ids)
+
+        if not notifications:
+            return 0
+
+        Notification.objects.bulk_create(notifications, batch_size=cls.BATCH_SIZE)
+        NotificationRecipient.objects.bulk_create(
+            [
+                NotificationRecipient(notification_id=notification.pk, user_id=user_id)
+                for notification, user_ids in zip(notifications, recipient_ids)
+                for user_id in user_ids
+            ],
+            batch_size=cls.BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        user_counts = Counter(user_id for user_ids in recipient_ids for user_id in user_ids)
+        transaction.on_commit(lambda: UnreadCounter.incr(user_counts))
+
+        sent_ids = {n.business_id for n in notifications}
+        new_ids = [i['business_id'] for i in items if i['is_new'] and i['business_id'] in sent_ids]
+        repeat_ids = [i['business_id'] for i in items if not i['is_new'] and i['business_id'] in sent_ids]
+
+        if new_ids:
+            # 已恢复的旧记录重新打开：提醒次数归 1、清除恢复时间
+            AlertRecord.objects.bulk_create(
+                [
+                    AlertRecord(
+                        rule=rule,
+                        business_type=business_type,
+                        business_id=business_id,
+                        last_notified_at=now,
+                        notify_count=1,
+                        resolved_at=None,
+                    )
+                    for business_id in new_ids
+                ],
+                batch_size=cls.BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=['rule', 'business_type', 'business_id'],
+                update_fields=['last_notified_at', 'notify_count', 'resolved_at'],
+            )
+        if repeat_ids:
+            AlertRecord.objects.filter(
+                rule=rule, business_type=business_type, business_id__in=repeat_ids
+            ).update(last_notified_at=now, notify_count=F('notify_count') + 1)
+
+        return len(notifications)
@@ -0,0 +1,23 @@
+"""
+消息通知异步任务 - 精臣云资产管理系统
+"""
+from celery import shared_task
+
+from .services import AlertEngine, UnreadCounter
+
+
+@shared_task(ignore_result=False)
+def evaluate_alert_rules(rule_ids=None):
+    """
+    定时评估预警规则（由 Celery Beat 调度）
+
+    Returns:
+        list: 每条规则的命中数量、发送数量与执行耗时
+    """
+    return AlertEngine.evaluate_all(rule_ids=rule_ids)
+
+
+@shared_task(ignore_result=False)
+def reconcile_unread_counters():
+    """定时校正 Redis 中的用户未读数"""
+    return UnreadCounter.reconcile()
@@ -8,5 +8,6 @@ router.register('announcements', views.AnnouncementViewSet)
 router.register('alert-rules', views.AlertRuleViewSet)
 
 urlpatterns = [
+    path('push/', views.NotificationPushView.as_view(), name='notification-push'),
     path('', include(router.urls)),
 ]
@@ -1,12 +1,17 @@
-from rest_framework import viewsets, status
+from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import serializers
+from django.db.models import Exists, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 from .models import Notification, NotificationRecipient, Announcement, AlertRule
+from .services import AlertEngine, UnreadCounter
+from apps.common.async_views import AsyncAPIView
+from services import NotificationPushService
 
 
 class NotificationSerializer(serializers.ModelSerializer):
@@ -17,12 +22,14 @@ class NotificationSerializer(serializers.ModelSerializer):
         fields = '__all__'
     
     def get_is_read(self, obj):
+        # 列表/详情查询已通过 Subquery 注解 is_read，避免逐行查询
+        if hasattr(obj, 'is_read'):
+            return bool(obj.is_read)
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            record = NotificationRecipient.objects.filter(
-                notification=obj, user=request.user
-            ).first()
-            return record.is_read if record else False
+            return NotificationRecipient.objects.filter(
+                notification=obj, user=request.user, is_read=True
+            ).exists()
         return False
 
 
@@ -36,6 +43,7 @@ class AlertRuleSerializer(serializers.ModelSerializer):
     class Meta:
         model = AlertRule
         fields = '__all__'
+        read_only_fields = ['last_run_at', 'last_run_duration', 'last_matched_count']
 
 
 class NotificationViewSet(viewsets.ModelViewSet):
@@ -47,32 +55,41 @@ class NotificationViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         user = self.request.user
+        user_records = NotificationRecipient.objects.filter(
+            notification=OuterRef('pk'), user=user
+        )
         return Notification.objects.filter(
-            recipient_records__user=user
-        ).distinct()
+            Exists(user_records)
+        ).annotate(
+            is_read=Coalesce(
+                Subquery(user_records.values('is_read')[:1]),
+                Value(False)
+            )
+        )
     
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
-        """获取未读消息数量"""
-        count = NotificationRecipient.objects.filter(
-            user=request.user,
-            is_read=False
-        ).count()
-        return Response({'count': count})
+        """获取未读消息数量（读取缓存计数器）"""
+        return Response({'count': UnreadCounter.get(request.user.id)})
     
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
         """标记为已读"""
         notification = self.get_object()
-        record, created = NotificationRecipient.objects.get_or_create(
+        now = timezone.now()
+        updated = NotificationRecipient.objects.filter(
             notification=notification,
             user=request.user,
-            defaults={'is_read': True, 'read_at': timezone.now()}
-        )
-        if not created:
-            record.is_read = True
-            record.read_at = timezone.now()
-            record.save()
+            is_read=False
+        ).update(is_read=True, read_at=now)
+        if updated:
+            UnreadCounter.decr(request.user.id, updated)
+        else:
+            NotificationRecipient.objects.get_or_create(
+                notification=notification,
+                user=request.user,
+                defaults={'is_read': True, 'read_at': now}
+            )
         return Response({'message': '已标记为已读'})
     
     @action(detail=False, methods=['post'])
@@ -82,6 +99,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
             user=request.user,
             is_read=False
         ).update(is_read=True, read_at=timezone.now())
+        UnreadCounter.reset(request.user.id)
         return Response({'message': '全部已标记为已读'})
 
 
@@ -99,3 +117,34 @@ class AlertRuleViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['company', 'alert_type', 'is_active']
+    
+    @action(detail=True, methods=['post'])
+    def evaluate(self, request, pk=None):
+        """立即执行预警规则"""
+        rule = self.get_object()
+        result = AlertEngine.evaluate_rule(rule)
+        return Response(result)
+
+
+class NotificationPushView(AsyncAPIView):
+    """
+    推送消息到企业微信/钉钉/飞书（异步等待各平台响应，管理员）
+    
+    company 须在请求人可见公司范围内，接收人限于该公司成员
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    async def post(self, request):
+        user_ids, message = NotificationPushService.clean_message(
+            request.data.get('user_ids'),
+            request.data.get('content'),
+            msg_type=request.data.get('msg_type', 'text'),
+            title=request.data.get('title', '通知'),
+        )
+        company_id = (
+            request.data.get('company')
+            or getattr(request.user, 'current_company_id', None)
+            or request.user.primary_company_id
+        )
+        result = await NotificationPushService.apush(request.user, company_id, user_ids, message)
+        return Response(result)
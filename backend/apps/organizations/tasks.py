@@ -0,0 +1,14 @@
+"""
+组织架构异步任务 - 精臣云资产管理系统
+"""
+from celery import shared_task
+
+
+@shared_task(ignore_result=False)
+def complete_cross_company_transfer(transfer_id, user_id):
+    """后台完成跨公司调拨（大批量资产）"""
+    from django.contrib.auth import get_user_model
+    from services import CrossCompanyTransferService
+    
+    user = get_user_model().objects.filter(pk=user_id).first()
+    return CrossCompanyTransferService.complete_transfer(transfer_id, user)
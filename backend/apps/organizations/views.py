@@ -8,9 +8,9 @@ from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django.utils import timezone
-from django.db import transaction
 
 from .models import Company, Department, Location, OrganizationChange, CrossCompanyTransfer, CrossCompanyTransferItem
+from services import CrossCompanyTransferService
 from .serializers import (
     CompanySerializer,
     DepartmentSerializer,
@@ -309,7 +309,6 @@ class CrossCompanyTransferViewSet(viewsets.ModelViewSet):
         return Response({'message': '调拨单已拒绝'})
     
     @action(detail=True, methods=['post'])
-    @transaction.atomic
     def complete(self, request, pk=None):
         """
         完成调拨 - 执行实际资产转移
@@ -321,60 +320,30 @@ class CrossCompanyTransferViewSet(viewsets.ModelViewSet):
         """
         transfer = self.get_object()
         
-        if transfer.status != CrossCompanyTransfer.Status.IN_TRANSIT:
-            if transfer.status == CrossCompanyTransfer.Status.APPROVED:
-                # Allow completion after from-company approval only in some cases
-                pass
-            else:
-                return Response(
-                    {'msg': '只能完成已审批的调拨单'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-        
-        now = timezone.now()
-        
-        # Process each asset in the transfer
-        for item in transfer.items.all():
-            asset = item.asset
-            
-            # Update asset company assignment
-            # Note: Actual implementation depends on your Asset model structure
-            # This is a placeholder for the business logic
-            if hasattr(asset, 'company'):
-                asset.company = transfer.to_company
-            if transfer.to_department and hasattr(asset, 'using_department'):
-                asset.using_department = transfer.to_department
-            
-            # Record operation in asset history
-            from apps.assets.models import AssetOperation
-            AssetOperation.objects.create(
-                asset=asset,
-                operation_type='transfer',
-                description=f'跨公司调拨: {transfer.from_company.name} → {transfer.to_company.name}',
-                operator=request.user,
-                extra_data={
-                    'transfer_no': transfer.transfer_no,
-                    'from_company_id': transfer.from_company.id,
-                    'to_company_id': transfer.to_company.id,
-                    'settlement_type': transfer.settlement_type,
-                    'transfer_price': str(item.transfer_price)
-                }
+        if transfer.status not in [
+            CrossCompanyTransfer.Status.IN_TRANSIT,
+            CrossCompanyTransfer.Status.APPROVED,
+        ]:
+            return Response(
+                {'msg': '只能完成已审批的调拨单'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            
-            asset.save()
         
-        # Calculate final settlement
-        transfer.settlement_amount = sum(
-            item.transfer_price for item in transfer.items.all()
-        )
-        transfer.settlement_date = now.date()
-        transfer.status = CrossCompanyTransfer.Status.COMPLETED
-        transfer.completed_at = now
-        transfer.save()
+        # 大批量调拨可提交后台任务执行
+        if str(request.data.get('async', '')).lower() in ('true', '1'):
+            from .tasks import complete_cross_company_transfer
+            task = complete_cross_company_transfer.delay(transfer.id, request.user.id)
+            return Response({
+                'message': '调拨完成任务已提交',
+                'task_id': task.id
+            }, status=status.HTTP_202_ACCEPTED)
+        
+        result = CrossCompanyTransferService.complete_transfer(transfer.id, request.user)
         
         return Response({
             'message': '调拨完成',
-            'settlement_amount': str(transfer.settlement_amount)
+            'asset_count': result['asset_count'],
+            'settlement_amount': result['settlement_amount']
         })
     
     @action(detail=True, methods=['post'])
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consumables', '0004_consumablestock_is_low_stock'),
+        ('procurement', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchaserequestitem',
+            name='consumable',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='purchase_request_items', to='consumables.consumable', verbose_name='耗材'),
+        ),
+    ]
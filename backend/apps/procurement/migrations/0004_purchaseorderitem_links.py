@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0008_asset_version'),
+        ('consumables', '0004_consumablestock_is_low_stock'),
+        ('procurement', '0003_purchaserequestitem_consumable'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchaseorderitem',
+            name='asset_category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='purchase_order_items', to='assets.assetcategory', verbose_name='资产分类'),
+        ),
+        migrations.AddField(
+            model_name='purchaseorderitem',
+            name='consumable',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='purchase_order_items', to='consumables.consumable', verbose_name='耗材'),
+        ),
+        migrations.AddField(
+            model_name='purchaseorderitem',
+            name='item_type',
+            field=models.CharField(choices=[('asset', '资产'), ('consumable', '耗材')], default='asset', max_length=20, verbose_name='物品类型'),
+        ),
+    ]
@@ -107,6 +107,14 @@ class PurchaseRequestItem(models.Model):
         verbose_name='采购申请'
     )
     item_type = models.CharField('物品类型', max_length=20, choices=ItemType.choices)
+    consumable = models.ForeignKey(
+        'consumables.Consumable',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='purchase_request_items',
+        verbose_name='耗材'
+    )
     name = models.CharField('物品名称', max_length=200)
     model = models.CharField('规格型号', max_length=200, blank=True, null=True)
     unit = models.CharField('单位', max_length=20, default='个')
@@ -185,6 +193,28 @@ class PurchaseOrderItem(models.Model):
         related_name='items',
         verbose_name='采购订单'
     )
+    # 验收入库时：资产明细按数量生成资产卡片，耗材明细生成入库单并增加库存
+    item_type = models.CharField(
+        '物品类型', max_length=20,
+        choices=PurchaseRequestItem.ItemType.choices,
+        default=PurchaseRequestItem.ItemType.ASSET
+    )
+    asset_category = models.ForeignKey(
+        'assets.AssetCategory',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='purchase_order_items',
+        verbose_name='资产分类'
+    )
+    consumable = models.ForeignKey(
+        'consumables.Consumable',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='purchase_order_items',
+        verbose_name='耗材'
+    )
     name = models.CharField('物品名称', max_length=200)
     model = models.CharField('规格型号', max_length=200, blank=True, null=True)
     unit = models.CharField('单位', max_length=20)
@@ -5,13 +5,17 @@ from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 
+from apps.system.bulk_mixins import BulkOperationsMixin
+from services.purchase_receipt_service import PurchaseReceiptService
+
 from .models import Supplier, PurchaseRequest, PurchaseOrder
 from .serializers import (
     SupplierSerializer, PurchaseRequestSerializer, PurchaseOrderSerializer
 )
 
 
-class SupplierViewSet(viewsets.ModelViewSet):
+class SupplierViewSet(BulkOperationsMixin, viewsets.ModelViewSet):
+    """供应商（支持 bulk_create / bulk_update / bulk_delete 批量导入与维护）"""
     queryset = Supplier.objects.all()
     serializer_class = SupplierSerializer
     permission_classes = [IsAuthenticated]
@@ -70,8 +74,22 @@ class PurchaseOrderViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['post'])
     def receive(self, request, pk=None):
-        """验收入库"""
+        """
+        验收入库（支持部分验收）
+        
+        items: [{item, quantity, serial_numbers, location}]，为空时验收全部未到货数量
+        warehouse: 耗材入库仓库；location / manage_department / manager: 新资产的默认信息
+        receive_date: 验收日期，默认今天
+        """
         obj = self.get_object()
-        obj.status = 'received'
-        obj.save()
-        return Response({'message': '验收成功'})
+        result = PurchaseReceiptService.receive(
+            obj.pk,
+            request.user,
+            lines=request.data.get('items') or None,
+            receive_date=request.data.get('receive_date') or None,
+            warehouse_id=request.data.get('warehouse') or None,
+            location_id=request.data.get('location') or None,
+            manage_department_id=request.data.get('manage_department') or None,
+            manager_id=request.data.get('manager') or None,
+        )
+        return Response({'message': '验收成功', **result})
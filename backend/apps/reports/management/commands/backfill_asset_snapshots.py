@@ -0,0 +1,44 @@
+"""
+回溯生成资产日快照
+
+以当前资产表为起点，按资产操作记录逐日倒推历史存量，写入 AssetDailySnapshot。
+区间内已存在的快照会被重建，可重复执行。
+
+Usage:
+    python manage.py backfill_asset_snapshots --days 365           # 最近一年（截至昨天）
+    python manage.py backfill_asset_snapshots --start 2025-01-01   # 指定开始日期
+    python manage.py backfill_asset_snapshots --days 90 --company 1 --company 2
+"""
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from services import AssetSnapshotService
+
+
+class Command(BaseCommand):
+    help = 'Backfill daily asset snapshots from asset operation history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, help='First day to build (YYYY-MM-DD)')
+        parser.add_argument('--end', type=date.fromisoformat, help='Last day to build (default: yesterday)')
+        parser.add_argument('--days', type=int, default=365, help='Days to build when --start is omitted')
+        parser.add_argument('--company', type=int, action='append', help='Company id (repeatable, default: all)')
+
+    def handle(self, *args, **options):
+        end = options['end'] or timezone.localdate() - timedelta(days=1)
+        start = options['start'] or end - timedelta(days=max(options['days'], 1) - 1)
+        if start > end:
+            raise CommandError('--start must not be later than --end')
+
+        started = time.monotonic()
+        results = AssetSnapshotService.backfill(start, end, company_ids=options['company'])
+        for result in results:
+            self.stdout.write(
+                f"company {result['company_id']}: {result['rows']} rows, {result['events']} events"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Built snapshots {start} ~ {end} for {len(results)} companies in {time.monotonic() - started:.1f}s'
+        ))
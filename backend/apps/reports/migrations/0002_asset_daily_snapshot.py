@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0008_asset_version'),
+        ('organizations', '0004_company_company_type_company_currency_and_more'),
+        ('reports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssetDailySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('snapshot_date', models.DateField(verbose_name='快照日期')),
+                ('status', models.CharField(max_length=30, verbose_name='资产状态')),
+                ('asset_count', models.IntegerField(default=0, verbose_name='资产数量')),
+                ('original_value', models.DecimalField(decimal_places=2, default=0, max_digits=18, verbose_name='原值')),
+                ('net_value', models.DecimalField(decimal_places=2, default=0, max_digits=18, verbose_name='净值')),
+                ('added_count', models.IntegerField(default=0, verbose_name='新增数量')),
+                ('added_value', models.DecimalField(decimal_places=2, default=0, max_digits=18, verbose_name='新增原值')),
+                ('disposed_count', models.IntegerField(default=0, verbose_name='处置数量')),
+                ('disposed_value', models.DecimalField(decimal_places=2, default=0, max_digits=18, verbose_name='处置原值')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='生成时间')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='assets.assetcategory', verbose_name='资产分类')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='asset_snapshots', to='organizations.company', verbose_name='所属公司')),
+            ],
+            options={
+                'verbose_name': '资产日快照',
+                'verbose_name_plural': '资产日快照',
+                'ordering': ['snapshot_date'],
+                'indexes': [models.Index(fields=['company', 'snapshot_date'], name='asset_snapshot_company_date')],
+            },
+        ),
+    ]
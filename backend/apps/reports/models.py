@@ -79,3 +79,52 @@ class ReportExportLog(models.Model):
     
     def __str__(self):
         return f"{self.report_name} - {self.created_at}"
+
+
+class AssetDailySnapshot(models.Model):
+    """
+    资产日快照 - 每日每公司按 (分类, 状态) 汇总的存量与当日增减
+
+    由夜间任务写入，历史数据可由资产操作记录回溯生成；趋势报表只读取本表。
+    """
+    
+    company = models.ForeignKey(
+        'organizations.Company',
+        on_delete=models.CASCADE,
+        related_name='asset_snapshots',
+        verbose_name='所属公司'
+    )
+    snapshot_date = models.DateField('快照日期')
+    category = models.ForeignKey(
+        'assets.AssetCategory',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='资产分类'
+    )
+    status = models.CharField('资产状态', max_length=30)
+    
+    # 日末存量
+    asset_count = models.IntegerField('资产数量', default=0)
+    original_value = models.DecimalField('原值', max_digits=18, decimal_places=2, default=0)
+    net_value = models.DecimalField('净值', max_digits=18, decimal_places=2, default=0)
+    
+    # 当日增减
+    added_count = models.IntegerField('新增数量', default=0)
+    added_value = models.DecimalField('新增原值', max_digits=18, decimal_places=2, default=0)
+    disposed_count = models.IntegerField('处置数量', default=0)
+    disposed_value = models.DecimalField('处置原值', max_digits=18, decimal_places=2, default=0)
+    
+    created_at = models.DateTimeField('生成时间', auto_now_add=True)
+    
+    class Meta:
+        verbose_name = '资产日快照'
+        verbose_name_plural = '资产日快照'
+        ordering = ['snapshot_date']
+        indexes = [
+            models.Index(fields=['company', 'snapshot_date'], name='asset_snapshot_company_date'),
+        ]
+    
+    def __str__(self):
+        return f"{self.company_id} {self.snapshot_date} {self.status}"
@@ -0,0 +1,36 @@
+from rest_framework import serializers
+
+from services import ReportService
+from apps.common.exceptions import BusinessException
+from .models import ReportTemplate, ReportExportLog
+
+
+class ReportTemplateSerializer(serializers.ModelSerializer):
+    report_type_display = serializers.CharField(source='get_report_type_display', read_only=True)
+    
+    class Meta:
+        model = ReportTemplate
+        fields = '__all__'
+        read_only_fields = ['is_system', 'created_at', 'updated_at']
+    
+    def validate(self, attrs):
+        # 保存前按白名单编译一次，配置有误时直接返回错误
+        # 未提供的配置项取模型默认值（创建时）或原值（更新时）
+        template = self.instance or ReportTemplate()
+        template = ReportTemplate(**{
+            field: attrs.get(field, getattr(template, field))
+            for field in ('report_type', 'columns', 'filters', 'grouping', 'sorting')
+        })
+        try:
+            ReportService.compile(template)
+        except BusinessException as e:
+            raise serializers.ValidationError(e.msg)
+        return attrs
+
+
+class ReportExportLogSerializer(serializers.ModelSerializer):
+    created_by_name = serializers.CharField(source='created_by.display_name', read_only=True, default=None)
+    
+    class Meta:
+        model = ReportExportLog
+        fields = '__all__'
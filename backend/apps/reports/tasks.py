@@ -0,0 +1,42 @@
+"""
+报表异步任务 - 精臣云资产管理系统
+"""
+from datetime import date
+
+from celery import shared_task
+
+
+@shared_task(ignore_result=False)
+def snapshot_assets_daily(snapshot_date=None, company_ids=None):
+    """
+    生成资产日快照（由 Celery Beat 每日凌晨调度，默认快照昨天）
+
+    Args:
+        snapshot_date: ISO 日期字符串，默认昨天
+    """
+    from services import AssetSnapshotService
+
+    return AssetSnapshotService.snapshot_daily(
+        date.fromisoformat(snapshot_date) if snapshot_date else None,
+        company_ids=company_ids
+    )
+
+
+@shared_task(ignore_result=False)
+def backfill_asset_snapshots(start, end=None, company_ids=None):
+    """按资产操作历史回溯生成 [start, end] 区间的资产日快照"""
+    from services import AssetSnapshotService
+
+    return AssetSnapshotService.backfill(
+        date.fromisoformat(start),
+        date.fromisoformat(end) if end else None,
+        company_ids=company_ids
+    )
+
+
+@shared_task(ignore_result=False)
+def export_analytics_dataset(datasets=None, company_ids=None, fmt='parquet'):
+    """后台导出分区列式数据集，打包写入存储并返回下载地址"""
+    from services import AnalyticsExportService
+
+    return AnalyticsExportService.export_to_storage(datasets, company_ids, fmt)
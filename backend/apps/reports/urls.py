@@ -1,9 +1,16 @@
-from django.urls import path
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
 from . import views
 
+router = DefaultRouter()
+router.register('templates', views.ReportTemplateViewSet)
+router.register('exports', views.ReportExportLogViewSet)
+
 urlpatterns = [
     path('assets/summary/', views.AssetSummaryReportView.as_view(), name='asset-summary'),
     path('assets/trend/', views.AssetTrendReportView.as_view(), name='asset-trend'),
     path('assets/by-department/', views.DepartmentAssetReportView.as_view(), name='asset-by-department'),
     path('consumables/summary/', views.ConsumableSummaryReportView.as_view(), name='consumable-summary'),
+    path('analytics-export/', views.AnalyticsExportView.as_view(), name='analytics-export'),
+    path('', include(router.urls)),
 ]
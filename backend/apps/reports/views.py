@@ -1,12 +1,28 @@
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Count, Sum, Q
-from django.db.models.functions import TruncMonth
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 
+from apps.accounts.data_scope import DataScopeResolver
 from apps.assets.models import Asset
 from apps.consumables.models import Consumable, ConsumableStock
 from apps.organizations.models import Department
+from apps.common.filters import DataScopeFilterBackend, apply_data_scope
+from services import AnalyticsExportService, AssetSnapshotService, ReportService
+from .models import AssetDailySnapshot, ReportTemplate, ReportExportLog
+from .serializers import ReportTemplateSerializer, ReportExportLogSerializer
+
+# 资产报表的数据权限字段
+ASSET_SCOPE_FIELDS = {
+    'department_fields': ['using_department_id', 'manage_department_id'],
+    'user_fields': ['using_user_id', 'manager_id', 'created_by_id'],
+}
 
 
 class AssetSummaryReportView(APIView):
@@ -16,7 +32,7 @@ class AssetSummaryReportView(APIView):
     def get(self, request):
         company_id = request.query_params.get('company')
         
-        queryset = Asset.objects.filter(is_deleted=False)
+        queryset = apply_data_scope(request, Asset.objects.filter(is_deleted=False), **ASSET_SCOPE_FIELDS)
         if company_id:
             queryset = queryset.filter(company_id=company_id)
         
@@ -47,25 +63,61 @@ class AssetSummaryReportView(APIView):
 
 
 class AssetTrendReportView(APIView):
-    """资产趋势报表"""
+    """
+    资产趋势报表 - 读取资产日快照
+    
+    参数: granularity=day|week|month|year（默认 month）、start/end（YYYY-MM-DD）、
+    group_by=status|category（可选）。存量取分桶内最后一日，新增/处置为分桶合计。
+    
+    快照按公司汇总，不含部门/人员维度，仅对整公司数据范围可见：
+    指定公司时范围不足返回 403，未指定时只统计整公司范围的公司。
+    """
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
         company_id = request.query_params.get('company')
         
-        queryset = Asset.objects.filter(is_deleted=False)
+        queryset = AssetDailySnapshot.objects.all()
         if company_id:
+            if not str(company_id).isdigit():
+                return Response({'msg': '公司ID不合法'}, status=status.HTTP_400_BAD_REQUEST)
+            scope = DataScopeResolver.get_company_scope(request.user, company_id, request)
+            if scope != DataScopeResolver.SCOPE_ALL:
+                return Response({'msg': '无权查看该公司的资产趋势'}, status=status.HTTP_403_FORBIDDEN)
             queryset = queryset.filter(company_id=company_id)
+        else:
+            scope = DataScopeResolver.get_scope(request.user, request)
+            if scope is not None:
+                company_ids = [
+                    company for company, entry in scope['companies'].items()
+                    if entry['scope'] == DataScopeResolver.SCOPE_ALL
+                ]
+                if not company_ids:
+                    return Response({'msg': '无权查看资产趋势'}, status=status.HTTP_403_FORBIDDEN)
+                queryset = queryset.filter(company_id__in=company_ids)
         
-        # 按月统计新增资产
-        monthly_trend = queryset.annotate(
-            month=TruncMonth('created_at')
-        ).values('month').annotate(
-            count=Count('id'),
-            value=Sum('original_value')
-        ).order_by('month')
+        dates = {}
+        for key in ('start', 'end'):
+            value = request.query_params.get(key)
+            try:
+                dates[key] = parse_date(value) if value else None
+            except ValueError:
+                dates[key] = None
+            if value and dates[key] is None:
+                return Response({'msg': f'{key} 日期格式应为 YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            trend = AssetSnapshotService.trend(
+                queryset,
+                granularity=request.query_params.get('granularity', 'month'),
+                start=dates['start'],
+                end=dates['end'],
+                group_by=request.query_params.get('group_by') or None
+            )
+        except ValueError as e:
+            return Response({'msg': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
-        return Response(list(monthly_trend))
+        return Response(trend)
 
 
 class DepartmentAssetReportView(APIView):
@@ -75,7 +127,7 @@ class DepartmentAssetReportView(APIView):
     def get(self, request):
         company_id = request.query_params.get('company')
         
-        queryset = Asset.objects.filter(is_deleted=False)
+        queryset = apply_data_scope(request, Asset.objects.filter(is_deleted=False), **ASSET_SCOPE_FIELDS)
         if company_id:
             queryset = queryset.filter(company_id=company_id)
         
@@ -95,7 +147,10 @@ class ConsumableSummaryReportView(APIView):
     def get(self, request):
         company_id = request.query_params.get('company')
         
-        stock_queryset = ConsumableStock.objects.all()
+        # 库存无部门/人员字段，本部门/本人范围不可见
+        stock_queryset = apply_data_scope(
+            request, ConsumableStock.objects.all(), company_field='consumable__company_id'
+        )
         if company_id:
             stock_queryset = stock_queryset.filter(consumable__company_id=company_id)
         
@@ -106,11 +161,142 @@ class ConsumableSummaryReportView(APIView):
         )
         
         # 库存预警
-        from django.db.models import F
-        warning_count = stock_queryset.filter(
-            quantity__lte=F('consumable__min_stock')
-        ).count()
+        warning_count = stock_queryset.filter(is_low_stock=True).count()
         
         summary['warning_count'] = warning_count
         
         return Response(summary)
+
+
+class AnalyticsExportView(APIView):
+    """
+    分析数据集导出（管理员）
+    
+    POST: datasets（默认全部）、companies（默认全部）、format（parquet / arrow）、
+    async（默认 true，提交后台任务返回 task_id）。结果为按公司/月份分区的 zip 数据集。
+    GET: task_id 查询后台任务状态与下载地址。
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    
+    def get(self, request):
+        from celery.result import AsyncResult
+        
+        task_id = request.query_params.get('task_id')
+        if not task_id:
+            return Response({'msg': '缺少 task_id'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        result = AsyncResult(task_id)
+        data = {'task_id': task_id, 'status': result.status}
+        if result.successful():
+            data['result'] = result.result
+        elif result.failed():
+            data['error'] = str(result.result)
+        return Response(data)
+    
+    def post(self, request):
+        fmt = request.data.get('format', 'parquet')
+        if fmt not in AnalyticsExportService.FORMATS:
+            return Response({'msg': f'不支持的导出格式: {fmt}'}, status=status.HTTP_400_BAD_REQUEST)
+        datasets = request.data.get('datasets') or None
+        if isinstance(datasets, str):
+            datasets = [name.strip() for name in datasets.split(',') if name.strip()] or None
+        elif datasets is not None and not isinstance(datasets, list):
+            return Response({'msg': 'datasets 须为数组或逗号分隔的字符串'}, status=status.HTTP_400_BAD_REQUEST)
+        unknown = [
+            str(name) for name in datasets or []
+            if not isinstance(name, str) or name not in AnalyticsExportService.DATASETS
+        ]
+        if unknown:
+            return Response({'msg': f'未知的数据集: {", ".join(unknown)}'}, status=status.HTTP_400_BAD_REQUEST)
+        company_ids = request.data.get('companies') or None
+        
+        if str(request.data.get('async', 'true')).lower() in ('true', '1'):
+            from .tasks import export_analytics_dataset
+            task = export_analytics_dataset.delay(datasets, company_ids, fmt)
+            return Response({
+                'message': '数据集导出任务已提交',
+                'task_id': task.id
+            }, status=status.HTTP_202_ACCEPTED)
+        
+        return Response(AnalyticsExportService.export_to_storage(datasets, company_ids, fmt))
+
+
+class ReportTemplateViewSet(viewsets.ModelViewSet):
+    """
+    报表模板 - 执行委托给 ReportService
+    
+    报表参数：GET 时取查询参数（company/page/page_size/format 以外），POST 时取请求体 params。
+    """
+    queryset = ReportTemplate.objects.all()
+    serializer_class = ReportTemplateSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DataScopeFilterBackend, DjangoFilterBackend]
+    # 模板为公司共享配置，执行结果再按 ReportService 中的数据权限字段过滤
+    data_scope_shared = True
+    filterset_fields = ['company', 'report_type', 'is_active']
+    
+    RESERVED_PARAMS = {'company', 'page', 'page_size', 'file_format', 'format'}
+    
+    def _report_params(self, request):
+        if request.method == 'POST':
+            return request.data.get('params') or {}
+        return {
+            key: values if len(values) > 1 else values[0]
+            for key, values in request.query_params.lists() if key not in self.RESERVED_PARAMS
+        }
+    
+    @action(detail=False, methods=['get'])
+    def fields(self, request):
+        """各报表类型可用字段"""
+        return Response(ReportService.available_fields(request.query_params.get('report_type')))
+    
+    @action(detail=True, methods=['get', 'post'])
+    def run(self, request, pk=None):
+        """分页执行报表"""
+        template = self.get_object()
+        source = request.data if request.method == 'POST' else request.query_params
+        return Response(ReportService.run(
+            template,
+            self._report_params(request),
+            request.user,
+            page=source.get('page', 1),
+            page_size=source.get('page_size', 50),
+            request=request
+        ))
+    
+    @action(detail=True, methods=['get', 'post'])
+    def export(self, request, pk=None):
+        """导出报表（file_format=csv 流式输出 / xlsx）"""
+        template = self.get_object()
+        source = request.data if request.method == 'POST' else request.query_params
+        fmt = source.get('file_format', 'csv')
+        params = self._report_params(request)
+        filename = f"{template.code}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+        
+        if fmt == 'csv':
+            response = StreamingHttpResponse(
+                ReportService.iter_csv(template, params, request.user, request=request),
+                content_type='text/csv; charset=utf-8'
+            )
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            return response
+        if fmt == 'xlsx':
+            return FileResponse(
+                ReportService.export_xlsx(template, params, request.user, request=request),
+                as_attachment=True,
+                filename=filename,
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            )
+        return Response({'msg': f'不支持的导出格式: {fmt}'}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ReportExportLogViewSet(viewsets.ReadOnlyModelViewSet):
+    """报表执行/导出记录"""
+    queryset = ReportExportLog.objects.select_related('created_by')
+    serializer_class = ReportExportLogSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DataScopeFilterBackend, DjangoFilterBackend]
+    # 本部门/本人范围只能看到自己执行的记录
+    data_scope_company_field = 'company_id'
+    data_scope_user_fields = ['created_by_id']
+    filterset_fields = ['company', 'report_template', 'created_by']
@@ -0,0 +1,113 @@
+"""
+SSO 异步接口 - 精臣云资产管理系统
+
+SSO 回调、连接测试等异步视图使用的 a 前缀方法（httpx 异步请求），
+各平台服务类通过混入获得，请求参数与响应解析复用同步实现中的 _token_params / _parse_* 等方法。
+"""
+from contextlib import asynccontextmanager
+
+from asgiref.sync import sync_to_async
+
+from apps.common.async_views import async_http_client
+
+
+class AsyncSSOMixin:
+    """SSO 异步接口基类"""
+    
+    async def aget_access_token(self, client=None):
+        raise NotImplementedError
+    
+    async def aget_user_info(self, code, client=None):
+        raise NotImplementedError
+    
+    async def aget_or_create_user(self, user_info):
+        """异步视图中查找或创建用户（数据库操作在线程中执行）"""
+        return await sync_to_async(self.get_or_create_user)(user_info)
+    
+    @asynccontextmanager
+    async def _aclient(self, client=None):
+        """复用调用方传入的客户端，否则新建并在结束时关闭"""
+        if client is not None:
+            yield client
+            return
+        async with async_http_client() as new_client:
+            yield new_client
+
+
+class WeWorkAsyncMixin:
+    """企业微信异步接口"""
+    
+    async def aget_access_token(self, client=None):
+        """获取access_token（异步）"""
+        async with self._aclient(client) as client:
+            response = await client.get(f"{self.BASE_URL}/gettoken", params=self._token_params())
+        return self._parse_access_token(response.json())
+    
+    async def aget_user_info(self, code, client=None):
+        """通过code获取用户信息（异步，三次调用复用同一连接）"""
+        async with self._aclient(client) as client:
+            access_token = await self.aget_access_token(client)
+            
+            response = await client.get(
+                f"{self.BASE_URL}/auth/getuserinfo",
+                params={'access_token': access_token, 'code': code}
+            )
+            user_id = self._parse_user_id(response.json())
+            
+            response = await client.get(
+                f"{self.BASE_URL}/user/get",
+                params={'access_token': access_token, 'userid': user_id}
+            )
+        return self._format_user_info(user_id, response.json())
+
+
+class DingTalkAsyncMixin:
+    """钉钉异步接口"""
+    
+    async def aget_access_token(self, client=None):
+        async with self._aclient(client) as client:
+            response = await client.get(f"{self.OAPI_URL}/gettoken", params=self._token_params())
+        return self._parse_access_token(response.json())
+    
+    async def aget_user_info(self, auth_code, client=None):
+        async with self._aclient(client) as client:
+            response = await client.post(
+                f"{self.API_URL}/v1.0/oauth2/userAccessToken",
+                json=self._user_token_payload(auth_code)
+            )
+            access_token = response.json().get('accessToken')
+            
+            response = await client.get(
+                f"{self.API_URL}/v1.0/contact/users/me",
+                headers={'x-acs-dingtalk-access-token': access_token}
+            )
+        return self._format_user_info(response.json())
+
+
+class FeishuAsyncMixin:
+    """飞书异步接口"""
+    
+    async def aget_access_token(self, client=None):
+        async with self._aclient(client) as client:
+            response = await client.post(
+                f"{self.BASE_URL}/auth/v3/app_access_token/internal",
+                json=self._token_payload()
+            )
+        return self._parse_access_token(response.json())
+    
+    async def aget_user_info(self, code, client=None):
+        async with self._aclient(client) as client:
+            app_access_token = await self.aget_access_token(client)
+            
+            response = await client.post(
+                f"{self.BASE_URL}/authen/v1/access_token",
+                headers={'Authorization': f'Bearer {app_access_token}'},
+                json={'grant_type': 'authorization_code', 'code': code}
+            )
+            user_access_token = response.json().get('data', {}).get('access_token')
+            
+            response = await client.get(
+                f"{self.BASE_URL}/authen/v1/user_info",
+                headers={'Authorization': f'Bearer {user_access_token}'}
+            )
+        return self._format_user_info(response.json().get('data', {}))
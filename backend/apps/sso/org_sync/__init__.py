@@ -0,0 +1,18 @@
+"""
+组织架构同步 - 精臣云资产管理系统
+
+企业微信 / 钉钉 / 飞书的部门、用户、部门负责人同步（后台任务调用），
+各平台 SSO 服务类通过混入获得 sync_organization。
+"""
+
+from .base import OrgSyncMixin
+from .wework import WeWorkOrgSyncMixin
+from .dingtalk import DingTalkOrgSyncMixin
+from .feishu import FeishuOrgSyncMixin
+
+__all__ = [
+    'OrgSyncMixin',
+    'WeWorkOrgSyncMixin',
+    'DingTalkOrgSyncMixin',
+    'FeishuOrgSyncMixin',
+]
@@ -0,0 +1,53 @@
+"""
+组织架构同步基类
+"""
+from django.db import transaction
+
+from apps.accounts.models import User
+from apps.organizations.models import Department
+from ..models import SSOUserBinding
+
+
+class OrgSyncMixin:
+    """组织架构同步基类"""
+    
+    def sync_organization(self, options=None):
+        """
+        同步组织架构
+        options: {
+            'sync_type': 'full' | 'incremental',  # 同步类型
+            'clear_existing': False,  # 是否清空现有数据
+            'sync_departments': True,  # 是否同步部门
+            'sync_users': True,  # 是否同步用户
+            'sync_managers': True,  # 是否同步部门负责人
+        }
+        """
+        raise NotImplementedError
+    
+    def clear_existing_data(self):
+        """清空现有组织架构数据"""
+        if not self.company:
+            return
+        
+        with transaction.atomic():
+            # 获取该公司下所有部门的ID
+            dept_ids = list(Department.objects.filter(
+                company=self.company
+            ).values_list('id', flat=True))
+            
+            # 删除SSO用户绑定（只删除该公司部门下的用户绑定）
+            SSOUserBinding.objects.filter(
+                user__department_id__in=dept_ids
+            ).delete()
+            
+            # 删除同步过来的用户（保留管理员和超级用户）
+            User.objects.filter(
+                department_id__in=dept_ids,
+                is_superuser=False,
+                is_staff=False
+            ).exclude(
+                username='admin'
+            ).delete()
+            
+            # 删除部门
+            Department.objects.filter(company=self.company).delete()
@@ -0,0 +1,124 @@
+"""
+钉钉组织架构同步
+"""
+import requests
+
+from apps.accounts.models import User
+from apps.organizations.models import Department
+from ..models import SSOUserBinding
+
+
+class DingTalkOrgSyncMixin:
+    """钉钉组织架构同步"""
+    
+    def sync_organization(self, options=None):
+        """同步钉钉组织架构"""
+        options = options or {}
+        sync_type = options.get('sync_type', 'full')
+        clear_existing = options.get('clear_existing', False)
+        sync_departments = options.get('sync_departments', True)
+        sync_users = options.get('sync_users', True)
+        sync_managers = options.get('sync_managers', True)
+        
+        if clear_existing:
+            self.clear_existing_data()
+        
+        access_token = self.get_access_token()
+        dept_count = 0
+        user_count = 0
+        manager_count = 0
+        dept_id_map = {}
+        
+        # 同步部门
+        if sync_departments:
+            url = f"{self.OAPI_URL}/topapi/v2/department/listsub"
+            
+            def sync_dept(parent_id=1, parent_dept=None):
+                nonlocal dept_count
+                params = {'access_token': access_token}
+                data = {'dept_id': parent_id}
+                response = requests.post(url, params=params, json=data, timeout=self.HTTP_TIMEOUT)
+                result = response.json()
+                
+                if result.get('errcode') == 0:
+                    for dept_data in result.get('result', []):
+                        dingtalk_dept_id = str(dept_data['dept_id'])
+                        
+                        dept, created = Department.objects.update_or_create(
+                            company=self.company,
+                            dingtalk_dept_id=dingtalk_dept_id,
+                            defaults={
+                                'name': dept_data['name'],
+                                'code': f"dd_{dept_data['dept_id']}",
+                                'sort_order': dept_data.get('order', 0),
+                                'parent': parent_dept
+                            }
+                        )
+                        dept_id_map[dingtalk_dept_id] = dept
+                        dept_count += 1
+                        
+                        # 递归同步子部门
+                        sync_dept(dept_data['dept_id'], dept)
+            
+            sync_dept(1)
+        
+        # 同步用户
+        if sync_users:
+            user_url = f"{self.OAPI_URL}/topapi/v2/user/list"
+            
+            for dingtalk_dept_id, dept in dept_id_map.items():
+                cursor = 0
+                while True:
+                    params = {'access_token': access_token}
+                    data = {'dept_id': int(dingtalk_dept_id), 'cursor': cursor, 'size': 100}
+                    response = requests.post(user_url, params=params, json=data, timeout=self.HTTP_TIMEOUT)
+                    result = response.json()
+                    
+                    if result.get('errcode') != 0:
+                        break
+                    
+                    user_list = result.get('result', {}).get('list', [])
+                    for user_data in user_list:
+                        userid = user_data['userid']
+                        
+                        binding = SSOUserBinding.objects.filter(
+                            provider='dingtalk',
+                            provider_user_id=userid
+                        ).first()
+                        
+                        if binding:
+                            user = binding.user
+                            user.display_name = user_data.get('name', '')
+                            user.phone = user_data.get('mobile', '')
+                            user.email = user_data.get('email', '')
+                            user.save()
+                        else:
+                            user = User.objects.create(
+                                username=f"dingtalk_{userid[:20]}",
+                                display_name=user_data.get('name', ''),
+                                phone=user_data.get('mobile', ''),
+                                email=user_data.get('email', '')
+                            )
+                            SSOUserBinding.objects.create(
+                                user=user,
+                                provider='dingtalk',
+                                provider_user_id=userid,
+                                provider_user_info=user_data
+                            )
+                            user_count += 1
+                        
+                        # 同步部门负责人
+                        if sync_managers and user_data.get('leader'):
+                            dept.manager = user
+                            dept.save()
+                            manager_count += 1
+                    
+                    if not result.get('result', {}).get('has_more'):
+                        break
+                    cursor = result.get('result', {}).get('next_cursor', 0)
+        
+        return {
+            'departments': dept_count,
+            'users': user_count,
+            'managers': manager_count
+        }
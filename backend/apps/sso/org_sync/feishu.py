@@ -0,0 +1,133 @@
+"""
+飞书组织架构同步
+"""
+import requests
+
+from apps.accounts.models import User
+from apps.organizations.models import Department
+from ..models import SSOUserBinding
+
+
+class FeishuOrgSyncMixin:
+    """飞书组织架构同步"""
+    
+    def sync_organization(self, options=None):
+        """同步飞书组织架构"""
+        options = options or {}
+        sync_type = options.get('sync_type', 'full')
+        clear_existing = options.get('clear_existing', False)
+        sync_departments = options.get('sync_departments', True)
+        sync_users = options.get('sync_users', True)
+        sync_managers = options.get('sync_managers', True)
+        
+        if clear_existing:
+            self.clear_existing_data()
+        
+        access_token = self.get_access_token()
+        dept_count = 0
+        user_count = 0
+        manager_count = 0
+        dept_id_map = {}
+        
+        headers = {'Authorization': f'Bearer {access_token}'}
+        
+        # 同步部门
+        if sync_departments:
+            def sync_dept(parent_id='0', parent_dept=None):
+                nonlocal dept_count
+                url = f"{self.BASE_URL}/contact/v3/departments/{parent_id}/children"
+                params = {'page_size': 50}
+                
+                while True:
+                    response = requests.get(url, headers=headers, params=params, timeout=self.HTTP_TIMEOUT)
+                    result = response.json()
+                    
+                    if result.get('code') != 0:
+                        break
+                    
+                    for dept_data in result.get('data', {}).get('items', []):
+                        feishu_dept_id = dept_data['open_department_id']
+                        
+                        dept, created = Department.objects.update_or_create(
+                            company=self.company,
+                            feishu_dept_id=feishu_dept_id,
+                            defaults={
+                                'name': dept_data['name'],
+                                'code': f"fs_{feishu_dept_id[:20]}",
+                                'sort_order': dept_data.get('order', 0),
+                                'parent': parent_dept
+                            }
+                        )
+                        dept_id_map[feishu_dept_id] = dept
+                        dept_count += 1
+                        
+                        # 同步部门负责人
+                        if sync_managers and dept_data.get('leader_user_id'):
+                            # 稍后处理
+                            pass
+                        
+                        sync_dept(feishu_dept_id, dept)
+                    
+                    if not result.get('data', {}).get('has_more'):
+                        break
+                    params['page_token'] = result.get('data', {}).get('page_token')
+            
+            sync_dept('0')
+        
+        # 同步用户
+        if sync_users:
+            for feishu_dept_id, dept in dept_id_map.items():
+                url = f"{self.BASE_URL}/contact/v3/users/find_by_department"
+                params = {'department_id': feishu_dept_id, 'page_size': 50}
+                
+                while True:
+                    response = requests.get(url, headers=headers, params=params, timeout=self.HTTP_TIMEOUT)
+                    result = response.json()
+                    
+                    if result.get('code') != 0:
+                        break
+                    
+                    for user_data in result.get('data', {}).get('items', []):
+                        union_id = user_data.get('union_id', user_data.get('user_id', ''))
+                        
+                        binding = SSOUserBinding.objects.filter(
+                            provider='feishu',
+                            provider_user_id=union_id
+                        ).first()
+                        
+                        if binding:
+                            user = binding.user
+                            user.display_name = user_data.get('name', '')
+                            user.phone = user_data.get('mobile', '')
+                            user.email = user_data.get('email', '')
+                            user.save()
+                        else:
+                            user = User.objects.create(
+                                username=f"feishu_{union_id[:20]}",
+                                display_name=user_data.get('name', ''),
+                                phone=user_data.get('mobile', ''),
+                                email=user_data.get('email', '')
+                            )
+                            SSOUserBinding.objects.create(
+                                user=user,
+                                provider='feishu',
+                                provider_user_id=union_id,
+                                provider_user_info=user_data
+                            )
+                            user_count += 1
+                        
+                        # 同步部门负责人
+                        if sync_managers and user_data.get('is_tenant_manager'):
+                            dept.manager = user
+                            dept.save()
+                            manager_count += 1
+                    
+                    if not result.get('data', {}).get('has_more'):
+                        break
+                    params['page_token'] = result.get('data', {}).get('page_token')
+        
+        return {
+            'departments': dept_count,
+            'users': user_count,
+            'managers': manager_count
+        }
@@ -0,0 +1,269 @@
+"""
+企业微信组织架构同步
+"""
+import requests
+
+from apps.accounts.models import User, UserDepartment
+from apps.organizations.models import Department
+from ..models import SSOUserBinding
+
+
+class WeWorkOrgSyncMixin:
+    """企业微信组织架构同步"""
+    
+    def sync_organization(self, options=None):
+        """同步组织架构"""
+        options = options or {}
+        sync_type = options.get('sync_type', 'full')
+        clear_existing = options.get('clear_existing', False)
+        sync_departments = options.get('sync_departments', True)
+        sync_users = options.get('sync_users', True)
+        sync_managers = options.get('sync_managers', True)
+        
+        # 清空现有数据
+        if clear_existing:
+            self.clear_existing_data()
+        
+        access_token = self.get_access_token()
+        dept_count = 0
+        user_count = 0
+        manager_count = 0
+        dept_id_map = {}  # 企业微信部门ID -> 本地部门对象
+        user_dept_relations = []  # 用户部门关系
+        
+        # 同步部门
+        if sync_departments:
+            url = f"{self.BASE_URL}/department/list"
+            params = {'access_token': access_token}
+            response = requests.get(url, params=params, timeout=self.HTTP_TIMEOUT)
+            data = response.json()
+            
+            if data.get('errcode') == 0:
+                departments = data.get('department', [])
+                
+                # 构建部门ID到数据的映射
+                dept_data_map = {str(d['id']): d for d in departments}
+                wework_dept_ids = set(dept_data_map.keys())
+                
+                # 第一步：先创建或更新所有部门（不设置父部门）
+                for dept_data in departments:
+                    wework_dept_id = str(dept_data['id'])
+                    wework_order = dept_data.get('order', 0)
+                    
+                    dept, created = Department.objects.update_or_create(
+                        company=self.company,
+                        wework_dept_id=wework_dept_id,
+                        defaults={
+                            'name': dept_data['name'],
+                            'code': f"ww_{dept_data['id']}",
+                            'sort_order': wework_order,
+                        }
+                    )
+                    dept_id_map[wework_dept_id] = dept
+                    dept_count += 1
+                
+                # 第二步：更新所有部门的父部门关系
+                for dept_data in departments:
+                    wework_dept_id = str(dept_data['id'])
+                    parent_id = str(dept_data.get('parentid', 0))
+                    
+                    dept = dept_id_map.get(wework_dept_id)
+                    if not dept:
+                        continue
+                    
+                    # 查找父部门
+                    parent_dept = None
+                    if parent_id and parent_id != '0':
+                        # 优先从映射中查找
+                        parent_dept = dept_id_map.get(parent_id)
+                        # 如果不在映射中，从数据库查找
+                        if not parent_dept:
+                            parent_dept = Department.objects.filter(
+                                company=self.company,
+                                wework_dept_id=parent_id
+                            ).first()
+                    
+                    # 更新父部门关系（如果有变化）
+                    if dept.parent != parent_dept:
+                        dept.parent = parent_dept
+                        dept.save()
+                
+                # 第三步：处理已删除的部门（在企业微信中不存在但数据库中存在的）
+                if sync_type == 'full':
+                    deleted_depts = Department.objects.filter(
+                        company=self.company,
+                        wework_dept_id__isnull=False
+                    ).exclude(wework_dept_id__in=wework_dept_ids)
+                    
+                    for deleted_dept in deleted_depts:
+                        # 将该部门下的员工移到父部门或设为空
+                        User.objects.filter(department=deleted_dept).update(
+                            department=deleted_dept.parent
+                        )
+                        # 将子部门移到父部门
+                        Department.objects.filter(parent=deleted_dept).update(
+                            parent=deleted_dept.parent
+                        )
+                        # 删除部门
+                        deleted_dept.delete()
+                
+                # 修复MPTT树结构
+                try:
+                    Department.objects.rebuild()
+                except Exception:
+                    pass
+        
+        # 同步用户
+        if sync_users:
+            processed_users = set()  # 记录已处理的用户ID，避免重复
+            
+            # 获取所有部门的用户
+            for wework_dept_id, dept in dept_id_map.items():
+                url = f"{self.BASE_URL}/user/list"
+                params = {
+                    'access_token': access_token,
+                    'department_id': int(wework_dept_id),
+                    'fetch_child': 0  # 不获取子部门用户，避免重复
+                }
+                response = requests.get(url, params=params, timeout=self.HTTP_TIMEOUT)
+                data = response.json()
+                
+                if data.get('errcode') == 0:
+                    for user_data in data.get('userlist', []):
+                        userid = user_data['userid']
+                        
+                        # 检查是否已绑定
+                        binding = SSOUserBinding.objects.filter(
+                            provider='wework',
+                            provider_user_id=userid
+                        ).first()
+                        
+                        # 获取用户的主部门（取企业微信返回的第一个部门）
+                        user_depts = user_data.get('department', [])
+                        main_dept = None
+                        if user_depts:
+                            main_dept_id = str(user_depts[0])
+                            main_dept = dept_id_map.get(main_dept_id)
+                        
+                        if binding:
+                            # 增量同步时只更新
+                            user = binding.user
+                            user.display_name = user_data.get('name', '')
+                            user.phone = user_data.get('mobile', '')
+                            user.email = user_data.get('email', '')
+                            if user_data.get('avatar'):
+                                user.avatar = user_data.get('avatar', '')
+                            user.position = user_data.get('position', '')
+                            user.department = main_dept
+                            user.wework_user_id = userid
+                            user.sso_type = 'wework'
+                            user.save()
+                        else:
+                            # 创建用户
+                            user = User.objects.create(
+                                username=f"wework_{userid}",
+                                display_name=user_data.get('name', ''),
+                                phone=user_data.get('mobile', ''),
+                                email=user_data.get('email', ''),
+                                avatar=user_data.get('avatar', ''),
+                                position=user_data.get('position', ''),
+                                department=main_dept,
+                                wework_user_id=userid,
+                                sso_type='wework'
+                            )
+                            SSOUserBinding.objects.create(
+                                user=user,
+                                provider='wework',
+                                provider_user_id=userid,
+                                provider_user_info=user_data
+                            )
+                        
+                        # 只统计新用户
+                        if userid not in processed_users:
+                            user_count += 1
+                            processed_users.add(userid)
+                        
+                        # 记录用户部门关系和负责人信息（支持一人多部门）
+                        # Record user-department relations with multi-department support
+                        is_leader_in_dept = user_data.get('is_leader_in_dept', [])
+                        
+                        for i, dept_id in enumerate(user_depts):
+                            is_leader = False
+                            if i < len(is_leader_in_dept):
+                                is_leader = is_leader_in_dept[i] == 1
+                            
+                            user_dept_relations.append({
+                                'user': user,
+                                'dept_id': str(dept_id),
+                                'is_leader': is_leader,
+                                'position': user_data.get('position', ''),
+                                'sso_order': i  # 0 = primary department, 1+ = secondary departments
+                            })
+            
+            # 处理离职用户（全量同步时）
+            if sync_type == 'full':
+                # 获取所有通过企业微信同步的用户
+                synced_bindings = SSOUserBinding.objects.filter(provider='wework')
+                for binding in synced_bindings:
+                    if binding.provider_user_id not in processed_users:
+                        # 该用户在企业微信中已不存在（离职）
+                        user = binding.user
+                        # 保护admin和超级管理员用户
+                        if user.is_superuser or user.username == 'admin':
+                            continue
+                        # 标记为离职/非活跃状态
+                        user.is_active = False
+                        user.department = None  # 移除部门关联
+                        user.save()
+                        # 如果是部门负责人，移除负责人关系
+                        Department.objects.filter(manager=user).update(manager=None)
+        
+        # 同步用户部门关联（多部门支持）和部门负责人
+        if sync_users and user_dept_relations:
+            for relation in user_dept_relations:
+                dept = dept_id_map.get(relation['dept_id'])
+                user = relation['user']
+                if not dept or not user:
+                    continue
+                
+                # Create or update UserDepartment record
+                user_dept, created = UserDepartment.objects.update_or_create(
+                    user=user,
+                    department=dept,
+                    defaults={
+                        'is_primary': relation.get('sso_order', 0) == 0,
+                        'is_leader': relation.get('is_leader', False),
+                        'position': relation.get('position', ''),
+                        'sso_order': relation.get('sso_order', 0)
+                    }
+                )
+                
+                # Set department manager if is_leader
+                if sync_managers and relation.get('is_leader'):
+                    dept.manager = user
+                    dept.save()
+                    manager_count += 1
+            
+            # Set asset_department to main department if not set
+            # 如果用户没有设置资产归属部门，默认设置为主部门
+            for user_id in processed_users:
+                try:
+                    binding = SSOUserBinding.objects.get(provider='wework', provider_user_id=user_id)
+                    user = binding.user
+                    if user.department and not user.asset_department:
+                        user.asset_department = user.department
+                        user.save()
+                except SSOUserBinding.DoesNotExist:
+                    pass
+        
+        # 自动同步用户角色
+        from apps.accounts.services import RoleService
+        role_stats = RoleService.sync_all_user_roles()
+        
+        return {
+            'departments': dept_count,
+            'users': user_count,
+            'managers': manager_count,
+            'user_dept_relations': len(user_dept_relations),
+            'role_sync': role_stats
+        }
@@ -4,116 +4,115 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.shortcuts import redirect
 from django.utils import timezone
 
 from .models import SSOConfig, SSOUserBinding, SSOSyncLog
 from .services import WeWorkService, DingTalkService, FeishuService
+from apps.common.async_views import AsyncAPIView
 from apps.organizations.models import Department
 from apps.accounts.models import User
 
 
-class WeWorkAuthView(APIView):
-    """企业微信SSO认证"""
-    permission_classes = [AllowAny]
-    
-    def get(self, request):
-        """获取企业微信登录URL"""
-        redirect_uri = request.query_params.get('redirect_uri', '')
-        try:
-            config = SSOConfig.objects.get(provider='wework', is_enabled=True)
-            service = WeWorkService(config)
-            login_url = service.get_auth_url(redirect_uri)
-            return Response({'url': login_url})
-        except SSOConfig.DoesNotExist:
-            return Response({'error': '企业微信SSO未配置'}, status=status.HTTP_400_BAD_REQUEST)
+SSO_SERVICES = {
+    'wework': WeWorkService,
+    'dingtalk': DingTalkService,
+    'feishu': FeishuService,
+}
 
 
-class WeWorkCallbackView(APIView):
-    """企业微信SSO回调"""
+def build_login_response(user):
+    """SSO登录成功后签发JWT"""
+    refresh = RefreshToken.for_user(user)
+    return {
+        'access': str(refresh.access_token),
+        'refresh': str(refresh),
+        'user': {
+            'id': user.id,
+            'username': user.username,
+            'display_name': user.display_name,
+            'avatar': user.avatar
+        }
+    }
+
+
+class BaseSSOCallbackView(AsyncAPIView):
+    """
+    SSO回调基类
+    
+    异步处理：等待第三方平台返回用户信息期间不占用 worker，
+    数据库操作（查找/创建用户、签发令牌）在线程中执行
+    """
     permission_classes = [AllowAny]
+    provider = None
+    code_param = 'code'
     
-    def get(self, request):
-        code = request.query_params.get('code')
-        state = request.query_params.get('state')
+    async def get(self, request):
+        code = request.query_params.get(self.code_param)
         
         if not code:
             return Response({'error': '授权码缺失'}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            config = SSOConfig.objects.get(provider='wework', is_enabled=True)
-            service = WeWorkService(config)
+            config = await SSOConfig.objects.select_related('company').aget(
+                provider=self.provider, is_enabled=True
+            )
+            service = SSO_SERVICES[self.provider](config)
             
             # 获取用户信息
-            user_info = service.get_user_info(code)
+            user_info = await service.aget_user_info(code)
             
             # 查找或创建用户
-            user = service.get_or_create_user(user_info)
+            user = await service.aget_or_create_user(user_info)
             
             # 生成JWT token
-            refresh = RefreshToken.for_user(user)
-            
-            return Response({
-                'access': str(refresh.access_token),
-                'refresh': str(refresh),
-                'user': {
-                    'id': user.id,
-                    'username': user.username,
-                    'display_name': user.display_name,
-                    'avatar': user.avatar
-                }
-            })
+            return Response(await sync_to_async(build_login_response)(user))
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class DingTalkAuthView(APIView):
-    """钉钉SSO认证"""
+class WeWorkAuthView(APIView):
+    """企业微信SSO认证"""
     permission_classes = [AllowAny]
     
     def get(self, request):
+        """获取企业微信登录URL"""
         redirect_uri = request.query_params.get('redirect_uri', '')
         try:
-            config = SSOConfig.objects.get(provider='dingtalk', is_enabled=True)
-            service = DingTalkService(config)
+            config = SSOConfig.objects.get(provider='wework', is_enabled=True)
+            service = WeWorkService(config)
             login_url = service.get_auth_url(redirect_uri)
             return Response({'url': login_url})
         except SSOConfig.DoesNotExist:
-            return Response({'error': '钉钉SSO未配置'}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({'error': '企业微信SSO未配置'}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class DingTalkCallbackView(APIView):
-    """钉钉SSO回调"""
+class WeWorkCallbackView(BaseSSOCallbackView):
+    """企业微信SSO回调"""
+    provider = 'wework'
+
+
+class DingTalkAuthView(APIView):
+    """钉钉SSO认证"""
     permission_classes = [AllowAny]
     
     def get(self, request):
-        auth_code = request.query_params.get('authCode')
-        
-        if not auth_code:
-            return Response({'error': '授权码缺失'}, status=status.HTTP_400_BAD_REQUEST)
-        
+        redirect_uri = request.query_params.get('redirect_uri', '')
         try:
             config = SSOConfig.objects.get(provider='dingtalk', is_enabled=True)
             service = DingTalkService(config)
-            
-            user_info = service.get_user_info(auth_code)
-            user = service.get_or_create_user(user_info)
-            
-            refresh = RefreshToken.for_user(user)
-            
-            return Response({
-                'access': str(refresh.access_token),
-                'refresh': str(refresh),
-                'user': {
-                    'id': user.id,
-                    'username': user.username,
-                    'display_name': user.display_name,
-                    'avatar': user.avatar
-                }
-            })
-        except Exception as e:
-            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            login_url = service.get_auth_url(redirect_uri)
+            return Response({'url': login_url})
+        except SSOConfig.DoesNotExist:
+            return Response({'error': '钉钉SSO未配置'}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class DingTalkCallbackView(BaseSSOCallbackView):
+    """钉钉SSO回调"""
+    provider = 'dingtalk'
+    code_param = 'authCode'
 
 
 class FeishuAuthView(APIView):
@@ -131,37 +130,9 @@ class FeishuAuthView(APIView):
             return Response({'error': '飞书SSO未配置'}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class FeishuCallbackView(APIView):
+class FeishuCallbackView(BaseSSOCallbackView):
     """飞书SSO回调"""
-    permission_classes = [AllowAny]
-    
-    def get(self, request):
-        code = request.query_params.get('code')
-        
-        if not code:
-            return Response({'error': '授权码缺失'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        try:
-            config = SSOConfig.objects.get(provider='feishu', is_enabled=True)
-            service = FeishuService(config)
-            
-            user_info = service.get_user_info(code)
-            user = service.get_or_create_user(user_info)
-            
-            refresh = RefreshToken.for_user(user)
-            
-            return Response({
-                'access': str(refresh.access_token),
-                'refresh': str(refresh),
-                'user': {
-                    'id': user.id,
-                    'username': user.username,
-                    'display_name': user.display_name,
-                    'avatar': user.avatar
-                }
-            })
-        except Exception as e:
-            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    provider = 'feishu'
 
 
 class SyncOrganizationView(APIView):
@@ -466,11 +437,11 @@ class SSOConfigDetailView(APIView):
         return Response({'message': '配置已删除'})
 
 
-class SSOTestConnectionView(APIView):
-    """测试SSO连接"""
+class SSOTestConnectionView(AsyncAPIView):
+    """测试SSO连接（异步等待平台响应）"""
     permission_classes = [IsAuthenticated]
     
-    def post(self, request):
+    async def post(self, request):
         provider = request.data.get('provider')
         app_id = request.data.get('app_id')
         app_secret = request.data.get('app_secret')
@@ -486,18 +457,12 @@ class SSOTestConnectionView(APIView):
             
             temp_config = TempConfig()
             
-            if provider == 'wework':
-                service = WeWorkService(temp_config)
-                access_token = service.get_access_token()
-            elif provider == 'dingtalk':
-                service = DingTalkService(temp_config)
-                access_token = service.get_access_token()
-            elif provider == 'feishu':
-                service = FeishuService(temp_config)
-                access_token = service.get_access_token()
-            else:
+            service_class = SSO_SERVICES.get(provider)
+            if service_class is None:
                 return Response({'error': '不支持的平台'}, status=status.HTTP_400_BAD_REQUEST)
             
+            await service_class(temp_config).aget_access_token()
+            
             return Response({
                 'success': True,
                 'message': '连接测试成功'
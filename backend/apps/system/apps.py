@@ -5,3 +5,6 @@ class SystemConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.system'
     verbose_name = '系统管理'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,232 @@
+"""
+Bulk Operations Mixin - batched bulk create / update / delete actions for ViewSets
+
+Usage:
+    class SupplierViewSet(BulkOperationsMixin, viewsets.ModelViewSet):
+        queryset = Supplier.objects.all()
+        serializer_class = SupplierSerializer
+
+Set module_name (as with DynamicFieldsMixin) to validate the module's custom fields.
+"""
+
+from rest_framework import serializers
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from django.db import models, transaction
+from django.utils import timezone
+
+from apps.common.exceptions import ValidationError
+from .field_validator import CustomFieldValidator
+from .custom_field_query import get_custom_field_source
+from .mixins import has_concrete_field
+
+
+class BulkOperationsMixin:
+    """
+    Mixin to add bulk operations support to ViewSets.
+    
+    Provides bulk create, update, and delete operations.
+    
+    Bulk writes are validated up front and written in batches:
+    - every item runs the serializer (standard fields) and the module's compiled
+      CustomFieldValidator (custom fields, rules from FieldDefinition), so all
+      item errors are reported together and nothing is written if any item fails
+    - custom field values (with defaults on create) are merged into the JSON
+      column before the first write
+    - rows are written with bulk_create / bulk_update in chunks of bulk_batch_size;
+      models overriding save() or serializers overriding create()/update()
+      keep per-item saves so their logic still runs
+    
+    Failed validation responds with data.errors: [{index, errors: {field: [messages]}}].
+    Note that batched writes do not send pre_save / post_save signals.
+    """
+    
+    bulk_batch_size = 500
+    
+    @action(detail=False, methods=['post'])
+    def bulk_create(self, request):
+        """
+        Create multiple records at once.
+        
+        Request body:
+            items: List of record data
+            
+        Returns:
+            List of created records
+        """
+        items = request.data.get('items', [])
+        if not items:
+            return Response({'error': 'No items provided'}, status=400)
+        
+        validated = self._validate_bulk_items([(index, item, None) for index, item in enumerate(items)])
+        model = self.get_queryset().model
+        serializer_class = self.get_serializer_class()
+        
+        with transaction.atomic():
+            if not self._can_bulk_write(model, serializer_class.create, serializers.ModelSerializer.create):
+                instances = [serializer.save() for serializer in self._merge_bulk_custom_fields(model, validated)]
+            else:
+                m2m_names = {field.name for field in model._meta.many_to_many}
+                instances, relations = [], []
+                for serializer in self._merge_bulk_custom_fields(model, validated):
+                    data = dict(serializer.validated_data)
+                    relations.append({name: data.pop(name) for name in list(data) if name in m2m_names})
+                    instances.append(model(**data))
+                
+                model.objects.bulk_create(instances, batch_size=self.bulk_batch_size)
+                for instance, values in zip(instances, relations):
+                    for name, value in values.items():
+                        getattr(instance, name).set(value)
+        
+        return Response(
+            serializer_class(instances, many=True, context=self.get_serializer_context()).data,
+            status=201
+        )
+    
+    @action(detail=False, methods=['post'])
+    def bulk_update(self, request):
+        """
+        Update multiple records at once.
+        
+        Request body:
+            items: List of {id: ..., data: {...}}
+            
+        Returns:
+            List of updated records
+        """
+        items = request.data.get('items', [])
+        if not items:
+            return Response({'error': 'No items provided'}, status=400)
+        
+        ids = [item.get('id') for item in items if isinstance(item, dict) and item.get('id')]
+        found = {str(pk): instance for pk, instance in self.get_queryset().in_bulk(ids).items()}
+        
+        # Unknown ids are skipped, as before
+        entries = [
+            (index, item.get('data', {}), found[str(item.get('id'))])
+            for index, item in enumerate(items)
+            if isinstance(item, dict) and str(item.get('id')) in found
+        ]
+        validated = self._validate_bulk_items(entries)
+        model = self.get_queryset().model
+        serializer_class = self.get_serializer_class()
+        
+        with transaction.atomic():
+            if not self._can_bulk_write(model, serializer_class.update, serializers.ModelSerializer.update):
+                instances = [serializer.save() for serializer in self._merge_bulk_custom_fields(model, validated)]
+            else:
+                m2m_names = {field.name for field in model._meta.many_to_many}
+                instances, relations, fields = [], [], set()
+                for serializer in self._merge_bulk_custom_fields(model, validated):
+                    instance = serializer.instance
+                    values = {}
+                    for attr, value in serializer.validated_data.items():
+                        if attr in m2m_names:
+                            values[attr] = value
+                        else:
+                            setattr(instance, attr, value)
+                            fields.add(attr)
+                    instances.append(instance)
+                    relations.append(values)
+                
+                # bulk_update does not call pre_save, so refresh auto_now fields here
+                now = timezone.now()
+                for field in model._meta.concrete_fields:
+                    if getattr(field, 'auto_now', False):
+                        for instance in instances:
+                            setattr(instance, field.attname, now)
+                        fields.add(field.name)
+                
+                if fields and instances:
+                    model.objects.bulk_update(instances, sorted(fields), batch_size=self.bulk_batch_size)
+                for instance, values in zip(instances, relations):
+                    for name, value in values.items():
+                        getattr(instance, name).set(value)
+        
+        return Response(serializer_class(instances, many=True, context=self.get_serializer_context()).data)
+    
+    def _validate_bulk_items(self, entries):
+        """
+        Validate all items before anything is written.
+        
+        Args:
+            entries: List of (index in request, data, instance or None)
+            
+        Returns:
+            List of (serializer, cleaned custom field values)
+            
+        Raises:
+            ValidationError: data.errors lists the failing items
+        """
+        module = getattr(self, 'module_name', None)
+        validator = CustomFieldValidator.for_module(module) if module else None
+        context = self.get_serializer_context()
+        context['custom_field_validator'] = validator
+        serializer_class = self.get_serializer_class()
+        
+        validated, errors = [], []
+        for index, data, instance in entries:
+            partial = instance is not None
+            serializer = serializer_class(instance, data=data, partial=partial, context=context)
+            item_errors = {} if serializer.is_valid() else dict(serializer.errors)
+            custom_values = {}
+            if validator and isinstance(data, dict):
+                custom_values, custom_errors = validator.clean(data, partial=partial)
+                item_errors.update(custom_errors)
+            
+            if item_errors:
+                errors.append({'index': index, 'errors': item_errors})
+            else:
+                validated.append((serializer, custom_values))
+        
+        if errors:
+            raise ValidationError(
+                f'{len(errors)} 条数据校验失败（第 {errors[0]["index"] + 1} 条起），未写入任何数据',
+                data={'errors': errors}
+            )
+        return validated
+    
+    def _merge_bulk_custom_fields(self, model, validated):
+        """Merge cleaned custom field values into each serializer's validated data."""
+        source = get_custom_field_source(getattr(self, 'module_name', None))
+        has_source = has_concrete_field(model, source)
+        for serializer, custom_values in validated:
+            if has_source and (custom_values or source in serializer.validated_data):
+                merged = dict(getattr(serializer.instance, source, None) or {})
+                merged.update(serializer.validated_data.get(source) or {})
+                merged.update(custom_values)
+                serializer.validated_data[source] = merged
+            yield serializer
+    
+    @staticmethod
+    def _can_bulk_write(model, serializer_method, default_method):
+        """Batched writes are only safe when neither save() nor the serializer write is customised."""
+        return model.save is models.Model.save and serializer_method is default_method
+    
+    @action(detail=False, methods=['post'])
+    def bulk_delete(self, request):
+        """
+        Delete multiple records at once (soft delete).
+        
+        Request body:
+            ids: List of record IDs
+            
+        Returns:
+            Number of deleted records
+        """
+        ids = request.data.get('ids', [])
+        if not ids:
+            return Response({'error': 'No IDs provided'}, status=400)
+        
+        queryset = self.get_queryset().filter(pk__in=ids)
+        count = queryset.count()
+        
+        # Use soft delete if available
+        with transaction.atomic():
+            for instance in queryset:
+                if hasattr(instance, 'soft_delete'):
+                    instance.soft_delete()
+                else:
+                    instance.delete()
+        
+        return Response({'deleted': count})
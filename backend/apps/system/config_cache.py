@@ -0,0 +1,210 @@
+"""
+系统配置缓存 (System Config Cache)
+
+SystemConfig / DataDictionary / CodeRule 按 (命名空间, 公司) 整体加载为一个配置包：
+- 一次查询取出全局（company 为空）与公司级记录，公司级覆盖同键的全局记录
+- 配置包缓存在 Redis，键包含全局版本号与公司版本号；写入时由信号递增对应版本即失效
+- 进程内再保留 LOCAL_TTL 秒，期间不访问 Redis；过期后仅比对版本号，未变则继续复用
+- 事务内的写入在提交后才递增版本，避免其他进程在提交前按新版本缓存旧数据
+- 配置包按内容哈希生成 ETag，接口配合 etag_response 支持 If-None-Match 返回 304
+"""
+import json
+import time
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from apps.common.exceptions import ValidationError
+from .form_bundle import _content_hash
+from .models import SystemConfig, DataDictionary, CodeRule
+
+
+class ConfigCache:
+    """系统配置 / 数据字典 / 编码规则缓存"""
+
+    CONFIG = 'config'
+    DICTIONARY = 'dictionary'
+    CODE_RULE = 'code_rule'
+
+    VERSION_KEY = 'system_config_cache_version:{namespace}:{company}'
+    CACHE_KEY = 'system_config_cache:{namespace}:{company}:{global_version}:{company_version}'
+    CACHE_TIMEOUT = 60 * 60 * 24
+    # 进程内缓存的信任时间（秒），其他进程的写入最多延迟这么久可见
+    LOCAL_TTL = 5
+
+    LOADERS = {
+        CONFIG: '_load_configs',
+        DICTIONARY: '_load_dictionaries',
+        CODE_RULE: '_load_code_rules',
+    }
+
+    # (命名空间, 公司ID) -> (过期时间, 缓存键, 配置包)
+    _local = {}
+
+    # ==================== 类型化访问 ====================
+
+    @classmethod
+    def get_config(cls, key, company_id=None, default=None, cast=None):
+        """
+        读取配置值（公司级优先，其次全局）
+
+        配置值为 JSON 时返回解析后的对象，否则返回原字符串；指定 cast（bool / int / float / str）时转换类型，
+        转换失败返回 default。
+        """
+        value = cls.get_bundle(cls.CONFIG, company_id)['data'].get(key)
+        if value is None:
+            return default
+        if cast is None:
+            return value
+        if cast is bool and isinstance(value, str):
+            return value.strip().lower() in ('1', 'true', 'yes', 'on')
+        try:
+            return cast(value)
+        except (TypeError, ValueError):
+            return default
+
+    @classmethod
+    def get_dictionary(cls, category, company_id=None):
+        """某分类下启用的字典项 [{'code', 'name', 'value', 'sort_order', 'description'}]"""
+        return cls.get_bundle(cls.DICTIONARY, company_id)['data'].get(category, [])
+
+    @classmethod
+    def get_dictionary_label(cls, category, code, company_id=None, default=None):
+        """字典项名称"""
+        for item in cls.get_dictionary(category, company_id):
+            if item['code'] == code:
+                return item['name']
+        return default
+
+    @classmethod
+    def get_code_rule(cls, code, company_id=None):
+        """编码规则字段值（dict），不存在返回 None"""
+        return cls.get_bundle(cls.CODE_RULE, company_id)['data'].get(code)
+
+    # ==================== 配置包 ====================
+
+    @classmethod
+    def get_bundle(cls, namespace, company_id=None):
+        """
+        获取配置包
+
+        Returns:
+            dict: {'etag': str, 'data': dict}
+
+        Raises:
+            ValidationError: 公司ID不合法
+        """
+        try:
+            company_id = int(company_id) if company_id else None
+        except (TypeError, ValueError):
+            raise ValidationError('公司ID不合法')
+        local_key = (namespace, company_id)
+        now = time.monotonic()
+        entry = cls._local.get(local_key)
+        if entry and entry[0] > now:
+            return entry[2]
+
+        key = cls._cache_key(namespace, company_id)
+        if entry and entry[1] == key:
+            bundle = entry[2]
+        else:
+            bundle = cache.get(key)
+            if bundle is None:
+                data = getattr(cls, cls.LOADERS[namespace])(company_id)
+                bundle = {'etag': f'"{_content_hash(data)}"', 'data': data}
+                cache.set(key, bundle, cls.CACHE_TIMEOUT)
+        cls._local[local_key] = (now + cls.LOCAL_TTL, key, bundle)
+        return bundle
+
+    @classmethod
+    def invalidate(cls, namespace, company_id=None):
+        """配置写入后使缓存失效（在事务内时于提交后执行）；全局记录变更影响所有公司"""
+        transaction.on_commit(partial(cls._bump_version, namespace, company_id))
+
+    @classmethod
+    def _bump_version(cls, namespace, company_id=None):
+        version_key = cls.VERSION_KEY.format(namespace=namespace, company=company_id or 0)
+        try:
+            cache.incr(version_key)
+        except ValueError:
+            cache.set(version_key, 2, None)
+
+        # 本进程立即可见
+        for local_key in list(cls._local):
+            if local_key[0] == namespace and (not company_id or local_key[1] == company_id):
+                cls._local.pop(local_key, None)
+
+    @classmethod
+    def _cache_key(cls, namespace, company_id):
+        global_key = cls.VERSION_KEY.format(namespace=namespace, company=0)
+        company_key = cls.VERSION_KEY.format(namespace=namespace, company=company_id or 0)
+        versions = cache.get_many([global_key, company_key])
+        for version_key in (global_key, company_key):
+            if version_key not in versions:
+                cache.add(version_key, 1, None)
+                versions[version_key] = cache.get(version_key, 1)
+        return cls.CACHE_KEY.format(
+            namespace=namespace,
+            company=company_id or 0,
+            global_version=versions[global_key],
+            company_version=versions[company_key] if company_id else 0,
+        )
+
+    # ==================== 加载 ====================
+
+    @staticmethod
+    def _scope(company_id):
+        if company_id:
+            return Q(company__isnull=True) | Q(company_id=company_id)
+        return Q(company__isnull=True)
+
+    @classmethod
+    def _load_configs(cls, company_id):
+        configs = {}
+        # 全局在前，公司级覆盖
+        rows = SystemConfig.objects.filter(cls._scope(company_id)).values_list(
+            'company_id', 'config_key', 'config_value'
+        )
+        for row_company_id, key, value in sorted(rows, key=lambda row: row[0] is not None):
+            try:
+                configs[key] = json.loads(value)
+            except (TypeError, ValueError):
+                configs[key] = value
+        return configs
+
+    @classmethod
+    def _load_dictionaries(cls, company_id):
+        items = {}
+        rows = DataDictionary.objects.filter(cls._scope(company_id), is_active=True).values_list(
+            'company_id', 'category', 'code', 'name', 'value', 'sort_order', 'description'
+        )
+        for row_company_id, category, code, name, value, sort_order, description in sorted(
+            rows, key=lambda row: row[0] is not None
+        ):
+            items[(category, code)] = {
+                'code': code,
+                'name': name,
+                'value': value,
+                'sort_order': sort_order,
+                'description': description,
+            }
+
+        dictionaries = {}
+        for (category, _), item in sorted(items.items(), key=lambda entry: (entry[1]['sort_order'], entry[1]['code'])):
+            dictionaries.setdefault(category, []).append(item)
+        return dictionaries
+
+    @classmethod
+    def _load_code_rules(cls, company_id):
+        rules = {}
+        rows = CodeRule.objects.filter(cls._scope(company_id)).values(
+            'id', 'company_id', 'name', 'code', 'prefix', 'date_format', 'serial_length', 'separator',
+            'current_serial', 'reset_cycle', 'last_reset_date', 'description', 'is_active',
+            'created_at', 'updated_at'
+        )
+        for row in sorted(rows, key=lambda row: row['company_id'] is not None):
+            rules[row['code']] = row
+        return rules
+
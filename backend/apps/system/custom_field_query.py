@@ -0,0 +1,287 @@
+"""
+自定义字段查询 (Custom Field Query)
+
+把 FieldDefinition 元数据翻译为对 JSON 字段（Asset.custom_data / BaseModel.custom_fields）的过滤与排序:
+- ?cf.<field_key>=值                 精确匹配（多选字段为包含该选项）
+- ?cf.<field_key>__in=a,b            任一匹配
+- ?cf.<field_key>__gte=10            范围比较（gt / gte / lt / lte，仅数字、日期字段）
+- ?cf.<field_key>__contains=abc      文本模糊匹配
+- ?cf.<field_key>__isnull=true       未填写
+- ?ordering=-cf.<field_key>          排序，可与普通排序字段混用
+只有 list_searchable 的字段可过滤、list_sortable 的字段可排序，查询值按字段类型转换。
+
+PostgreSQL 下按字段配置自动维护索引（CustomFieldIndexes.sync，字段定义保存后异步执行）:
+- 模块内存在可搜索字段时，在 JSON 列上建 GIN (jsonb_path_ops) 索引，精确匹配 / __in 转为 @> 包含查询命中
+- 可排序字段及数字、日期类可搜索字段，建 (列 -> '键') 表达式索引，供范围比较与排序使用
+"""
+import hashlib
+import logging
+from decimal import Decimal, InvalidOperation
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from django.db.models.fields.json import KeyTransform
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+from apps.common.exceptions import ValidationError
+from .form_bundle import FormConfigBundle
+from .form_models import FieldDefinition
+
+logger = logging.getLogger(__name__)
+
+# 模块 -> (模型, JSON 字段)；未登记的模块默认使用 BaseModel.custom_fields
+CUSTOM_FIELD_SOURCES = {
+    'asset': ('assets.Asset', 'custom_data'),
+}
+
+PARAM_PREFIX = 'cf.'
+
+NUMERIC_TYPES = {'number', 'decimal'}
+DATE_TYPES = {'date', 'datetime'}
+BOOLEAN_TYPES = {'switch'}
+MULTI_TYPES = {'multi_select', 'checkbox'}
+
+RANGE_LOOKUPS = {'gt', 'gte', 'lt', 'lte'}
+LOOKUPS = {'exact', 'in', 'contains', 'isnull'} | RANGE_LOOKUPS
+
+
+def get_custom_field_source(module):
+    """模块自定义字段所在的 JSON 字段名"""
+    return CUSTOM_FIELD_SOURCES.get(module, (None, 'custom_fields'))[1]
+
+
+def get_custom_field_definitions(module):
+    """
+    模块启用的自定义字段定义（随表单配置版本号失效）
+
+    Returns:
+        dict: {field_key: {'field_key', 'field_name', 'field_type', 'options', 'list_searchable', 'list_sortable'}}
+    """
+    key = f'custom_field_definitions:{cache.get_or_set(FormConfigBundle.VERSION_KEY, 1, None)}:{module}'
+    definitions = cache.get(key)
+    if definitions is None:
+        definitions = {
+            row['field_key']: row
+            for row in FieldDefinition.objects.filter(module=module, is_active=True, is_system=False).values(
+                'field_key', 'field_name', 'field_type', 'options', 'list_searchable', 'list_sortable'
+            )
+        }
+        cache.set(key, definitions, FormConfigBundle.CACHE_TIMEOUT)
+    return definitions
+
+
+class CustomFieldQuery:
+    """把 cf.* 查询参数编译为 Q 对象"""
+
+    def __init__(self, module, source=None):
+        self.module = module
+        self.source = source or get_custom_field_source(module)
+        self.definitions = get_custom_field_definitions(module)
+        # 精确匹配走 @> 包含查询以命中 GIN 索引
+        self.use_containment = connection.features.supports_json_field_contains
+
+    def parse_params(self, params):
+        """
+        解析查询参数
+
+        Returns:
+            list: [(field_key, lookup, 原始值)]
+        """
+        conditions = []
+        for param in params:
+            if not param.startswith(PARAM_PREFIX):
+                continue
+            field_key, _, lookup = param[len(PARAM_PREFIX):].partition('__')
+            for raw in params.getlist(param) if hasattr(params, 'getlist') else [params[param]]:
+                conditions.append((field_key, lookup or 'exact', raw))
+        return conditions
+
+    def build_q(self, conditions):
+        q = Q()
+        for field_key, lookup, raw in conditions:
+            q &= self.condition_q(field_key, lookup, raw)
+        return q
+
+    def condition_q(self, field_key, lookup, raw):
+        definition = self.get_definition(field_key, 'list_searchable', '过滤')
+        field_type = definition['field_type']
+        if lookup not in LOOKUPS:
+            raise ValidationError(f'自定义字段 {definition["field_name"]} 不支持 {lookup} 查询')
+
+        path = f'{self.source}__{field_key}'
+        if lookup == 'isnull':
+            return Q(**{f'{path}__isnull': self._to_bool(raw)})
+
+        if lookup in RANGE_LOOKUPS:
+            if field_type not in NUMERIC_TYPES | DATE_TYPES:
+                raise ValidationError(f'自定义字段 {definition["field_name"]} 不支持范围查询')
+            return Q(**{f'{path}__{lookup}': self.coerce(definition, raw)})
+
+        if lookup == 'contains' and field_type not in MULTI_TYPES:
+            return Q(**{f'{path}__icontains': str(raw)})
+
+        if lookup == 'in':
+            values = [self.coerce(definition, value) for value in str(raw).split(',') if value.strip()]
+        else:
+            values = [self.coerce(definition, raw)]
+        q = Q()
+        for value in values:
+            q |= self._exact_q(field_key, field_type, value)
+        return q
+
+    def ordering_expression(self, term):
+        """排序项 cf.<key> / -cf.<key> 转为排序表达式，空值排在最后"""
+        descending = term.startswith('-')
+        field_key = term.lstrip('-')[len(PARAM_PREFIX):]
+        self.get_definition(field_key, 'list_sortable', '排序')
+        expression = KeyTransform(field_key, self.source)
+        return expression.desc(nulls_last=True) if descending else expression.asc(nulls_last=True)
+
+    def get_definition(self, field_key, flag, verb):
+        definition = self.definitions.get(field_key)
+        if definition is None or '__' in field_key:
+            raise ValidationError(f'未知的自定义字段: {field_key}')
+        if not definition[flag]:
+            raise ValidationError(f'自定义字段 {definition["field_name"]} 不允许{verb}')
+        return definition
+
+    def coerce(self, definition, raw):
+        """查询值按字段类型转换为 JSON 中保存的类型"""
+        field_type = definition['field_type']
+        raw = str(raw).strip()
+        try:
+            if field_type in NUMERIC_TYPES:
+                value = Decimal(raw)
+                # JSON 中的数字统一按 int / float 比较
+                return int(value) if value == value.to_integral_value() else float(value)
+            if field_type in BOOLEAN_TYPES:
+                return self._to_bool(raw)
+            if field_type in DATE_TYPES:
+                # ISO 格式字符串按字典序比较即时间顺序
+                if not (parse_date(raw) or parse_datetime(raw)):
+                    raise ValueError(raw)
+                return raw
+        except (InvalidOperation, ValueError):
+            raise ValidationError(f'自定义字段 {definition["field_name"]} 的查询值无效: {raw}') from None
+
+        # 选项值保持选项定义中的类型（如数字选项）
+        for option in definition['options'] or []:
+            if isinstance(option, dict) and str(option.get('value')) == raw:
+                return option['value']
+        if field_type == 'reference' and raw.isdigit():
+            return int(raw)
+        return raw
+
+    def _exact_q(self, field_key, field_type, value):
+        if self.use_containment:
+            return Q(**{f'{self.source}__contains': {field_key: [value] if field_type in MULTI_TYPES else value}})
+        if field_type in MULTI_TYPES:
+            return Q(**{f'{self.source}__{field_key}__icontains': value})
+        return Q(**{f'{self.source}__{field_key}': value})
+
+    @staticmethod
+    def _to_bool(raw):
+        return str(raw).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def get_view_custom_field_module(view):
+    return getattr(view, 'custom_fields_module', None) or getattr(view, 'module_name', None)
+
+
+class CustomFieldFilterBackend(BaseFilterBackend):
+    """
+    自定义字段过滤后端
+
+    视图通过 custom_fields_module（或 DynamicFieldsMixin 的 module_name）声明模块，
+    JSON 字段由 CUSTOM_FIELD_SOURCES 决定。
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        module = get_view_custom_field_module(view)
+        if not module or not any(param.startswith(PARAM_PREFIX) for param in request.query_params):
+            return queryset
+        query = CustomFieldQuery(module)
+        return queryset.filter(query.build_q(query.parse_params(request.query_params)))
+
+
+class CustomFieldOrderingFilter(OrderingFilter):
+    """在 OrderingFilter 基础上支持 ordering=cf.<field_key>"""
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        module = get_view_custom_field_module(view)
+        if not module or not any(term.lstrip('-').startswith(PARAM_PREFIX) for term in fields):
+            return super().remove_invalid_fields(queryset, fields, view, request)
+
+        query = CustomFieldQuery(module)
+        ordering = []
+        for term in fields:
+            if term.lstrip('-').startswith(PARAM_PREFIX):
+                ordering.append(query.ordering_expression(term))
+            else:
+                ordering.extend(super().remove_invalid_fields(queryset, [term], view, request))
+        return ordering
+
+
+class CustomFieldIndexes:
+    """按字段定义维护 JSON 自定义字段索引（仅 PostgreSQL）"""
+
+    @classmethod
+    def sync(cls, module):
+        """
+        创建缺失的索引并删除不再需要的索引
+
+        Returns:
+            dict: {'created': [索引名], 'dropped': [索引名]}
+        """
+        result = {'created': [], 'dropped': []}
+        if module not in CUSTOM_FIELD_SOURCES or connection.vendor != 'postgresql':
+            return result
+
+        model_label, source = CUSTOM_FIELD_SOURCES[module]
+        model = apps.get_model(model_label)
+        table = model._meta.db_table
+        column = model._meta.get_field(source).column
+        prefix = f'cf_{table[:40]}_'
+
+        with connection.schema_editor(atomic=False) as editor:
+            desired = {}
+            definitions = FieldDefinition.objects.filter(
+                Q(list_searchable=True) | Q(list_sortable=True),
+                module=module, is_active=True, is_system=False
+            ).values_list('field_key', 'field_type', 'list_searchable', 'list_sortable')
+            for field_key, field_type, searchable, sortable in definitions:
+                if '__' in field_key:
+                    continue
+                if searchable:
+                    desired[f'{prefix}gin'] = (
+                        f'USING gin ({editor.quote_name(column)} jsonb_path_ops)'
+                    )
+                if sortable or (searchable and field_type in NUMERIC_TYPES | DATE_TYPES):
+                    digest = hashlib.md5(field_key.encode('utf-8')).hexdigest()[:10]
+                    desired[f'{prefix}{digest}'] = (
+                        f'(({editor.quote_name(column)} -> {editor.quote_value(field_key)}))'
+                    )
+
+            with connection.cursor() as cursor:
+                existing = {
+                    name for name, info in connection.introspection.get_constraints(cursor, table).items()
+                    if info['index'] and name.startswith(prefix)
+                }
+
+            # CONCURRENTLY 不锁表，需在事务外执行
+            for name in sorted(existing - set(desired)):
+                editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {editor.quote_name(name)}')
+                result['dropped'].append(name)
+            for name in sorted(set(desired) - existing):
+                editor.execute(
+                    f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {editor.quote_name(name)} '
+                    f'ON {editor.quote_name(table)} {desired[name]}'
+                )
+                result['created'].append(name)
+
+        if result['created'] or result['dropped']:
+            logger.info(f"[CustomFieldIndexes] {module}: 新建 {result['created']}, 删除 {result['dropped']}")
+        return result
@@ -0,0 +1,220 @@
+"""
+自定义字段校验器 (Custom Field Validator)
+
+按模块把启用的自定义 FieldDefinition 一次编译为校验器，供单条与批量写入共用:
+- 规则来自 FieldDefinition._build_validation_rules()（必填、length / min / max、pattern、email / url、
+  已知的 custom 校验器），正则等在编译时预处理
+- 按字段类型校验并规范化取值（数字转为 JSON 数字、开关转为布尔、选项值必须在选项列表内、日期格式）
+- 新增时为未提供的字段填充 default_value
+- 编译结果按表单配置版本号缓存在进程内，字段定义变更后自动重新编译
+"""
+import copy
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.validators import EmailValidator, URLValidator
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .form_bundle import FormConfigBundle
+from .form_models import FieldDefinition
+
+EMPTY_VALUES = (None, '', [], {})
+
+# 前端 custom 规则中可在后端复现的校验器；其余仅在前端生效
+CUSTOM_VALIDATORS = {
+    'validatePhone': re.compile(r'^1[3-9]\d{9}$'),
+    'validateMobile': re.compile(r'^1[3-9]\d{9}$'),
+    'validateIdCard': re.compile(r'^\d{17}[\dXx]$'),
+}
+
+
+class CompiledField:
+    """单个自定义字段的编译结果"""
+
+    def __init__(self, definition):
+        self.key = definition.field_key
+        self.label = definition.field_name
+        self.field_type = definition.field_type
+        self.required = False
+        self.default = definition.default_value
+        self.option_values = {
+            str(option.get('value')): option.get('value')
+            for option in definition.options or [] if isinstance(option, dict)
+        }
+        number_config = definition.number_config or {}
+        self.number_min = number_config.get('min')
+        self.number_max = number_config.get('max')
+        self.checks = []
+
+        for rule in definition._build_validation_rules():
+            if not isinstance(rule, dict):
+                continue
+            if rule.get('required'):
+                self.required = True
+                self.required_message = rule.get('message') or f'请输入{self.label}'
+                continue
+            self._compile_rule(rule)
+
+    def _compile_rule(self, rule):
+        rule_type = rule.get('type')
+        message = rule.get('message')
+
+        if rule_type == 'length' or (rule_type is None and ('min' in rule or 'max' in rule)):
+            min_length, max_length = rule.get('min'), rule.get('max')
+
+            def check_length(value):
+                size = len(value) if isinstance(value, (list, str)) else len(str(value))
+                if (min_length is not None and size < min_length) or (max_length is not None and size > max_length):
+                    return message or f'{self.label}长度必须在{min_length or 0}-{max_length or "不限"}之间'
+            self.checks.append(check_length)
+
+        elif rule_type == 'pattern' or (rule_type is None and 'pattern' in rule):
+            try:
+                pattern = re.compile(rule['pattern'])
+            except (re.error, TypeError):
+                return
+
+            def check_pattern(value):
+                if not pattern.search(str(value)):
+                    return message or f'{self.label}格式不正确'
+            self.checks.append(check_pattern)
+
+        elif rule_type in ('email', 'url'):
+            validator = EmailValidator() if rule_type == 'email' else URLValidator()
+
+            def check_format(value):
+                try:
+                    validator(str(value))
+                except DjangoValidationError:
+                    return message or f'{self.label}格式不正确'
+            self.checks.append(check_format)
+
+        elif rule_type == 'custom' and rule.get('validator') in CUSTOM_VALIDATORS:
+            pattern = CUSTOM_VALIDATORS[rule['validator']]
+
+            def check_custom(value):
+                if not pattern.match(str(value)):
+                    return message or f'{self.label}格式不正确'
+            self.checks.append(check_custom)
+
+    def clean(self, value):
+        """
+        Returns:
+            tuple: (规范化后的值, 错误信息列表)
+        """
+        if value in EMPTY_VALUES:
+            if self.required:
+                return value, [self.required_message]
+            return value, []
+
+        try:
+            value = self._normalize(value)
+        except (TypeError, ValueError, InvalidOperation) as e:
+            return value, [str(e) or f'{self.label}的值无效']
+
+        errors = [error for error in (check(value) for check in self.checks) if error]
+        return value, errors
+
+    def _normalize(self, value):
+        field_type = self.field_type
+        if field_type in ('number', 'decimal'):
+            if isinstance(value, bool):
+                raise ValueError(f'{self.label}必须是数字')
+            try:
+                number = Decimal(str(value).strip())
+            except InvalidOperation:
+                raise ValueError(f'{self.label}必须是数字') from None
+            if self.number_min is not None and number < Decimal(str(self.number_min)):
+                raise ValueError(f'{self.label}不能小于{self.number_min}')
+            if self.number_max is not None and number > Decimal(str(self.number_max)):
+                raise ValueError(f'{self.label}不能大于{self.number_max}')
+            return int(number) if number == number.to_integral_value() else float(number)
+
+        if field_type == 'switch':
+            if isinstance(value, bool):
+                return value
+            if str(value).strip().lower() in ('1', 'true', 'yes', 'on'):
+                return True
+            if str(value).strip().lower() in ('0', 'false', 'no', 'off'):
+                return False
+            raise ValueError(f'{self.label}必须是布尔值')
+
+        if field_type in ('date', 'datetime'):
+            value = str(value).strip()
+            try:
+                valid = parse_date(value) or (field_type == 'datetime' and parse_datetime(value))
+            except ValueError:
+                valid = False
+            if not valid:
+                raise ValueError(f'{self.label}日期格式不正确')
+            return value
+
+        if self.option_values and field_type in ('select', 'radio'):
+            if str(value) not in self.option_values:
+                raise ValueError(f'{self.label}的选项无效: {value}')
+            return self.option_values[str(value)]
+
+        if self.option_values and field_type in ('multi_select', 'checkbox'):
+            values = value if isinstance(value, list) else [value]
+            invalid = [item for item in values if str(item) not in self.option_values]
+            if invalid:
+                raise ValueError(f'{self.label}的选项无效: {", ".join(map(str, invalid))}')
+            return [self.option_values[str(item)] for item in values]
+
+        return value
+
+
+class CustomFieldValidator:
+    """模块自定义字段校验器"""
+
+    # (模块, 表单配置版本号) -> 校验器
+    _compiled = {}
+
+    def __init__(self, module, definitions):
+        self.module = module
+        self.fields = [CompiledField(definition) for definition in definitions]
+        self.keys = {field.key for field in self.fields}
+
+    @classmethod
+    def for_module(cls, module):
+        """获取模块校验器（字段定义变更前复用同一编译结果）"""
+        version = cache.get_or_set(FormConfigBundle.VERSION_KEY, 1, None)
+        validator = cls._compiled.get((module, version))
+        if validator is None:
+            validator = cls(module, FieldDefinition.objects.filter(module=module, is_active=True, is_system=False))
+            for key in [key for key in cls._compiled if key[0] == module]:
+                cls._compiled.pop(key, None)
+            cls._compiled[(module, version)] = validator
+        return validator
+
+    def clean(self, data, partial=False):
+        """
+        校验一条记录的自定义字段
+
+        Args:
+            data: 提交的数据（含标准字段与自定义字段）
+            partial: 部分更新时只校验提交的字段，且不填充默认值
+
+        Returns:
+            tuple: ({字段键: 值}, {字段键: [错误信息]})
+        """
+        values, errors = {}, {}
+        for field in self.fields:
+            if field.key in data:
+                value = data[field.key]
+            elif partial:
+                continue
+            elif field.default is not None:
+                values[field.key] = copy.deepcopy(field.default)
+                continue
+            else:
+                value = None
+
+            value, messages = field.clean(value)
+            if messages:
+                errors[field.key] = messages
+            elif field.key in data:
+                values[field.key] = value
+        return values, errors
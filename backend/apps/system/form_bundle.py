@@ -0,0 +1,349 @@
+"""
+表单配置包 (Form Config Bundle)
+
+将某个 (公司, 模块, 模式) 下前端需要的全部表单配置预编译为一个配置包：
+- form: 表单字段/分组配置（ModuleFormConfig 或默认配置）
+- layout: 表单布局（公司级 > 全局默认）
+- registry: MODULE_REGISTRY 中该模块的配置及系统字段
+
+配置包按内容哈希生成 ETag 并缓存，客户端携带 If-None-Match 时返回 304。
+FieldGroup / FieldDefinition / ModuleFormConfig / FormLayout 变更时递增版本号，
+MODULE_REGISTRY 的哈希参与缓存键，代码发布后自动重建。
+"""
+import hashlib
+import json
+from functools import lru_cache
+
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+from apps.common.exceptions import PermissionError, ValidationError
+from .form_models import FieldDefinition, ModuleFormConfig, FormLayout, group_field_configs
+from .module_registry import MODULE_REGISTRY
+
+
+# 表单模式
+FORM_MODES = ('create', 'edit')
+
+
+def _json_default(value):
+    # 兼容注册表中的枚举值
+    return getattr(value, 'value', str(value))
+
+
+def _content_hash(data):
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False, default=_json_default)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+# ==================== 注册表格式化（注册表为静态配置，进程内缓存） ====================
+
+def format_registry_field(field):
+    """Format field config, converting enums to strings"""
+    return {key: _json_default(value) if hasattr(value, 'value') else value for key, value in field.items()}
+
+
+def format_registry_field_for_form(field, mode='create'):
+    """Format registry system field config for form rendering"""
+    field_type = _json_default(field.get('field_type'))
+
+    # Determine readonly based on mode
+    is_readonly = field.get('is_readonly', False)
+    if mode == 'edit' and field.get('is_readonly_on_edit', False):
+        is_readonly = True
+
+    config = {
+        'key': field.get('field_key'),
+        'label': field.get('field_name'),
+        'type': field_type,
+        'required': field.get('is_required', False),
+        'readonly': is_readonly,
+        'width': field.get('width', 8),
+        'sortOrder': field.get('sort_order', 0),
+        'showInList': field.get('show_in_list', False),
+        'listSortable': field.get('list_sortable', False),
+        'listSearchable': field.get('list_searchable', False),
+    }
+
+    # Add type-specific configurations
+    if 'options' in field:
+        config['options'] = field['options']
+    if 'default_value' in field:
+        config['defaultValue'] = field['default_value']
+    if 'reference_config' in field:
+        config['referenceConfig'] = field['reference_config']
+    if 'number_config' in field:
+        config['numberConfig'] = field['number_config']
+
+    return config
+
+
+def format_registry_module(name, config, include_fields=True):
+    """Format module config for API response"""
+    result = {
+        'name': name,
+        'label': config.get('label'),
+        'label_en': config.get('label_en'),
+        'api_base': config.get('api_base'),
+        'icon': config.get('icon'),
+        'code_rule': config.get('code_rule'),
+        'features': config.get('features'),
+    }
+    if include_fields:
+        result['system_fields'] = [
+            format_registry_field(field) for field in config.get('system_fields', [])
+        ]
+    return result
+
+
+@lru_cache(maxsize=None)
+def get_registry_hash():
+    """MODULE_REGISTRY 内容哈希（随代码发布变化）"""
+    return _content_hash(MODULE_REGISTRY)
+
+
+@lru_cache(maxsize=2)
+def get_formatted_registry(include_fields=True):
+    """格式化后的全部模块注册表，返回 (数据, ETag)"""
+    data = [format_registry_module(name, config, include_fields) for name, config in MODULE_REGISTRY.items()]
+    return data, f'"{_content_hash(data)}"'
+
+
+def get_formatted_registry_module(module_name, include_fields=True):
+    """格式化后的单个模块注册配置，返回 (数据, ETag)；模块不存在返回 (None, None)"""
+    # 先按注册表校验，进程内缓存的键只会是已注册的模块
+    if module_name not in MODULE_REGISTRY:
+        return None, None
+    return _formatted_registry_module(module_name, bool(include_fields))
+
+
+@lru_cache(maxsize=None)
+def _formatted_registry_module(module_name, include_fields):
+    data = format_registry_module(module_name, MODULE_REGISTRY[module_name], include_fields)
+    return data, f'"{_content_hash(data)}"'
+
+
+def get_formatted_registry_fields(module_name, mode='create'):
+    """格式化后的模块系统字段，返回 (数据, ETag)；模块未注册或模式不支持返回 (None, None)"""
+    if module_name not in MODULE_REGISTRY or mode not in FORM_MODES:
+        return None, None
+    return _formatted_registry_fields(module_name, mode)
+
+
+@lru_cache(maxsize=None)
+def _formatted_registry_fields(module_name, mode):
+    config = MODULE_REGISTRY[module_name]
+    data = [format_registry_field_for_form(field, mode) for field in config.get('system_fields', [])]
+    return data, f'"{_content_hash(data)}"'
+
+
+# ==================== 表单配置 ====================
+
+def build_default_form_config(module, mode='create', fields=None):
+    """未配置 ModuleFormConfig 时的默认表单配置"""
+    if fields is None:
+        fields = FieldDefinition.objects.filter(
+            module=module,
+            is_active=True
+        ).select_related('group').order_by('group__sort_order', 'sort_order')
+
+    grouped_fields, ungrouped_fields = group_field_configs(fields, mode)
+
+    return {
+        'module': module,
+        'moduleLabel': module,
+        'apiBase': f'/api/{module}/',
+        'dialogWidth': '900px',
+        'labelWidth': '100px',
+        'permissions': {
+            'create': True,
+            'edit': True,
+            'delete': True,
+            'import': True,
+            'export': True,
+        },
+        'groups': grouped_fields,
+        'ungroupedFields': ungrouped_fields,
+        'extra': {},
+    }
+
+
+class FormConfigBundle:
+    """表单配置包构建与缓存"""
+
+    VERSION_KEY = 'form_config_bundle_version'
+    CACHE_KEY = 'form_config_bundle:{registry}:{version}:{company}:{mode}:{module}'
+    CACHE_TIMEOUT = 60 * 60 * 24
+
+    # 所有模块合并包使用的模块占位名
+    ALL_MODULES = '__all__'
+
+    @classmethod
+    def invalidate(cls):
+        """表单配置变更后使所有配置包失效"""
+        try:
+            cache.incr(cls.VERSION_KEY)
+        except ValueError:
+            cache.set(cls.VERSION_KEY, 2, None)
+
+    @classmethod
+    def _cache_key(cls, company_id, module, mode):
+        return cls.CACHE_KEY.format(
+            registry=get_registry_hash()[:12],
+            version=cache.get_or_set(cls.VERSION_KEY, 1, None),
+            company=company_id or 0,
+            mode=mode,
+            module=module,
+        )
+
+    @classmethod
+    def get(cls, module, mode='create', company_id=None):
+        """
+        获取单模块配置包
+
+        Returns:
+            dict: {'etag': str, 'data': dict}；模块既未注册也无表单配置时返回 None
+        """
+        key = cls._cache_key(company_id, module, mode)
+        bundle = cache.get(key)
+        if bundle is None:
+            data = cls._build([module], mode, company_id).get(module)
+            if data is None:
+                return None
+            bundle = {'etag': f'"{_content_hash(data)}"', 'data': data}
+            cache.set(key, bundle, cls.CACHE_TIMEOUT)
+        return bundle
+
+    @classmethod
+    def get_all(cls, mode='create', company_id=None):
+        """
+        获取所有模块的合并配置包
+
+        Returns:
+            dict: {'etag': str, 'data': {模块名: 配置包数据}}
+        """
+        key = cls._cache_key(company_id, cls.ALL_MODULES, mode)
+        bundle = cache.get(key)
+        if bundle is None:
+            modules = set(MODULE_REGISTRY) | set(
+                ModuleFormConfig.objects.filter(is_active=True).values_list('module', flat=True)
+            )
+            data = cls._build(sorted(modules), mode, company_id)
+            bundle = {'etag': f'"{_content_hash(data)}"', 'data': data}
+            cache.set(key, bundle, cls.CACHE_TIMEOUT)
+        return bundle
+
+    @classmethod
+    def _build(cls, modules, mode, company_id):
+        """批量构建配置包：字段、表单配置、布局各一次查询"""
+        fields_by_module = {}
+        for field in FieldDefinition.objects.filter(
+            module__in=modules, is_active=True
+        ).select_related('group').order_by('group__sort_order', 'sort_order'):
+            fields_by_module.setdefault(field.module, []).append(field)
+
+        form_configs = {
+            config.module: config
+            for config in ModuleFormConfig.objects.filter(module__in=modules, is_active=True)
+        }
+
+        layouts = cls._load_layouts(modules, company_id)
+
+        bundles = {}
+        for module in modules:
+            registry_config = MODULE_REGISTRY.get(module)
+            form_config_obj = form_configs.get(module)
+            if registry_config is None and form_config_obj is None:
+                continue
+
+            fields = fields_by_module.get(module, [])
+            if form_config_obj:
+                form = form_config_obj.get_form_config(mode, fields=fields)
+            else:
+                form = build_default_form_config(module, mode, fields=fields)
+
+            bundles[module] = {
+                'module': module,
+                'mode': mode,
+                'formSource': 'module_config' if form_config_obj else 'default',
+                'form': form,
+                'layout': layouts.get(module, {'rows': [], 'groups': []}),
+                'registry': get_formatted_registry_module(module)[0],
+                'registryFields': get_formatted_registry_fields(module, mode)[0],
+            }
+        return bundles
+
+    @staticmethod
+    def _load_layouts(modules, company_id):
+        """与 FormLayout.get_layout_for_module 相同的优先级：公司级 > 全局默认"""
+        layouts = {}
+        for module, layout_config in FormLayout.objects.filter(
+            module__in=modules,
+            layout_type=FormLayout.LayoutType.FORM,
+            company__isnull=True,
+            is_active=True,
+            is_default=True
+        ).values_list('module', 'layout_config'):
+            layouts.setdefault(module, layout_config)
+
+        if company_id:
+            company_layouts = {}
+            for module, layout_config in FormLayout.objects.filter(
+                module__in=modules,
+                layout_type=FormLayout.LayoutType.FORM,
+                company_id=company_id,
+                is_active=True
+            ).values_list('module', 'layout_config'):
+                company_layouts.setdefault(module, layout_config)
+            layouts.update(company_layouts)
+        return layouts
+
+
+def get_request_company_id(request):
+    """
+    当前请求的公司：query 参数 > 会话公司 > 用户主公司
+
+    Raises:
+        ValidationError: query 参数 company 不是整数
+        PermissionError: query 参数指定的公司不在请求人的数据权限范围内
+    """
+    from apps.accounts.data_scope import DataScopeResolver
+
+    company_id = request.query_params.get('company')
+    if not company_id:
+        return (
+            getattr(request.user, 'current_company_id', None)
+            or getattr(request.user, 'primary_company_id', None)
+        )
+    try:
+        company_id = int(company_id)
+    except (TypeError, ValueError):
+        raise ValidationError('公司ID不合法')
+    scope = DataScopeResolver.get_scope(request.user, request)
+    if scope is not None and company_id not in scope['companies']:
+        raise PermissionError('无权访问该公司的数据')
+    return company_id
+
+
+def invalid_mode_response(mode):
+    """表单模式不支持时返回 400 响应，否则返回 None"""
+    if mode in FORM_MODES:
+        return None
+    return Response(
+        {'error': f'不支持的 mode: {mode}，可选值: {", ".join(FORM_MODES)}'},
+        status=status.HTTP_400_BAD_REQUEST
+    )
+
+
+def etag_response(request, data, etag):
+    """带 ETag 的响应，If-None-Match 命中时返回 304"""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+    candidates = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',') if tag.strip()}
+    if etag in candidates or '*' in candidates:
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(data)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -293,6 +293,43 @@ class FieldDefinition(models.Model):
         return rules
 
 
+def group_field_configs(fields, mode='create'):
+    """
+    按分组组织字段配置（隐藏字段不输出）
+    
+    Args:
+        fields: FieldDefinition 可迭代对象（需已 select_related('group')）
+        mode: 'create' 或 'edit'
+    
+    Returns:
+        tuple: (分组列表, 未分组字段列表)
+    """
+    grouped_fields = {}
+    ungrouped_fields = []
+    
+    for field in fields:
+        field_config = field.get_field_config(mode)
+        if field_config['hidden']:
+            continue
+        
+        if field.group:
+            group_key = field.group.group_key
+            if group_key not in grouped_fields:
+                grouped_fields[group_key] = {
+                    'key': group_key,
+                    'name': field.group.group_name,
+                    'collapsible': field.group.is_collapsible,
+                    'collapsed': field.group.default_collapsed,
+                    'sortOrder': field.group.sort_order,
+                    'fields': []
+                }
+            grouped_fields[group_key]['fields'].append(field_config)
+        else:
+            ungrouped_fields.append(field_config)
+    
+    return list(grouped_fields.values()), ungrouped_fields
+
+
 class ModuleFormConfig(models.Model):
     """模块表单配置"""
     
@@ -331,41 +368,22 @@ class ModuleFormConfig(models.Model):
     def __str__(self):
         return f"{self.module} ({self.module_label})"
     
-    def get_form_config(self, mode='create'):
-        """获取完整的表单配置"""
-        groups = FieldGroup.objects.filter(
-            module=self.module, 
-            is_active=True
-        ).order_by('sort_order')
-        
-        fields = FieldDefinition.objects.filter(
-            module=self.module, 
-            is_active=True
-        ).select_related('group').order_by('group__sort_order', 'sort_order')
+    def get_form_config(self, mode='create', fields=None):
+        """
+        获取完整的表单配置
         
-        # 按分组组织字段
-        grouped_fields = {}
-        ungrouped_fields = []
+        Args:
+            mode: 'create' 或 'edit'
+            fields: 预加载的字段定义（可选，需已 select_related('group')），
+                    为空时从数据库查询
+        """
+        if fields is None:
+            fields = FieldDefinition.objects.filter(
+                module=self.module, 
+                is_active=True
+            ).select_related('group').order_by('group__sort_order', 'sort_order')
         
-        for field in fields:
-            field_config = field.get_field_config(mode)
-            if field_config['hidden']:
-                continue
-            
-            if field.group:
-                group_key = field.group.group_key
-                if group_key not in grouped_fields:
-                    grouped_fields[group_key] = {
-                        'key': group_key,
-                        'name': field.group.group_name,
-                        'collapsible': field.group.is_collapsible,
-                        'collapsed': field.group.default_collapsed,
-                        'sortOrder': field.group.sort_order,
-                        'fields': []
-                    }
-                grouped_fields[group_key]['fields'].append(field_config)
-            else:
-                ungrouped_fields.append(field_config)
+        grouped_fields, ungrouped_fields = group_field_configs(fields, mode)
         
         # 构建最终配置
         return {
@@ -381,7 +399,7 @@ class ModuleFormConfig(models.Model):
                 'import': self.enable_import,
                 'export': self.enable_export,
             },
-            'groups': list(grouped_fields.values()),
+            'groups': grouped_fields,
             'ungroupedFields': ungrouped_fields,
             'extra': self.extra_config,
         }
@@ -31,13 +31,21 @@ from .form_serializers import (
     FormLayoutCreateSerializer
 )
 from .module_registry import (
-    MODULE_REGISTRY,
-    get_module_config,
     get_all_modules,
     get_module_system_fields,
     get_modules_with_feature,
     get_module_code_rule_config
 )
+from .form_bundle import (
+    FormConfigBundle,
+    build_default_form_config,
+    etag_response,
+    get_formatted_registry,
+    get_formatted_registry_fields,
+    get_formatted_registry_module,
+    get_request_company_id,
+    invalid_mode_response,
+)
 
 
 class FieldGroupViewSet(viewsets.ModelViewSet):
@@ -184,6 +192,9 @@ class FieldDefinitionViewSet(viewsets.ModelViewSet):
                 field_key=item['field_key']
             ).update(sort_order=item['sort_order'])
         
+        # update() 不触发信号，需手动使配置包失效
+        FormConfigBundle.invalidate()
+        
         return Response({'message': '排序更新成功'})
 
 
@@ -208,67 +219,16 @@ class ModuleFormConfigViewSet(viewsets.ModelViewSet):
                 {'error': '请提供 module 参数'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        invalid = invalid_mode_response(mode)
+        if invalid:
+            return invalid
         
-        try:
-            config = ModuleFormConfig.objects.get(module=module, is_active=True)
-            form_config = config.get_form_config(mode)
-            return Response(form_config)
-        except ModuleFormConfig.DoesNotExist:
+        bundle = FormConfigBundle.get(module, mode, get_request_company_id(request))
+        if bundle is None:
             # 如果没有配置，返回默认配置
-            return self._get_default_config(module, mode)
-    
-    def _get_default_config(self, module, mode):
-        """获取默认表单配置"""
-        groups = FieldGroup.objects.filter(
-            module=module,
-            is_active=True
-        ).order_by('sort_order')
-        
-        fields = FieldDefinition.objects.filter(
-            module=module,
-            is_active=True
-        ).select_related('group').order_by('group__sort_order', 'sort_order')
-        
-        grouped_fields = {}
-        ungrouped_fields = []
-        
-        for field in fields:
-            field_config = field.get_field_config(mode)
-            if field_config['hidden']:
-                continue
-            
-            if field.group:
-                group_key = field.group.group_key
-                if group_key not in grouped_fields:
-                    grouped_fields[group_key] = {
-                        'key': group_key,
-                        'name': field.group.group_name,
-                        'collapsible': field.group.is_collapsible,
-                        'collapsed': field.group.default_collapsed,
-                        'sortOrder': field.group.sort_order,
-                        'fields': []
-                    }
-                grouped_fields[group_key]['fields'].append(field_config)
-            else:
-                ungrouped_fields.append(field_config)
-        
-        return Response({
-            'module': module,
-            'moduleLabel': module,
-            'apiBase': f'/api/{module}/',
-            'dialogWidth': '900px',
-            'labelWidth': '100px',
-            'permissions': {
-                'create': True,
-                'edit': True,
-                'delete': True,
-                'import': True,
-                'export': True,
-            },
-            'groups': list(grouped_fields.values()),
-            'ungroupedFields': ungrouped_fields,
-            'extra': {},
-        })
+            return Response(build_default_form_config(module, mode))
+        form_config = bundle['data']['form']
+        return etag_response(request, form_config, bundle['etag'])
     
     @action(detail=False, methods=['get'])
     def modules(self, request):
@@ -307,55 +267,19 @@ class ModuleRegistryView(APIView):
         module_name = request.query_params.get('module')
         include_fields = request.query_params.get('include_fields', 'true').lower() == 'true'
         
+        # 注册表为静态配置，格式化结果在进程内缓存
         if module_name:
-            config = get_module_config(module_name)
-            if not config:
+            result, etag = get_formatted_registry_module(module_name, include_fields)
+            if result is None:
                 return Response(
                     {'error': f'Module "{module_name}" not found'},
                     status=status.HTTP_404_NOT_FOUND
                 )
-            
-            result = self._format_module_config(module_name, config, include_fields)
-            return Response(result)
+            return etag_response(request, result, etag)
         
         # Return all modules
-        modules = []
-        for name, config in MODULE_REGISTRY.items():
-            modules.append(self._format_module_config(name, config, include_fields))
-        
-        return Response(modules)
-    
-    def _format_module_config(self, name, config, include_fields=True):
-        """Format module config for API response"""
-        result = {
-            'name': name,
-            'label': config.get('label'),
-            'label_en': config.get('label_en'),
-            'api_base': config.get('api_base'),
-            'icon': config.get('icon'),
-            'code_rule': config.get('code_rule'),
-            'features': config.get('features'),
-        }
-        
-        if include_fields:
-            # Convert system fields to serializable format
-            system_fields = config.get('system_fields', [])
-            result['system_fields'] = [
-                self._format_field(field) for field in system_fields
-            ]
-        
-        return result
-    
-    def _format_field(self, field):
-        """Format field config, converting enums to strings"""
-        formatted = {}
-        for key, value in field.items():
-            if hasattr(value, 'value'):
-                # Convert enum to string
-                formatted[key] = value.value
-            else:
-                formatted[key] = value
-        return formatted
+        modules, etag = get_formatted_registry(include_fields)
+        return etag_response(request, modules, etag)
 
 
 class ModuleRegistryFieldsView(APIView):
@@ -388,53 +312,12 @@ class ModuleRegistryFieldsView(APIView):
             )
         
         mode = request.query_params.get('mode', 'create')
+        invalid = invalid_mode_response(mode)
+        if invalid:
+            return invalid
         
-        # Format fields for response
-        formatted_fields = []
-        for field in fields:
-            field_config = self._format_field_for_form(field, mode)
-            formatted_fields.append(field_config)
-        
-        return Response(formatted_fields)
-    
-    def _format_field_for_form(self, field, mode='create'):
-        """Format field config for form rendering"""
-        field_type = field.get('field_type')
-        if hasattr(field_type, 'value'):
-            field_type = field_type.value
-        
-        # Determine readonly based on mode
-        is_readonly = field.get('is_readonly', False)
-        if mode == 'edit' and field.get('is_readonly_on_edit', False):
-            is_readonly = True
-        
-        config = {
-            'key': field.get('field_key'),
-            'label': field.get('field_name'),
-            'type': field_type,
-            'required': field.get('is_required', False),
-            'readonly': is_readonly,
-            'width': field.get('width', 8),
-            'sortOrder': field.get('sort_order', 0),
-            'showInList': field.get('show_in_list', False),
-            'listSortable': field.get('list_sortable', False),
-            'listSearchable': field.get('list_searchable', False),
-        }
-        
-        # Add type-specific configurations
-        if 'options' in field:
-            config['options'] = field['options']
-        
-        if 'default_value' in field:
-            config['defaultValue'] = field['default_value']
-        
-        if 'reference_config' in field:
-            config['referenceConfig'] = field['reference_config']
-        
-        if 'number_config' in field:
-            config['numberConfig'] = field['number_config']
-        
-        return config
+        formatted_fields, etag = get_formatted_registry_fields(module_name, mode)
+        return etag_response(request, formatted_fields, etag)
 
 
 class ModuleCodeRuleView(APIView):
@@ -586,3 +469,57 @@ class FormLayoutViewSet(viewsets.ModelViewSet):
             'layout': FormLayoutSerializer(layout).data
         })
 
+
+
+class FormConfigBundleView(APIView):
+    """
+    表单配置包 API
+    
+    返回单个模块在当前公司、指定模式下的完整表单配置（表单、布局、注册表），
+    支持 ETag / If-None-Match 协商缓存。
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        """
+        Query params:
+            module: 模块名称 (required)
+            mode: create / edit (default: create)
+            company: 公司ID (可选，默认当前用户公司)
+        """
+        module = request.query_params.get('module')
+        mode = request.query_params.get('mode', 'create')
+        
+        if not module:
+            return Response(
+                {'error': '请提供 module 参数'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        invalid = invalid_mode_response(mode)
+        if invalid:
+            return invalid
+        
+        bundle = FormConfigBundle.get(module, mode, get_request_company_id(request))
+        if bundle is None:
+            return Response(
+                {'error': f'Module "{module}" not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return etag_response(request, bundle['data'], bundle['etag'])
+
+
+class FormConfigBundleAllView(APIView):
+    """
+    全部模块表单配置包 API
+    
+    一次返回所有模块的配置包 {模块名: 配置包}，支持 ETag / If-None-Match。
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        mode = request.query_params.get('mode', 'create')
+        invalid = invalid_mode_response(mode)
+        if invalid:
+            return invalid
+        bundle = FormConfigBundle.get_all(mode, get_request_company_id(request))
+        return etag_response(request, bundle['data'], bundle['etag'])
@@ -0,0 +1,33 @@
+"""
+同步自定义字段索引
+
+按 FieldDefinition 的可搜索 / 可排序配置，在 PostgreSQL 上创建或删除 JSON 自定义字段的 GIN 与表达式索引。
+字段定义保存后会自动异步同步，本命令用于首次部署或手工修复。
+
+Usage:
+    python manage.py sync_custom_field_indexes              # 所有登记的模块
+    python manage.py sync_custom_field_indexes --module asset
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.system.custom_field_query import CUSTOM_FIELD_SOURCES, CustomFieldIndexes
+
+
+class Command(BaseCommand):
+    help = 'Create or drop JSON custom field indexes from field definitions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--module', action='append', help='Module name (repeatable, default: all)')
+
+    def handle(self, *args, **options):
+        modules = options['module'] or list(CUSTOM_FIELD_SOURCES)
+        unknown = [module for module in modules if module not in CUSTOM_FIELD_SOURCES]
+        if unknown:
+            raise CommandError(f'Modules without custom field storage: {", ".join(unknown)}')
+
+        for module in modules:
+            result = CustomFieldIndexes.sync(module)
+            self.stdout.write(
+                f"{module}: created {result['created'] or '-'}, dropped {result['dropped'] or '-'}"
+            )
+        self.stdout.write(self.style.SUCCESS(f'Synced custom field indexes for {len(modules)} modules'))
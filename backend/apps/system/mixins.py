@@ -10,15 +10,23 @@ Usage:
         module_name = 'asset'
         queryset = Asset.objects.all()
         serializer_class = AssetSerializer
+
+Bulk create / update / delete actions live in bulk_mixins.BulkOperationsMixin.
 """
 
-from rest_framework import serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db import transaction
 
-from .form_models import FieldDefinition, ModuleFormConfig
+from .form_models import FieldDefinition
 from .module_registry import get_module_config
+from .form_bundle import FormConfigBundle, etag_response, get_request_company_id
+from .field_validator import CustomFieldValidator
+from .custom_field_query import get_custom_field_source
+
+
+def has_concrete_field(model, name):
+    """Whether the model has a concrete (database) field with the given name."""
+    return any(field.name == name for field in model._meta.concrete_fields)
 
 
 class DynamicFieldsSerializerMixin:
@@ -66,14 +74,10 @@ class DynamicFieldsSerializerMixin:
         return validated_data
     
     def _get_custom_field_keys(self, module_name):
-        """Get list of custom field keys for the module."""
+        """Get list of custom field keys for the module (compiled once per field definition version)."""
+        validator = self.context.get('custom_field_validator')
         try:
-            fields = FieldDefinition.objects.filter(
-                module=module_name,
-                is_active=True,
-                is_system=False
-            ).values_list('field_key', flat=True)
-            return list(fields)
+            return list((validator or CustomFieldValidator.for_module(module_name)).keys)
         except Exception:
             return []
 
@@ -93,6 +97,9 @@ class DynamicFieldsMixin:
             module_name = 'asset'
             queryset = Asset.objects.all()
             serializer_class = AssetSerializer
+    
+    Add CustomFieldFilterBackend / CustomFieldOrderingFilter (apps.system.custom_field_query)
+    to filter_backends to enable ?cf.<field_key>= filtering and ordering for module_name.
     """
     
     module_name = None  # Override in subclass
@@ -104,28 +111,25 @@ class DynamicFieldsMixin:
         return context
     
     def perform_create(self, serializer):
-        """Extract and save custom field values on create."""
-        # Get custom fields from request data
-        custom_fields = self._extract_custom_fields(self.request.data)
-        
-        # Save with custom fields
-        instance = serializer.save()
-        
-        if custom_fields and hasattr(instance, 'set_custom_fields'):
-            instance.set_custom_fields(custom_fields)
-            instance.save(update_fields=['custom_fields'])
+        """Extract custom field values and save them with the record in a single write."""
+        self._save_with_custom_fields(serializer)
     
     def perform_update(self, serializer):
-        """Extract and update custom field values on update."""
-        # Get custom fields from request data
+        """Extract custom field values and update them with the record in a single write."""
+        self._save_with_custom_fields(serializer)
+    
+    def _save_with_custom_fields(self, serializer):
+        """Merge custom field values into the JSON column before the first save."""
         custom_fields = self._extract_custom_fields(self.request.data)
-        
-        # Update with custom fields
-        instance = serializer.save()
-        
-        if custom_fields and hasattr(instance, 'set_custom_fields'):
-            instance.set_custom_fields(custom_fields)
-            instance.save(update_fields=['custom_fields'])
+        source = get_custom_field_source(self.module_name)
+        
+        if custom_fields and has_concrete_field(self.get_queryset().model, source):
+            merged = dict(getattr(serializer.instance, source, None) or {})
+            merged.update(serializer.validated_data.get(source) or {})
+            merged.update(custom_fields)
+            serializer.save(**{source: merged})
+        else:
+            serializer.save()
     
     def _extract_custom_fields(self, data):
         """
@@ -140,20 +144,9 @@ class DynamicFieldsMixin:
         if not self.module_name:
             return {}
         
-        # Get field definitions for this module
         try:
-            custom_field_defs = FieldDefinition.objects.filter(
-                module=self.module_name,
-                is_active=True,
-                is_system=False
-            )
-            
-            custom_fields = {}
-            for field_def in custom_field_defs:
-                if field_def.field_key in data:
-                    custom_fields[field_def.field_key] = data[field_def.field_key]
-            
-            return custom_fields
+            keys = CustomFieldValidator.for_module(self.module_name).keys
+            return {key: data[key] for key in keys if key in data}
         except Exception:
             return {}
     
@@ -170,20 +163,17 @@ class DynamicFieldsMixin:
         """
         mode = request.query_params.get('mode', 'create')
         
-        try:
-            # Try to get module form config from database
-            config = ModuleFormConfig.objects.get(
-                module=self.module_name,
-                is_active=True
-            )
-            return Response(config.get_form_config(mode))
-        except ModuleFormConfig.DoesNotExist:
-            # Fall back to module registry
-            module_config = get_module_config(self.module_name)
-            if module_config:
-                return Response(self._build_form_config_from_registry(module_config, mode))
-            
-            return Response({'error': 'Module configuration not found'}, status=404)
+        # Precompiled bundle (cached, ETag) when a module form config exists
+        bundle = FormConfigBundle.get(self.module_name, mode, get_request_company_id(request))
+        if bundle and bundle['data']['formSource'] == 'module_config':
+            return etag_response(request, bundle['data']['form'], bundle['etag'])
+        
+        # Fall back to module registry
+        module_config = get_module_config(self.module_name)
+        if module_config:
+            return Response(self._build_form_config_from_registry(module_config, mode))
+        
+        return Response({'error': 'Module configuration not found'}, status=404)
     
     @action(detail=False, methods=['get'])
     def list_fields(self, request):
@@ -402,100 +392,3 @@ class CodeGenerationMixin:
             serial = str(int(now.timestamp() * 1000) % 10000).zfill(4)
             
             return Response({'code': f"{prefix}{date_str}{serial}"})
-
-
-class BulkOperationsMixin:
-    """
-    Mixin to add bulk operations support to ViewSets.
-    
-    Provides bulk create, update, and delete operations.
-    """
-    
-    @action(detail=False, methods=['post'])
-    def bulk_create(self, request):
-        """
-        Create multiple records at once.
-        
-        Request body:
-            items: List of record data
-            
-        Returns:
-            List of created records
-        """
-        items = request.data.get('items', [])
-        if not items:
-            return Response({'error': 'No items provided'}, status=400)
-        
-        serializer = self.get_serializer(data=items, many=True)
-        serializer.is_valid(raise_exception=True)
-        
-        with transaction.atomic():
-            instances = serializer.save()
-        
-        return Response(
-            self.get_serializer(instances, many=True).data,
-            status=201
-        )
-    
-    @action(detail=False, methods=['post'])
-    def bulk_update(self, request):
-        """
-        Update multiple records at once.
-        
-        Request body:
-            items: List of {id: ..., data: {...}}
-            
-        Returns:
-            List of updated records
-        """
-        items = request.data.get('items', [])
-        if not items:
-            return Response({'error': 'No items provided'}, status=400)
-        
-        updated = []
-        with transaction.atomic():
-            for item in items:
-                item_id = item.get('id')
-                data = item.get('data', {})
-                
-                if not item_id:
-                    continue
-                
-                try:
-                    instance = self.get_queryset().get(pk=item_id)
-                    serializer = self.get_serializer(instance, data=data, partial=True)
-                    serializer.is_valid(raise_exception=True)
-                    serializer.save()
-                    updated.append(serializer.data)
-                except self.get_queryset().model.DoesNotExist:
-                    pass
-        
-        return Response(updated)
-    
-    @action(detail=False, methods=['post'])
-    def bulk_delete(self, request):
-        """
-        Delete multiple records at once (soft delete).
-        
-        Request body:
-            ids: List of record IDs
-            
-        Returns:
-            Number of deleted records
-        """
-        ids = request.data.get('ids', [])
-        if not ids:
-            return Response({'error': 'No IDs provided'}, status=400)
-        
-        queryset = self.get_queryset().filter(pk__in=ids)
-        count = queryset.count()
-        
-        # Use soft delete if available
-        with transaction.atomic():
-            for instance in queryset:
-                if hasattr(instance, 'soft_delete'):
-                    instance.soft_delete()
-                else:
-                    instance.delete()
-        
-        return Response({'deleted': count})
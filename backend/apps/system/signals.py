@@ -0,0 +1,58 @@
+"""
+系统模块信号处理
+
+动态表单相关模型变更时使表单配置包失效，字段定义变更时异步同步自定义字段索引；
+系统配置、数据字典、编码规则变更时使配置缓存失效
+"""
+import logging
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .form_models import FieldGroup, FieldDefinition, ModuleFormConfig, FormLayout
+from .form_bundle import FormConfigBundle
+from .models import SystemConfig, DataDictionary, CodeRule
+from .config_cache import ConfigCache
+from .custom_field_query import CUSTOM_FIELD_SOURCES
+
+logger = logging.getLogger(__name__)
+
+
+@receiver([post_save, post_delete], sender=FieldGroup)
+@receiver([post_save, post_delete], sender=FieldDefinition)
+@receiver([post_save, post_delete], sender=ModuleFormConfig)
+@receiver([post_save, post_delete], sender=FormLayout)
+def invalidate_form_config_bundle(sender, instance, **kwargs):
+    FormConfigBundle.invalidate()
+
+
+def _enqueue_custom_field_indexes(module):
+    from .tasks import sync_custom_field_indexes
+
+    try:
+        sync_custom_field_indexes.delay(module)
+    except Exception as e:
+        # 任务队列不可用时不影响保存，可通过 sync_custom_field_indexes 命令补齐
+        logger.warning(f"[CustomFieldIndexes] 提交索引同步任务失败 {module}: {e}")
+
+
+@receiver([post_save, post_delete], sender=FieldDefinition)
+def schedule_custom_field_indexes(sender, instance, **kwargs):
+    if instance.module in CUSTOM_FIELD_SOURCES:
+        transaction.on_commit(partial(_enqueue_custom_field_indexes, instance.module))
+
+
+CONFIG_CACHE_NAMESPACES = {
+    SystemConfig: ConfigCache.CONFIG,
+    DataDictionary: ConfigCache.DICTIONARY,
+    CodeRule: ConfigCache.CODE_RULE,
+}
+
+
+@receiver([post_save, post_delete], sender=SystemConfig)
+@receiver([post_save, post_delete], sender=DataDictionary)
+@receiver([post_save, post_delete], sender=CodeRule)
+def invalidate_config_cache(sender, instance, **kwargs):
+    ConfigCache.invalidate(CONFIG_CACHE_NAMESPACES[sender], instance.company_id)
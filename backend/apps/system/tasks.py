@@ -0,0 +1,12 @@
+"""
+系统模块异步任务 - 精臣云资产管理系统
+"""
+from celery import shared_task
+
+
+@shared_task(ignore_result=False)
+def sync_custom_field_indexes(module):
+    """按字段定义同步自定义字段索引（CREATE INDEX CONCURRENTLY 耗时较长，放到后台执行）"""
+    from .custom_field_query import CustomFieldIndexes
+    
+    return CustomFieldIndexes.sync(module)
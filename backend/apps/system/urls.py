@@ -9,13 +9,16 @@ from .form_views import (
     ModuleRegistryFieldsView,
     ModuleCodeRuleView,
     ModuleFeatureView,
-    FormLayoutViewSet
+    FormLayoutViewSet,
+    FormConfigBundleView,
+    FormConfigBundleAllView
 )
 
 router = DefaultRouter()
 router.register('configs', views.SystemConfigViewSet)
 router.register('logs', views.OperationLogViewSet)
 router.register('code-rules', views.CodeRuleViewSet)
+router.register('dictionaries', views.DataDictionaryViewSet)
 
 # Dynamic form configuration routes
 router.register('form/groups', FieldGroupViewSet, basename='field-group')
@@ -33,4 +36,8 @@ urlpatterns = [
     path('registry/<str:module_name>/fields/', ModuleRegistryFieldsView.as_view(), name='module-registry-fields'),
     path('registry/<str:module_name>/code-rule/', ModuleCodeRuleView.as_view(), name='module-code-rule'),
     path('registry/features/', ModuleFeatureView.as_view(), name='module-features'),
+    
+    # Precompiled form config bundles (ETag)
+    path('form/bundle/', FormConfigBundleView.as_view(), name='form-config-bundle'),
+    path('form/bundle/all/', FormConfigBundleAllView.as_view(), name='form-config-bundle-all'),
 ]
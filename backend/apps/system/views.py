@@ -7,7 +7,9 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django.utils import timezone
 
-from .models import SystemConfig, OperationLog, CodeRule
+from .models import SystemConfig, OperationLog, CodeRule, DataDictionary
+from .config_cache import ConfigCache
+from .form_bundle import etag_response, get_request_company_id
 
 
 class CodeRuleSerializer(serializers.ModelSerializer):
@@ -41,6 +43,18 @@ class CodeRuleSerializer(serializers.ModelSerializer):
         return f"{obj.prefix or ''}{sep}{date_str}{sep}{serial}"
 
 
+class DataDictionarySerializer(serializers.ModelSerializer):
+    """数据字典序列化器"""
+    
+    class Meta:
+        model = DataDictionary
+        fields = [
+            'id', 'company', 'category', 'code', 'name', 'value', 'sort_order',
+            'description', 'is_system', 'is_active', 'created_at'
+        ]
+        read_only_fields = ['created_at']
+
+
 class CodeRuleViewSet(viewsets.ModelViewSet):
     """编码规则视图集"""
     queryset = CodeRule.objects.all()
@@ -349,33 +363,26 @@ class CodeRuleViewSet(viewsets.ModelViewSet):
         company_id = request.query_params.get('company') or request.data.get('company')
         
         if request.method == 'GET':
-            try:
-                filters = {'code': code_type}
-                if company_id:
-                    filters['company_id'] = company_id
-                
-                rule = CodeRule.objects.filter(**filters).first()
-                
-                if rule:
-                    return Response(self.get_serializer(rule).data)
-                else:
-                    # Return default configuration
-                    default_prefixes = {
-                        'asset_code': 'ZC',
-                        'supply_code': 'BG',
-                        'purchase_order_code': 'PO',
-                    }
-                    return Response({
-                        'prefix': default_prefixes.get(code_type, 'CODE'),
-                        'date_format': 'YYYYMMDD',
-                        'serial_length': 4,
-                        'separator': '',
-                        'reset_cycle': 'daily',
-                        'example': f"{default_prefixes.get(code_type, 'CODE')}{timezone.now().strftime('%Y%m%d')}0001"
-                    })
-                    
-            except Exception as e:
-                return Response({'error': str(e)}, status=400)
+            # 公司级规则优先，其次全局规则（缓存，规则保存时失效）
+            rule = ConfigCache.get_code_rule(code_type, get_request_company_id(request))
+            
+            if rule:
+                return Response(self.get_serializer(CodeRule(**rule)).data)
+            else:
+                # Return default configuration
+                default_prefixes = {
+                    'asset_code': 'ZC',
+                    'supply_code': 'BG',
+                    'purchase_order_code': 'PO',
+                }
+                return Response({
+                    'prefix': default_prefixes.get(code_type, 'CODE'),
+                    'date_format': 'YYYYMMDD',
+                    'serial_length': 4,
+                    'separator': '',
+                    'reset_cycle': 'daily',
+                    'example': f"{default_prefixes.get(code_type, 'CODE')}{timezone.now().strftime('%Y%m%d')}0001"
+                })
         
         elif request.method == 'POST':
             from apps.organizations.models import Company
@@ -499,6 +506,36 @@ class SystemInfoView(APIView):
         })
 
 
+class DataDictionaryViewSet(viewsets.ModelViewSet):
+    """数据字典视图集"""
+    queryset = DataDictionary.objects.all()
+    serializer_class = DataDictionarySerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, SearchFilter]
+    filterset_fields = ['company', 'category', 'is_active']
+    search_fields = ['code', 'name']
+    
+    def get_queryset(self):
+        return super().get_queryset().order_by('category', 'sort_order', 'code')
+    
+    @action(detail=False, methods=['get'])
+    def preload(self, request):
+        """
+        一次返回当前公司全部启用的字典 {分类: [字典项]}（含全局字典，公司级覆盖同代码项）
+        
+        Query params:
+            company: 公司ID（可选，默认当前用户公司）
+            category: 只返回指定分类（可选）
+        
+        支持 ETag / If-None-Match，字典未变更时返回 304。
+        """
+        bundle = ConfigCache.get_bundle(ConfigCache.DICTIONARY, get_request_company_id(request))
+        category = request.query_params.get('category')
+        if category:
+            return etag_response(request, bundle['data'].get(category, []), bundle['etag'])
+        return etag_response(request, bundle['data'], bundle['etag'])
+
+
 class GlobalConfigView(APIView):
     """全局系统配置（名称、Logo、主题等）"""
     permission_classes = [IsAuthenticated]
@@ -506,23 +543,12 @@ class GlobalConfigView(APIView):
     CONFIG_KEY = 'global_system_config'
     
     def get(self, request):
-        """获取全局配置"""
-        import json
-        
-        try:
-            config_obj = SystemConfig.objects.filter(
-                config_key=self.CONFIG_KEY,
-                company__isnull=True
-            ).first()
-            
-            if config_obj:
-                config = json.loads(config_obj.config_value)
-            else:
-                config = self.get_default_config()
-            
-            return Response({'config': config})
-        except Exception as e:
-            return Response({'config': self.get_default_config()})
+        """获取全局配置（缓存，支持 ETag / If-None-Match）"""
+        bundle = ConfigCache.get_bundle(ConfigCache.CONFIG)
+        config = bundle['data'].get(self.CONFIG_KEY)
+        if not isinstance(config, dict):
+            config = self.get_default_config()
+        return etag_response(request, {'config': config}, bundle['etag'])
     
     def post(self, request):
         """保存全局配置"""
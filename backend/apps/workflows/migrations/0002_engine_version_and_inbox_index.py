@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflows', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workflowinstance',
+            name='context',
+            field=models.JSONField(blank=True, default=dict, verbose_name='流程变量'),
+        ),
+        migrations.AddField(
+            model_name='workflowtemplate',
+            name='version',
+            field=models.PositiveIntegerField(default=1, verbose_name='版本'),
+        ),
+        migrations.AddIndex(
+            model_name='workflowtask',
+            index=models.Index(fields=['assignee', 'status', '-created_at'], name='wf_task_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workflowtask',
+            index=models.Index(fields=['instance', 'status'], name='wf_task_instance_status_idx'),
+        ),
+    ]
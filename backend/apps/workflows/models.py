@@ -28,6 +28,8 @@ class WorkflowTemplate(models.Model):
     business_type = models.CharField('业务类型', max_length=30, choices=BusinessType.choices)
     description = models.TextField('描述', blank=True, null=True)
     is_active = models.BooleanField('是否启用', default=True)
+    # 节点或审批人变更时递增，编译后的节点图按 (模板, 版本) 缓存
+    version = models.PositiveIntegerField('版本', default=1)
     created_at = models.DateTimeField('创建时间', auto_now_add=True)
     updated_at = models.DateTimeField('更新时间', auto_now=True)
     
@@ -124,6 +126,8 @@ class WorkflowInstance(models.Model):
     business_no = models.CharField('业务单号', max_length=50)
     title = models.CharField('审批标题', max_length=200)
     status = models.CharField('状态', max_length=20, choices=Status.choices, default=Status.PENDING)
+    # 流程变量，条件节点据此选择分支，如 {"amount": 5000}
+    context = models.JSONField('流程变量', default=dict, blank=True)
     
     current_node = models.ForeignKey(
         WorkflowNode,
@@ -192,6 +196,11 @@ class WorkflowTask(models.Model):
         verbose_name = '审批任务'
         verbose_name_plural = '审批任务'
         ordering = ['-created_at']
+        indexes = [
+            # 待办收件箱: assignee + status 过滤，按创建时间倒序分页
+            models.Index(fields=['assignee', 'status', '-created_at'], name='wf_task_inbox_idx'),
+            models.Index(fields=['instance', 'status'], name='wf_task_instance_status_idx'),
+        ]
     
     def __str__(self):
         return f"{self.instance.title} - {self.assignee.display_name if self.assignee else '未指定'}"
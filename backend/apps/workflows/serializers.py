@@ -19,6 +19,11 @@ class WorkflowTemplateSerializer(serializers.ModelSerializer):
 class WorkflowTaskSerializer(serializers.ModelSerializer):
     assignee_name = serializers.CharField(source='assignee.display_name', read_only=True)
     node_name = serializers.CharField(source='node.name', read_only=True)
+    # 待办列表展示所需的流程信息（视图已 select_related）
+    instance_title = serializers.CharField(source='instance.title', read_only=True)
+    business_type = serializers.CharField(source='instance.business_type', read_only=True)
+    business_no = serializers.CharField(source='instance.business_no', read_only=True)
+    initiator_name = serializers.CharField(source='instance.initiator.display_name', read_only=True, default=None)
     
     class Meta:
         model = WorkflowTask
@@ -33,3 +38,12 @@ class WorkflowInstanceSerializer(serializers.ModelSerializer):
     class Meta:
         model = WorkflowInstance
         fields = '__all__'
+        # 流程状态由 WorkflowEngine 推进，流程变量由业务单据生成
+        read_only_fields = ['status', 'context', 'current_node', 'initiator', 'completed_at']
+
+
+class WorkflowBulkProcessSerializer(serializers.Serializer):
+    """批量审批"""
+    task_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=500)
+    action = serializers.ChoiceField(choices=['approve', 'reject'])
+    comment = serializers.CharField(required=False, allow_blank=True, default='')
@@ -0,0 +1,413 @@
+"""
+审批流程引擎 - 精臣云资产管理系统
+
+- CompiledWorkflow: 模板编译后的节点图，按 (模板, 版本) 缓存在进程内，推进流程时不再逐节点查询
+- WorkflowEngine: 发起、批量审批/拒绝、撤销流程
+    - 发起时流程变量（条件分支依据）由服务端从业务单据生成，不接受客户端传入
+    - 审批人按节点类型批量解析（指定人员/角色/部门主管/直接上级/发起人）
+    - 下一节点任务 bulk_create 批量创建，处理 N 个任务的查询数与 N 无关
+    - 同一节点多名审批人为或签：任一人处理后其余待办自动取消
+    - 节点未解析到审批人时自动通过
+"""
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+from django.apps import apps
+from django.db import transaction
+from django.utils import timezone
+
+from apps.common.exceptions import BusinessException, NotFoundError, ValidationError
+from .models import WorkflowTemplate, WorkflowNode, WorkflowInstance, WorkflowTask
+
+logger = logging.getLogger(__name__)
+
+
+class CompiledNode:
+    """编译后的节点（只读）"""
+
+    __slots__ = ('id', 'name', 'node_type', 'approver_type', 'approver_ids', 'role_ids', 'conditions', 'next_id')
+
+    def __init__(self, row, approver_ids, role_ids, next_id):
+        self.id = row['id']
+        self.name = row['name']
+        self.node_type = row['node_type']
+        self.approver_type = row['approver_type']
+        self.conditions = row['conditions'] or {}
+        self.approver_ids = tuple(approver_ids)
+        self.role_ids = tuple(role_ids)
+        self.next_id = next_id
+
+
+class CompiledWorkflow:
+    """
+    流程模板节点图
+
+    节点未设置 next_node 时按 sort_order 顺序流转；条件节点的 conditions 格式:
+        {"branches": [{"field": "amount", "operator": "gt", "value": 5000, "next_node": 12}],
+         "default_node": 13}
+    """
+
+    OPERATORS = {
+        'eq': lambda a, b: a == b,
+        'ne': lambda a, b: a != b,
+        'gt': lambda a, b: a is not None and a > b,
+        'gte': lambda a, b: a is not None and a >= b,
+        'lt': lambda a, b: a is not None and a < b,
+        'lte': lambda a, b: a is not None and a <= b,
+        'in': lambda a, b: a in (b or []),
+    }
+
+    def __init__(self, template_id: int):
+        rows = list(
+            WorkflowNode.objects.filter(template_id=template_id).order_by('sort_order', 'id').values(
+                'id', 'name', 'node_type', 'approver_type', 'conditions', 'next_node_id'
+            )
+        )
+        approvers = self._group(
+            WorkflowNode.approvers.through.objects.filter(workflownode__template_id=template_id)
+            .values_list('workflownode_id', 'user_id')
+        )
+        roles = self._group(
+            WorkflowNode.roles.through.objects.filter(workflownode__template_id=template_id)
+            .values_list('workflownode_id', 'role_id')
+        )
+
+        self.nodes: Dict[int, CompiledNode] = {}
+        for index, row in enumerate(rows):
+            next_id = row['next_node_id']
+            if next_id is None and index + 1 < len(rows):
+                next_id = rows[index + 1]['id']
+            self.nodes[row['id']] = CompiledNode(
+                row, approvers.get(row['id'], ()), roles.get(row['id'], ()), next_id
+            )
+
+        start = next((row['id'] for row in rows if row['node_type'] == WorkflowNode.NodeType.START), None)
+        self.start_id = start if start is not None else (rows[0]['id'] if rows else None)
+
+    @staticmethod
+    def _group(pairs) -> Dict[int, List[int]]:
+        grouped = {}
+        for key, value in pairs:
+            grouped.setdefault(key, []).append(value)
+        return grouped
+
+    def next_id(self, node_id: int, context: Dict) -> Optional[int]:
+        node = self.nodes[node_id]
+        if node.node_type == WorkflowNode.NodeType.CONDITION:
+            for branch in node.conditions.get('branches', []):
+                compare = self.OPERATORS.get(branch.get('operator', 'eq'))
+                if compare and compare(context.get(branch.get('field')), branch.get('value')):
+                    return branch.get('next_node')
+            return node.conditions.get('default_node') or node.next_id
+        return node.next_id
+
+    def next_approval(self, from_id: Optional[int], context: Dict) -> Optional[CompiledNode]:
+        """
+        从 from_id（None 表示开始节点）之后找到下一个审批节点
+
+        开始/抄送/条件节点直接流转；到达结束节点或无后续节点时返回 None
+        """
+        node_id = self.start_id if from_id is None else self.next_id(from_id, context)
+        visited = set()
+        while node_id is not None:
+            if node_id in visited or node_id not in self.nodes:
+                raise BusinessException('审批流程配置有误：节点循环或引用了不存在的节点')
+            visited.add(node_id)
+            node = self.nodes[node_id]
+            if node.node_type == WorkflowNode.NodeType.APPROVAL:
+                return node
+            if node.node_type == WorkflowNode.NodeType.END:
+                return None
+            node_id = self.next_id(node_id, context)
+        return None
+
+
+class WorkflowEngine:
+    """审批流程引擎"""
+
+    BATCH_SIZE = 500
+
+    # 业务类型 -> 业务单据模型（流程变量取自单据字段）
+    BUSINESS_MODELS = {
+        WorkflowTemplate.BusinessType.ASSET_RECEIVE: 'assets.AssetReceive',
+        WorkflowTemplate.BusinessType.ASSET_RETURN: 'assets.AssetReceive',
+        WorkflowTemplate.BusinessType.ASSET_BORROW: 'assets.AssetBorrow',
+        WorkflowTemplate.BusinessType.ASSET_GIVE_BACK: 'assets.AssetBorrow',
+        WorkflowTemplate.BusinessType.ASSET_TRANSFER: 'assets.AssetTransfer',
+        WorkflowTemplate.BusinessType.ASSET_DISPOSAL: 'assets.AssetDisposal',
+        WorkflowTemplate.BusinessType.ASSET_CHANGE: 'assets.Asset',
+        WorkflowTemplate.BusinessType.PURCHASE_REQUEST: 'procurement.PurchaseRequest',
+        WorkflowTemplate.BusinessType.CONSUMABLE_RECEIVE: 'consumables.ConsumableOutbound',
+    }
+
+    @classmethod
+    def get_compiled(cls, template) -> CompiledWorkflow:
+        """编译模板，按 (模板, 版本) 缓存在进程内"""
+        return cls._compile_cached(template.id, template.version)
+
+    @staticmethod
+    @lru_cache(maxsize=128)
+    def _compile_cached(template_id, version):
+        return CompiledWorkflow(template_id)
+
+    @classmethod
+    def build_context(cls, template, business_type: str, business_id: int) -> Dict:
+        """
+        从业务单据生成流程变量：单据的标量字段（外键取ID，金额转为数值，日期转为 ISO 字符串）
+
+        Raises:
+            ValidationError: 业务类型与模板不一致
+            NotFoundError: 业务单据不存在或不属于模板所属公司
+        """
+        if business_type != template.business_type:
+            raise ValidationError('业务类型与流程模板不一致')
+        model = apps.get_model(cls.BUSINESS_MODELS[business_type])
+        business = model.objects.filter(pk=business_id, company_id=template.company_id).first()
+        if business is None:
+            raise NotFoundError('业务单据不存在')
+
+        context = {}
+        for field in model._meta.concrete_fields:
+            value = getattr(business, field.attname)
+            if isinstance(value, Decimal):
+                value = float(value)
+            elif isinstance(value, (date, datetime)):
+                value = value.isoformat()
+            elif not isinstance(value, (str, int, float, bool, type(None))):
+                continue
+            context[field.attname] = value
+        return context
+
+    @classmethod
+    @transaction.atomic
+    def create_and_start(cls, validated_data: Dict, user) -> WorkflowInstance:
+        """创建流程实例并发起；模板未启用等失败时实例一并回滚"""
+        template = validated_data.get('template')
+        if template is None:
+            raise ValidationError('请选择流程模板')
+        context = cls.build_context(template, validated_data['business_type'], validated_data['business_id'])
+        instance = WorkflowInstance.objects.create(**validated_data, context=context, initiator=user)
+        cls.start(instance)
+        return instance
+
+    @classmethod
+    def start(cls, instance) -> Dict:
+        """发起流程：从开始节点推进到第一个审批节点并创建待办"""
+        template = instance.template
+        if template is None or not template.is_active:
+            raise BusinessException('审批流程模板不存在或未启用')
+        with transaction.atomic():
+            return cls._advance([(instance, None)], timezone.now())
+
+    @classmethod
+    def process(cls, task_ids: Iterable[int], user, approve: bool, comment: str = '') -> Dict:
+        """
+        批量审批通过/拒绝
+
+        Args:
+            task_ids: 审批任务ID列表
+            user: 当前审批人（只能处理分配给自己的待办）
+            approve: True 通过 / False 拒绝
+            comment: 审批意见
+
+        Returns:
+            {'processed': [任务ID], 'failed': {任务ID: 原因}, 'finished': [已结束的流程实例ID]}
+        """
+        failed = {}
+        valid_ids = []
+        for task_id in task_ids:
+            try:
+                valid_ids.append(int(task_id))
+            except (TypeError, ValueError):
+                failed[task_id] = '审批任务不存在'
+        task_ids = list(dict.fromkeys(valid_ids))
+        now = timezone.now()
+
+        with transaction.atomic():
+            tasks = {
+                task.pk: task for task in WorkflowTask.objects.select_for_update(of=('self',))
+                .select_related('instance__template')
+                .filter(pk__in=task_ids)
+            }
+
+            valid = {}
+            for task_id in task_ids:
+                task = tasks.get(task_id)
+                if task is None:
+                    failed[task_id] = '审批任务不存在'
+                elif task.assignee_id != user.id:
+                    failed[task_id] = '不是当前审批人'
+                elif task.status != WorkflowTask.Status.PENDING or task.instance.status != WorkflowInstance.Status.PENDING:
+                    failed[task_id] = '审批任务已处理'
+                elif task.instance_id in valid:
+                    # 同一流程只处理一次，其余待办随或签一并取消
+                    failed[task_id] = '同一流程已在本批次中处理'
+                else:
+                    valid[task.instance_id] = task
+
+            if not valid:
+                return {'processed': [], 'failed': failed, 'finished': []}
+
+            processed = [task.pk for task in valid.values()]
+            instance_ids = list(valid)
+            WorkflowTask.objects.filter(pk__in=processed).update(
+                status=WorkflowTask.Status.APPROVED if approve else WorkflowTask.Status.REJECTED,
+                comment=comment,
+                completed_at=now
+            )
+            # 或签：同一流程的其他待办取消
+            WorkflowTask.objects.filter(
+                instance_id__in=instance_ids, status=WorkflowTask.Status.PENDING
+            ).exclude(pk__in=processed).update(status=WorkflowTask.Status.CANCELLED, completed_at=now)
+
+            if approve:
+                result = cls._advance(
+                    [(task.instance, task.node_id or task.instance.current_node_id) for task in valid.values()],
+                    now
+                )
+                finished = result['finished']
+            else:
+                WorkflowInstance.objects.filter(pk__in=instance_ids).update(
+                    status=WorkflowInstance.Status.REJECTED, completed_at=now
+                )
+                finished = instance_ids
+
+        return {'processed': processed, 'failed': failed, 'finished': finished}
+
+    @classmethod
+    def cancel(cls, instance) -> None:
+        """撤销流程并取消全部待办"""
+        if instance.status != WorkflowInstance.Status.PENDING:
+            raise BusinessException('流程已结束，无法取消')
+        now = timezone.now()
+        with transaction.atomic():
+            WorkflowInstance.objects.filter(pk=instance.pk).update(
+                status=WorkflowInstance.Status.CANCELLED, completed_at=now
+            )
+            WorkflowTask.objects.filter(instance=instance, status=WorkflowTask.Status.PENDING).update(
+                status=WorkflowTask.Status.CANCELLED, completed_at=now
+            )
+
+    @classmethod
+    def _advance(cls, moves, now) -> Dict:
+        """
+        将一批流程实例推进到下一审批节点
+
+        每一轮为全部实例批量解析审批人；无审批人的节点自动通过进入下一轮，
+        轮数取决于流程深度而非实例数量。同一实例再次自动通过同一节点说明
+        无审批人的节点构成循环，抛出 BusinessException。
+
+        Args:
+            moves: [(instance, 已完成的节点ID 或 None)]
+
+        Returns:
+            {'finished': [结束的实例ID], 'created': 新建待办数}
+        """
+        finished = []
+        moved = []
+        auto_passed = {}
+        pending = list(moves)
+        while pending:
+            targets = []
+            for instance, from_id in pending:
+                if instance.template is None:
+                    finished.append(instance)
+                    continue
+                node = cls.get_compiled(instance.template).next_approval(from_id, instance.context or {})
+                if node is None:
+                    finished.append(instance)
+                else:
+                    targets.append((instance, node))
+
+            approvers = cls._resolve_approvers(targets)
+            pending = []
+            for instance, node in targets:
+                user_ids = approvers[instance.pk, node.id]
+                if user_ids:
+                    moved.append((instance, node, user_ids))
+                else:
+                    passed = auto_passed.setdefault(instance.pk, set())
+                    if node.id in passed:
+                        raise BusinessException(f'审批流程配置有误：无审批人的节点 {node.name} 形成循环')
+                    passed.add(node.id)
+                    logger.info(f"[Workflow] 实例 {instance.pk} 节点 {node.name} 无审批人，自动通过")
+                    pending.append((instance, node.id))
+
+        tasks = [
+            WorkflowTask(instance=instance, node_id=node.id, assignee_id=user_id)
+            for instance, node, user_ids in moved
+            for user_id in user_ids
+        ]
+        WorkflowTask.objects.bulk_create(tasks, batch_size=cls.BATCH_SIZE)
+
+        if moved:
+            for instance, node, _ in moved:
+                instance.current_node_id = node.id
+            WorkflowInstance.objects.bulk_update(
+                [instance for instance, _, _ in moved], ['current_node'], batch_size=cls.BATCH_SIZE
+            )
+        if finished:
+            WorkflowInstance.objects.filter(pk__in=[instance.pk for instance in finished]).update(
+                status=WorkflowInstance.Status.APPROVED, current_node=None, completed_at=now
+            )
+            for instance in finished:
+                instance.status = WorkflowInstance.Status.APPROVED
+
+        return {'finished': [instance.pk for instance in finished], 'created': len(tasks)}
+
+    @staticmethod
+    def _resolve_approvers(targets) -> Dict:
+        """
+        批量解析审批人
+
+        角色成员、发起人部门主管各一次查询，与实例数量无关
+
+        Returns:
+            {(实例ID, 节点ID): [用户ID]}
+        """
+        from apps.accounts.models import User, UserRole
+
+        ApproverType = WorkflowNode.ApproverType
+        role_ids = {
+            role_id for _, node in targets if node.approver_type == ApproverType.ROLE for role_id in node.role_ids
+        }
+        role_members = {}
+        if role_ids:
+            for role_id, user_id in UserRole.objects.filter(
+                role_id__in=role_ids, user__is_active=True
+            ).values_list('role_id', 'user_id'):
+                role_members.setdefault(role_id, []).append(user_id)
+
+        initiator_ids = {
+            instance.initiator_id for instance, node in targets
+            if node.approver_type in (ApproverType.DEPARTMENT_MANAGER, ApproverType.SUPERIOR)
+        }
+        managers = {}
+        if initiator_ids:
+            managers = {
+                user_id: (manager_id, parent_manager_id)
+                for user_id, manager_id, parent_manager_id in User.objects.filter(id__in=initiator_ids).values_list(
+                    'id', 'department__manager_id', 'department__parent__manager_id'
+                )
+            }
+
+        resolved = {}
+        for instance, node in targets:
+            approver_type = node.approver_type
+            if approver_type == ApproverType.ROLE:
+                user_ids = [user_id for role_id in node.role_ids for user_id in role_members.get(role_id, [])]
+            elif approver_type == ApproverType.DEPARTMENT_MANAGER:
+                user_ids = [managers.get(instance.initiator_id, (None, None))[0]]
+            elif approver_type == ApproverType.SUPERIOR:
+                # 直接上级：本部门负责人；发起人本身是负责人时取上级部门负责人
+                manager_id, parent_manager_id = managers.get(instance.initiator_id, (None, None))
+                user_ids = [parent_manager_id if manager_id == instance.initiator_id else manager_id]
+            elif approver_type == ApproverType.SELF:
+                user_ids = [instance.initiator_id]
+            else:
+                user_ids = list(node.approver_ids)
+            resolved[instance.pk, node.id] = [user_id for user_id in dict.fromkeys(user_ids) if user_id]
+        return resolved
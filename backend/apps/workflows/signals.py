@@ -0,0 +1,32 @@
+"""
+审批流程信号处理
+
+节点或节点审批人/角色变更时递增模板版本，使编译后的节点图缓存失效
+"""
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .models import WorkflowTemplate, WorkflowNode
+
+
+def bump_template_version(template_id):
+    WorkflowTemplate.objects.filter(pk=template_id).update(version=F('version') + 1)
+
+
+@receiver([post_save, post_delete], sender=WorkflowNode)
+def invalidate_on_node_change(sender, instance, **kwargs):
+    bump_template_version(instance.template_id)
+
+
+@receiver(m2m_changed, sender=WorkflowNode.approvers.through)
+@receiver(m2m_changed, sender=WorkflowNode.roles.through)
+def invalidate_on_node_members_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        bump_template_version(instance.template_id)
+    else:
+        # 从用户/角色一侧修改时，instance 为用户或角色
+        template_ids = WorkflowNode.objects.filter(pk__in=pk_set or ()).values_list('template_id', flat=True)
+        WorkflowTemplate.objects.filter(pk__in=set(template_ids)).update(version=F('version') + 1)
@@ -6,8 +6,10 @@ from django_filters.rest_framework import DjangoFilterBackend
 
 from .models import WorkflowTemplate, WorkflowInstance, WorkflowTask
 from .serializers import (
-    WorkflowTemplateSerializer, WorkflowInstanceSerializer, WorkflowTaskSerializer
+    WorkflowTemplateSerializer, WorkflowInstanceSerializer, WorkflowTaskSerializer,
+    WorkflowBulkProcessSerializer
 )
+from .services import WorkflowEngine
 
 
 class WorkflowTemplateViewSet(viewsets.ModelViewSet):
@@ -26,21 +28,17 @@ class WorkflowInstanceViewSet(viewsets.ModelViewSet):
     filterset_fields = ['template', 'status', 'initiator']
     
     def perform_create(self, serializer):
-        serializer.save(initiator=self.request.user)
+        serializer.instance = WorkflowEngine.create_and_start(serializer.validated_data, self.request.user)
     
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
         """取消流程"""
-        instance = self.get_object()
-        if instance.status in ['completed', 'cancelled']:
-            return Response({'error': '流程已结束，无法取消'}, status=status.HTTP_400_BAD_REQUEST)
-        instance.status = 'cancelled'
-        instance.save()
+        WorkflowEngine.cancel(self.get_object())
         return Response({'message': '流程已取消'})
 
 
 class WorkflowTaskViewSet(viewsets.ModelViewSet):
-    queryset = WorkflowTask.objects.all()
+    queryset = WorkflowTask.objects.select_related('instance__initiator', 'node', 'assignee')
     serializer_class = WorkflowTaskSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
@@ -48,60 +46,45 @@ class WorkflowTaskViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def my_tasks(self, request):
-        """获取我的待办任务"""
+        """获取我的待办任务（分页，默认待处理；?status= 可查看已处理）"""
         tasks = self.get_queryset().filter(
             assignee=request.user,
-            status='pending'
-        )
-        serializer = self.get_serializer(tasks, many=True)
-        return Response(serializer.data)
+            status=request.query_params.get('status', WorkflowTask.Status.PENDING)
+        ).order_by('-created_at')
+        page = self.paginate_queryset(tasks)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
     
     @action(detail=True, methods=['post'])
     def approve(self, request, pk=None):
         """审批通过"""
-        task = self.get_object()
-        comment = request.data.get('comment', '')
-        
-        task.status = 'approved'
-        task.comment = comment
-        task.save()
-        
-        # 处理后续节点
-        self._process_next_node(task.instance)
-        
-        return Response({'message': '审批通过'})
+        return self._process([pk], True, request.data.get('comment', ''), '审批通过')
     
     @action(detail=True, methods=['post'])
     def reject(self, request, pk=None):
         """审批拒绝"""
-        task = self.get_object()
-        comment = request.data.get('comment', '')
-        
-        task.status = 'rejected'
-        task.comment = comment
-        task.save()
-        
-        # 更新流程状态
-        task.instance.status = 'rejected'
-        task.instance.save()
+        return self._process([pk], False, request.data.get('comment', ''), '已拒绝')
+    
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_process(self, request):
+        """
+        批量审批 - 委托给 WorkflowEngine
         
-        return Response({'message': '已拒绝'})
+        请求体：{"task_ids": [...], "action": "approve" | "reject", "comment": ""}
+        逐条返回失败原因，其余任务正常处理。
+        """
+        serializer = WorkflowBulkProcessSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        result = WorkflowEngine.process(
+            data['task_ids'], request.user, data['action'] == 'approve', data.get('comment', '')
+        )
+        return Response(result)
     
-    def _process_next_node(self, instance):
-        """处理下一个节点"""
-        current_node = instance.current_node
-        if current_node:
-            next_node = WorkflowNode.objects.filter(
-                template=instance.template,
-                order=current_node.order + 1
-            ).first()
-            
-            if next_node:
-                # 创建下一个任务
-                instance.current_node = next_node
-                instance.save()
-                # 这里需要实现分配审批人的逻辑
-            else:
-                # 流程结束
-                instance.status = 'completed'
-                instance.save()
+    def _process(self, task_ids, approve, comment, message):
+        result = WorkflowEngine.process(task_ids, self.request.user, approve, comment)
+        if result['failed']:
+            return Response(
+                {'error': next(iter(result['failed'].values()))}, status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({'message': message, **result})
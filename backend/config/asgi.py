@@ -0,0 +1,10 @@
+"""
+ASGI 配置 - 精臣云资产管理系统
+
+GUNICORN_PROFILE=asgi 时由 uvicorn worker 加载，异步视图等待第三方平台响应时不占用 worker
+"""
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+application = get_asgi_application()
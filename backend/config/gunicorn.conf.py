@@ -0,0 +1,41 @@
+"""
+Gunicorn 配置 - 精臣云资产管理系统
+
+通过 GUNICORN_PROFILE 选择 worker 模式:
+- sync:   同步 worker（默认），适合 CPU/数据库密集的常规接口
+- asgi:   uvicorn worker 加载 config.asgi，SSO 回调、连接测试、消息推送等异步视图
+          等待第三方平台时让出事件循环，一个慢 IdP 不会占满 worker
+- gevent: 协程 worker 加载 config.wsgi，requests 等阻塞 I/O 经 monkey patch 后协作调度；
+          需额外安装 gevent、psycogreen，且每个协程独占数据库连接，建议配合 DB_POOL_MODE=pgbouncer
+
+用法:
+    gunicorn -c config/gunicorn.conf.py
+    GUNICORN_PROFILE=asgi gunicorn -c config/gunicorn.conf.py
+"""
+import os
+
+profile = os.environ.get('GUNICORN_PROFILE', 'sync')
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 4))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+if profile == 'asgi':
+    wsgi_app = 'config.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+elif profile == 'gevent':
+    wsgi_app = 'config.wsgi:application'
+    worker_class = 'gevent'
+    worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 200))
+
+    def post_fork(server, worker):
+        """psycopg2 默认阻塞整个进程，fork 后为其打上 gevent 补丁"""
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+elif profile == 'sync':
+    wsgi_app = 'config.wsgi:application'
+    worker_class = 'sync'
+else:
+    raise RuntimeError(f'未知的 GUNICORN_PROFILE: {profile}（可选 sync / asgi / gevent）')
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+数据库连接管理压测脚本 - 对比不同连接配置下资产列表接口的吞吐量
+
+用法（后端需已启动，每种配置重启一次 gunicorn 后运行）:
+
+    # 1. 基线：每个请求新建连接
+    DB_CONN_MAX_AGE=0 gunicorn config.wsgi:application --workers 4
+    python scripts/benchmark_db_connections.py --label no-persist
+
+    # 2. 持久连接 + 健康检查
+    DB_CONN_MAX_AGE=60 gunicorn config.wsgi:application --workers 4
+    python scripts/benchmark_db_connections.py --label persistent
+
+    # 3. psycopg 3 连接池 / PgBouncer
+    DB_POOL_MODE=psycopg gunicorn ...
+    DB_POOL_MODE=pgbouncer DATABASE_URL=postgres://...@pgbouncer:6432/... gunicorn ...
+
+参数:
+    --url          接口地址（默认 http://localhost:8000/api/assets/list/?page_size=20）
+    --username / --password  登录账号（默认读取 BENCH_USERNAME / BENCH_PASSWORD）
+    --requests     总请求数（默认 2000）
+    --concurrency  并发数（默认 16）
+
+结果追加到 logs/benchmark_db_connections.csv，便于前后对比。
+"""
+import argparse
+import csv
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+
+def get_token(base_url, username, password):
+    """通过 JWT 登录接口获取访问令牌"""
+    response = requests.post(
+        f'{base_url}/api/auth/login/',
+        json={'username': username, 'password': password},
+        timeout=30
+    )
+    response.raise_for_status()
+    return response.json()['access']
+
+
+def run(url, token, total, concurrency):
+    """并发请求接口，返回 (每次耗时列表, 失败数, 总耗时)"""
+    session_headers = {'Authorization': f'Bearer {token}'}
+    latencies = []
+    failures = 0
+
+    def worker(count):
+        session = requests.Session()
+        session.headers.update(session_headers)
+        local = []
+        local_failures = 0
+        for _ in range(count):
+            started = time.perf_counter()
+            try:
+                response = session.get(url, timeout=30)
+                if response.status_code != 200:
+                    local_failures += 1
+            except requests.RequestException:
+                local_failures += 1
+            local.append(time.perf_counter() - started)
+        return local, local_failures
+
+    per_worker = [total // concurrency + (1 if i < total % concurrency else 0) for i in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for result, result_failures in executor.map(worker, per_worker):
+            latencies.extend(result)
+            failures += result_failures
+    elapsed = time.perf_counter() - started
+    return latencies, failures, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='资产列表接口连接配置压测')
+    parser.add_argument('--url', default='http://localhost:8000/api/assets/list/?page_size=20')
+    parser.add_argument('--username', default=os.environ.get('BENCH_USERNAME', 'admin'))
+    parser.add_argument('--password', default=os.environ.get('BENCH_PASSWORD', 'admin123'))
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--label', default=os.environ.get('DB_POOL_MODE', 'none'))
+    args = parser.parse_args()
+
+    base_url = args.url.split('/api/')[0]
+    try:
+        token = get_token(base_url, args.username, args.password)
+    except requests.RequestException as e:
+        print(f'登录失败: {e}')
+        sys.exit(1)
+
+    # 预热：让各 worker 建立连接
+    run(args.url, token, args.warmup, min(args.concurrency, args.warmup))
+
+    latencies, failures, elapsed = run(args.url, token, args.requests, args.concurrency)
+    latencies.sort()
+    rps = len(latencies) / elapsed if elapsed else 0
+    p50 = statistics.median(latencies) * 1000
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+
+    print(f'[{args.label}] {len(latencies)} requests, concurrency={args.concurrency}')
+    print(f'  RPS: {rps:.1f}')
+    print(f'  latency p50={p50:.1f}ms p95={p95:.1f}ms p99={p99:.1f}ms')
+    print(f'  failures: {failures}')
+
+    log_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs')
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, 'benchmark_db_connections.csv')
+    is_new = not os.path.exists(log_path)
+    with open(log_path, 'a', newline='') as f:
+        writer = csv.writer(f)
+        if is_new:
+            writer.writerow(['time', 'label', 'requests', 'concurrency', 'rps', 'p50_ms', 'p95_ms', 'p99_ms', 'failures'])
+        writer.writerow([
+            datetime.now().isoformat(timespec='seconds'), args.label, len(latencies), args.concurrency,
+            f'{rps:.1f}', f'{p50:.1f}', f'{p95:.1f}', f'{p99:.1f}', failures
+        ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+两步登录压测脚本 - 模拟登录高峰，统计 verify-credentials / complete-login 的延迟分布
+
+两种模式:
+
+    # 1. 登录链路压测（后端需已启动）：每个虚拟用户依次调用两步登录，统计 p50 / p95 / p99
+    python scripts/benchmark_login.py flow --username admin --password admin123
+    python scripts/benchmark_login.py flow --users-file users.csv --requests 2000 --concurrency 200
+
+    # 2. 密码哈希成本测量（无需后端）：不同 PBKDF2 迭代次数下单次校验耗时与单核吞吐
+    python scripts/benchmark_login.py hashers --iterations 260000 600000 1000000 --budget-ms 150
+
+登录第一步的耗时主要是密码校验（与 PBKDF2 迭代次数成正比，占满一个 CPU 核心），
+公司列表已缓存。调整 PASSWORD_PBKDF2_ITERATIONS 的建议流程:
+    1) 用 hashers 模式在生产同规格机器上测出单次校验耗时，选取不超过 --budget-ms 的最大迭代次数
+       （OWASP 对 PBKDF2-SHA256 的建议下限为 600000，不建议低于此值换取吞吐）
+    2) 以新值启动后端，用 flow 模式复测，p99 应接近 (并发数 / worker 核数) × 单次校验耗时
+    3) 已有密码在用户下次登录时自动按新迭代次数重新哈希，无需迁移
+
+参数 (flow):
+    --base-url     后端地址（默认 http://localhost:8000）
+    --username / --password   单个压测账号（所有请求共用）
+    --users-file   每行 "用户名,密码" 的 CSV，按轮询分配给请求
+    --requests     完整登录次数（默认 500）
+    --concurrency  并发数（默认 50）
+
+结果追加到 logs/benchmark_login.csv，便于前后对比。
+"""
+import argparse
+import csv
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[max(int(len(values) * pct) - 1, 0)] if values else 0
+
+
+def summarize(latencies):
+    """(p50, p95, p99) 毫秒"""
+    if not latencies:
+        return 0, 0, 0
+    return (
+        statistics.median(latencies) * 1000,
+        percentile(latencies, 0.95) * 1000,
+        percentile(latencies, 0.99) * 1000,
+    )
+
+
+def append_csv(filename, header, row):
+    log_dir = os.path.join(BACKEND_DIR, 'logs')
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, filename)
+    is_new = not os.path.exists(log_path)
+    with open(log_path, 'a', newline='') as f:
+        writer = csv.writer(f)
+        if is_new:
+            writer.writerow(header)
+        writer.writerow(row)
+
+
+# ==================== 登录链路压测 ====================
+
+def login_once(session, base_url, username, password):
+    """
+    执行一次两步登录
+
+    Returns:
+        (第一步耗时, 第二步耗时, 是否成功)
+    """
+    started = time.perf_counter()
+    try:
+        response = session.post(
+            f'{base_url}/api/auth/verify-credentials/',
+            json={'username': username, 'password': password},
+            timeout=120
+        )
+    except requests.RequestException:
+        return time.perf_counter() - started, None, False
+    step1 = time.perf_counter() - started
+    if response.status_code != 200:
+        return step1, None, False
+
+    data = response.json()
+    started = time.perf_counter()
+    try:
+        response = session.post(
+            f'{base_url}/api/auth/complete-login/',
+            json={'temp_token': data['temp_token'], 'company_id': data['companies'][0]['id']},
+            timeout=120
+        )
+    except requests.RequestException:
+        return step1, time.perf_counter() - started, False
+    return step1, time.perf_counter() - started, response.status_code == 200
+
+
+def load_users(args):
+    if args.users_file:
+        with open(args.users_file, newline='', encoding='utf-8') as f:
+            users = [(row[0].strip(), row[1].strip()) for row in csv.reader(f) if len(row) >= 2]
+        if not users:
+            print(f'{args.users_file} 中没有可用账号')
+            sys.exit(1)
+        return users
+    if not args.username or not args.password:
+        print('请指定 --username/--password 或 --users-file')
+        sys.exit(1)
+    return [(args.username, args.password)]
+
+
+def run_flow(args):
+    users = load_users(args)
+
+    # 预检：确认账号可以完成两步登录
+    step1, step2, ok = login_once(requests.Session(), args.base_url, *users[0])
+    if not ok:
+        print(f'登录预检失败，请确认后端地址与账号可用（第一步 {step1 * 1000:.0f}ms）')
+        sys.exit(1)
+
+    local = threading.local()
+
+    def call(index):
+        # 每个线程复用一个连接，避免把 TCP 建连计入登录耗时
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        return login_once(local.session, args.base_url, *users[index % len(users)])
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(call, range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    step1_latencies = [s1 for s1, _, _ in results]
+    step2_latencies = [s2 for _, s2, _ in results if s2 is not None]
+    total_latencies = [s1 + s2 for s1, s2, ok in results if ok]
+    failures = sum(1 for _, _, ok in results if not ok)
+    rps = len(total_latencies) / elapsed if elapsed else 0
+
+    s1 = summarize(step1_latencies)
+    s2 = summarize(step2_latencies)
+    total = summarize(total_latencies)
+    print(f'[{args.label}] {args.requests} logins, concurrency={args.concurrency}, {len(users)} accounts')
+    print(f'  elapsed: {elapsed:.1f}s, logins/s: {rps:.1f}, failures: {failures}')
+    print(f'  verify-credentials p50={s1[0]:.0f}ms p95={s1[1]:.0f}ms p99={s1[2]:.0f}ms')
+    print(f'  complete-login     p50={s2[0]:.0f}ms p95={s2[1]:.0f}ms p99={s2[2]:.0f}ms')
+    print(f'  full login         p50={total[0]:.0f}ms p95={total[1]:.0f}ms p99={total[2]:.0f}ms')
+
+    append_csv(
+        'benchmark_login.csv',
+        [
+            'time', 'label', 'requests', 'concurrency', 'accounts', 'elapsed_s', 'logins_per_s',
+            'step1_p50_ms', 'step1_p99_ms', 'step2_p50_ms', 'step2_p99_ms', 'p50_ms', 'p95_ms', 'p99_ms',
+            'failures'
+        ],
+        [
+            datetime.now().isoformat(timespec='seconds'), args.label, args.requests, args.concurrency,
+            len(users), f'{elapsed:.1f}', f'{rps:.1f}', f'{s1[0]:.0f}', f'{s1[2]:.0f}',
+            f'{s2[0]:.0f}', f'{s2[2]:.0f}', f'{total[0]:.0f}', f'{total[1]:.0f}', f'{total[2]:.0f}', failures
+        ]
+    )
+
+
+# ==================== 密码哈希成本 ====================
+
+def verify_samples(iterations, samples):
+    """在子进程中测量指定迭代次数下的单次密码校验耗时"""
+    from django.conf import settings
+    if not settings.configured:
+        settings.configure()
+    from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+    hasher = PBKDF2PasswordHasher()
+    encoded = hasher.encode('benchmark-password', hasher.salt(), iterations)
+    latencies = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        hasher.verify('benchmark-password', encoded)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def run_hashers(args):
+    from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+    configured = os.environ.get('PASSWORD_PBKDF2_ITERATIONS') or PBKDF2PasswordHasher.iterations
+    print(f'[{args.label}] PBKDF2-SHA256 verify cost, {args.samples} samples x {args.processes} processes '
+          f'(current setting: {configured})')
+    print(f'  {"iterations":>12} {"p50":>8} {"p99":>8} {"logins/s/core":>14} {"logins/s total":>15}')
+
+    recommended = None
+    for iterations in sorted(args.iterations):
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=args.processes) as executor:
+            batches = list(executor.map(verify_samples, [iterations] * args.processes, [args.samples] * args.processes))
+        elapsed = time.perf_counter() - started
+        latencies = [latency for batch in batches for latency in batch]
+        p50, _, p99 = summarize(latencies)
+        per_core = 1000 / p50 if p50 else 0
+        total = len(latencies) / elapsed if elapsed else 0
+        marker = ''
+        if p99 <= args.budget_ms:
+            recommended = iterations
+            marker = ' *'
+        print(f'  {iterations:>12} {p50:>6.1f}ms {p99:>6.1f}ms {per_core:>14.1f} {total:>15.1f}{marker}')
+        append_csv(
+            'benchmark_password_hashers.csv',
+            ['time', 'label', 'iterations', 'processes', 'samples', 'p50_ms', 'p99_ms', 'logins_per_s_core', 'logins_per_s_total'],
+            [
+                datetime.now().isoformat(timespec='seconds'), args.label, iterations, args.processes,
+                args.samples, f'{p50:.1f}', f'{p99:.1f}', f'{per_core:.1f}', f'{total:.1f}'
+            ]
+        )
+
+    if recommended:
+        print(f'  * within {args.budget_ms:.0f}ms budget; largest: PASSWORD_PBKDF2_ITERATIONS={recommended}')
+        if recommended < 600000:
+            print('  note: below the OWASP minimum of 600000 for PBKDF2-SHA256; prefer adding CPU over lowering it')
+    else:
+        print(f'  no tested value fits the {args.budget_ms:.0f}ms budget on this machine')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='两步登录压测 / 密码哈希成本测量')
+    parser.add_argument('--label', default=os.environ.get('GUNICORN_PROFILE', 'sync'))
+    subparsers = parser.add_subparsers(dest='mode', required=True)
+
+    flow = subparsers.add_parser('flow', help='压测 verify-credentials + complete-login')
+    flow.add_argument('--base-url', default='http://localhost:8000')
+    flow.add_argument('--username')
+    flow.add_argument('--password')
+    flow.add_argument('--users-file')
+    flow.add_argument('--requests', type=int, default=500)
+    flow.add_argument('--concurrency', type=int, default=50)
+
+    hashers = subparsers.add_parser('hashers', help='测量 PBKDF2 迭代次数对应的校验耗时')
+    hashers.add_argument('--iterations', type=int, nargs='+', default=[260000, 600000, 870000, 1000000])
+    hashers.add_argument('--samples', type=int, default=20)
+    hashers.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+    hashers.add_argument('--budget-ms', type=float, default=150)
+
+    args = parser.parse_args()
+    if args.mode == 'flow':
+        run_flow(args)
+    else:
+        run_hashers(args)
+
+
+if __name__ == '__main__':
+    main()
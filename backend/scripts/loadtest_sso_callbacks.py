@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+SSO 回调压测脚本 - 模拟慢 IdP，对比 sync / asgi worker 下的并发能力
+
+脚本内置一个模拟企业微信 API 的 HTTP 服务，每个请求固定延迟 --idp-latency 秒。
+压测期间同时以固定频率探测一个不访问第三方平台的接口，观察慢 IdP 是否拖垮其他 API。
+
+用法（后端需已启动，且已启用一条 provider=wework 的 SSOConfig）:
+
+    # 1. 同步 worker（基线）：4 个 worker 同一时间最多处理 4 个回调
+    SSO_WEWORK_API_BASE=http://127.0.0.1:9009/cgi-bin \\
+        gunicorn -c config/gunicorn.conf.py
+    python scripts/loadtest_sso_callbacks.py --label sync
+
+    # 2. ASGI worker：回调等待 IdP 时让出事件循环
+    GUNICORN_PROFILE=asgi SSO_WEWORK_API_BASE=http://127.0.0.1:9009/cgi-bin \\
+        gunicorn -c config/gunicorn.conf.py
+    python scripts/loadtest_sso_callbacks.py --label asgi
+
+参数:
+    --base-url     后端地址（默认 http://localhost:8000）
+    --idp-port     模拟 IdP 端口（默认 9009，需与 SSO_WEWORK_API_BASE 一致）
+    --idp-latency  模拟 IdP 每次调用延迟秒数（默认 1.0，一次回调调用 3 次 IdP）
+    --requests     回调请求总数（默认 200）
+    --concurrency  并发数（默认 50）
+    --probe-url    探测接口（默认 /api/sso/wework/login/）
+
+结果追加到 logs/loadtest_sso_callbacks.csv，便于前后对比。
+"""
+import argparse
+import csv
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+
+class MockIdPHandler(BaseHTTPRequestHandler):
+    """模拟企业微信 API：gettoken / auth/getuserinfo / user/get 统一返回成功"""
+
+    latency = 1.0
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        body = json.dumps({
+            'errcode': 0,
+            'errmsg': 'ok',
+            'access_token': 'mock-token',
+            'expires_in': 7200,
+            'userid': 'loadtest_user',
+            'name': '压测用户',
+            'mobile': '',
+            'email': '',
+            'avatar': '',
+            'department': [],
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_POST = do_GET
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_mock_idp(port, latency):
+    """在后台线程中启动模拟 IdP"""
+    MockIdPHandler.latency = latency
+    server = ThreadingHTTPServer(('0.0.0.0', port), MockIdPHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[max(int(len(values) * pct) - 1, 0)] if values else 0
+
+
+def run_callbacks(url, total, concurrency):
+    """并发请求回调接口，返回 (每次耗时列表, 失败数, 总耗时)"""
+    def call(index):
+        started = time.perf_counter()
+        try:
+            response = requests.get(url, params={'code': f'loadtest-{index}'}, timeout=120)
+            ok = response.status_code == 200
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - started, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(call, range(total)))
+    elapsed = time.perf_counter() - started
+    return [latency for latency, _ in results], sum(1 for _, ok in results if not ok), elapsed
+
+
+def run_probe(url, stop_event, interval=0.2):
+    """回调压测期间持续探测其他接口的响应时间"""
+    latencies = []
+    while not stop_event.is_set():
+        started = time.perf_counter()
+        try:
+            requests.get(url, timeout=120)
+        except requests.RequestException:
+            pass
+        latencies.append(time.perf_counter() - started)
+        stop_event.wait(interval)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SSO 回调慢 IdP 压测')
+    parser.add_argument('--base-url', default='http://localhost:8000')
+    parser.add_argument('--idp-port', type=int, default=9009)
+    parser.add_argument('--idp-latency', type=float, default=1.0)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--probe-url', default='/api/sso/wework/login/')
+    parser.add_argument('--label', default=os.environ.get('GUNICORN_PROFILE', 'sync'))
+    args = parser.parse_args()
+
+    server = start_mock_idp(args.idp_port, args.idp_latency)
+    callback_url = f'{args.base_url}/api/sso/wework/callback/'
+
+    # 预热并确认回调链路可用（首次调用会创建压测用户）
+    try:
+        response = requests.get(callback_url, params={'code': 'warmup'}, timeout=120)
+    except requests.RequestException as e:
+        print(f'后端不可达: {e}')
+        sys.exit(1)
+    if response.status_code != 200:
+        print(f'回调预检失败 ({response.status_code}): {response.text[:200]}')
+        print('请确认已启用 wework SSOConfig，且后端以 SSO_WEWORK_API_BASE 指向模拟 IdP 启动')
+        sys.exit(1)
+
+    stop_event = threading.Event()
+    with ThreadPoolExecutor(max_workers=1) as probe_executor:
+        probe_future = probe_executor.submit(run_probe, f'{args.base_url}{args.probe_url}', stop_event)
+        latencies, failures, elapsed = run_callbacks(callback_url, args.requests, args.concurrency)
+        stop_event.set()
+        probe_latencies = probe_future.result()
+    server.shutdown()
+
+    rps = len(latencies) / elapsed if elapsed else 0
+    # 单个回调在 IdP 上的理论耗时（3 次调用）
+    ideal = args.idp_latency * 3
+    p50 = statistics.median(latencies) * 1000
+    p95 = percentile(latencies, 0.95) * 1000
+    probe_p50 = statistics.median(probe_latencies) * 1000 if probe_latencies else 0
+    probe_p95 = percentile(probe_latencies, 0.95) * 1000
+
+    print(f'[{args.label}] {len(latencies)} callbacks, concurrency={args.concurrency}, idp latency={args.idp_latency}s')
+    print(f'  elapsed: {elapsed:.1f}s (ideal with full concurrency ≈ {ideal * args.requests / args.concurrency:.1f}s)')
+    print(f'  callbacks/s: {rps:.1f}')
+    print(f'  callback latency p50={p50:.0f}ms p95={p95:.0f}ms')
+    print(f'  probe {args.probe_url} p50={probe_p50:.0f}ms p95={probe_p95:.0f}ms ({len(probe_latencies)} samples)')
+    print(f'  failures: {failures}')
+
+    log_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs')
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, 'loadtest_sso_callbacks.csv')
+    is_new = not os.path.exists(log_path)
+    with open(log_path, 'a', newline='') as f:
+        writer = csv.writer(f)
+        if is_new:
+            writer.writerow([
+                'time', 'label', 'requests', 'concurrency', 'idp_latency', 'elapsed_s', 'rps',
+                'p50_ms', 'p95_ms', 'probe_p50_ms', 'probe_p95_ms', 'failures'
+            ])
+        writer.writerow([
+            datetime.now().isoformat(timespec='seconds'), args.label, len(latencies), args.concurrency,
+            args.idp_latency, f'{elapsed:.1f}', f'{rps:.1f}', f'{p50:.0f}', f'{p95:.0f}',
+            f'{probe_p50:.0f}', f'{probe_p95:.0f}', failures
+        ])
+
+
+if __name__ == '__main__':
+    main()
@@ -13,6 +13,17 @@ from .transfer_service import TransferService
 from .disposal_service import DisposalService
 from .maintenance_service import MaintenanceService
 from .batch_service import BatchImportExportService, BatchOperationService
+from .cross_transfer_service import CrossCompanyTransferService
+from .label_service import LabelRenderService
+from .thumbnail_service import ThumbnailService
+from .inventory_service import InventoryService
+from .report_service import ReportService
+from .asset_snapshot_service import AssetSnapshotService
+from .analytics_export_service import AnalyticsExportService
+from .replenishment_service import ReplenishmentService
+from .purchase_receipt_service import PurchaseReceiptService
+from .consumable_document_service import ConsumableDocumentService
+from .notification_push_service import NotificationPushService
 
 __all__ = [
     'AssetService',
@@ -23,4 +34,15 @@ __all__ = [
     'MaintenanceService',
     'BatchImportExportService',
     'BatchOperationService',
+    'CrossCompanyTransferService',
+    'LabelRenderService',
+    'ThumbnailService',
+    'InventoryService',
+    'ReportService',
+    'AssetSnapshotService',
+    'AnalyticsExportService',
+    'ReplenishmentService',
+    'PurchaseReceiptService',
+    'ConsumableDocumentService',
+    'NotificationPushService',
 ]
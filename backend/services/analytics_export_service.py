@@ -0,0 +1,274 @@
+"""
+分析数据导出服务 - Analytics Export Service
+
+将资产、资产操作记录、折旧记录、耗材库存导出为列式数据集（Parquet / Arrow IPC）:
+- 按 <数据集>/company_id=<公司>/month=<YYYY-MM>/part-0.<扩展名> 分区（Hive 风格），
+  pandas / pyarrow / DuckDB / Spark 可直接按目录读取并识别分区列
+- 查询按 (公司, 月份字段) 排序后以 .iterator() 分块读取，同一时刻只打开一个分区的写入器，
+  内存占用与数据量无关
+- 每列声明 Arrow 类型（金额为 decimal128、时间为 UTC timestamp），不经过 Excel 的类型与行数限制
+"""
+import json
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+import zipfile
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.apps import apps
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from apps.common.exceptions import BusinessException
+from .base import BaseService
+
+logger = logging.getLogger(__name__)
+
+MONEY = pa.decimal128(18, 2)
+TIMESTAMP = pa.timestamp('us', tz='UTC')
+
+
+class AnalyticsExportService(BaseService):
+    """分析数据导出业务服务"""
+
+    OUTPUT_DIR = 'analytics'
+    FORMATS = {'parquet': 'parquet', 'arrow': 'arrow'}
+    CHUNK_SIZE = 5000
+
+    # 数据集: 模型、公司字段、分区月份字段，以及 (列名, 查询路径, Arrow 类型)
+    DATASETS = {
+        'assets': {
+            'model': 'assets.Asset',
+            'company_field': 'company_id',
+            'month_field': 'created_at',
+            'columns': [
+                ('id', 'id', pa.int64()),
+                ('asset_code', 'asset_code', pa.string()),
+                ('name', 'name', pa.string()),
+                ('category_id', 'category_id', pa.int64()),
+                ('category_name', 'category__name', pa.string()),
+                ('status', 'status', pa.string()),
+                ('acquisition_method', 'acquisition_method', pa.string()),
+                ('acquisition_date', 'acquisition_date', pa.date32()),
+                ('original_value', 'original_value', MONEY),
+                ('current_value', 'current_value', MONEY),
+                ('accumulated_depreciation', 'accumulated_depreciation', MONEY),
+                ('useful_life', 'useful_life', pa.int32()),
+                ('quantity', 'quantity', pa.int32()),
+                ('using_department_id', 'using_department_id', pa.int64()),
+                ('using_department_name', 'using_department__name', pa.string()),
+                ('using_user_id', 'using_user_id', pa.int64()),
+                ('manage_department_id', 'manage_department_id', pa.int64()),
+                ('location_id', 'location_id', pa.int64()),
+                ('location_name', 'location__name', pa.string()),
+                ('supplier_id', 'supplier_id', pa.int64()),
+                ('is_deleted', 'is_deleted', pa.bool_()),
+                ('created_at', 'created_at', TIMESTAMP),
+                ('updated_at', 'updated_at', TIMESTAMP),
+            ],
+        },
+        'asset_operations': {
+            'model': 'assets.AssetOperation',
+            'company_field': 'asset__company_id',
+            'month_field': 'created_at',
+            'columns': [
+                ('id', 'id', pa.int64()),
+                ('asset_id', 'asset_id', pa.int64()),
+                ('asset_code', 'asset__asset_code', pa.string()),
+                ('operation_type', 'operation_type', pa.string()),
+                ('operation_no', 'operation_no', pa.string()),
+                ('description', 'description', pa.string()),
+                # JSON 以字符串保存，分析端按需解析
+                ('old_data', 'old_data', pa.string()),
+                ('new_data', 'new_data', pa.string()),
+                ('operator_id', 'operator_id', pa.int64()),
+                ('created_at', 'created_at', TIMESTAMP),
+            ],
+        },
+        'depreciation': {
+            'model': 'finance.DepreciationRecord',
+            'company_field': 'company_id',
+            # 期间本身即为 YYYY-MM
+            'month_field': 'period',
+            'columns': [
+                ('id', 'id', pa.int64()),
+                ('asset_id', 'asset_id', pa.int64()),
+                ('asset_code', 'asset__asset_code', pa.string()),
+                ('period', 'period', pa.string()),
+                ('depreciation_amount', 'depreciation_amount', MONEY),
+                ('accumulated_depreciation', 'accumulated_depreciation', MONEY),
+                ('current_value', 'current_value', MONEY),
+                ('created_at', 'created_at', TIMESTAMP),
+            ],
+        },
+        'consumable_stock': {
+            'model': 'consumables.ConsumableStock',
+            'company_field': 'consumable__company_id',
+            'month_field': 'updated_at',
+            'columns': [
+                ('id', 'id', pa.int64()),
+                ('consumable_id', 'consumable_id', pa.int64()),
+                ('consumable_code', 'consumable__code', pa.string()),
+                ('consumable_name', 'consumable__name', pa.string()),
+                ('category_name', 'consumable__category__name', pa.string()),
+                ('unit', 'consumable__unit', pa.string()),
+                ('price', 'consumable__price', MONEY),
+                ('warehouse_id', 'warehouse_id', pa.int64()),
+                ('warehouse_name', 'warehouse__name', pa.string()),
+                ('quantity', 'quantity', pa.int64()),
+                ('updated_at', 'updated_at', TIMESTAMP),
+            ],
+        },
+    }
+
+    @classmethod
+    def export_to_storage(cls, datasets: Optional[Iterable[str]] = None,
+                          company_ids: Optional[Iterable[int]] = None, fmt: str = 'parquet') -> Dict:
+        """
+        导出并打包为 zip 写入默认存储，供 Celery 任务与 API 调用
+
+        Returns:
+            {'format', 'path', 'url', 'size', 'datasets': {名称: {'rows', 'files'}}}
+        """
+        root = tempfile.mkdtemp(prefix='analytics-')
+        try:
+            summary = cls.export_to_directory(root, datasets, company_ids, fmt)
+            path = os.path.join(
+                cls.OUTPUT_DIR, timezone.now().strftime('%Y%m%d'), f'{uuid.uuid4().hex}.zip'
+            )
+            with tempfile.TemporaryFile() as buffer:
+                # Parquet / Arrow 文件已压缩，zip 仅作打包
+                with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as archive:
+                    for directory, _, filenames in os.walk(root):
+                        for filename in filenames:
+                            full_path = os.path.join(directory, filename)
+                            archive.write(full_path, os.path.relpath(full_path, root))
+                size = buffer.tell()
+                buffer.seek(0)
+                saved_path = default_storage.save(path, File(buffer))
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+        return {
+            'format': fmt,
+            'path': saved_path,
+            'url': default_storage.url(saved_path),
+            'size': size,
+            'datasets': summary,
+        }
+
+    @classmethod
+    def export_to_directory(cls, root: str, datasets: Optional[Iterable[str]] = None,
+                            company_ids: Optional[Iterable[int]] = None, fmt: str = 'parquet') -> Dict:
+        """
+        导出到本地目录（管理命令直接调用）
+
+        Returns:
+            {数据集名称: {'rows', 'files'}}
+        """
+        if fmt not in cls.FORMATS:
+            raise BusinessException(f'不支持的导出格式: {fmt}')
+        datasets = list(datasets or cls.DATASETS)
+        unknown = [name for name in datasets if name not in cls.DATASETS]
+        if unknown:
+            raise BusinessException(f'未知的数据集: {", ".join(unknown)}')
+
+        company_ids = list(company_ids) if company_ids is not None else None
+        summary = {}
+        for name in datasets:
+            summary[name] = cls._write_dataset(name, os.path.join(root, name), company_ids, fmt)
+            logger.info(f"[AnalyticsExport] {name}: {summary[name]['rows']} 行, {summary[name]['files']} 个分区")
+
+        os.makedirs(root, exist_ok=True)
+        with open(os.path.join(root, '_schema.json'), 'w', encoding='utf-8') as f:
+            json.dump(
+                {
+                    name: {column: str(arrow_type) for column, _, arrow_type in cls.DATASETS[name]['columns']}
+                    for name in datasets
+                },
+                f, ensure_ascii=False, indent=2
+            )
+        return summary
+
+    @classmethod
+    def schema(cls, name: str) -> pa.Schema:
+        return pa.schema([(column, arrow_type) for column, _, arrow_type in cls.DATASETS[name]['columns']])
+
+    @classmethod
+    def _write_dataset(cls, name: str, directory: str, company_ids: Optional[List[int]], fmt: str) -> Dict:
+        spec = cls.DATASETS[name]
+        schema = cls.schema(name)
+        company_field, month_field = spec['company_field'], spec['month_field']
+        paths = [path for _, path, _ in spec['columns']]
+        json_columns = {index for index, (column, _, _) in enumerate(spec['columns']) if column in ('old_data', 'new_data')}
+
+        queryset = apps.get_model(spec['model']).objects.all()
+        if company_ids is not None:
+            queryset = queryset.filter(**{f'{company_field}__in': company_ids})
+        # 按分区键排序，使同一分区的行连续到达
+        rows = queryset.order_by(company_field, month_field, 'pk').values_list(
+            company_field, month_field, *paths
+        ).iterator(chunk_size=cls.CHUNK_SIZE)
+
+        buffer = [[] for _ in paths]
+        writer, current, files, total = None, None, 0, 0
+
+        def flush():
+            if buffer[0]:
+                writer.write_batch(pa.record_batch(
+                    [pa.array(values, type=field.type) for values, field in zip(buffer, schema)],
+                    schema=schema
+                ))
+                for values in buffer:
+                    values.clear()
+
+        try:
+            for row in rows:
+                key = (row[0], cls._month(row[1]))
+                if key != current:
+                    if writer is not None:
+                        flush()
+                        writer.close()
+                    current = key
+                    partition = os.path.join(directory, f'company_id={key[0]}', f'month={key[1]}')
+                    os.makedirs(partition, exist_ok=True)
+                    writer = cls._open_writer(os.path.join(partition, f'part-0.{cls.FORMATS[fmt]}'), schema, fmt)
+                    files += 1
+
+                for index, value in enumerate(row[2:]):
+                    if index in json_columns and value is not None:
+                        value = json.dumps(value, ensure_ascii=False, default=str)
+                    buffer[index].append(value)
+                total += 1
+                if len(buffer[0]) >= cls.CHUNK_SIZE:
+                    flush()
+
+            if writer is not None:
+                flush()
+        finally:
+            if writer is not None:
+                writer.close()
+
+        return {'rows': total, 'files': files}
+
+    @staticmethod
+    def _open_writer(path: str, schema: pa.Schema, fmt: str):
+        if fmt == 'parquet':
+            return pq.ParquetWriter(path, schema, compression='zstd')
+        return pa.ipc.new_file(path, schema)
+
+    @staticmethod
+    def _month(value) -> str:
+        if value is None:
+            return 'unknown'
+        if isinstance(value, str):
+            return value[:7]
+        if isinstance(value, datetime):
+            value = timezone.localtime(value)
+        return value.strftime('%Y-%m')
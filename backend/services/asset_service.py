@@ -6,10 +6,10 @@
 - 资产统计
 - 资产软删除/恢复
 """
-from django.db import transaction
+from django.db import models, transaction
 from django.db.models import Sum, Count
 from django.utils import timezone
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 from .base import BaseService
 
@@ -77,119 +77,140 @@ class AssetService(BaseService):
         Returns:
             Generated asset code string
         """
-        from apps.system.models import CodeRule
-        from django.db.models import F
-        
         try:
-            # Get or create code rule for this company
-            rule, created = CodeRule.objects.get_or_create(
-                company=company,
-                code='asset_code',
-                defaults={
-                    'name': '资产编号规则',
-                    'prefix': 'ZC',
-                    'date_format': 'YYYYMMDD',
-                    'serial_length': 4,
-                    'separator': '',
-                    'reset_cycle': 'daily',
-                    'current_serial': 0,
-                    'is_active': True
-                }
-            )
-            
-            now = timezone.now()
-            today = now.date()
-            
-            # Check if we need to reset the serial number
-            should_reset = False
-            if rule.reset_cycle == 'daily':
-                if rule.last_reset_date != today:
-                    should_reset = True
-            elif rule.reset_cycle == 'monthly':
-                if rule.last_reset_date is None or \
-                   rule.last_reset_date.year != today.year or \
-                   rule.last_reset_date.month != today.month:
-                    should_reset = True
-            elif rule.reset_cycle == 'yearly':
-                if rule.last_reset_date is None or rule.last_reset_date.year != today.year:
-                    should_reset = True
-            
-            if should_reset:
-                rule.current_serial = 0
-                rule.last_reset_date = today
-            
-            # Increment serial number
-            rule.current_serial = F('current_serial') + 1
-            rule.save()
-            rule.refresh_from_db()
-            
-            # Build the date string
-            date_str = ''
-            if rule.date_format == 'YYYY':
-                date_str = now.strftime('%Y')
-            elif rule.date_format == 'YYYYMM':
-                date_str = now.strftime('%Y%m')
-            elif rule.date_format == 'YYYYMMDD':
-                date_str = now.strftime('%Y%m%d')
-            
-            # Build the serial number string
-            serial_str = str(rule.current_serial).zfill(rule.serial_length)
-            
-            # Combine parts
-            sep = rule.separator or ''
-            prefix = rule.prefix or ''
-            
-            asset_code = f"{prefix}{sep}{date_str}{sep}{serial_str}"
-            
-            return asset_code
-            
+            return cls.reserve_asset_codes(company, 1)[0]
         except Exception as e:
             # Fallback to old method if anything fails
             import logging
             logging.warning(f"Failed to generate asset code using rule: {e}")
             return cls.generate_order_no('ZC')
     
+    ASSET_CODE_RULE_DEFAULTS = {
+        'name': '资产编号规则',
+        'prefix': 'ZC',
+        'date_format': 'YYYYMMDD',
+        'serial_length': 4,
+        'separator': '',
+        'reset_cycle': 'daily',
+        'current_serial': 0,
+        'is_active': True
+    }
+    
+    @classmethod
+    def reserve_asset_codes(cls, company, count: int) -> List[str]:
+        """
+        按资产编码规则一次预留 count 个资产编码，公司内已被占用的编码（如手工录入）自动跳过
+        
+        Args:
+            company: Company 对象或公司ID
+            count: 编码数量
+            
+        Returns:
+            按流水号顺序排列的编码列表
+        """
+        from apps.assets.models import Asset
+        
+        company_id = getattr(company, 'pk', company)
+        return cls.reserve_rule_codes(
+            company_id, 'asset_code', count, cls.ASSET_CODE_RULE_DEFAULTS,
+            taken=lambda block: Asset.objects.filter(
+                company_id=company_id, asset_code__in=block
+            ).values_list('asset_code', flat=True)
+        )
+    
+    # 由系统维护、不接受编辑提交的字段
+    DIFF_EXCLUDE_FIELDS = {'version', 'updated_at'}
+    
     @classmethod
     @transaction.atomic
-    def update_asset(cls, asset, validated_data: Dict, user) -> 'Asset':
+    def update_asset(cls, asset, validated_data: Dict, user, expected_version=None) -> 'Asset':
         """
-        更新资产并记录变动
+        更新资产并记录变动（乐观锁）
+        
+        直接比较 validated_data 与已加载的资产得出变更字段，仅写入变更字段；
+        UPDATE 附带 WHERE version = expected_version，版本不一致时抛出 ConflictError。
         
         Args:
             asset: 资产对象
             validated_data: 已验证的更新数据
             user: 操作用户
+            expected_version: 客户端编辑时看到的版本号（整数或数字字符串），未提供时取已加载资产的版本
             
         Returns:
             更新后的资产对象
+        
+        Raises:
+            ValidationError: 版本号不是整数
+            ConflictError: 版本已变化
         """
-        from apps.assets.models import AssetOperation
+        from apps.assets.models import Asset, AssetOperation
+        from apps.common.exceptions import ConflictError, ValidationError
         
-        # 记录更新前数据
-        old_data = cls._build_asset_snapshot(asset)
+        if expected_version in (None, ''):
+            expected_version = asset.version
+        elif not str(expected_version).isdigit():
+            raise ValidationError('版本号必须是整数')
+        expected_version = int(expected_version)
+        if expected_version != asset.version:
+            raise ConflictError('资产已被他人修改，请刷新后重试')
         
-        # 更新资产
+        old_data, new_data = {}, {}
         for key, value in validated_data.items():
+            if key in cls.DIFF_EXCLUDE_FIELDS:
+                continue
+            field = Asset._meta.get_field(key)
+            if cls._field_value_equal(asset, field, value):
+                continue
+            old_data[key] = cls._display_value(field, getattr(asset, key))
+            new_data[key] = cls._display_value(field, value)
             setattr(asset, key, value)
-        asset.save()
         
-        # 记录更新后数据
-        new_data = cls._build_asset_snapshot(asset)
-        
-        # 比较变化并记录
-        changes = cls._compare_changes(old_data, new_data)
-        if changes:
-            AssetOperation.objects.create(
-                asset=asset,
-                operation_type=AssetOperation.OperationType.UPDATE,
-                description=f'资产编辑：{", ".join(changes[:3])}{"..." if len(changes) > 3 else ""}',
-                old_data=old_data,
-                new_data=new_data,
-                operator=user
-            )
+        changed_fields = list(old_data)
+        if not changed_fields:
+            return asset
+        
+        if not asset.save_if_version(expected_version, update_fields=[*changed_fields, 'updated_at']):
+            raise ConflictError('资产已被他人修改，请刷新后重试')
+        
+        changes = [f'{key}: {old_data[key]} → {new_data[key]}' for key in old_data]
+        AssetOperation.objects.create(
+            asset=asset,
+            operation_type=AssetOperation.OperationType.UPDATE,
+            description=f'资产编辑：{", ".join(changes[:3])}{"..." if len(changes) > 3 else ""}',
+            old_data=old_data,
+            new_data=new_data,
+            operator=user
+        )
         
         return asset
     
+    @staticmethod
+    def _field_value_equal(asset, field, value) -> bool:
+        """已加载的字段值与提交值是否相同（外键按主键比较，上传文件视为变更）"""
+        if field.is_relation:
+            return getattr(asset, field.attname) == (value.pk if value is not None else None)
+        if isinstance(field, models.FileField):
+            current = getattr(asset, field.attname)
+            if value is None or isinstance(value, str):
+                return (current.name or None) == (value or None)
+            return False
+        return getattr(asset, field.attname) == value
+    
+    @staticmethod
+    def _display_value(field, value):
+        """变更记录中的展示值"""
+        if value is None:
+            return None
+        if field.is_relation:
+            return getattr(value, 'display_name', None) or getattr(value, 'name', None) or str(value)
+        if field.choices:
+            return dict(field.flatchoices).get(value, value)
+        if isinstance(field, models.FileField):
+            return getattr(value, 'name', None) or str(value)
+        if isinstance(value, (dict, list, bool, int)):
+            return value
+        return str(value)
+    
     @classmethod
     def get_statistics(cls, company_id: Optional[int] = None) -> Dict:
         """
@@ -293,29 +314,3 @@ class AssetService(BaseService):
             },
             operator=user
         )
-    
-    @classmethod
-    def _build_asset_snapshot(cls, asset) -> Dict:
-        """构建资产快照数据"""
-        return {
-            'asset_code': asset.asset_code,
-            'name': asset.name,
-            'category': asset.category.name if asset.category else None,
-            'brand': asset.brand,
-            'model': asset.model,
-            'serial_number': asset.serial_number,
-            'original_value': str(asset.original_value) if asset.original_value else None,
-            'status': asset.get_status_display(),
-            'using_user': asset.using_user.display_name if asset.using_user else None,
-            'using_department': asset.using_department.name if asset.using_department else None,
-            'location': asset.location.full_name if asset.location else None,
-        }
-    
-    @classmethod
-    def _compare_changes(cls, old_data: Dict, new_data: Dict) -> list:
-        """比较前后数据变化"""
-        changes = []
-        for key in old_data:
-            if old_data.get(key) != new_data.get(key):
-                changes.append(f'{key}: {old_data[key]} → {new_data[key]}')
-        return changes
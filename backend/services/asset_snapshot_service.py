@@ -0,0 +1,335 @@
+"""
+资产日快照服务 - Asset Snapshot Service
+
+按公司、日期、分类、状态汇总资产日末存量（数量/原值/净值）及当日新增、处置:
+- 以当前资产表的聚合结果为起点，按时间倒序撤销其后发生的事件
+  （资产创建、软删除、操作记录 old_data 中的状态/分类/金额/公司），得到每日日末状态
+- 夜间任务只需撤销零点之后的少量事件；历史回溯沿同一路径逐日向前
+- 只有被事件涉及的资产会逐条加载，其余资产始终以数据库聚合结果参与
+- 趋势查询只读快照表，按日/周/月/年分桶，与资产表规模无关
+"""
+import logging
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, List, Optional
+
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek, TruncYear
+from django.utils import timezone
+
+from .base import BaseService
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal('0')
+
+
+class AssetSnapshotService(BaseService):
+    """资产日快照业务服务"""
+
+    # 分桶粒度 -> (截断函数, 默认回看天数)
+    GRANULARITIES = {
+        'day': (TruncDay, 30),
+        'week': (TruncWeek, 7 * 26),
+        'month': (TruncMonth, 365),
+        'year': (TruncYear, 365 * 5),
+    }
+    GROUP_FIELDS = {
+        'status': 'status',
+        'category': 'category__name',
+    }
+    STOCK_FIELDS = ('asset_count', 'original_value', 'net_value')
+    FLOW_FIELDS = ('added_count', 'added_value', 'disposed_count', 'disposed_value')
+
+    # 同一时刻的事件按此顺序撤销（倒序遍历时创建最后撤销）
+    EVENT_CREATE, EVENT_OPERATION, EVENT_DELETE = 0, 1, 2
+
+    # ==================== 生成 ====================
+
+    @classmethod
+    def snapshot_daily(cls, snapshot_date: Optional[date] = None,
+                       company_ids: Optional[Iterable[int]] = None) -> List[Dict]:
+        """生成指定日期（默认昨天）各公司的快照，供夜间任务调用"""
+        snapshot_date = snapshot_date or timezone.localdate() - timedelta(days=1)
+        return [
+            cls.rebuild(company_id, snapshot_date, snapshot_date)
+            for company_id in cls._company_ids(company_ids)
+        ]
+
+    @classmethod
+    def backfill(cls, start: date, end: Optional[date] = None,
+                 company_ids: Optional[Iterable[int]] = None) -> List[Dict]:
+        """按资产操作历史回溯生成 [start, end]（默认到昨天）的快照，已存在的日期会被重建"""
+        end = end or timezone.localdate() - timedelta(days=1)
+        return [cls.rebuild(company_id, start, end) for company_id in cls._company_ids(company_ids)]
+
+    @staticmethod
+    def _company_ids(company_ids):
+        from apps.organizations.models import Company
+
+        if company_ids is not None:
+            return list(company_ids)
+        return list(Company.objects.filter(is_active=True).values_list('id', flat=True))
+
+    @classmethod
+    def rebuild(cls, company_id: int, start: date, end: date) -> Dict:
+        """
+        重建单个公司 [start, end] 区间的日快照
+
+        Returns:
+            {'company_id', 'start', 'end', 'rows', 'events'}
+        """
+        from apps.assets.models import Asset
+        from apps.reports.models import AssetDailySnapshot
+
+        if start > end:
+            raise ValueError('开始日期不能晚于结束日期')
+
+        # 当前资产表按 (分类, 状态) 聚合作为撤销的起点
+        totals = defaultdict(lambda: [0, ZERO, ZERO])
+        rows = (
+            Asset.objects.filter(company_id=company_id, is_deleted=False)
+            .values('category_id', 'status')
+            .annotate(count=Count('id'), original=Sum('original_value'), net=Sum('current_value'))
+            .order_by()
+        )
+        for row in rows:
+            totals[(row['category_id'], row['status'])] = [
+                row['count'], row['original'] or ZERO, row['net'] or ZERO
+            ]
+
+        states, events = cls._load_events(company_id, cls._day_start(start + timedelta(days=1)))
+
+        def apply(state, sign):
+            if state['present'] and state['company_id'] == company_id:
+                bucket = totals[(state['category_id'], state['status'])]
+                bucket[0] += sign
+                bucket[1] += sign * state['original_value']
+                bucket[2] += sign * state['current_value']
+
+        def undo(event):
+            state = states[event[2]]
+            apply(state, -1)
+            state.update(event[3])
+            apply(state, 1)
+
+        # 先撤销结束日期之后的事件，得到结束日期日末状态
+        index = 0
+        boundary = cls._day_start(end + timedelta(days=1))
+        while index < len(events) and events[index][0] >= boundary:
+            undo(events[index])
+            index += 1
+
+        snapshots = []
+        day = end
+        while day >= start:
+            stock = {key: list(value) for key, value in totals.items() if value[0]}
+            flows = defaultdict(lambda: [0, ZERO, 0, ZERO])
+            day_start = cls._day_start(day)
+            while index < len(events) and events[index][0] >= day_start:
+                event = events[index]
+                state = states[event[2]]
+                if state['present'] and state['company_id'] == company_id:
+                    # 撤销前的状态即事件发生后的状态
+                    key = (state['category_id'], state['status'])
+                    if event[1] == cls.EVENT_CREATE:
+                        flows[key][0] += 1
+                        flows[key][1] += state['original_value']
+                    elif event[4]:
+                        flows[key][2] += 1
+                        flows[key][3] += state['original_value']
+                undo(event)
+                index += 1
+
+            for key in stock.keys() | flows.keys():
+                count, original, net = stock.get(key, (0, ZERO, ZERO))
+                added_count, added_value, disposed_count, disposed_value = flows.get(key, (0, ZERO, 0, ZERO))
+                snapshots.append(AssetDailySnapshot(
+                    company_id=company_id,
+                    snapshot_date=day,
+                    category_id=key[0],
+                    status=key[1],
+                    asset_count=count,
+                    original_value=original,
+                    net_value=net,
+                    added_count=added_count,
+                    added_value=added_value,
+                    disposed_count=disposed_count,
+                    disposed_value=disposed_value,
+                ))
+            day -= timedelta(days=1)
+
+        with transaction.atomic():
+            AssetDailySnapshot.objects.filter(
+                company_id=company_id, snapshot_date__range=(start, end)
+            ).delete()
+            AssetDailySnapshot.objects.bulk_create(snapshots, batch_size=1000)
+
+        logger.info(f"[AssetSnapshot] 公司 {company_id} {start}~{end}: {len(snapshots)} 行, {len(events)} 个事件")
+        return {
+            'company_id': company_id,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'rows': len(snapshots),
+            'events': len(events),
+        }
+
+    @classmethod
+    def _load_events(cls, company_id: int, since: datetime):
+        """
+        加载 since 之后涉及本公司资产的事件，按时间倒序
+
+        Returns:
+            (states, events): states 为涉及资产的当前状态；
+            events 为 (时间, 类型, 资产ID, 撤销后取值, 是否处置) 列表
+        """
+        from apps.assets.models import Asset, AssetCategory, AssetOperation
+
+        recent_operations = AssetOperation.objects.filter(created_at__gte=since)
+        touched = Asset.objects.filter(
+            Q(company_id=company_id) & (
+                Q(created_at__gte=since)
+                | Q(deleted_at__gte=since)
+                | Q(id__in=recent_operations.values('asset_id'))
+            )
+            # 已调出到其他公司的资产
+            | Q(id__in=recent_operations.filter(
+                operation_type=AssetOperation.OperationType.TRANSFER,
+                old_data__company_id=company_id,
+            ).values('asset_id'))
+        )
+
+        states, events = {}, []
+        for row in touched.values(
+            'id', 'company_id', 'category_id', 'status', 'original_value', 'current_value',
+            'is_deleted', 'deleted_at', 'created_at'
+        ).iterator(chunk_size=2000):
+            states[row['id']] = {
+                'company_id': row['company_id'],
+                'category_id': row['category_id'],
+                'status': row['status'],
+                'original_value': row['original_value'] or ZERO,
+                'current_value': row['current_value'] or ZERO,
+                'present': not row['is_deleted'],
+            }
+            if row['created_at'] >= since:
+                events.append((row['created_at'], cls.EVENT_CREATE, row['id'], {'present': False}, False))
+            if row['is_deleted'] and row['deleted_at'] and row['deleted_at'] >= since:
+                events.append((row['deleted_at'], cls.EVENT_DELETE, row['id'], {'present': True}, False))
+
+        if states:
+            status_codes = cls._status_codes()
+            category_ids = dict(
+                AssetCategory.objects.filter(company_id=company_id).values_list('name', 'id')
+            )
+            operations = recent_operations.filter(
+                asset_id__in=touched.values('id')
+            ).values_list('asset_id', 'created_at', 'operation_type', 'old_data')
+            for asset_id, created_at, operation_type, old_data in operations.iterator(chunk_size=2000):
+                values = cls._revert_values(old_data, status_codes, category_ids)
+                dispose = operation_type == AssetOperation.OperationType.DISPOSE
+                if values or dispose:
+                    events.append((created_at, cls.EVENT_OPERATION, asset_id, values, dispose))
+
+        events.sort(key=lambda event: (event[0], event[1]), reverse=True)
+        return states, events
+
+    @staticmethod
+    def _status_codes() -> Dict[str, str]:
+        """状态显示名/代码 -> 代码（操作记录中多数以显示名保存）"""
+        from apps.assets.models import Asset
+
+        codes = {label: value for value, label in Asset.Status.choices}
+        codes.update({value: value for value in Asset.Status.values})
+        return codes
+
+    @staticmethod
+    def _revert_values(old_data, status_codes: Dict[str, str], category_ids: Dict[str, int]) -> Dict:
+        """从操作记录 old_data 中取出快照相关字段的操作前取值"""
+        values = {}
+        if not isinstance(old_data, dict):
+            return values
+
+        if old_data.get('status') in status_codes:
+            values['status'] = status_codes[old_data['status']]
+        if 'category_id' in old_data:
+            values['category_id'] = old_data['category_id']
+        elif 'category' in old_data:
+            category = old_data['category']
+            if category is None or isinstance(category, int):
+                values['category_id'] = category
+            elif category in category_ids:
+                values['category_id'] = category_ids[category]
+        for field in ('original_value', 'current_value'):
+            if old_data.get(field) is not None:
+                try:
+                    values[field] = Decimal(str(old_data[field]))
+                except InvalidOperation:
+                    pass
+        if old_data.get('company_id'):
+            values['company_id'] = old_data['company_id']
+        return values
+
+    @staticmethod
+    def _day_start(day: date) -> datetime:
+        return timezone.make_aware(datetime.combine(day, time.min))
+
+    # ==================== 查询 ====================
+
+    @classmethod
+    def trend(cls, queryset, granularity: str = 'month', start: Optional[date] = None,
+              end: Optional[date] = None, group_by: Optional[str] = None) -> List[Dict]:
+        """
+        按时间分桶读取快照趋势
+
+        存量取每个分桶内最后一个快照日的值，新增/处置为分桶内合计。
+
+        Args:
+            queryset: 已按公司/数据权限过滤的 AssetDailySnapshot 查询集
+            granularity: day / week / month / year
+            group_by: 可选细分维度 status / category
+
+        Returns:
+            [{'period', [status|category], asset_count, original_value, net_value,
+              added_count, added_value, disposed_count, disposed_value}]
+        """
+        if granularity not in cls.GRANULARITIES:
+            raise ValueError(f'不支持的时间粒度: {granularity}')
+        if group_by and group_by not in cls.GROUP_FIELDS:
+            raise ValueError(f'不支持的分组维度: {group_by}')
+
+        trunc, default_days = cls.GRANULARITIES[granularity]
+        end = end or timezone.localdate()
+        start = start or end - timedelta(days=default_days)
+        queryset = queryset.filter(snapshot_date__range=(start, end)).annotate(
+            period=trunc('snapshot_date')
+        )
+        dimension = cls.GROUP_FIELDS.get(group_by)
+        keys = ['period', dimension] if dimension else ['period']
+
+        last_dates = (
+            queryset.values('period').annotate(last_date=Max('snapshot_date')).order_by()
+            .values_list('last_date', flat=True)
+        )
+        stock = queryset.filter(snapshot_date__in=list(last_dates)).values(*keys).annotate(
+            **{field: Sum(field) for field in cls.STOCK_FIELDS}
+        ).order_by()
+        flows = queryset.values(*keys).annotate(
+            **{field: Sum(field) for field in cls.FLOW_FIELDS}
+        ).order_by()
+
+        results = {}
+        for row in flows:
+            key = tuple(row[k] for k in keys)
+            results[key] = {**row, **{field: 0 for field in cls.STOCK_FIELDS}}
+        for row in stock:
+            key = tuple(row[k] for k in keys)
+            results.setdefault(key, {**row, **{field: 0 for field in cls.FLOW_FIELDS}}).update(row)
+
+        items = sorted(results.values(), key=lambda item: (item['period'], str(item.get(dimension) or '')))
+        if dimension and dimension != group_by:
+            for item in items:
+                item[group_by] = item.pop(dimension)
+        return items
@@ -4,7 +4,7 @@
 提供统一的服务层模式和工具方法
 """
 from django.db import transaction
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional
 import uuid
 from django.utils import timezone
 
@@ -35,6 +35,80 @@ class BaseService:
         """
         return f"{prefix}{timezone.now().strftime('%Y%m%d')}{str(uuid.uuid4())[:8].upper()}"
     
+    @classmethod
+    @transaction.atomic
+    def reserve_rule_codes(cls, company_id, rule_code: str, count: int, defaults: Dict,
+                           taken: Optional[Callable[[List[str]], Iterable[str]]] = None) -> List[str]:
+        """
+        按编码规则（CodeRule）一次预留 count 个连续编码
+        
+        锁定规则行（不存在时按 defaults 创建），按重置周期计算起始流水号，整段编码生成后
+        用一次 UPDATE 推进 current_serial。
+        
+        Args:
+            company_id: 公司ID
+            rule_code: 规则代码，如 asset_code / inbound_code
+            count: 编码数量
+            defaults: 规则不存在时的创建参数
+            taken: 可选，传入一段候选编码、返回其中已被占用的编码，占用的编码跳过并顺延
+        
+        Returns:
+            按流水号顺序排列的编码列表
+        """
+        from apps.system.config_cache import ConfigCache
+        from apps.system.models import CodeRule
+        
+        CodeRule.objects.get_or_create(company_id=company_id, code=rule_code, defaults=defaults)
+        rule = CodeRule.objects.select_for_update().get(company_id=company_id, code=rule_code)
+        
+        now = timezone.now()
+        today = now.date()
+        serial, last_reset_date = rule.current_serial, rule.last_reset_date
+        if cls._should_reset_serial(rule, today):
+            serial, last_reset_date = 0, today
+        
+        date_str = ''
+        if rule.date_format == 'YYYY':
+            date_str = now.strftime('%Y')
+        elif rule.date_format == 'YYYYMM':
+            date_str = now.strftime('%Y%m')
+        elif rule.date_format == 'YYYYMMDD':
+            date_str = now.strftime('%Y%m%d')
+        sep = rule.separator or ''
+        prefix = rule.prefix or ''
+        
+        codes = []
+        while len(codes) < count:
+            block = [
+                f"{prefix}{sep}{date_str}{sep}{str(number).zfill(rule.serial_length)}"
+                for number in range(serial + 1, serial + 1 + count - len(codes))
+            ]
+            serial += len(block)
+            used = set(taken(block)) if taken else set()
+            codes.extend(code for code in block if code not in used)
+        
+        CodeRule.objects.filter(pk=rule.pk).update(
+            current_serial=serial, last_reset_date=last_reset_date, updated_at=now
+        )
+        # update() 不触发 post_save，需手动使编码规则缓存失效
+        ConfigCache.invalidate(ConfigCache.CODE_RULE, company_id)
+        return codes
+    
+    @staticmethod
+    def _should_reset_serial(rule, today) -> bool:
+        """流水号是否需要按重置周期归零"""
+        if rule.reset_cycle == 'daily':
+            return rule.last_reset_date != today
+        if rule.reset_cycle == 'monthly':
+            return (
+                rule.last_reset_date is None or
+                rule.last_reset_date.year != today.year or
+                rule.last_reset_date.month != today.month
+            )
+        if rule.reset_cycle == 'yearly':
+            return rule.last_reset_date is None or rule.last_reset_date.year != today.year
+        return False
+    
     @staticmethod
     def get_user_company(user, company_id=None):
         """
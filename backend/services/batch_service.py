@@ -9,6 +9,7 @@ Handles batch operations for assets:
 Following .cursorrules: All business logic must be encapsulated in services/ directory.
 """
 from django.db import transaction
+from django.db.models import F
 from django.utils import timezone
 from django.http import HttpResponse
 from typing import Dict, Any, List, Optional, Tuple
@@ -897,7 +898,7 @@ class BatchOperationService(BaseService):
             }
         
         # Soft delete assets
-        count = assets.update(is_deleted=True, deleted_at=timezone.now())
+        count = assets.update(is_deleted=True, deleted_at=timezone.now(), version=F('version') + 1)
         
         return {
             'success': True,
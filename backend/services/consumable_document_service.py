@@ -0,0 +1,198 @@
+"""
+耗材单据服务 - Consumable Document Service
+
+入库单 / 领用单的创建与明细替换（单张与批量共用）:
+- 明细先整体校验：所有单据涉及的用品用一次 in_bulk 取出，校验归属公司、启用状态、数量与单价，
+  所有错误一并返回，任一单据不合法则不写入
+- 单号按编码规则（inbound_code / outbound_code）整段预留，表头与明细分别 bulk_create
+- 入库单金额按明细（数量 × 单价，未填单价取用品单价）计算，表头总金额在同一事务内写入
+"""
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Tuple
+
+from django.db import transaction
+
+from .base import BaseService
+
+
+class ConsumableDocumentService(BaseService):
+    """耗材出入库单据服务"""
+
+    INBOUND = 'inbound'
+    OUTBOUND = 'outbound'
+
+    RULE_DEFAULTS = {'date_format': 'YYYYMMDD', 'serial_length': 4, 'reset_cycle': 'daily', 'is_active': True}
+
+    # 单据类型 -> 单号字段、编码规则与默认规则
+    DOCUMENTS = {
+        INBOUND: {
+            'number_field': 'inbound_no',
+            'rule_code': 'inbound_code',
+            'rule_defaults': {'name': '入库单编号规则', 'prefix': 'RK', **RULE_DEFAULTS},
+        },
+        OUTBOUND: {
+            'number_field': 'outbound_no',
+            'rule_code': 'outbound_code',
+            'rule_defaults': {'name': '领用单编号规则', 'prefix': 'LY', **RULE_DEFAULTS},
+        },
+    }
+
+    # 批量创建单次最多单据数
+    MAX_BATCH_DOCUMENTS = 200
+    BATCH_SIZE = 500
+
+    @staticmethod
+    def get_models(kind: str):
+        """(表头模型, 明细模型)"""
+        from apps.consumables.models import (
+            ConsumableInbound, ConsumableInboundItem, ConsumableOutbound, ConsumableOutboundItem
+        )
+
+        if kind == ConsumableDocumentService.INBOUND:
+            return ConsumableInbound, ConsumableInboundItem
+        return ConsumableOutbound, ConsumableOutboundItem
+
+    # ==================== 明细校验 ====================
+
+    @classmethod
+    def clean_items(cls, kind: str, company_id: int, items_list: List[List[Dict]]) -> Tuple[List[List[Dict]], List[List[Dict]]]:
+        """
+        校验多张单据的明细
+
+        Args:
+            items_list: 每张单据的明细 [{'consumable', 'quantity', 'price'}]
+
+        Returns:
+            (每张单据规范化后的明细, 每张单据的错误 [{'index', 'errors': {字段: [信息]}}])
+        """
+        from apps.consumables.models import Consumable
+
+        consumable_ids = set()
+        for items in items_list:
+            for item in items if isinstance(items, list) else []:
+                if isinstance(item, dict) and str(item.get('consumable', '')).isdigit():
+                    consumable_ids.add(int(item['consumable']))
+        consumables = Consumable.objects.filter(company_id=company_id).only(
+            'id', 'name', 'price', 'is_active'
+        ).in_bulk(consumable_ids)
+
+        lines_list, errors_list = [], []
+        for items in items_list:
+            lines, errors = [], []
+            if not isinstance(items, list):
+                errors.append({'index': None, 'errors': {'items': ['明细格式错误，应为列表']}})
+                items = []
+            for index, item in enumerate(items):
+                line, item_errors = cls._clean_item(kind, item, consumables)
+                if item_errors:
+                    errors.append({'index': index, 'errors': item_errors})
+                else:
+                    lines.append(line)
+            lines_list.append(lines)
+            errors_list.append(errors)
+        return lines_list, errors_list
+
+    @classmethod
+    def _clean_item(cls, kind, item, consumables):
+        if not isinstance(item, dict):
+            return None, {'item': ['明细格式错误']}
+
+        errors = {}
+        consumable = None
+        raw_consumable = item.get('consumable')
+        if raw_consumable in (None, ''):
+            errors['consumable'] = ['请选择用品']
+        else:
+            consumable = consumables.get(int(raw_consumable)) if str(raw_consumable).isdigit() else None
+            if consumable is None:
+                errors['consumable'] = [f'用品不存在或不属于该公司: {raw_consumable}']
+            elif not consumable.is_active:
+                errors['consumable'] = [f'{consumable.name} 已停用']
+
+        quantity = None
+        try:
+            quantity = int(item.get('quantity'))
+            if quantity <= 0:
+                errors['quantity'] = ['数量必须大于0']
+        except (TypeError, ValueError):
+            errors['quantity'] = ['数量必须是整数']
+
+        price = None
+        if kind == cls.INBOUND:
+            raw_price = item.get('price')
+            try:
+                price = Decimal(str(raw_price)) if raw_price not in (None, '') else None
+            except InvalidOperation:
+                errors['price'] = ['单价必须是数字']
+            else:
+                if price is not None and not price.is_finite():
+                    errors['price'] = ['单价必须是数字']
+                elif price is not None and price < 0:
+                    errors['price'] = ['单价不能为负数']
+
+        if errors:
+            return None, errors
+        line = {'consumable_id': consumable.pk, 'quantity': quantity}
+        if kind == cls.INBOUND:
+            # 未填单价时取用品单价，金额由服务端计算
+            line['price'] = (consumable.price if price is None else price).quantize(Decimal('0.01'))
+            line['amount'] = line['price'] * quantity
+        return line, {}
+
+    # ==================== 写入 ====================
+
+    @classmethod
+    @transaction.atomic
+    def create_documents(cls, kind: str, company_id: int, headers: List[Dict], lines_list: List[List[Dict]], user) -> List:
+        """
+        批量创建单据（明细须已通过 clean_items 校验）
+
+        Args:
+            headers: 已校验的表头数据（serializer.validated_data）
+            lines_list: 与 headers 一一对应的明细
+
+        Returns:
+            创建的单据列表
+        """
+        model, item_model = cls.get_models(kind)
+        config = cls.DOCUMENTS[kind]
+        number_field = config['number_field']
+
+        numbers = cls.reserve_rule_codes(
+            company_id, config['rule_code'], len(headers), config['rule_defaults'],
+            taken=lambda block: model.objects.filter(**{f'{number_field}__in': block}).values_list(number_field, flat=True)
+        )
+
+        documents = []
+        for header, lines, number in zip(headers, lines_list, numbers):
+            header = {key: value for key, value in header.items() if key not in ('company', 'created_by', number_field)}
+            document = model(**header, company_id=company_id, created_by=user, **{number_field: number})
+            if kind == cls.INBOUND:
+                document.total_amount = sum((line['amount'] for line in lines), Decimal('0'))
+            documents.append(document)
+        documents = model.objects.bulk_create(documents, batch_size=cls.BATCH_SIZE)
+
+        item_model.objects.bulk_create(
+            [
+                item_model(**{kind: document}, **line)
+                for document, lines in zip(documents, lines_list)
+                for line in lines
+            ],
+            batch_size=cls.BATCH_SIZE
+        )
+        return documents
+
+    @classmethod
+    @transaction.atomic
+    def replace_items(cls, kind: str, document, lines: List[Dict]):
+        """替换草稿单据的全部明细并重算总金额"""
+        _, item_model = cls.get_models(kind)
+
+        item_model.objects.filter(**{kind: document}).delete()
+        item_model.objects.bulk_create(
+            [item_model(**{kind: document}, **line) for line in lines], batch_size=cls.BATCH_SIZE
+        )
+        if kind == cls.INBOUND:
+            document.total_amount = sum((line['amount'] for line in lines), Decimal('0'))
+            document.save(update_fields=['total_amount'])
+        return document
@@ -0,0 +1,124 @@
+"""
+跨公司调拨服务 - Cross-Company Transfer Service
+
+处理跨公司调拨完成时的资产转移:
+- 锁定调拨单与资产后一次性 UPDATE 资产归属
+- 批量写入资产操作记录
+- 在数据库中汇总结算金额
+"""
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from typing import Dict
+
+from apps.common.exceptions import BusinessException, NotFoundError
+from .base import BaseService
+
+
+class CrossCompanyTransferService(BaseService):
+    """跨公司调拨业务服务"""
+
+    BATCH_SIZE = 1000
+
+    @classmethod
+    def complete_transfer(cls, transfer_id: int, user) -> Dict:
+        """
+        完成跨公司调拨 - 执行实际资产转移
+
+        Args:
+            transfer_id: 调拨单ID
+            user: 操作用户
+
+        Returns:
+            {'transfer_no', 'asset_count', 'settlement_amount'}
+        """
+        from apps.assets.models import Asset, AssetOperation
+        from apps.organizations.models import CrossCompanyTransfer
+
+        with transaction.atomic():
+            try:
+                transfer = CrossCompanyTransfer.objects.select_for_update().get(pk=transfer_id)
+            except CrossCompanyTransfer.DoesNotExist:
+                raise NotFoundError('调拨单不存在')
+
+            if transfer.status not in (
+                CrossCompanyTransfer.Status.IN_TRANSIT,
+                CrossCompanyTransfer.Status.APPROVED,
+            ):
+                raise BusinessException('只能完成已审批的调拨单')
+
+            from_company = transfer.from_company
+            to_company = transfer.to_company
+            to_department = transfer.to_department
+
+            # 锁定全部调拨资产并记录调拨前归属
+            asset_ids = list(transfer.items.values_list('asset_id', flat=True))
+            assets = list(
+                Asset.objects.select_for_update().filter(id__in=asset_ids).values_list(
+                    'id', 'asset_code', 'company_id', 'using_department_id'
+                )
+            )
+
+            # 调入公司资产编号冲突检查（company + asset_code 唯一）
+            conflicts = list(
+                Asset.objects.filter(
+                    company=to_company,
+                    asset_code__in=[asset_code for _, asset_code, _, _ in assets]
+                ).exclude(id__in=asset_ids).values_list('asset_code', flat=True)[:20]
+            )
+            if conflicts:
+                raise BusinessException(
+                    f'调入公司已存在相同编号的资产: {", ".join(conflicts)}',
+                    data={'conflict_codes': conflicts}
+                )
+
+            now = timezone.now()
+
+            # 一次性更新资产归属
+            update_fields = {'company': to_company, 'updated_at': now, 'version': F('version') + 1}
+            if to_department:
+                update_fields['using_department'] = to_department
+            Asset.objects.filter(id__in=asset_ids).update(**update_fields)
+
+            # 批量写入操作记录
+            description = f'跨公司调拨: {from_company.name} → {to_company.name}'
+            new_department_id = to_department.id if to_department else None
+            AssetOperation.objects.bulk_create(
+                [
+                    AssetOperation(
+                        asset_id=asset_id,
+                        operation_type=AssetOperation.OperationType.TRANSFER,
+                        operation_no=transfer.transfer_no,
+                        description=description,
+                        old_data={
+                            'company_id': company_id,
+                            'using_department_id': using_department_id,
+                        },
+                        new_data={
+                            'company_id': to_company.id,
+                            'using_department_id': new_department_id or using_department_id,
+                            'settlement_type': transfer.settlement_type,
+                        },
+                        operator=user,
+                    )
+                    for asset_id, _, company_id, using_department_id in assets
+                ],
+                batch_size=cls.BATCH_SIZE
+            )
+
+            # 结算金额由数据库汇总
+            settlement_amount = transfer.items.aggregate(total=Sum('transfer_price'))['total'] or 0
+
+            transfer.settlement_amount = settlement_amount
+            transfer.settlement_date = now.date()
+            transfer.status = CrossCompanyTransfer.Status.COMPLETED
+            transfer.completed_at = now
+            transfer.save(update_fields=[
+                'settlement_amount', 'settlement_date', 'status', 'completed_at', 'updated_at'
+            ])
+
+        return {
+            'transfer_no': transfer.transfer_no,
+            'asset_count': len(assets),
+            'settlement_amount': str(settlement_amount),
+        }
@@ -0,0 +1,376 @@
+"""
+盘点服务 - Inventory Service
+
+处理盘点任务的生成、扫码提交、统计与结盘:
+- 生成: 按盘点范围一条 INSERT ... SELECT 快照资产账面部门/位置/使用人
+- 批量扫码: 一次查询将条码/RFID/资产编码解析为盘点记录，bulk_update 批量写入
+- 幂等: 与已有结果一致的条目不再写入，扫码枪重试不会重复改动
+- 统计: 单条条件聚合查询得出各结果数量，并回写任务计数
+- 结盘: 未盘记为盘亏，在数据库中统计位置/部门/使用人差异，可选批量回写资产
+"""
+from django.db import connection, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from typing import Dict, List
+
+from apps.common.exceptions import BusinessException, NotFoundError
+from .base import BaseService
+
+
+class InventoryService(BaseService):
+    """盘点业务服务"""
+
+    BATCH_SIZE = 500
+    # 扫码可提交的实际信息字段
+    ACTUAL_FIELDS = ('actual_location_id', 'actual_department_id', 'actual_user_id')
+
+    @staticmethod
+    def get_task(task_id: int, for_update: bool = False):
+        from apps.inventory.models import InventoryTask
+
+        queryset = InventoryTask.objects.select_for_update() if for_update else InventoryTask.objects
+        try:
+            return queryset.get(pk=task_id)
+        except InventoryTask.DoesNotExist:
+            raise NotFoundError('盘点任务不存在')
+
+    @staticmethod
+    def get_scope_queryset(task):
+        """盘点范围内的资产（部门/位置/分类均包含下级）"""
+        from apps.assets.models import Asset, AssetCategory
+        from apps.organizations.models import Department, Location
+
+        queryset = Asset.objects.filter(company_id=task.company_id, is_deleted=False).exclude(
+            status=Asset.Status.DISPOSED
+        )
+        for relation, field, model in (
+            (task.departments, 'using_department', Department),
+            (task.locations, 'location', Location),
+            (task.categories, 'category', AssetCategory),
+        ):
+            selected = relation.all()
+            if selected.exists():
+                queryset = queryset.filter(**{
+                    f'{field}__in': model.objects.get_queryset_descendants(selected, include_self=True)
+                })
+        return queryset
+
+    @classmethod
+    def generate_records(cls, task_id: int) -> Dict:
+        """
+        生成盘点记录 - 为范围内每个资产快照账面部门/位置/使用人
+
+        PostgreSQL / SQLite 下为单条 INSERT ... SELECT，其余数据库分批 bulk_create；
+        (task, asset) 冲突时跳过，可重复执行以补齐新进入范围的资产。
+
+        Returns:
+            {'created', 'statistics'}
+        """
+        from apps.inventory.models import InventoryTask, InventoryRecord
+
+        with transaction.atomic():
+            task = cls.get_task(task_id, for_update=True)
+            if task.status not in (InventoryTask.Status.DRAFT, InventoryTask.Status.IN_PROGRESS):
+                raise BusinessException('只能为草稿或进行中的盘点任务生成盘点记录')
+
+            assets = cls.get_scope_queryset(task).order_by().values_list(
+                'id', 'using_department_id', 'location_id', 'using_user_id'
+            )
+            if connection.vendor in ('postgresql', 'sqlite'):
+                select_sql, params = assets.query.sql_with_params()
+                table = InventoryRecord._meta.db_table
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f"INSERT INTO {table} "
+                        f"(task_id, result, images, asset_id, book_department_id, book_location_id, book_user_id) "
+                        # WHERE true: SQLite 需借此区分 ON CONFLICT 与 JOIN 的 ON 子句
+                        f"SELECT %s, %s, '[]', scope.* FROM ({select_sql}) scope WHERE true "
+                        f"ON CONFLICT (task_id, asset_id) DO NOTHING",
+                        [task.pk, InventoryRecord.Result.UNCHECKED, *params]
+                    )
+                    created = cursor.rowcount
+            else:
+                created = 0
+                batch = []
+                for asset_id, department_id, location_id, user_id in assets.iterator(chunk_size=cls.BATCH_SIZE * 4):
+                    batch.append(InventoryRecord(
+                        task_id=task.pk, asset_id=asset_id, book_department_id=department_id,
+                        book_location_id=location_id, book_user_id=user_id
+                    ))
+                    if len(batch) >= cls.BATCH_SIZE * 4:
+                        created += len(InventoryRecord.objects.bulk_create(batch, ignore_conflicts=True))
+                        batch = []
+                if batch:
+                    created += len(InventoryRecord.objects.bulk_create(batch, ignore_conflicts=True))
+
+            statistics = cls.refresh_statistics(task.pk)
+
+        return {'created': created, 'statistics': statistics}
+
+    @classmethod
+    def submit_scans(cls, task_id: int, items: List[Dict], user) -> Dict:
+        """
+        批量提交扫码结果
+
+        Args:
+            task_id: 盘点任务ID
+            items: [{'code', 'result', 'actual_location', 'actual_department', 'actual_user', 'remark'}]
+                   code 可为资产编码、条形码或 RFID 编码；同一资产（含同一资产的不同编码）多次出现时以最后一条为准
+            user: 盘点人
+
+        Returns:
+            {'updated', 'unchanged', 'surplus_created', 'not_found', 'statistics'}
+        """
+        from apps.assets.models import Asset
+        from apps.inventory.models import InventoryTask, InventoryRecord
+
+        task = cls.get_task(task_id)
+        if task.status in (InventoryTask.Status.COMPLETED, InventoryTask.Status.CANCELLED):
+            raise BusinessException('盘点任务已结束，不能提交扫码结果')
+
+        scans = {item['code']: item for item in items}
+        positions = {item['code']: index for index, item in enumerate(items)}
+        cls._validate_references(scans.values())
+        codes = list(scans)
+
+        # 一次查询解析编码 -> 盘点记录（资产编码 / 条形码 / RFID 均有 company 前缀索引）
+        code_match = (
+            Q(asset__asset_code__in=codes) | Q(asset__barcode__in=codes) | Q(asset__rfid_code__in=codes)
+        )
+        rows = InventoryRecord.objects.filter(task=task).filter(code_match).values(
+            'id', 'asset_id', 'asset__asset_code', 'asset__barcode', 'asset__rfid_code',
+            'result', 'remark', *cls.ACTUAL_FIELDS
+        )
+        # 盘点记录ID -> (记录, 编码)：同一资产的多个编码只更新一次，取最后提交的扫码
+        matched = {}
+        matched_codes = set()
+        for row in rows:
+            row_codes = [
+                row[key] for key in ('asset__rfid_code', 'asset__barcode', 'asset__asset_code') if row[key] in scans
+            ]
+            matched_codes.update(row_codes)
+            matched[row['id']] = (row, max(row_codes, key=positions.__getitem__))
+
+        now = timezone.now()
+        to_update = []
+        unchanged = 0
+        for row, code in matched.values():
+            scan = scans[code]
+            values = cls._scan_values(scan)
+            # 盘盈记录再次扫到仍为盘盈（扫码重试的默认结果为正常）
+            if row['result'] == InventoryRecord.Result.SURPLUS and values['result'] == InventoryRecord.Result.NORMAL:
+                values['result'] = InventoryRecord.Result.SURPLUS
+            current = {field: row[field] for field in values}
+            if current == values:
+                unchanged += 1
+                continue
+            # 未提交的字段沿用原值，避免 bulk_update 覆盖为空
+            fields = {field: row[field] for field in ('remark', *cls.ACTUAL_FIELDS)}
+            fields.update(values)
+            to_update.append(InventoryRecord(id=row['id'], checker=user, check_time=now, **fields))
+
+        # 账外资产：属于本公司但不在盘点范围内，记为盘盈
+        unmatched = [code for code in codes if code not in matched_codes]
+        surplus = []
+        if unmatched:
+            assets = Asset.objects.filter(company_id=task.company_id, is_deleted=False).filter(
+                Q(asset_code__in=unmatched) | Q(barcode__in=unmatched) | Q(rfid_code__in=unmatched)
+            ).values('id', 'asset_code', 'barcode', 'rfid_code')
+            for asset in assets:
+                asset_codes = [c for c in (asset['rfid_code'], asset['barcode'], asset['asset_code']) if c in scans]
+                values = cls._scan_values(scans[max(asset_codes, key=positions.__getitem__)])
+                values['result'] = InventoryRecord.Result.SURPLUS
+                surplus.append(InventoryRecord(
+                    task=task, asset_id=asset['id'], checker=user, check_time=now, **values
+                ))
+                unmatched = [code for code in unmatched if code not in asset_codes]
+
+        with transaction.atomic():
+            if to_update:
+                InventoryRecord.objects.bulk_update(
+                    to_update,
+                    ['result', 'remark', 'checker', 'check_time', *cls.ACTUAL_FIELDS],
+                    batch_size=cls.BATCH_SIZE
+                )
+            if surplus:
+                # (task, asset) 唯一，重试时已存在的盘盈记录直接忽略
+                InventoryRecord.objects.bulk_create(
+                    surplus, batch_size=cls.BATCH_SIZE, ignore_conflicts=True
+                )
+            if task.status == InventoryTask.Status.DRAFT:
+                InventoryTask.objects.filter(pk=task.pk, status=InventoryTask.Status.DRAFT).update(
+                    status=InventoryTask.Status.IN_PROGRESS, actual_start_date=now.date()
+                )
+            statistics = cls.refresh_statistics(task.pk)
+
+        return {
+            'updated': len(to_update),
+            'unchanged': unchanged,
+            'surplus_created': len(surplus),
+            'not_found': unmatched,
+            'statistics': statistics,
+        }
+
+    @classmethod
+    def _scan_values(cls, scan: Dict) -> Dict:
+        """扫码条目 -> 待写入的记录字段（未提交的实际信息保持不变）"""
+        values = {'result': scan['result']}
+        for field in cls.ACTUAL_FIELDS:
+            key = field[:-3]
+            if key in scan:
+                values[field] = scan[key]
+        if 'remark' in scan:
+            values['remark'] = scan['remark']
+        return values
+
+    @staticmethod
+    def _validate_references(scans):
+        """校验扫码条目中引用的位置/部门/用户是否存在"""
+        from apps.accounts.models import User
+        from apps.organizations.models import Department, Location
+
+        for key, model, label in (
+            ('actual_location', Location, '位置'),
+            ('actual_department', Department, '部门'),
+            ('actual_user', User, '使用人'),
+        ):
+            ids = {scan[key] for scan in scans if scan.get(key)}
+            if not ids:
+                continue
+            missing = ids - set(model.objects.filter(pk__in=ids).values_list('pk', flat=True))
+            if missing:
+                raise BusinessException(f'{label}不存在', data={key: sorted(missing)})
+
+    @staticmethod
+    def get_statistics(task_id: int) -> Dict:
+        """单条条件聚合查询统计盘点进度"""
+        from apps.inventory.models import InventoryRecord
+
+        Result = InventoryRecord.Result
+        stats = InventoryRecord.objects.filter(task_id=task_id).aggregate(
+            total=Count('id'),
+            unchecked=Count('id', filter=Q(result=Result.UNCHECKED)),
+            normal=Count('id', filter=Q(result=Result.NORMAL)),
+            loss=Count('id', filter=Q(result=Result.LOSS)),
+            surplus=Count('id', filter=Q(result=Result.SURPLUS)),
+        )
+        stats['checked'] = stats['total'] - stats['unchecked']
+        stats['abnormal'] = stats['loss'] + stats['surplus']
+        stats['progress'] = int(stats['checked'] / stats['total'] * 100) if stats['total'] else 0
+        return stats
+
+    @classmethod
+    def refresh_statistics(cls, task_id: int) -> Dict:
+        """重新统计并回写任务计数字段"""
+        from apps.inventory.models import InventoryTask
+
+        stats = cls.get_statistics(task_id)
+        InventoryTask.objects.filter(pk=task_id).update(
+            total_assets=stats['total'],
+            checked_assets=stats['checked'],
+            normal_count=stats['normal'],
+            loss_count=stats['loss'],
+            surplus_count=stats['surplus'],
+            updated_at=timezone.now(),
+        )
+        return stats
+
+    # 差异类型 -> (实际字段, 账面字段, 资产字段)
+    MISMATCH_FIELDS = {
+        'location': ('actual_location', 'book_location', 'location'),
+        'department': ('actual_department', 'book_department', 'using_department'),
+        'user': ('actual_user', 'book_user', 'using_user'),
+    }
+
+    @classmethod
+    def _mismatch_q(cls, kind: str) -> Q:
+        """实际信息已填写且与账面不一致（账面为空也算不一致）"""
+        actual, book, _ = cls.MISMATCH_FIELDS[kind]
+        return Q(**{f'{actual}__isnull': False}) & (
+            Q(**{f'{book}__isnull': True}) | ~Q(**{actual: F(book)})
+        )
+
+    @classmethod
+    def complete_task(cls, task_id: int, user, apply_corrections: bool = False) -> Dict:
+        """
+        结盘 - 未盘记录记为盘亏，统计账实差异，可选将实际信息回写资产
+
+        Args:
+            task_id: 盘点任务ID
+            user: 操作用户
+            apply_corrections: 是否将已盘到资产的实际位置/部门/使用人批量回写到资产
+
+        Returns:
+            {'statistics', 'mismatch': {'location', 'department', 'user'}, 'corrected'}
+        """
+        from apps.assets.models import Asset, AssetOperation
+        from apps.inventory.models import InventoryTask, InventoryRecord
+
+        Result = InventoryRecord.Result
+        with transaction.atomic():
+            task = cls.get_task(task_id, for_update=True)
+            if task.status != InventoryTask.Status.IN_PROGRESS:
+                raise BusinessException('只能完成进行中的盘点任务')
+
+            now = timezone.now()
+            records = InventoryRecord.objects.filter(task=task)
+            records.filter(result=Result.UNCHECKED).update(result=Result.LOSS, check_time=now)
+
+            # 已盘到的资产（正常/盘盈）在数据库中统计账实差异
+            found = records.filter(result__in=[Result.NORMAL, Result.SURPLUS])
+            mismatch = found.aggregate(**{
+                kind: Count('id', filter=cls._mismatch_q(kind)) for kind in cls.MISMATCH_FIELDS
+            })
+
+            corrected = 0
+            if apply_corrections and any(mismatch.values()):
+                any_mismatch = Q()
+                for kind in cls.MISMATCH_FIELDS:
+                    any_mismatch |= cls._mismatch_q(kind)
+                rows = list(found.filter(any_mismatch).values(
+                    'asset_id', *(f'{f}_id' for fields in cls.MISMATCH_FIELDS.values() for f in fields[:2])
+                ))
+                asset_ids = [row['asset_id'] for row in rows]
+
+                # 单条 UPDATE：各字段取盘点实际值，未填写时保持原值
+                record = InventoryRecord.objects.filter(task=task, asset_id=OuterRef('pk'))
+                Asset.objects.filter(id__in=asset_ids).update(
+                    updated_at=now,
+                    version=F('version') + 1,
+                    **{
+                        asset_field: Coalesce(Subquery(record.values(f'{actual}_id')[:1]), F(f'{asset_field}_id'))
+                        for actual, _, asset_field in cls.MISMATCH_FIELDS.values()
+                    }
+                )
+                AssetOperation.objects.bulk_create(
+                    [
+                        AssetOperation(
+                            asset_id=row['asset_id'],
+                            operation_type=AssetOperation.OperationType.INVENTORY,
+                            operation_no=task.task_no,
+                            description=f'盘点结果回写: {task.name}',
+                            old_data={
+                                f'{asset_field}_id': row[f'{book}_id']
+                                for actual, book, asset_field in cls.MISMATCH_FIELDS.values()
+                                if row[f'{actual}_id'] is not None
+                            },
+                            new_data={
+                                f'{asset_field}_id': row[f'{actual}_id']
+                                for actual, _, asset_field in cls.MISMATCH_FIELDS.values()
+                                if row[f'{actual}_id'] is not None
+                            },
+                            operator=user,
+                        )
+                        for row in rows
+                    ],
+                    batch_size=cls.BATCH_SIZE
+                )
+                corrected = len(asset_ids)
+
+            statistics = cls.refresh_statistics(task.pk)
+            InventoryTask.objects.filter(pk=task.pk).update(
+                status=InventoryTask.Status.COMPLETED, actual_end_date=now.date()
+            )
+
+        return {'statistics': statistics, 'mismatch': mismatch, 'corrected': corrected}
@@ -0,0 +1,309 @@
+"""
+资产标签渲染服务 - Asset Label Rendering Service
+
+将 AssetLabel 模板批量渲染为 PDF（多页）或 ZPL（斑马打印机指令流）：
+- 模板只编译一次：单位换算、字段取值路径在编译时确定，资产按 values() 分块迭代
+- ZPL 逐张生成，可直接流式返回；PDF 逐页写入文件，不在内存中保留资产对象
+- 二维码/条形码图片按内容哈希缓存，重复打印不重复生成
+- 大批量由 Celery 任务在后台渲染到存储，返回下载地址
+
+template_config 结构（坐标与尺寸单位均为毫米，原点在标签左上角）::
+
+    {
+        "dpi": 203,                      # ZPL 打印机分辨率（203 / 300 / 600）
+        "zpl_font": "E:SIMSUN.TTF",      # 可选，打印机中文字体；为空使用内置字体 0
+        "pdf_font": "/usr/share/fonts/simsun.ttf",  # 可选，嵌入 PDF 的 TTF 字体；为空使用 STSong-Light（不嵌入）
+        "sheet": {                       # 可选，PDF 拼版到 A4 纸；为空时每页一张标签
+            "page": "A4", "columns": 3, "rows": 8, "margin": 5, "gap": 2
+        },
+        "elements": [
+            {"type": "text", "field": "name", "x": 2, "y": 2, "font_size": 3, "prefix": "名称: ", "max_length": 20},
+            {"type": "text", "text": "固定资产标签", "x": 2, "y": 8, "font_size": 3},
+            {"type": "qrcode", "field": "qrcode", "fallback": "asset_code", "x": 30, "y": 2, "size": 16},
+            {"type": "barcode", "field": "barcode", "fallback": "asset_code", "x": 2, "y": 12,
+             "width": 26, "height": 6, "show_text": false}
+        ]
+    }
+
+field 取值见 services/label_template.py 的 LABEL_FIELDS，自定义字段使用 "custom.<字段key>"。
+"""
+import os
+import tempfile
+import uuid
+from functools import lru_cache
+from io import BytesIO
+from typing import Dict, Iterable, Iterator, List
+
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfgen import canvas
+
+from apps.common.exceptions import BusinessException, NotFoundError, ValidationError
+from .base import BaseService
+from .label_template import CompiledLabel, LabelImageCache, PAGE_SIZES
+
+
+class LabelRenderService(BaseService):
+    """资产标签批量渲染服务"""
+
+    CHUNK_SIZE = 500
+    FORMATS = ('pdf', 'zpl')
+    # 超过该数量的批次建议走后台任务
+    SYNC_LIMIT = 500
+    OUTPUT_DIR = 'labels'
+    # 渲染结果超过该大小时落盘到临时文件
+    SPOOL_MAX_SIZE = 16 * 1024 * 1024
+    # 后台任务归属：提交人才能查询任务状态与下载地址
+    JOB_CACHE_KEY = 'label_job:{user_id}:{task_id}'
+    JOB_CACHE_TIMEOUT = 60 * 60 * 24
+
+    @classmethod
+    def get_label(cls, label_id, company_id=None):
+        from apps.assets.models import AssetLabel
+
+        queryset = AssetLabel.objects.filter(is_active=True)
+        if company_id:
+            queryset = queryset.filter(company_id=company_id)
+        if label_id:
+            label = queryset.filter(pk=label_id).first()
+        else:
+            label = queryset.filter(is_default=True).first()
+        if label is None:
+            raise NotFoundError('标签模板不存在或未启用')
+        return label
+
+    @classmethod
+    def compile(cls, label) -> CompiledLabel:
+        """编译模板，按 (模板, 更新时间) 缓存在进程内"""
+        return cls._compile_cached(label.id, label.updated_at, label)
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _compile_cached(label_id, updated_at, label):
+        return CompiledLabel(label)
+
+    @classmethod
+    def iter_rows(cls, compiled: CompiledLabel, queryset) -> Iterator[Dict]:
+        """分块迭代资产取值行"""
+        return queryset.order_by('id').values(*compiled.paths).iterator(chunk_size=cls.CHUNK_SIZE)
+
+    # ==================== ZPL ====================
+
+    @classmethod
+    def iter_zpl(cls, compiled: CompiledLabel, rows: Iterable[Dict]) -> Iterator[str]:
+        """逐张生成 ZPL，每张标签为一个 ^XA...^XZ 块"""
+        dots = compiled.dpi / 25.4
+        header = f'^XA^CI28^PW{round(compiled.width * dots)}^LL{round(compiled.height * dots)}'
+
+        for row in rows:
+            parts = [header]
+            for element in compiled.elements:
+                value = compiled.get_value(element, row)
+                if not value:
+                    continue
+                origin = f"^FO{round(element['x'] * dots)},{round(element['y'] * dots)}"
+                if element['type'] == 'text':
+                    font_height = round(element['font_size'] * dots)
+                    font = (
+                        f'^A@N,{font_height},{font_height},{compiled.zpl_font}'
+                        if compiled.zpl_font else f'^A0N,{font_height},{font_height}'
+                    )
+                    parts.append(f'{origin}{font}^FH_^FD{cls._zpl_escape(value)}^FS')
+                elif element['type'] == 'qrcode':
+                    # 按 25 模块（版本 2）估算放大倍数，ZPL 取值 1-10
+                    magnification = max(1, min(10, round(element['size'] * dots / 25)))
+                    parts.append(f'{origin}^BQN,2,{magnification}^FH_^FDMA,{cls._zpl_escape(value)}^FS')
+                else:
+                    interpretation = 'Y' if element['show_text'] else 'N'
+                    parts.append(
+                        f"{origin}^BY2^BCN,{round(element['height'] * dots)},{interpretation},N,N"
+                        f'^FH_^FD{cls._zpl_escape(value)}^FS'
+                    )
+            parts.append('^XZ\n')
+            yield ''.join(parts)
+
+    @staticmethod
+    def _zpl_escape(value: str) -> str:
+        # ^FH_ 模式下以十六进制转义控制字符
+        return value.replace('_', '_5F').replace('^', '_5E').replace('~', '_7E')
+
+    # ==================== PDF ====================
+
+    @classmethod
+    def render_pdf(cls, compiled: CompiledLabel, rows: Iterable[Dict], output) -> int:
+        """
+        渲染 PDF 到 output（文件对象），返回标签数量
+
+        未配置 sheet 时每页一张标签（热敏标签打印机），否则按行列拼版
+        """
+        label_w, label_h = compiled.width * mm, compiled.height * mm
+        sheet = compiled.sheet
+        if sheet:
+            page_w, page_h = PAGE_SIZES.get(sheet.get('page', 'A4'), A4)
+            columns = int(sheet.get('columns', 1))
+            per_page = columns * int(sheet.get('rows', 1))
+            margin = float(sheet.get('margin', 5)) * mm
+            gap = float(sheet.get('gap', 0)) * mm
+        else:
+            page_w, page_h = label_w, label_h
+            columns, per_page, margin, gap = 1, 1, 0, 0
+
+        pdf = canvas.Canvas(output, pagesize=(page_w, page_h))
+        pdf.setTitle(compiled.name)
+        count = 0
+        for row in rows:
+            slot = count % per_page
+            if count and slot == 0:
+                pdf.showPage()
+            origin_x = margin + (slot % columns) * (label_w + gap)
+            origin_top = page_h - margin - (slot // columns) * (label_h + gap)
+            cls._draw_label(pdf, compiled, row, origin_x, origin_top)
+            count += 1
+
+        if count == 0:
+            raise BusinessException('没有需要打印的资产')
+        pdf.showPage()
+        pdf.save()
+        return count
+
+    @staticmethod
+    def _draw_label(pdf, compiled, row, origin_x, origin_top):
+        for element in compiled.elements:
+            value = compiled.get_value(element, row)
+            if not value:
+                continue
+            x = origin_x + element['x'] * mm
+            top = origin_top - element['y'] * mm
+            if element['type'] == 'text':
+                font_size = element['font_size'] * mm
+                pdf.setFont(compiled.pdf_font, font_size)
+                pdf.drawString(x, top - font_size, value)
+            elif element['type'] == 'qrcode':
+                size = element['size'] * mm
+                pdf.drawImage(LabelImageCache.get_reader('qrcode', value), x, top - size, size, size)
+            else:
+                width, height = element['width'] * mm, element['height'] * mm
+                pdf.drawImage(LabelImageCache.get_reader('barcode', value), x, top - height, width, height)
+                if element['show_text']:
+                    pdf.setFont(compiled.pdf_font, 2 * mm)
+                    pdf.drawCentredString(x + width / 2, top - height - 2 * mm, value)
+
+    @classmethod
+    def print_labels(cls, user, label, queryset, fmt: str = 'pdf', run_async: bool = False):
+        """
+        渲染一批资产标签：超过 SYNC_LIMIT 或指定 run_async 时提交后台任务
+
+        Returns:
+            下载响应，或后台任务 {'message', 'task_id', 'count'}
+
+        Raises:
+            ValidationError: 格式不支持或没有需要打印的资产
+        """
+        if fmt not in cls.FORMATS:
+            raise ValidationError(f'不支持的标签格式: {fmt}')
+        count = queryset.count()
+        if not count:
+            raise ValidationError('没有需要打印的资产')
+
+        if run_async or count > cls.SYNC_LIMIT:
+            task_id = cls.submit_job(user, label, list(queryset.values_list('id', flat=True)), fmt)
+            return {'message': '标签渲染任务已提交', 'task_id': task_id, 'count': count}
+        return cls.render_response(label, queryset, fmt)
+
+    @classmethod
+    def render_response(cls, label, queryset, fmt: str = 'pdf'):
+        """同步渲染为下载响应：ZPL 流式返回，PDF 整体返回"""
+        compiled = cls.compile(label)
+        rows = cls.iter_rows(compiled, queryset)
+        filename = f"labels_{timezone.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+
+        if fmt == 'zpl':
+            response = StreamingHttpResponse(cls.iter_zpl(compiled, rows), content_type='text/plain; charset=utf-8')
+        else:
+            output = BytesIO()
+            cls.render_pdf(compiled, rows, output)
+            response = HttpResponse(output.getvalue(), content_type='application/pdf')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    # ==================== 后台批量渲染 ====================
+
+    @classmethod
+    def submit_job(cls, user, label, asset_ids: List[int], fmt: str = 'pdf') -> str:
+        """提交后台渲染任务并记录归属，返回任务ID"""
+        from apps.assets.tasks import render_asset_labels
+
+        task = render_asset_labels.delay(label.id, asset_ids, fmt)
+        cache.set(
+            cls.JOB_CACHE_KEY.format(user_id=user.id, task_id=task.id),
+            {'label': label.id, 'format': fmt, 'count': len(asset_ids)},
+            cls.JOB_CACHE_TIMEOUT
+        )
+        return task.id
+
+    @classmethod
+    def get_job(cls, user, task_id: str) -> Dict:
+        """
+        查询提交人自己的标签渲染任务
+
+        Raises:
+            NotFoundError: 任务不存在、已过期或不是该用户提交的标签任务
+        """
+        from celery.result import AsyncResult
+
+        if cache.get(cls.JOB_CACHE_KEY.format(user_id=user.id, task_id=task_id)) is None:
+            raise NotFoundError('标签任务不存在')
+
+        result = AsyncResult(task_id)
+        data = {'task_id': task_id, 'status': result.status}
+        if result.successful():
+            data['result'] = result.result
+        elif result.failed():
+            data['error'] = str(result.result)
+        return data
+
+    @classmethod
+    def render_to_storage(cls, label_id: int, asset_ids: List[int], fmt: str = 'pdf') -> Dict:
+        """
+        渲染到默认存储，供 Celery 任务调用
+
+        Returns:
+            {'count', 'format', 'path', 'url'}
+        """
+        from apps.assets.models import Asset, AssetLabel
+
+        if fmt not in cls.FORMATS:
+            raise BusinessException(f'不支持的标签格式: {fmt}')
+        try:
+            label = AssetLabel.objects.get(pk=label_id)
+        except AssetLabel.DoesNotExist:
+            raise NotFoundError('标签模板不存在')
+
+        compiled = cls.compile(label)
+        rows = cls.iter_rows(compiled, Asset.objects.filter(id__in=asset_ids, is_deleted=False))
+
+        path = os.path.join(
+            cls.OUTPUT_DIR, timezone.now().strftime('%Y%m%d'), f'{uuid.uuid4().hex}.{fmt}'
+        )
+        with tempfile.SpooledTemporaryFile(max_size=cls.SPOOL_MAX_SIZE) as buffer:
+            if fmt == 'pdf':
+                count = cls.render_pdf(compiled, rows, buffer)
+            else:
+                count = 0
+                for block in cls.iter_zpl(compiled, rows):
+                    buffer.write(block.encode('utf-8'))
+                    count += 1
+            buffer.seek(0)
+            saved_path = default_storage.save(path, File(buffer))
+
+        return {
+            'count': count,
+            'format': fmt,
+            'path': saved_path,
+            'url': default_storage.url(saved_path),
+        }
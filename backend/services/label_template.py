@@ -0,0 +1,213 @@
+"""
+资产标签模板编译 - Asset Label Template
+
+LabelRenderService 使用的模板编译与图片缓存:
+- CompiledLabel: 模板编译一次，单位换算、字段取值路径与字体在编译时确定
+- LabelImageCache: 二维码/条形码 PNG 按内容哈希缓存
+
+template_config 结构见 services/label_service.py。
+"""
+import hashlib
+from functools import lru_cache
+from io import BytesIO
+
+import barcode
+import qrcode
+from barcode.writer import ImageWriter
+from django.core.cache import cache
+from reportlab.lib.pagesizes import A4, A3, A5
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+from reportlab.pdfbase.ttfonts import TTFont
+
+from apps.common.exceptions import BusinessException
+
+
+# 标签可用字段 -> 取值路径（多个路径时取第一个非空值）
+LABEL_FIELDS = {
+    'asset_code': ('asset_code',),
+    'name': ('name',),
+    'barcode': ('barcode',),
+    'qrcode': ('qrcode',),
+    'rfid_code': ('rfid_code',),
+    'serial_number': ('serial_number',),
+    'brand': ('brand',),
+    'model': ('model',),
+    'unit': ('unit',),
+    'status': ('status',),
+    'acquisition_date': ('acquisition_date',),
+    'warranty_expiry': ('warranty_expiry',),
+    'company': ('company__name',),
+    'category': ('category__name',),
+    'using_department': ('using_department__name',),
+    'using_user': ('using_user__nickname', 'using_user__username'),
+    'location': ('location__name',),
+    'manage_department': ('manage_department__name',),
+    'manager': ('manager__nickname', 'manager__username'),
+}
+
+CUSTOM_FIELD_PREFIX = 'custom.'
+
+PAGE_SIZES = {'A3': A3, 'A4': A4, 'A5': A5}
+
+PDF_FONT = 'STSong-Light'
+
+DEFAULT_ELEMENTS = [
+    {'type': 'text', 'field': 'name', 'x': 2, 'y': 2, 'font_size': 3},
+    {'type': 'text', 'field': 'asset_code', 'x': 2, 'y': 7, 'font_size': 2.5},
+    {'type': 'text', 'field': 'using_department', 'x': 2, 'y': 11, 'font_size': 2.5},
+]
+
+
+class CompiledLabel:
+    """编译后的标签模板"""
+
+    def __init__(self, label):
+        config = label.template_config or {}
+        self.label_id = label.id
+        self.name = label.name
+        self.width = float(label.width)
+        self.height = float(label.height)
+        self.dpi = int(config.get('dpi') or 203)
+        self.zpl_font = config.get('zpl_font') or ''
+        self.pdf_font = self._register_pdf_font(config.get('pdf_font'))
+        self.sheet = config.get('sheet') or None
+
+        elements = config.get('elements') or self._default_elements()
+        self.elements = [self._compile_element(element) for element in elements]
+
+        # 所有元素需要的取值路径，一次 values() 查询取出
+        paths = {'id'}
+        for element in self.elements:
+            for field in element['fields']:
+                paths.update(self._field_paths(field))
+        self.paths = sorted(paths)
+
+        from apps.assets.models import Asset
+        self.status_labels = dict(Asset.Status.choices)
+
+    @staticmethod
+    def _register_pdf_font(font_file):
+        """注册 PDF 字体，返回字体名"""
+        if not font_file:
+            font_name = PDF_FONT
+            if font_name not in pdfmetrics.getRegisteredFontNames():
+                pdfmetrics.registerFont(UnicodeCIDFont(font_name))
+            return font_name
+
+        font_name = f'label-{hashlib.sha1(font_file.encode("utf-8")).hexdigest()[:8]}'
+        if font_name not in pdfmetrics.getRegisteredFontNames():
+            try:
+                pdfmetrics.registerFont(TTFont(font_name, font_file))
+            except Exception as e:
+                raise BusinessException(f'标签字体加载失败: {font_file} ({e})')
+        return font_name
+
+    def _default_elements(self):
+        """未配置元素时：左侧文字，右侧按标签高度放置二维码"""
+        size = max(min(self.height - 4, self.width / 2), 5)
+        return DEFAULT_ELEMENTS + [
+            {'type': 'qrcode', 'field': 'qrcode', 'fallback': 'asset_code',
+             'x': self.width - size - 2, 'y': 2, 'size': size},
+        ]
+
+    @staticmethod
+    def _field_paths(field):
+        if field.startswith(CUSTOM_FIELD_PREFIX):
+            return ('custom_data',)
+        return LABEL_FIELDS[field]
+
+    @staticmethod
+    def _compile_element(element):
+        element_type = element.get('type')
+        if element_type not in ('text', 'qrcode', 'barcode'):
+            raise BusinessException(f'不支持的标签元素类型: {element_type}')
+
+        fields = [f for f in (element.get('field'), element.get('fallback')) if f]
+        for field in fields:
+            if not field.startswith(CUSTOM_FIELD_PREFIX) and field not in LABEL_FIELDS:
+                raise BusinessException(f'标签字段不存在: {field}')
+        if element_type != 'text' and not fields:
+            raise BusinessException('二维码/条形码元素必须指定字段')
+
+        return {
+            'type': element_type,
+            'fields': fields,
+            'text': element.get('text', ''),
+            'prefix': element.get('prefix', ''),
+            'max_length': element.get('max_length'),
+            'x': float(element.get('x', 0)),
+            'y': float(element.get('y', 0)),
+            'font_size': float(element.get('font_size', 3)),
+            'size': float(element.get('size', 15)),
+            'width': float(element.get('width', 30)),
+            'height': float(element.get('height', 8)),
+            'show_text': bool(element.get('show_text', False)),
+        }
+
+    def get_value(self, element, row) -> str:
+        """按元素配置从 values() 行中取值"""
+        if not element['fields']:
+            return element['text']
+
+        value = ''
+        for field in element['fields']:
+            if field.startswith(CUSTOM_FIELD_PREFIX):
+                value = (row.get('custom_data') or {}).get(field[len(CUSTOM_FIELD_PREFIX):])
+            elif field == 'status':
+                value = self.status_labels.get(row.get('status'), row.get('status'))
+            else:
+                value = next((row[path] for path in LABEL_FIELDS[field] if row.get(path)), '')
+            if value not in (None, ''):
+                break
+
+        value = '' if value is None else str(value)
+        if element['max_length']:
+            value = value[:int(element['max_length'])]
+        if element['type'] == 'text' and value:
+            value = f"{element['prefix']}{value}"
+        return value
+
+
+class LabelImageCache:
+    """
+    二维码/条形码图片缓存
+
+    PNG 按 (类型, 内容) 哈希缓存在 Redis，多个 worker 与 Celery 共享；
+    进程内再保留最近使用的 ImageReader，同一批次内重复内容不重复解码
+    """
+
+    CACHE_KEY = 'label_image:{kind}:{digest}'
+    CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+    @classmethod
+    def get_png(cls, kind: str, value: str) -> bytes:
+        key = cls.CACHE_KEY.format(kind=kind, digest=hashlib.sha1(value.encode('utf-8')).hexdigest())
+        png = cache.get(key)
+        if png is None:
+            png = cls._generate(kind, value)
+            cache.set(key, png, cls.CACHE_TIMEOUT)
+        return png
+
+    @classmethod
+    @lru_cache(maxsize=2048)
+    def get_reader(cls, kind: str, value: str) -> ImageReader:
+        return ImageReader(BytesIO(cls.get_png(kind, value)))
+
+    @staticmethod
+    def _generate(kind: str, value: str) -> bytes:
+        output = BytesIO()
+        if kind == 'qrcode':
+            qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, box_size=8, border=1)
+            qr.add_data(value)
+            qr.make(fit=True)
+            qr.make_image().save(output, format='PNG')
+        else:
+            image = barcode.get('code128', value, writer=ImageWriter()).render({
+                'write_text': False,
+                'quiet_zone': 1,
+                'module_height': 10,
+            })
+            image.save(output, format='PNG')
+        return output.getvalue()
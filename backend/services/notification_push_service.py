@@ -0,0 +1,158 @@
+"""
+平台消息推送服务 - Notification Push Service
+
+通过企业微信/钉钉/飞书向系统用户推送消息:
+- 只能使用请求人可见公司（数据权限中的公司）的 SSO 配置，接收人限于该公司成员
+- 按接收人的 SSO 绑定关系分组到各平台，各平台请求在同一事件循环中并发等待，
+  一个平台响应缓慢不会阻塞其他平台，也不会占用 worker（ASGI 部署）
+"""
+import asyncio
+import logging
+from typing import Dict, List
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+
+from apps.common.exceptions import PermissionError, ValidationError
+from .base import BaseService
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationPushService(BaseService):
+    """平台消息推送业务服务"""
+
+    # SSO 绑定中保存的飞书用户ID为 union_id
+    FEISHU_RECEIVE_ID_TYPE = 'union_id'
+
+    # ==================== 校验 ====================
+
+    @staticmethod
+    def check_company(user, company_id) -> int:
+        """
+        校验请求人可以使用该公司的推送配置
+
+        Raises:
+            ValidationError: 公司ID不合法
+            PermissionError: 公司不在请求人的数据权限范围内
+        """
+        from apps.accounts.data_scope import DataScopeResolver
+
+        try:
+            company_id = int(company_id)
+        except (TypeError, ValueError):
+            raise ValidationError('公司ID不合法')
+
+        scope = DataScopeResolver.get_scope(user)
+        if scope is not None and company_id not in scope['company_ids']:
+            raise PermissionError('无权使用该公司的消息推送')
+        return company_id
+
+    @staticmethod
+    def clean_message(user_ids, content, msg_type='text', title='通知'):
+        """校验接收人与消息内容，返回 (用户ID列表, 消息)"""
+        if not user_ids or not content:
+            raise ValidationError('接收人和消息内容不能为空')
+        if not isinstance(user_ids, list):
+            raise ValidationError('user_ids 应为用户ID列表')
+        try:
+            user_ids = sorted({int(user_id) for user_id in user_ids})
+        except (TypeError, ValueError):
+            raise ValidationError('user_ids 应为用户ID列表')
+        return user_ids, {'type': msg_type or 'text', 'title': title or '通知', 'content': content}
+
+    # ==================== 推送 ====================
+
+    @staticmethod
+    def _build_adapter(config):
+        from adapters import WeWorkAdapter, DingTalkAdapter, FeishuAdapter
+
+        if config.provider == 'wework':
+            return WeWorkAdapter(
+                corp_id=config.corp_id or config.app_id,
+                agent_id=config.agent_id,
+                secret=config.app_secret,
+            )
+        if config.provider == 'dingtalk':
+            return DingTalkAdapter(app_key=config.app_id, app_secret=config.app_secret, agent_id=config.agent_id)
+        if config.provider == 'feishu':
+            return FeishuAdapter(app_id=config.app_id, app_secret=config.app_secret)
+        return None
+
+    @classmethod
+    def _load_targets(cls, company_id: int, user_ids: List[int]):
+        """
+        查询公司启用的平台配置与接收人绑定
+
+        Returns:
+            ([(provider, adapter, 平台用户ID列表)], 不属于该公司的用户ID列表)
+        """
+        from apps.accounts.models import User
+        from apps.sso.models import SSOConfig, SSOUserBinding
+
+        member_ids = set(
+            User.objects.filter(id__in=user_ids).filter(
+                Q(primary_company_id=company_id)
+                | Q(company_memberships__company_id=company_id, company_memberships__end_date__isnull=True)
+            ).values_list('id', flat=True).distinct()
+        )
+        skipped = [user_id for user_id in user_ids if user_id not in member_ids]
+
+        configs = {
+            config.provider: config
+            for config in SSOConfig.objects.filter(company_id=company_id, is_enabled=True)
+        }
+        if not configs or not member_ids:
+            return [], skipped
+
+        provider_user_ids = {}
+        for provider, provider_user_id in SSOUserBinding.objects.filter(
+            user_id__in=member_ids, provider__in=list(configs)
+        ).values_list('provider', 'provider_user_id'):
+            provider_user_ids.setdefault(provider, []).append(provider_user_id)
+
+        targets = []
+        for provider, ids in provider_user_ids.items():
+            adapter = cls._build_adapter(configs[provider])
+            if adapter is not None:
+                targets.append((provider, adapter, ids))
+        return targets, skipped
+
+    @classmethod
+    async def apush(cls, user, company_id, user_ids, message: Dict) -> Dict:
+        """
+        推送消息到接收人绑定的平台
+
+        Args:
+            user: 请求人（校验公司权限）
+            company_id: 公司ID（决定使用的平台配置）
+            user_ids: 系统用户ID列表，非该公司成员的跳过
+            message: {'type': 'text/markdown', 'title': ..., 'content': ...}
+
+        Returns:
+            {'results': {平台: 发送结果}, 'skipped_user_ids': [...]}
+        """
+        from apps.common.async_views import async_http_client
+
+        company_id = await sync_to_async(cls.check_company)(user, company_id)
+        targets, skipped = await sync_to_async(cls._load_targets)(company_id, user_ids)
+        if not targets:
+            return {'results': {}, 'skipped_user_ids': skipped}
+
+        async with async_http_client() as client:
+            results = await asyncio.gather(*(
+                adapter.asend_notification(
+                    ids,
+                    dict(message, receive_id_type=cls.FEISHU_RECEIVE_ID_TYPE) if provider == 'feishu' else message,
+                    client,
+                )
+                for provider, adapter, ids in targets
+            ), return_exceptions=True)
+
+        summary = {}
+        for (provider, _, ids), result in zip(targets, results):
+            if isinstance(result, Exception):
+                logger.error(f"[{provider}] 推送消息异常: {result}")
+                result = {'success': False, 'error': str(result)}
+            summary[provider] = dict(result, recipients=len(ids))
+        return {'results': summary, 'skipped_user_ids': skipped}
@@ -0,0 +1,316 @@
+"""
+采购验收服务 - Purchase Receipt Service
+
+采购订单验收入库（支持按明细部分验收、多次验收）:
+- 先锁定订单与明细并整体校验（状态、剩余可验收数量、耗材明细的入库仓库），任一明细不合法则不写入
+- 资产明细按验收数量生成资产卡片：编码按编码规则一次整段预留，资产与录入记录 bulk_create 批量写入
+- 耗材明细合并生成一张已入库的入库单（单号取 inbound_code 编码规则），库存通过 ReplenishmentService.apply_movements 批量记账
+- 已入库数量用条件 UPDATE（F 表达式）累加，全部到货后订单变为已完成，否则为部分入库
+以上在同一事务内完成，500 台电脑的验收为一次请求、固定数量的批量 SQL。
+"""
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from apps.common.exceptions import BusinessException, ConflictError, ValidationError
+from .base import BaseService
+
+
+class PurchaseReceiptService(BaseService):
+    """采购验收业务服务"""
+
+    BATCH_SIZE = 500
+
+    @classmethod
+    @transaction.atomic
+    def receive(cls, order_id: int, user, lines: Optional[Iterable[Dict]] = None, receive_date=None,
+                warehouse_id=None, location_id=None, manage_department_id=None, manager_id=None) -> Dict:
+        """
+        验收采购订单
+
+        Args:
+            order_id: 采购订单ID
+            user: 验收人
+            lines: [{'item': 明细ID, 'quantity': 本次验收数量, 'serial_numbers': [...], 'location': 存放位置ID}]，
+                   为空时验收全部未到货数量
+            receive_date: 验收日期（默认今天），作为资产取得日期与入库日期
+            warehouse_id: 耗材入库仓库（含耗材明细时必填）
+            location_id / manage_department_id / manager_id: 新资产的存放位置、管理部门、管理员
+
+        Returns:
+            {'receipt_no', 'order': {...}, 'items': [...], 'assets': [...], 'inbound': {...} | None}
+
+        Raises:
+            BusinessException: 订单状态不允许验收
+            ValidationError: 明细或默认位置/仓库/管理部门/管理员不合法，data.errors 列出每项错误
+        """
+        from apps.procurement.models import PurchaseOrder, PurchaseOrderItem
+
+        order = PurchaseOrder.objects.select_for_update().get(pk=order_id)
+        if order.status not in (PurchaseOrder.Status.APPROVED, PurchaseOrder.Status.PARTIAL):
+            raise BusinessException(f'订单状态为{order.get_status_display()}，不能验收')
+
+        items = {
+            item.pk: item
+            for item in PurchaseOrderItem.objects.select_for_update().filter(order=order)
+            .select_related('asset_category', 'consumable')
+        }
+        if receive_date and not hasattr(receive_date, 'year'):
+            receive_date = parse_date(str(receive_date))
+            if receive_date is None:
+                raise ValidationError('验收日期格式不正确')
+        receive_date = receive_date or timezone.localdate()
+
+        receipts, defaults = cls._validate_lines(
+            order, items, lines, warehouse_id=warehouse_id, location_id=location_id,
+            manage_department_id=manage_department_id, manager_id=manager_id
+        )
+        warehouse_id = defaults.pop('warehouse_id')
+        receipt_no = cls.generate_order_no('SH')
+
+        asset_lines = [receipt for receipt in receipts if receipt['item'].item_type != 'consumable']
+        consumable_lines = [receipt for receipt in receipts if receipt['item'].item_type == 'consumable']
+        assets = cls._create_assets(order, asset_lines, user, receipt_no, receive_date, **defaults)
+        inbound = cls._create_inbound(order, consumable_lines, user, receipt_no, receive_date, warehouse_id)
+
+        for receipt in receipts:
+            item, quantity = receipt['item'], receipt['quantity']
+            updated = PurchaseOrderItem.objects.filter(
+                pk=item.pk, received_quantity__lte=F('quantity') - quantity
+            ).update(received_quantity=F('received_quantity') + quantity)
+            if not updated:
+                raise ConflictError(f'{item.name} 验收数量超过订单剩余数量')
+            item.received_quantity += quantity
+
+        completed = not PurchaseOrderItem.objects.filter(
+            order=order, received_quantity__lt=F('quantity')
+        ).exists()
+        order.status = PurchaseOrder.Status.COMPLETED if completed else PurchaseOrder.Status.PARTIAL
+        order.save(update_fields=['status', 'updated_at'])
+
+        return {
+            'receipt_no': receipt_no,
+            'order': {'id': order.pk, 'order_no': order.order_no, 'status': order.status},
+            'items': [
+                {
+                    'item': receipt['item'].pk,
+                    'name': receipt['item'].name,
+                    'received': receipt['quantity'],
+                    'received_quantity': receipt['item'].received_quantity,
+                    'quantity': receipt['item'].quantity,
+                }
+                for receipt in receipts
+            ],
+            'assets': [{'id': asset.pk, 'asset_code': asset.asset_code, 'item': item_id} for asset, item_id in assets],
+            'inbound': {'id': inbound.pk, 'inbound_no': inbound.inbound_no} if inbound else None,
+        }
+
+    @classmethod
+    def _validate_lines(cls, order, items, lines, **default_ids) -> Tuple[List[Dict], Dict]:
+        """
+        校验验收明细与默认的仓库/位置/管理部门/管理员
+
+        Returns:
+            ([{'item', 'quantity', 'serial_numbers', 'location'}], {'warehouse_id', 'location_id', ...: 整数ID或None})
+        """
+        from apps.accounts.models import User
+        from apps.organizations.models import Department, Location
+
+        if lines is None:
+            lines = [
+                {'item': item.pk, 'quantity': item.quantity - item.received_quantity}
+                for item in items.values() if item.quantity > item.received_quantity
+            ]
+
+        errors = []
+        defaults = {}
+        for field, value in default_ids.items():
+            try:
+                defaults[field] = int(value) if value not in (None, '') else None
+            except (TypeError, ValueError):
+                defaults[field] = None
+                errors.append({'field': field, 'error': f'{field} 须为ID'})
+
+        receipts = {}
+        for index, line in enumerate(lines):
+            try:
+                item_id = int(line.get('item'))
+                quantity = int(line.get('quantity'))
+                location = int(line['location']) if line.get('location') else None
+            except (TypeError, ValueError):
+                errors.append({'index': index, 'error': '需提供明细 item、数量 quantity，位置 location 须为ID'})
+                continue
+            item = items.get(item_id)
+            if item is None:
+                errors.append({'index': index, 'item': item_id, 'error': '明细不属于该订单'})
+                continue
+            if quantity <= 0:
+                errors.append({'index': index, 'item': item_id, 'error': '验收数量必须大于0'})
+                continue
+
+            receipt = receipts.setdefault(item_id, {'item': item, 'quantity': 0, 'serial_numbers': [], 'location': None})
+            receipt['quantity'] += quantity
+            receipt['serial_numbers'].extend(str(number).strip() for number in line.get('serial_numbers') or [])
+            receipt['location'] = location or receipt['location']
+
+        location_ids = set()
+        for item_id, receipt in receipts.items():
+            item = receipt['item']
+            remaining = item.quantity - item.received_quantity
+            if receipt['quantity'] > remaining:
+                errors.append({'item': item_id, 'error': f'{item.name} 验收数量 {receipt["quantity"]} 超过未到货数量 {remaining}'})
+            if item.item_type == 'consumable':
+                if not item.consumable_id:
+                    errors.append({'item': item_id, 'error': f'{item.name} 未关联耗材，无法入库'})
+                if not default_ids.get('warehouse_id'):
+                    errors.append({'item': item_id, 'error': '耗材验收需指定入库仓库 warehouse'})
+            elif len(receipt['serial_numbers']) > receipt['quantity']:
+                errors.append({'item': item_id, 'error': f'{item.name} 序列号数量超过验收数量'})
+            if receipt['location']:
+                location_ids.add(receipt['location'])
+        location_ids.update(defaults[field] for field in ('warehouse_id', 'location_id') if defaults.get(field))
+
+        if location_ids:
+            valid = set(
+                Location.objects.filter(company_id=order.company_id, pk__in=location_ids).values_list('pk', flat=True)
+            )
+            invalid = sorted(location_ids - valid)
+            if invalid:
+                errors.append({'error': f'位置不存在或不属于该公司: {", ".join(map(str, invalid))}'})
+        if defaults.get('manage_department_id') and not Department.objects.filter(
+            pk=defaults['manage_department_id'], company_id=order.company_id
+        ).exists():
+            errors.append({'field': 'manage_department_id', 'error': '管理部门不存在或不属于该公司'})
+        if defaults.get('manager_id') and not User.objects.filter(
+            Q(primary_company_id=order.company_id)
+            | Q(company_memberships__company_id=order.company_id, company_memberships__end_date__isnull=True),
+            pk=defaults['manager_id'], is_active=True
+        ).exists():
+            errors.append({'field': 'manager_id', 'error': '管理员不存在或不属于该公司'})
+
+        if errors:
+            raise ValidationError('验收明细校验失败', data={'errors': errors})
+        if not receipts:
+            raise BusinessException('没有可验收的明细')
+        return list(receipts.values()), defaults
+
+    @classmethod
+    def _create_assets(cls, order, receipts, user, receipt_no, receive_date,
+                       location_id=None, manage_department_id=None, manager_id=None) -> List:
+        """按验收数量批量生成资产卡片，返回 [(资产, 明细ID)]"""
+        from apps.assets.models import Asset, AssetOperation
+        from apps.system.field_validator import CustomFieldValidator
+        from .asset_service import AssetService
+
+        total = sum(receipt['quantity'] for receipt in receipts)
+        if not total:
+            return []
+
+        codes = iter(AssetService.reserve_asset_codes(order.company_id, total))
+        # 新资产按自定义字段默认值初始化，必填项留待后续完善
+        custom_defaults, _ = CustomFieldValidator.for_module('asset').clean({})
+        remark = f'采购订单 {order.order_no} 验收入库（{receipt_no}）'
+
+        assets, item_ids = [], []
+        for receipt in receipts:
+            item = receipt['item']
+            category = item.asset_category
+            serial_numbers = receipt['serial_numbers']
+            for index in range(receipt['quantity']):
+                assets.append(Asset(
+                    company_id=order.company_id,
+                    asset_code=next(codes),
+                    name=item.name,
+                    category=category,
+                    model=item.model,
+                    serial_number=serial_numbers[index] if index < len(serial_numbers) else None,
+                    unit=item.unit or '台',
+                    acquisition_method=Asset.AcquisitionMethod.PURCHASE,
+                    acquisition_date=receive_date,
+                    original_value=item.price,
+                    current_value=item.price,
+                    depreciation_method=category.depreciation_method if category else None,
+                    useful_life=category.useful_life if category else None,
+                    salvage_rate=category.salvage_rate if category else None,
+                    depreciation_start_date=receive_date,
+                    location_id=receipt['location'] or location_id,
+                    manage_department_id=manage_department_id,
+                    manager_id=manager_id,
+                    supplier_id=order.supplier_id,
+                    custom_data=dict(custom_defaults),
+                    remark=remark,
+                    created_by=user,
+                ))
+                item_ids.append(item.pk)
+        assets = Asset.objects.bulk_create(assets, batch_size=cls.BATCH_SIZE)
+
+        AssetOperation.objects.bulk_create([
+            AssetOperation(
+                asset=asset,
+                operation_type=AssetOperation.OperationType.CREATE,
+                operation_no=receipt_no,
+                description=f'采购验收录入：{asset.name}',
+                new_data={
+                    'asset_code': asset.asset_code,
+                    'name': asset.name,
+                    'category': asset.category.name if asset.category else None,
+                    'original_value': str(asset.original_value) if asset.original_value else None,
+                    'status': asset.get_status_display(),
+                    'purchase_order': order.order_no,
+                },
+                operator=user,
+            )
+            for asset in assets
+        ], batch_size=cls.BATCH_SIZE)
+        return list(zip(assets, item_ids))
+
+    @classmethod
+    def _create_inbound(cls, order, receipts, user, receipt_no, receive_date, warehouse_id):
+        """耗材明细合并生成已入库的入库单并记账"""
+        from apps.consumables.models import ConsumableInbound, ConsumableInboundItem
+        from .consumable_document_service import ConsumableDocumentService
+        from .replenishment_service import ReplenishmentService
+
+        if not receipts:
+            return None
+
+        config = ConsumableDocumentService.DOCUMENTS[ConsumableDocumentService.INBOUND]
+        inbound_no = cls.reserve_rule_codes(
+            order.company_id, config['rule_code'], 1, config['rule_defaults'],
+            taken=lambda block: ConsumableInbound.objects.filter(inbound_no__in=block).values_list('inbound_no', flat=True)
+        )[0]
+
+        inbound_items = [
+            ConsumableInboundItem(
+                consumable_id=receipt['item'].consumable_id,
+                quantity=receipt['quantity'],
+                price=receipt['item'].price,
+                amount=receipt['item'].price * receipt['quantity'],
+            )
+            for receipt in receipts
+        ]
+        inbound = ConsumableInbound.objects.create(
+            inbound_no=inbound_no,
+            company_id=order.company_id,
+            warehouse_id=warehouse_id,
+            status=ConsumableInbound.Status.APPROVED,
+            inbound_date=receive_date,
+            supplier_id=order.supplier_id,
+            total_amount=sum((item.amount for item in inbound_items), Decimal('0')),
+            remark=f'采购订单 {order.order_no} 验收入库（{receipt_no}）',
+            created_by=user,
+        )
+        for item in inbound_items:
+            item.inbound = inbound
+        ConsumableInboundItem.objects.bulk_create(inbound_items)
+
+        movements = defaultdict(int)
+        for item in inbound_items:
+            movements[item.consumable_id] += item.quantity
+        ReplenishmentService.apply_movements(warehouse_id, movements)
+        return inbound
@@ -0,0 +1,337 @@
+"""
+耗材补货服务 - Replenishment Service
+
+- 出入库记账：按 (用品, 仓库) 批量增减库存，同时维护 ConsumableStock.is_low_stock 预警标记，
+  预警列表与统计直接按标记过滤，不再每次关联用品表比较安全库存
+- 消耗速度：一次聚合最近 N 天已出库的领用明细，得到每个用品（或每个仓库）的日均消耗
+- 补货建议：跨仓库汇总现有库存与在途数量（未审批的采购申请、采购订单未到货部分），
+  结合日均消耗、采购周期计算再订货点与建议采购量，可一键批量生成采购申请草稿
+
+参数（系统配置，公司级覆盖全局，均可在请求中临时指定）:
+    replenishment_velocity_days   消耗统计天数（默认 30）
+    replenishment_lead_time_days  采购周期天数（默认 7）
+    replenishment_review_days     补货覆盖天数（默认 30）
+"""
+import math
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional
+
+from django.db import transaction
+from django.db.models import Case, F, Sum, Value, When
+from django.utils import timezone
+
+from apps.common.exceptions import BusinessException
+from .base import BaseService
+
+
+class ReplenishmentService(BaseService):
+    """耗材补货业务服务"""
+
+    DEFAULT_VELOCITY_DAYS = 30
+    DEFAULT_LEAD_TIME_DAYS = 7
+    DEFAULT_REVIEW_DAYS = 30
+
+    # ==================== 出入库记账 ====================
+
+    @classmethod
+    @transaction.atomic
+    def apply_movements(cls, warehouse_id: int, movements: Dict[int, int]) -> List:
+        """
+        按仓库批量记账并刷新预警标记
+
+        Args:
+            warehouse_id: 仓库（存放位置）ID
+            movements: {用品ID: 数量变化}，入库为正、出库为负
+
+        Returns:
+            更新后的 ConsumableStock 列表
+
+        Raises:
+            BusinessException: 任一用品库存不足时整体回滚，data.shortages 列出不足的用品
+        """
+        from apps.consumables.models import Consumable, ConsumableStock
+
+        totals = defaultdict(int)
+        for consumable_id, delta in movements.items():
+            totals[int(consumable_id)] += int(delta)
+        totals = {consumable_id: delta for consumable_id, delta in totals.items() if delta}
+        if not totals:
+            return []
+
+        consumables = {
+            row[0]: row for row in Consumable.objects.filter(pk__in=totals).values_list('id', 'name', 'min_stock')
+        }
+        stocks = {
+            stock.consumable_id: stock
+            for stock in ConsumableStock.objects.select_for_update().filter(
+                warehouse_id=warehouse_id, consumable_id__in=totals
+            )
+        }
+
+        shortages = []
+        for consumable_id, delta in totals.items():
+            current = stocks[consumable_id].quantity if consumable_id in stocks else 0
+            if delta < 0 and current + delta < 0:
+                name = consumables.get(consumable_id, (None, str(consumable_id)))[1]
+                shortages.append({'consumable': consumable_id, 'name': name, 'quantity': current, 'required': -delta})
+        if shortages:
+            raise BusinessException(
+                '；'.join(f"{row['name']} 库存不足，当前库存: {row['quantity']}" for row in shortages),
+                data={'shortages': shortages}
+            )
+
+        missing = [consumable_id for consumable_id in totals if consumable_id not in stocks]
+        if missing:
+            ConsumableStock.objects.bulk_create(
+                [ConsumableStock(consumable_id=consumable_id, warehouse_id=warehouse_id) for consumable_id in missing],
+                ignore_conflicts=True
+            )
+            for stock in ConsumableStock.objects.select_for_update().filter(
+                warehouse_id=warehouse_id, consumable_id__in=missing
+            ):
+                stocks[stock.consumable_id] = stock
+
+        now = timezone.now()
+        for consumable_id, delta in totals.items():
+            stock = stocks[consumable_id]
+            stock.quantity += delta
+            stock.is_low_stock = stock.quantity <= consumables.get(consumable_id, (None, None, 0))[2]
+            stock.updated_at = now
+        ConsumableStock.objects.bulk_update(list(stocks.values()), ['quantity', 'is_low_stock', 'updated_at'])
+        return list(stocks.values())
+
+    @staticmethod
+    def refresh_low_stock(consumable_id: int, min_stock: int) -> int:
+        """安全库存调整后重算该用品所有仓库的预警标记（单条 UPDATE）"""
+        from apps.consumables.models import ConsumableStock
+
+        return ConsumableStock.objects.filter(consumable_id=consumable_id).update(
+            is_low_stock=Case(When(quantity__lte=min_stock, then=Value(True)), default=Value(False))
+        )
+
+    # ==================== 消耗速度 ====================
+
+    @classmethod
+    def consumption_velocity(cls, company_id: int, days: int, end_date=None, by_warehouse: bool = False) -> Dict:
+        """
+        最近 days 天（含 end_date）已出库领用的日均消耗
+
+        Returns:
+            {用品ID: 日均数量} 或 by_warehouse 时 {(用品ID, 仓库ID): 日均数量}
+        """
+        from apps.consumables.models import ConsumableOutbound, ConsumableOutboundItem
+
+        end_date = end_date or timezone.localdate()
+        start_date = end_date - timedelta(days=days - 1)
+        keys = ['consumable_id', 'outbound__warehouse_id'] if by_warehouse else ['consumable_id']
+        rows = ConsumableOutboundItem.objects.filter(
+            outbound__company_id=company_id,
+            outbound__status=ConsumableOutbound.Status.APPROVED,
+            outbound__outbound_type=ConsumableOutbound.OutboundType.RECEIVE,
+            outbound__outbound_date__range=(start_date, end_date),
+        ).values(*keys).annotate(total=Sum('quantity')).order_by().values_list(*keys, 'total')
+
+        velocity = {}
+        for row in rows:
+            key = row[:2] if by_warehouse else row[0]
+            velocity[key] = (Decimal(row[-1] or 0) / days).quantize(Decimal('0.01'))
+        return velocity
+
+    # ==================== 补货建议 ====================
+
+    @classmethod
+    def get_parameters(cls, company_id: int, **overrides) -> Dict[str, int]:
+        """补货参数：请求指定 > 系统配置 > 默认值"""
+        from apps.system.config_cache import ConfigCache
+
+        params = {}
+        for name, default in (
+            ('velocity_days', cls.DEFAULT_VELOCITY_DAYS),
+            ('lead_time_days', cls.DEFAULT_LEAD_TIME_DAYS),
+            ('review_days', cls.DEFAULT_REVIEW_DAYS),
+        ):
+            value = overrides.get(name)
+            if value in (None, ''):
+                value = ConfigCache.get_config(f'replenishment_{name}', company_id, default=default, cast=int)
+            try:
+                params[name] = max(int(value), 1 if name == 'velocity_days' else 0)
+            except (TypeError, ValueError):
+                raise BusinessException(f'{name} 必须是整数')
+        return params
+
+    @classmethod
+    def suggestions(cls, company_id: int, consumables=None, include_all: bool = False, **overrides) -> Dict:
+        """
+        计算补货建议（跨仓库汇总）
+
+        再订货点 = max(安全库存, 日均消耗 × 采购周期)
+        目标库存 = max(最高库存, 再订货点 + 日均消耗 × 覆盖天数)
+        可用库存（现有 + 在途）不高于再订货点时，建议采购量 = 目标库存 - 可用库存
+
+        Args:
+            consumables: 用品查询集（视图传入已按数据权限过滤的查询集），默认公司全部启用用品
+            include_all: 为 True 时返回所有用品，否则只返回需要补货的用品
+
+        Returns:
+            {'parameters': {...}, 'items': [...]}
+        """
+        from apps.consumables.models import Consumable, ConsumableStock
+        from apps.procurement.models import PurchaseOrder, PurchaseOrderItem, PurchaseRequest, PurchaseRequestItem
+
+        params = cls.get_parameters(company_id, **overrides)
+        if consumables is None:
+            consumables = Consumable.objects.all()
+        rows = consumables.filter(company_id=company_id, is_active=True).values_list(
+            'id', 'code', 'name', 'unit', 'price', 'min_stock', 'max_stock', 'category_id', 'category__name'
+        )
+
+        on_hand = dict(
+            ConsumableStock.objects.filter(consumable__company_id=company_id).values('consumable_id')
+            .annotate(total=Sum('quantity')).order_by().values_list('consumable_id', 'total')
+        )
+        low_warehouses = defaultdict(list)
+        for consumable_id, warehouse_id, warehouse_name, quantity in ConsumableStock.objects.filter(
+            consumable__company_id=company_id, is_low_stock=True
+        ).values_list('consumable_id', 'warehouse_id', 'warehouse__name', 'quantity'):
+            low_warehouses[consumable_id].append({
+                'warehouse': warehouse_id, 'warehouse_name': warehouse_name, 'quantity': quantity
+            })
+        # 在途 = 未审批的采购申请 + 采购订单未到货数量（申请审批后由订单承接，不重复计算）
+        on_order = defaultdict(int)
+        for consumable_id, total in PurchaseRequestItem.objects.filter(
+            request__company_id=company_id,
+            request__status__in=[PurchaseRequest.Status.DRAFT, PurchaseRequest.Status.PENDING],
+            consumable__isnull=False,
+        ).values('consumable_id').annotate(total=Sum('quantity')).order_by().values_list('consumable_id', 'total'):
+            on_order[consumable_id] += total or 0
+        for consumable_id, total in PurchaseOrderItem.objects.filter(
+            order__company_id=company_id,
+            order__status__in=[
+                PurchaseOrder.Status.DRAFT, PurchaseOrder.Status.PENDING,
+                PurchaseOrder.Status.APPROVED, PurchaseOrder.Status.PARTIAL,
+            ],
+            item_type=PurchaseRequestItem.ItemType.CONSUMABLE,
+            consumable__isnull=False,
+        ).values('consumable_id').annotate(
+            total=Sum(F('quantity') - F('received_quantity'))
+        ).order_by().values_list('consumable_id', 'total'):
+            on_order[consumable_id] += max(total or 0, 0)
+        velocity = cls.consumption_velocity(company_id, params['velocity_days'])
+
+        items = []
+        for consumable_id, code, name, unit, price, min_stock, max_stock, category_id, category_name in rows:
+            stock = on_hand.get(consumable_id) or 0
+            pending = on_order.get(consumable_id) or 0
+            daily = velocity.get(consumable_id, Decimal('0.00'))
+            reorder_point = max(min_stock, math.ceil(daily * params['lead_time_days']))
+            target = max(max_stock, reorder_point + math.ceil(daily * params['review_days']))
+            available = stock + pending
+            suggested = max(target - available, 0) if available <= reorder_point else 0
+            if not suggested and not include_all:
+                continue
+            items.append({
+                'consumable': consumable_id,
+                'code': code,
+                'name': name,
+                'unit': unit,
+                'price': price,
+                'category': category_id,
+                'category_name': category_name,
+                'min_stock': min_stock,
+                'max_stock': max_stock,
+                'on_hand': stock,
+                'on_order': pending,
+                'daily_usage': daily,
+                'days_of_cover': (Decimal(stock) / daily).quantize(Decimal('0.1')) if daily else None,
+                'reorder_point': reorder_point,
+                'target_stock': target,
+                'suggested_quantity': suggested,
+                'low_warehouses': low_warehouses.get(consumable_id, []),
+            })
+
+        items.sort(key=lambda item: (item['days_of_cover'] is None, item['days_of_cover'] or 0, item['code']))
+        return {'parameters': params, 'items': items}
+
+    @classmethod
+    @transaction.atomic
+    def create_purchase_requests(cls, company_id: int, user, lines: Optional[Iterable[Dict]] = None,
+                                 consumables=None, department_id=None, expected_date=None, **overrides) -> List:
+        """
+        按补货建议批量生成采购申请草稿（每个用品分类一张）
+
+        Args:
+            lines: [{'consumable': ID, 'quantity': 数量}]，为空时采用全部建议采购量
+
+        Returns:
+            创建的 PurchaseRequest 列表
+        """
+        from apps.consumables.models import Consumable
+        from apps.procurement.models import PurchaseRequest, PurchaseRequestItem
+
+        if lines is None:
+            lines = [
+                {'consumable': item['consumable'], 'quantity': item['suggested_quantity']}
+                for item in cls.suggestions(company_id, consumables, **overrides)['items']
+            ]
+
+        quantities = defaultdict(int)
+        for line in lines:
+            try:
+                quantity = int(line.get('quantity') or 0)
+                consumable_id = int(line['consumable'])
+            except (KeyError, TypeError, ValueError):
+                raise BusinessException('补货明细格式错误，需提供 consumable 与 quantity')
+            if quantity > 0:
+                quantities[consumable_id] += quantity
+        if not quantities:
+            raise BusinessException('没有需要补货的用品')
+
+        if consumables is None:
+            consumables = Consumable.objects.all()
+        found = {
+            consumable.id: consumable
+            for consumable in consumables.filter(company_id=company_id, pk__in=quantities).select_related('category')
+        }
+        unknown = sorted(set(quantities) - set(found))
+        if unknown:
+            raise BusinessException(f'用品不存在或无权访问: {", ".join(map(str, unknown))}')
+
+        by_category = defaultdict(list)
+        for consumable_id, quantity in quantities.items():
+            consumable = found[consumable_id]
+            by_category[consumable.category_id].append((consumable, quantity))
+
+        today = timezone.localdate()
+        requests, items = [], []
+        for lines_in_category in by_category.values():
+            category = lines_in_category[0][0].category
+            request = PurchaseRequest(
+                request_no=cls.generate_order_no('CG'),
+                company_id=company_id,
+                status=PurchaseRequest.Status.DRAFT,
+                request_date=today,
+                expected_date=expected_date,
+                department_id=department_id,
+                reason=f'补货建议：{category.name if category else "未分类"}',
+                total_amount=sum((consumable.price * quantity for consumable, quantity in lines_in_category), Decimal('0')),
+                created_by=user,
+            )
+            requests.append(request)
+            for consumable, quantity in lines_in_category:
+                items.append(PurchaseRequestItem(
+                    request=request,
+                    item_type=PurchaseRequestItem.ItemType.CONSUMABLE,
+                    consumable=consumable,
+                    name=consumable.name,
+                    model=consumable.model,
+                    unit=consumable.unit,
+                    quantity=quantity,
+                    estimated_price=consumable.price,
+                    estimated_amount=consumable.price * quantity,
+                ))
+
+        PurchaseRequest.objects.bulk_create(requests)
+        PurchaseRequestItem.objects.bulk_create(items)
+        return requests
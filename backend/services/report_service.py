@@ -0,0 +1,474 @@
+"""
+报表引擎服务 - Report Service
+
+将 ReportTemplate 的 columns / filters / grouping / sorting 配置编译为单条 ORM 聚合查询:
+- 每种 report_type 只允许白名单内的字段、比较运算与聚合函数
+- 分页结果按 (模板, 版本, 参数, 用户) 缓存，TTL 由 REPORT_CACHE_TIMEOUT 控制
+- 导出时分块迭代查询结果，CSV 流式输出，Excel 以 write_only 模式写入临时文件
+- 每次实际执行查询均写入 ReportExportLog
+
+模板配置示例:
+    columns:  [{"field": "category__name", "label": "分类"},
+               {"field": "original_value", "agg": "sum", "label": "原值合计"},
+               {"field": "id", "agg": "count", "label": "数量"}]
+    grouping: [{"field": "acquisition_date", "trunc": "month"}]
+    filters:  [{"field": "status", "op": "in", "param": "status"},
+               {"field": "original_value", "op": "gte", "value": 1000}]
+    sorting:  [{"field": "sum_original_value", "desc": true}]
+
+不含聚合列时为明细报表，按列取值；含聚合列时其余列与 grouping 为分组维度。
+"""
+import csv
+import hashlib
+import json
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from tempfile import SpooledTemporaryFile
+from typing import Dict, Iterator, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Avg, Count, Max, Min, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncQuarter, TruncWeek, TruncYear
+
+from apps.common.exceptions import BusinessException, ValidationError
+from .base import BaseService
+
+# 字段类型
+DIM, NUM, DATE = 'dim', 'num', 'date'
+
+# 报表数据源：模型、基础过滤、公司字段、数据权限字段、可用字段白名单 {字段: (名称, 类型)}
+REPORT_SOURCES = {
+    'asset': {
+        'model': 'assets.Asset',
+        'base_filter': {'is_deleted': False},
+        'company_field': 'company_id',
+        'department_fields': ['using_department_id', 'manage_department_id'],
+        'user_fields': ['using_user_id', 'manager_id', 'created_by_id'],
+        'fields': {
+            'id': ('ID', NUM),
+            'asset_code': ('资产编码', DIM),
+            'name': ('资产名称', DIM),
+            'status': ('状态', DIM),
+            'brand': ('品牌', DIM),
+            'model': ('规格型号', DIM),
+            'acquisition_method': ('取得方式', DIM),
+            'category__name': ('资产分类', DIM),
+            'using_department__name': ('使用部门', DIM),
+            'manage_department__name': ('管理部门', DIM),
+            'location__name': ('存放位置', DIM),
+            'using_user__nickname': ('使用人', DIM),
+            'supplier__name': ('供应商', DIM),
+            'quantity': ('数量', NUM),
+            'original_value': ('原值', NUM),
+            'current_value': ('净值', NUM),
+            'accumulated_depreciation': ('累计折旧', NUM),
+            'acquisition_date': ('取得日期', DATE),
+            'warranty_expiry': ('保修到期日', DATE),
+            'created_at': ('创建时间', DATE),
+        },
+    },
+    'consumable': {
+        'model': 'consumables.ConsumableStock',
+        'base_filter': {},
+        'company_field': 'consumable__company_id',
+        'fields': {
+            'id': ('ID', NUM),
+            'consumable__code': ('用品编码', DIM),
+            'consumable__name': ('用品名称', DIM),
+            'consumable__category__name': ('用品分类', DIM),
+            'consumable__unit': ('计量单位', DIM),
+            'warehouse__name': ('仓库', DIM),
+            'quantity': ('库存数量', NUM),
+            'consumable__price': ('单价', NUM),
+            'consumable__min_stock': ('安全库存', NUM),
+            'updated_at': ('更新时间', DATE),
+        },
+    },
+    'finance': {
+        'model': 'finance.DepreciationRecord',
+        'base_filter': {},
+        'company_field': 'company_id',
+        'fields': {
+            'id': ('ID', NUM),
+            'period': ('折旧期间', DIM),
+            'asset__asset_code': ('资产编码', DIM),
+            'asset__name': ('资产名称', DIM),
+            'asset__category__name': ('资产分类', DIM),
+            'asset__using_department__name': ('使用部门', DIM),
+            'depreciation_amount': ('本期折旧额', NUM),
+            'accumulated_depreciation': ('累计折旧', NUM),
+            'current_value': ('当前净值', NUM),
+            'created_at': ('计提时间', DATE),
+        },
+    },
+    'inventory': {
+        'model': 'inventory.InventoryRecord',
+        'base_filter': {},
+        'company_field': 'task__company_id',
+        'fields': {
+            'id': ('ID', NUM),
+            'task__task_no': ('任务编号', DIM),
+            'task__name': ('任务名称', DIM),
+            'result': ('盘点结果', DIM),
+            'asset__asset_code': ('资产编码', DIM),
+            'asset__name': ('资产名称', DIM),
+            'asset__category__name': ('资产分类', DIM),
+            'book_department__name': ('账面部门', DIM),
+            'book_location__name': ('账面位置', DIM),
+            'actual_location__name': ('实际位置', DIM),
+            'checker__nickname': ('盘点人', DIM),
+            'check_time': ('盘点时间', DATE),
+        },
+    },
+}
+
+AGGREGATES = {
+    'count': (Count, (DIM, NUM, DATE)),
+    'count_distinct': (Count, (DIM, NUM, DATE)),
+    'sum': (Sum, (NUM,)),
+    'avg': (Avg, (NUM,)),
+    'min': (Min, (NUM, DATE)),
+    'max': (Max, (NUM, DATE)),
+}
+
+TRUNCATES = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+    'quarter': TruncQuarter,
+    'year': TruncYear,
+}
+
+# isnull 条件可接受的取值
+BOOLEAN_VALUES = {'true': True, '1': True, 'yes': True, 'false': False, '0': False, 'no': False}
+
+# 比较运算 -> (ORM lookup, 是否接受列表值)
+OPERATORS = {
+    'eq': ('exact', False),
+    'ne': ('exact', False),
+    'gt': ('gt', False),
+    'gte': ('gte', False),
+    'lt': ('lt', False),
+    'lte': ('lte', False),
+    'in': ('in', True),
+    'contains': ('icontains', False),
+    'isnull': ('isnull', False),
+    'range': ('range', True),
+}
+
+
+class CompiledReport:
+    """校验并编译后的报表定义"""
+
+    def __init__(self, template):
+        from django.apps import apps
+
+        source = REPORT_SOURCES.get(template.report_type)
+        if source is None:
+            raise BusinessException(f'不支持的报表类型: {template.report_type}')
+        self.source = source
+        self.fields = source['fields']
+        # 聚合/截断列以 annotate 输出，列标识不能与模型字段同名
+        self.model_fields = {
+            name
+            for field in apps.get_model(source['model'])._meta.get_fields()
+            for name in (field.name, getattr(field, 'attname', None)) if name
+        }
+
+        self.dimensions = []     # [(输出键, 字段, 截断)]
+        self.metrics = []        # [(输出键, 字段, 聚合)]
+        self.headers = []        # [(输出键, 列名)]
+        for column in [*template.grouping, *template.columns]:
+            self._add_column(column if isinstance(column, dict) else {'field': column})
+        if not self.headers:
+            raise BusinessException('报表未配置任何列')
+
+        self.filters = [self._check_filter(item) for item in template.filters]
+
+        keys = {key for key, _ in self.headers}
+        self.ordering = []
+        for item in template.sorting:
+            item = item if isinstance(item, dict) else {'field': item}
+            if item.get('field') not in keys:
+                raise BusinessException(f'排序字段必须是报表列: {item.get("field")}')
+            self.ordering.append(f'-{item["field"]}' if item.get('desc') else item['field'])
+        if not self.ordering:
+            # 分页需要稳定排序
+            self.ordering = [key for key, _, _ in self.dimensions] or ['pk']
+
+    def _field_kind(self, field):
+        if field not in self.fields:
+            raise BusinessException(f'字段不在可用范围内: {field}')
+        return self.fields[field][1]
+
+    def _add_column(self, column: Dict):
+        field = column.get('field')
+        kind = self._field_kind(field)
+        agg = column.get('agg')
+        if agg:
+            if agg not in AGGREGATES or kind not in AGGREGATES[agg][1]:
+                raise BusinessException(f'字段 {field} 不支持聚合方式 {agg}')
+            key = column.get('key') or f'{agg}_{field.replace("__", "_")}'
+            self.metrics.append((key, field, agg))
+        else:
+            trunc = column.get('trunc')
+            if trunc and (trunc not in TRUNCATES or kind != DATE):
+                raise BusinessException(f'字段 {field} 不支持按 {trunc} 分组')
+            key = f'{field}_{trunc}' if trunc else field
+            if any(key == existing for existing, _, _ in self.dimensions):
+                return
+            self.dimensions.append((key, field, trunc))
+        if not key.replace('_', '').isalnum():
+            raise BusinessException(f'列标识不合法: {key}')
+        if (agg or trunc) and key in self.model_fields:
+            raise ValidationError(f'列标识不能与字段同名: {key}')
+        self.headers.append((key, column.get('label') or self.fields[field][0]))
+
+    def _check_filter(self, item: Dict) -> Dict:
+        self._field_kind(item.get('field'))
+        if item.get('op', 'eq') not in OPERATORS:
+            raise BusinessException(f'不支持的筛选条件: {item.get("op")}')
+        if 'value' not in item and not item.get('param'):
+            raise BusinessException(f'筛选条件缺少 value 或 param: {item.get("field")}')
+        return item
+
+    @staticmethod
+    def _clean_value(item: Dict, lookup: str, many: bool, value):
+        """规范化筛选取值：列表运算拆分逗号分隔值，isnull 转为布尔，range 须为两个值"""
+        if many and not isinstance(value, (list, tuple)):
+            value = [v for v in str(value).split(',') if v != '']
+        if lookup == 'isnull' and not isinstance(value, bool):
+            value = BOOLEAN_VALUES.get(str(value).lower())
+            if value is None:
+                raise ValidationError(f'筛选条件 {item["field"]} 的取值应为 true 或 false')
+        if lookup == 'range' and len(value) != 2:
+            raise ValidationError(f'筛选条件 {item["field"]} 的范围应为两个值')
+        return value
+
+    def build_queryset(self, company_id: int, params: Dict, request=None):
+        """按参数构建单条查询（values + annotate）"""
+        from django.apps import apps
+        from apps.common.filters import apply_data_scope
+
+        source = self.source
+        queryset = apps.get_model(source['model']).objects.filter(
+            **source['base_filter'], **{source['company_field']: company_id}
+        )
+        if request is not None:
+            queryset = apply_data_scope(
+                request, queryset,
+                company_field=source['company_field'],
+                department_fields=source.get('department_fields'),
+                user_fields=source.get('user_fields'),
+            )
+
+        for item in self.filters:
+            lookup, many = OPERATORS[item.get('op', 'eq')]
+            if item.get('param'):
+                if item['param'] not in params:
+                    if item.get('required'):
+                        raise BusinessException(f'缺少报表参数: {item["param"]}')
+                    continue
+                value = params[item['param']]
+            else:
+                value = item['value']
+            value = self._clean_value(item, lookup, many, value)
+            condition = {f'{item["field"]}__{lookup}': value}
+            try:
+                queryset = queryset.exclude(**condition) if item.get('op') == 'ne' else queryset.filter(**condition)
+            except (DjangoValidationError, TypeError, ValueError):
+                raise ValidationError(f'筛选条件取值不合法: {item["field"]}')
+
+        annotations = {
+            key: TRUNCATES[trunc](field) for key, field, trunc in self.dimensions if trunc
+        }
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+        queryset = queryset.values(*(key for key, _, _ in self.dimensions))
+        if self.metrics:
+            queryset = queryset.annotate(**{
+                key: AGGREGATES[agg][0](field, distinct=agg == 'count_distinct')
+                for key, field, agg in self.metrics
+            })
+        return queryset.order_by(*self.ordering)
+
+
+class ReportService(BaseService):
+    """报表引擎业务服务"""
+
+    CACHE_KEY = 'report:{template_id}:{version}:{digest}'
+    EXPORT_CHUNK_SIZE = 2000
+    MAX_PAGE_SIZE = 500
+
+    @staticmethod
+    def compile(template) -> CompiledReport:
+        return CompiledReport(template)
+
+    @staticmethod
+    def available_fields(report_type: Optional[str] = None) -> Dict:
+        """各报表类型可用字段、聚合方式与截断粒度"""
+        types = [report_type] if report_type else list(REPORT_SOURCES)
+        return {
+            name: [
+                {
+                    'field': field,
+                    'label': label,
+                    'kind': kind,
+                    'aggregates': [agg for agg, (_, kinds) in AGGREGATES.items() if kind in kinds],
+                }
+                for field, (label, kind) in REPORT_SOURCES[name]['fields'].items()
+            ]
+            for name in types if name in REPORT_SOURCES
+        }
+
+    @classmethod
+    def run(cls, template, params: Dict, user, page: int = 1, page_size: int = 50, request=None) -> Dict:
+        """
+        执行报表并返回一页结果（带缓存）
+
+        Returns:
+            {'columns': [{'key', 'label'}], 'count', 'page', 'page_size', 'results', 'cached'}
+        """
+        try:
+            page = max(int(page), 1)
+            page_size = min(max(int(page_size), 1), cls.MAX_PAGE_SIZE)
+        except (TypeError, ValueError):
+            raise ValidationError('page 和 page_size 必须是整数')
+        key = cls._cache_key(template, {'params': params, 'page': page, 'page_size': page_size}, user)
+        cached = cache.get(key)
+        if cached is not None:
+            return {**cached, 'cached': True}
+
+        compiled = cls.compile(template)
+        started = time.perf_counter()
+        queryset = compiled.build_queryset(template.company_id, params, request)
+        count = queryset.count()
+        offset = (page - 1) * page_size
+        results = [cls._jsonable(row) for row in queryset[offset:offset + page_size]]
+        data = {
+            'columns': [{'key': key_, 'label': label} for key_, label in compiled.headers],
+            'count': count,
+            'page': page,
+            'page_size': page_size,
+            'results': results,
+        }
+        cache.set(key, data, settings.REPORT_CACHE_TIMEOUT)
+        cls._log(template, user, {
+            'mode': 'page', 'params': params, 'page': page, 'rows': len(results),
+            'duration_ms': int((time.perf_counter() - started) * 1000),
+        })
+        return {**data, 'cached': False}
+
+    @classmethod
+    def iter_csv(cls, template, params: Dict, user, request=None) -> Iterator[str]:
+        """
+        流式生成 CSV（带 BOM，Excel 可直接打开），导出完成后回写日志的文件大小与行数
+
+        编译、参数校验与日志在调用时立即执行，配置或参数有误时在返回响应前抛出异常
+        """
+        compiled = cls.compile(template)
+        queryset = compiled.build_queryset(template.company_id, params, request)
+        log = cls._log(template, user, {'mode': 'export', 'format': 'csv', 'params': params})
+        return cls._csv_lines(compiled, queryset, log)
+
+    @classmethod
+    def _csv_lines(cls, compiled, queryset, log) -> Iterator[str]:
+        buffer = _LineBuffer()
+        writer = csv.writer(buffer)
+        keys = [key for key, _ in compiled.headers]
+        size, rows, started = 0, 0, time.perf_counter()
+
+        line = '\ufeff' + writer.writerow([label for _, label in compiled.headers])
+        size += len(line.encode('utf-8'))
+        yield line
+        for row in queryset.iterator(chunk_size=cls.EXPORT_CHUNK_SIZE):
+            line = writer.writerow([cls._cell(row[key]) for key in keys])
+            size += len(line.encode('utf-8'))
+            rows += 1
+            yield line
+
+        cls._finish_log(log, size, rows, started)
+
+    @classmethod
+    def export_xlsx(cls, template, params: Dict, user, request=None):
+        """导出 Excel：write_only 模式逐行写入临时文件，返回文件对象"""
+        import openpyxl
+
+        compiled = cls.compile(template)
+        queryset = compiled.build_queryset(template.company_id, params, request)
+        log = cls._log(template, user, {'mode': 'export', 'format': 'xlsx', 'params': params})
+        started = time.perf_counter()
+
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet(title=template.name[:31])
+        sheet.append([label for _, label in compiled.headers])
+        keys = [key for key, _ in compiled.headers]
+        rows = 0
+        for row in queryset.iterator(chunk_size=cls.EXPORT_CHUNK_SIZE):
+            sheet.append([cls._cell(row[key], excel=True) for key in keys])
+            rows += 1
+
+        output = SpooledTemporaryFile(max_size=10 * 1024 * 1024)
+        workbook.save(output)
+        size = output.tell()
+        output.seek(0)
+        cls._finish_log(log, size, rows, started)
+        return output
+
+    @classmethod
+    def _cache_key(cls, template, payload: Dict, user) -> str:
+        # 数据权限因人而异，缓存按用户隔离
+        digest = hashlib.sha1(
+            json.dumps({**payload, 'user': user.pk}, sort_keys=True, default=str).encode('utf-8')
+        ).hexdigest()
+        return cls.CACHE_KEY.format(
+            template_id=template.pk, version=int(template.updated_at.timestamp()), digest=digest
+        )
+
+    @staticmethod
+    def _log(template, user, export_params: Dict):
+        from apps.reports.models import ReportExportLog
+
+        return ReportExportLog.objects.create(
+            company_id=template.company_id,
+            report_template=template,
+            report_name=template.name,
+            export_params=json.loads(json.dumps(export_params, default=str)),
+            created_by=user if user and user.is_authenticated else None,
+        )
+
+    @staticmethod
+    def _finish_log(log, size: int, rows: int, started: float):
+        from apps.reports.models import ReportExportLog
+
+        log.export_params.update({'rows': rows, 'duration_ms': int((time.perf_counter() - started) * 1000)})
+        ReportExportLog.objects.filter(pk=log.pk).update(file_size=size, export_params=log.export_params)
+
+    @staticmethod
+    def _cell(value, excel: bool = False):
+        if value is None:
+            return ''
+        if isinstance(value, datetime):
+            return value.replace(tzinfo=None) if excel else value.isoformat(sep=' ', timespec='seconds')
+        if isinstance(value, Decimal):
+            return float(value) if excel else str(value)
+        return value
+
+    @classmethod
+    def _jsonable(cls, row: Dict) -> Dict:
+        return {
+            key: str(value) if isinstance(value, Decimal)
+            else value.isoformat() if isinstance(value, (date, datetime))
+            else value
+            for key, value in row.items()
+        }
+
+
+class _LineBuffer:
+    """csv.writer 的写入目标，writerow 直接返回该行文本"""
+
+    def write(self, value):
+        return value
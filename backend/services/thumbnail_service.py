@@ -0,0 +1,161 @@
+"""
+图片缩略图服务 - Thumbnail Service
+
+为 Asset.image 与 AssetImage.image 生成多尺寸 WebP / JPEG 缩略图:
+- 上传后由信号提交 Celery 任务异步生成，不阻塞保存请求
+- 缩略图按原图内容哈希存放 (thumbs/ab/<sha1>/<尺寸>.<格式>)，相同图片只生成一次，
+  路径随内容变化，可由 nginx 长期缓存
+- 生成结果写回模型 JSON 字段，列表序列化时无需额外查询
+"""
+import hashlib
+import logging
+import os
+from io import BytesIO
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .base import BaseService
+
+logger = logging.getLogger(__name__)
+
+
+class ThumbnailService(BaseService):
+    """图片缩略图业务服务"""
+
+    STORAGE_DIR = 'thumbs'
+    SAVE_OPTIONS = {
+        'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+        'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+    }
+    EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+    # 支持的模型: 标识 -> (app_label.Model, 图片字段, 缩略图字段)
+    TARGETS = {
+        'asset': ('assets.Asset', 'image', 'image_thumbnails'),
+        'asset_image': ('assets.AssetImage', 'image', 'thumbnails'),
+    }
+
+    @classmethod
+    def get_model(cls, target: str):
+        from django.apps import apps
+
+        model_label, image_field, thumb_field = cls.TARGETS[target]
+        return apps.get_model(model_label), image_field, thumb_field
+
+    @staticmethod
+    def is_current(thumbnails: Optional[Dict], image_name: Optional[str]) -> bool:
+        """缩略图是否对应当前图片"""
+        return bool(image_name) and bool(thumbnails) and thumbnails.get('source') == image_name
+
+    @classmethod
+    def generate(cls, target: str, pk: int, force: bool = False) -> Optional[Dict]:
+        """
+        为单条记录生成缩略图并写回
+
+        写回使用以原图路径为条件的 UPDATE，生成期间图片被替换时不会覆盖新图的结果
+
+        Returns:
+            缩略图信息；无图片或已是最新时返回 None
+        """
+        model, image_field, thumb_field = cls.get_model(target)
+        row = model.objects.filter(pk=pk).values(image_field, thumb_field).first()
+        if not row or not row[image_field]:
+            return None
+
+        image_name = row[image_field]
+        if not force and cls.is_current(row[thumb_field], image_name):
+            return None
+
+        thumbnails = cls.build(image_name)
+        if thumbnails is None:
+            return None
+        model.objects.filter(pk=pk, **{image_field: image_name}).update(**{thumb_field: thumbnails})
+        return thumbnails
+
+    @classmethod
+    def build(cls, image_name: str) -> Optional[Dict]:
+        """
+        读取原图并生成各尺寸缩略图（已存在的内容地址直接复用）
+
+        Returns:
+            {'source': 原图路径, 'digest': sha1, 尺寸名: {格式: 路径}}；原图不可读时返回 None
+        """
+        try:
+            with default_storage.open(image_name, 'rb') as f:
+                content = f.read()
+        except (FileNotFoundError, OSError) as e:
+            logger.warning(f"[Thumbnail] 原图不可读 {image_name}: {e}")
+            return None
+
+        digest = hashlib.sha1(content).hexdigest()
+        base_dir = os.path.join(cls.STORAGE_DIR, digest[:2], digest)
+        thumbnails = {'source': image_name, 'digest': digest}
+
+        sizes = settings.ASSET_THUMBNAIL_SIZES
+        formats = settings.ASSET_THUMBNAIL_FORMATS
+        paths = {
+            size_name: {fmt: os.path.join(base_dir, f'{size}.{cls.EXTENSIONS[fmt]}') for fmt in formats}
+            for size_name, size in sizes.items()
+        }
+        thumbnails.update(paths)
+
+        missing = [
+            (sizes[size_name], fmt, path)
+            for size_name, fmt_paths in paths.items()
+            for fmt, path in fmt_paths.items()
+            if not default_storage.exists(path)
+        ]
+        if not missing:
+            return thumbnails
+
+        try:
+            with Image.open(BytesIO(content)) as source:
+                source = ImageOps.exif_transpose(source)
+                source.load()
+                # 从大到小依次缩放，后一尺寸复用前一尺寸的结果
+                current = source
+                for size in sorted({size for size, _, _ in missing}, reverse=True):
+                    current = current.copy()
+                    current.thumbnail((size, size), Image.Resampling.LANCZOS)
+                    for _, fmt, path in (m for m in missing if m[0] == size):
+                        cls._save(current, fmt, path)
+        except (Image.UnidentifiedImageError, OSError) as e:
+            logger.warning(f"[Thumbnail] 图片无法解析 {image_name}: {e}")
+            return None
+        return thumbnails
+
+    @classmethod
+    def _save(cls, image: Image.Image, fmt: str, path: str):
+        if fmt == 'jpeg' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        elif fmt == 'webp' and image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+        output = BytesIO()
+        image.save(output, **cls.SAVE_OPTIONS[fmt])
+        # 内容地址相同即内容相同，并发生成时后写入者直接跳过
+        if not default_storage.exists(path):
+            default_storage.save(path, ContentFile(output.getvalue()))
+
+    @staticmethod
+    def to_urls(thumbnails: Optional[Dict], image_name: Optional[str], request=None) -> Optional[Dict]:
+        """
+        缩略图信息转为 URL: {尺寸名: {格式: url}}
+
+        缩略图尚未生成或与当前图片不一致时返回 None，前端回退到原图
+        """
+        if not ThumbnailService.is_current(thumbnails, image_name):
+            return None
+        urls = {}
+        for size_name in settings.ASSET_THUMBNAIL_SIZES:
+            fmt_paths = thumbnails.get(size_name)
+            if not fmt_paths:
+                continue
+            urls[size_name] = {
+                fmt: request.build_absolute_uri(default_storage.url(path)) if request else default_storage.url(path)
+                for fmt, path in fmt_paths.items()
+            }
+        return urls or None